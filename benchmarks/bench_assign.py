@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Compare whisperx's assign_word_speakers with the vectorized assignment engine.
+
+Usage: python benchmarks/bench_assign.py [--words 100000] [--speakers 6]
+"""
+
+import argparse
+import copy
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from diarized_transcriber.speaker_assignment import assign_word_speakers
+
+def synthetic(num_words, num_speakers, seed=0):
+    """Diarization turns (a quarter followed by overlapping speech) and aligned words across them."""
+    rng = random.Random(seed)
+    turns, t = [], 0.0
+    while t < num_words * 0.45:
+        duration = rng.uniform(0.5, 15)
+        turns.append({"start": t, "end": t + duration, "speaker": f"SPEAKER_{rng.randrange(num_speakers):02d}"})
+        if rng.random() < 0.25:
+            turns.append({"start": t + duration - rng.uniform(0.2, 3), "end": t + duration + rng.uniform(0.2, 3),
+                          "speaker": f"SPEAKER_{rng.randrange(num_speakers):02d}"})
+        t += duration + rng.uniform(-0.5, 1.5)
+    segments, t = [], 0.0
+    for _ in range(0, num_words, 12):
+        words = []
+        for _ in range(12):
+            duration = rng.uniform(0.1, 0.6)
+            words.append({"word": "w", "start": round(t, 3), "end": round(t + duration, 3), "score": 0.9})
+            t += duration + rng.uniform(0, 0.2)
+        segments.append({"start": words[0]["start"], "end": words[-1]["end"], "text": "w", "words": words})
+    return pd.DataFrame(turns), {"segments": segments, "language": "en"}
+
+def labels(result):
+    return [(seg.get("speaker"), [w.get("speaker") for w in seg["words"]]) for seg in result["segments"]]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark word-to-speaker assignment")
+    parser.add_argument("--words", type=int, default=100000, help="Synthetic words (default: 100000)")
+    parser.add_argument("--speakers", type=int, default=6, help="Speakers (default: 6)")
+    args = parser.parse_args()
+
+    diarize_df, result = synthetic(args.words, args.speakers)
+    print(f"{args.words} words, {len(diarize_df)} turns, {args.speakers} speakers")
+
+    start = time.perf_counter()
+    ours = assign_word_speakers(diarize_df, copy.deepcopy(result))
+    engine = time.perf_counter() - start
+    print(f"vectorized engine:           {engine:8.3f}s")
+
+    try:
+        import whisperx
+        from whisperx import diarize
+    except ImportError:
+        print("whisperx not installed; skipping the comparison")
+        return
+    version = getattr(whisperx, "__version__", None)
+    if version is None:
+        from importlib import metadata
+        version = metadata.version("whisperx")
+    start = time.perf_counter()
+    theirs = diarize.assign_word_speakers(diarize_df.copy(), copy.deepcopy(result))
+    baseline = time.perf_counter() - start
+    print(f"whisperx {version} assign:    {baseline:8.3f}s  ({baseline / engine:.1f}x slower)")
+
+    ours_labels, their_labels = labels(ours), labels(theirs)
+    words = sum(len(w) for _, w in ours_labels)
+    same = sum(a == b for (_, wa), (_, wb) in zip(ours_labels, their_labels) for a, b in zip(wa, wb))
+    # Releases after 3.4 break exact ties (words inside overlapping speech) by turn order
+    print(f"identical word labels:       {same}/{words}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Compare per-format exporters run one after another with the single-pass export engine.
+
+Usage: python benchmarks/bench_export.py [--segments 50000] [--formats srt txt md html pdf json]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from diarized_transcriber.export import export_transcript
+from diarized_transcriber.srt_exporter import generate_speaker_aware_srt
+from diarized_transcriber.txt_exporter import generate_txt
+from diarized_transcriber.markdown_exporter import generate_markdown_transcript
+from diarized_transcriber.html_exporter import generate_html_transcript
+from diarized_transcriber.pdf_exporter import generate_pdf_transcript
+from diarized_transcriber.json_exporter import save_json
+
+def synthetic_result(num_segments, num_speakers=4, seed=0):
+    rng = random.Random(seed)
+    segments = []
+    t = 0.0
+    speaker = "SPEAKER_00"
+    for i in range(num_segments):
+        if rng.random() < 0.3:
+            speaker = f"SPEAKER_{rng.randrange(num_speakers):02d}"
+        duration = rng.uniform(1.0, 6.0)
+        segments.append({"start": round(t, 3), "end": round(t + duration, 3), "speaker": speaker,
+                         "text": f" Segment {i} says something about the topic at hand. "})
+        t += duration + rng.uniform(0.0, 0.5)
+    return {"segments": segments, "language": "en"}
+
+def sequential_export(result, output_dir, base_filename, formats):
+    """The exporters called one after another, each grouping the segments itself."""
+    segments = result["segments"]
+    for format_type in formats:
+        path = os.path.join(output_dir, f"{base_filename}.{format_type}")
+        if format_type == "srt":
+            generate_speaker_aware_srt(segments, path)
+        elif format_type == "txt":
+            generate_txt(segments, path, include_timestamps=True)
+        elif format_type == "md":
+            generate_markdown_transcript(segments, path, include_timestamps=True)
+        elif format_type == "html":
+            generate_html_transcript(segments, path)
+        elif format_type == "pdf":
+            generate_pdf_transcript(segments, path)
+        elif format_type == "json":
+            save_json(result, path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark transcript export")
+    parser.add_argument("--segments", type=int, default=50000, help="Synthetic segments (default: 50000)")
+    parser.add_argument("--formats", nargs="+", default=["srt", "txt", "md", "html", "pdf", "json"])
+    parser.add_argument("--workers", type=int, help="Export workers (default: one per format, capped at the CPU count)")
+    args = parser.parse_args()
+
+    result = synthetic_result(args.segments)
+    output_dir = tempfile.mkdtemp(prefix="bench-export-")
+    try:
+        start = time.perf_counter()
+        sequential_export(result, output_dir, "sequential", args.formats)
+        sequential = time.perf_counter() - start
+
+        start = time.perf_counter()
+        export_transcript(result, output_dir, "engine", args.formats, max_workers=args.workers)
+        engine = time.perf_counter() - start
+    finally:
+        shutil.rmtree(output_dir)
+
+    print(f"{args.segments} segments, formats: {' '.join(args.formats)}, {os.cpu_count()} CPU(s)")
+    print(f"sequential exporters: {sequential:8.3f}s")
+    print(f"export engine:        {engine:8.3f}s  ({sequential / engine:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Compare the previous FPDF renderer with the streaming paragraph PDF writer.
+
+Usage: python benchmarks/bench_pdf.py [--segments 50000] [--font /path/to/font.ttf]
+"""
+
+import argparse
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_export import synthetic_result
+from diarized_transcriber.pdf_exporter import FpdfWriter, PdfWriter
+from diarized_transcriber.streaming import scan_has_speakers
+
+def render(writer_class, segments, path, **kwargs):
+    with writer_class(path, has_speakers=scan_has_speakers(segments), autoflush=False, **kwargs) as writer:
+        writer.write_all(segments)
+
+def measure(writer_class, segments, path, **kwargs):
+    """Wall time, peak traced allocation in MB (from a second run) and file size in KB."""
+    gc.collect()
+    start = time.perf_counter()
+    render(writer_class, segments, path, **kwargs)
+    seconds = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    try:
+        render(writer_class, segments, path, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return seconds, peak / (1024 * 1024), os.path.getsize(path) / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF export")
+    parser.add_argument("--segments", type=int, default=50000, help="Synthetic segments (default: 50000)")
+    parser.add_argument("--font", help="TrueType font for a run with non-Latin text (new writer only)")
+    args = parser.parse_args()
+
+    segments = synthetic_result(args.segments)["segments"]
+    output_dir = tempfile.mkdtemp(prefix="bench-pdf-")
+    try:
+        # Warm up the imports so neither side pays for them
+        render(FpdfWriter, segments[:10], os.path.join(output_dir, "warmup.pdf"))
+        render(PdfWriter, segments[:10], os.path.join(output_dir, "warmup.pdf"))
+
+        rows = [("fpdf (one block per segment)", measure(FpdfWriter, segments, os.path.join(output_dir, "fpdf.pdf"))),
+                ("paragraph writer", measure(PdfWriter, segments, os.path.join(output_dir, "new.pdf")))]
+        if args.font:
+            cyrillic = [dict(seg, text=seg["text"].replace("Segment", "Сегмент")) for seg in segments]
+            rows.append(("paragraph writer, embedded font",
+                         measure(PdfWriter, cyrillic, os.path.join(output_dir, "font.pdf"), font_path=args.font)))
+    finally:
+        shutil.rmtree(output_dir)
+
+    print(f"{args.segments} segments, {os.cpu_count()} CPU(s)")
+    base = rows[0][1][0]
+    for name, (seconds, peak_mb, size_kb) in rows:
+        print(f"{name:34s} {seconds:8.3f}s  ({base / seconds:5.2f}x)  peak {peak_mb:7.1f} MB  {size_kb:8.0f} KB")
+
+if __name__ == "__main__":
+    main()
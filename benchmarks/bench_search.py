@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Time building, updating and querying the transcript search index.
+
+Usage: python benchmarks/bench_search.py [--files 50] [--minutes 60]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from synthetic import synthetic_recording
+from diarized_transcriber.search_index import SearchIndex
+from diarized_transcriber.transcript import Transcript
+from diarized_transcriber.transcript_file import save_transcript
+
+QUERIES = [("word", "interesting", None), ("phrase", '"really think about the"', None),
+           ("words in a segment", "episode data", None), ("phrase, one speaker", '"the model"', "SPEAKER_01"),
+           ("no match", "nonexistent", None)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the search index")
+    parser.add_argument("--files", type=int, default=50, help="Synthetic transcripts (default: 50)")
+    parser.add_argument("--minutes", type=float, default=60, help="Length of each transcript (default: 60)")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench-search-")
+    try:
+        sources = os.path.join(work_dir, "transcripts")
+        os.makedirs(sources)
+        paths = []
+        for i in range(args.files):
+            paths.append(os.path.join(sources, f"episode-{i:04d}.dtr"))
+            recording = synthetic_recording(args.minutes * 60, seed=i)
+            save_transcript(Transcript.from_result(recording.diarized), paths[-1])
+
+        index = SearchIndex(os.path.join(work_dir, "index"))
+        start = time.perf_counter()
+        index.update([sources])
+        build = time.perf_counter() - start
+        words = index.word_count()
+
+        # One transcript re-saved and one new: only those two are read
+        os.utime(paths[0], ns=(0, 1))
+        save_transcript(Transcript.from_result(synthetic_recording(args.minutes * 60, seed=args.files).diarized),
+                        os.path.join(sources, "episode-new.dtr"))
+        start = time.perf_counter()
+        index.update()
+        incremental = time.perf_counter() - start
+        index.close()
+
+        # A fresh process maps the parts on its first query
+        index = SearchIndex(index.directory)
+        rows = []
+        for name, query, speaker in QUERIES:
+            start = time.perf_counter()
+            _, total = index.search(query, speaker=speaker)
+            first = time.perf_counter() - start
+            start = time.perf_counter()
+            for _ in range(20):
+                index.search(query, speaker=speaker)
+            rows.append((name, total, first, (time.perf_counter() - start) / 20))
+        size = sum(os.path.getsize(os.path.join(index.directory, n)) for n in os.listdir(index.directory))
+        parts = len(index.manifest["parts"])
+        index.close()
+    finally:
+        shutil.rmtree(work_dir)
+
+    print(f"{args.files} transcripts of {args.minutes:g} min, {words} words, {parts} part(s), {size / (1024 * 1024):.1f} MB index")
+    print(f"{'build':26s} {build:8.2f}s  ({words / build:,.0f} words/s)")
+    print(f"{'update (1 changed, 1 new)':26s} {incremental:8.2f}s")
+    for name, total, first, warm in rows:
+        print(f"{name:26s} {first * 1000:8.2f} ms first, {warm * 1000:6.2f} ms warm  {total:7d} hit(s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Compare the memory of a dict-based result with the columnar Transcript.
+
+Usage: python benchmarks/bench_transcript.py [--words 300000]
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from diarized_transcriber.transcript import Transcript
+
+VOCABULARY = ["the", "model", "speaker", "episode", "really", "think", "about", "transcript", "and", "we"]
+
+def synthetic_aligned_result(num_words, words_per_segment=12, num_speakers=4, seed=0):
+    """Aligned and diarized result shaped like whisperx output, with a dict per word."""
+    rng = random.Random(seed)
+    segments = []
+    t = 0.0
+    speaker = "SPEAKER_00"
+    for first in range(0, num_words, words_per_segment):
+        if rng.random() < 0.3:
+            speaker = f"SPEAKER_{rng.randrange(num_speakers):02d}"
+        words = []
+        for _ in range(min(words_per_segment, num_words - first)):
+            duration = rng.uniform(0.15, 0.6)
+            words.append({"word": rng.choice(VOCABULARY), "start": round(t, 3), "end": round(t + duration, 3),
+                          "score": round(rng.random(), 3), "speaker": speaker})
+            t += duration + rng.uniform(0.0, 0.2)
+        segments.append({"start": words[0]["start"], "end": words[-1]["end"], "speaker": speaker,
+                         "text": " " + " ".join(w["word"] for w in words), "words": words})
+    return {"segments": segments, "word_segments": [w for s in segments for w in s["words"]], "language": "en"}
+
+def traced(build):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    value = build()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, size, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the columnar transcript")
+    parser.add_argument("--words", type=int, default=300000, help="Synthetic words (default: 300000)")
+    args = parser.parse_args()
+
+    result, dict_bytes, _ = traced(lambda: synthetic_aligned_result(args.words))
+    transcript, columnar_bytes, convert_time = traced(lambda: Transcript.from_result(result))
+    start = time.perf_counter()
+    round_trip_ok = transcript.to_result() == result
+    back_time = time.perf_counter() - start
+
+    print(f"{args.words} words in {len(transcript)} segments")
+    print(f"dict result:        {dict_bytes / 2**20:8.1f} MB")
+    print(f"Transcript:         {columnar_bytes / 2**20:8.1f} MB  ({dict_bytes / columnar_bytes:.1f}x smaller)")
+    print(f"from_result:        {convert_time:8.3f}s")
+    print(f"to_result:          {back_time:8.3f}s  (round trip {'ok' if round_trip_ok else 'MISMATCH'})")
+
+if __name__ == "__main__":
+    main()
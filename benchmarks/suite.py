@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""Benchmark suite: every exporter, the export engine, speaker assignment and pipeline overhead.
+
+Runs offline on CPU against a synthetic recording. Models are stubbed, so
+the pipeline benchmark measures only the orchestration around them
+(progress UI, model pool, checkpoint plumbing, speaker assignment).
+
+Usage:
+    python benchmarks/suite.py                       # run and compare against benchmarks/baselines.json
+    python benchmarks/suite.py --save-baseline       # record the current numbers as the baseline
+    python benchmarks/suite.py --duration 7200 --speakers 6 --turns-per-minute 10 --only export
+
+Exits with status 1 when a benchmark is slower, or peaks higher in memory,
+than its baseline by more than --threshold.
+"""
+
+import argparse
+import contextlib
+import copy
+import gc
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, NamedTuple
+from unittest import mock
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from synthetic import synthetic_recording
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baselines.json")
+DEFAULT_THRESHOLD = 0.25
+
+# Differences below these are timer and allocator noise, whatever the ratio
+MIN_SECONDS_DELTA = 0.01
+MIN_PEAK_MB_DELTA = 1.0
+
+class Benchmark(NamedTuple):
+    name: str
+    setup: Callable[[], Any]       # untimed; returns the argument passed to run
+    run: Callable[[Any], Any]
+
+def _exporter_benchmarks(recording, output_dir):
+    from diarized_transcriber.srt_exporter import generate_speaker_aware_srt
+    from diarized_transcriber.txt_exporter import generate_txt
+    from diarized_transcriber.markdown_exporter import generate_markdown_transcript
+    from diarized_transcriber.html_exporter import generate_html_transcript, generate_html_viewer
+    from diarized_transcriber.pdf_exporter import generate_pdf_transcript
+    from diarized_transcriber.json_exporter import save_json
+    from diarized_transcriber.export import ALL_FORMATS, export_transcript
+
+    result = recording.diarized
+    segments = result["segments"]
+    path = lambda ext: os.path.join(output_dir, f"bench.{ext}")
+    exporters = {
+        "srt": lambda _: generate_speaker_aware_srt(segments, path("srt")),
+        "txt": lambda _: generate_txt(segments, path("txt"), include_timestamps=True),
+        "md": lambda _: generate_markdown_transcript(segments, path("md"), include_timestamps=True),
+        "html": lambda _: generate_html_transcript(segments, path("html")),
+        "viewer": lambda _: generate_html_viewer(segments, path("viewer.html")),
+        "pdf": lambda _: generate_pdf_transcript(segments, path("pdf")),
+        "json": lambda _: save_json(result, path("json")),
+    }
+    benchmarks = [Benchmark(f"export.{fmt}", lambda: None, run) for fmt, run in exporters.items()]
+    benchmarks.append(Benchmark("export.engine", lambda: None,
+                                lambda _: export_transcript(result, output_dir, "engine", ALL_FORMATS)))
+    return benchmarks
+
+def _transcript_benchmarks(recording, output_dir):
+    from diarized_transcriber.transcript import Transcript
+    from diarized_transcriber.transcript_file import load_transcript, save_transcript
+    from diarized_transcriber.speaker_assignment import assign_word_speakers
+
+    transcript = Transcript.from_result(recording.diarized)
+    path = os.path.join(output_dir, "bench.dtr")
+    save_transcript(transcript, path)
+    return [
+        Benchmark("transcript.from_result", lambda: None, lambda _: Transcript.from_result(recording.diarized)),
+        Benchmark("transcript.to_result", lambda: None, lambda _: transcript.to_result()),
+        Benchmark("transcript.save_dtr", lambda: None, lambda _: save_transcript(transcript, path)),
+        Benchmark("transcript.load_dtr", lambda: None, lambda _: load_transcript(path)),
+        Benchmark("transcript.assign_speakers", lambda: copy.deepcopy(recording.aligned),
+                  lambda aligned: assign_word_speakers(recording.turns, aligned)),
+    ]
+
+class _StubWhisper:
+    def __init__(self, result):
+        self.result = result
+
+    def transcribe(self, audio):
+        return self.result
+
+class _StubDiarizer:
+    def __init__(self, turns):
+        self.turns = turns
+
+    def __call__(self, audio, **kwargs):
+        return self.turns
+
+def _pipeline_benchmarks(recording, output_dir):
+    import numpy as np
+    import pandas as pd
+    from diarized_transcriber.audio import SAMPLE_RATE
+    from diarized_transcriber.diarization import run_transcribe_with_diarization
+    from diarized_transcriber.model_pool import ModelPool
+
+    turns = pd.DataFrame(recording.turns)
+
+    def setup():
+        # Stages mutate what they are handed, so every run gets fresh copies
+        return copy.deepcopy(recording.transcribed), copy.deepcopy(recording.aligned)
+
+    def run(stage_outputs):
+        transcribed, aligned = stage_outputs
+        patches = [
+            mock.patch("torch.cuda.is_available", return_value=False),
+            # The stubbed stages never read the samples, so one second stands in for the recording
+            mock.patch("whisperx.load_audio", return_value=np.zeros(SAMPLE_RATE, dtype=np.float32)),
+            mock.patch("whisperx.load_model", return_value=_StubWhisper(transcribed)),
+            mock.patch("whisperx.load_align_model", return_value=(object(), {"language": "en"})),
+            mock.patch("whisperx.align", return_value=aligned),
+            mock.patch("whisperx.diarize.DiarizationPipeline", return_value=_StubDiarizer(turns)),
+            mock.patch.dict(os.environ, {"HUGGINGFACE_TOKEN": "benchmark"}),
+        ]
+        with contextlib.ExitStack() as stack, contextlib.redirect_stdout(io.StringIO()):
+            for patch in patches:
+                stack.enter_context(patch)
+            return run_transcribe_with_diarization("benchmark.wav", output_dir, model_size="tiny", quiet=True,
+                                                   pool=ModelPool())
+
+    return [Benchmark("pipeline.orchestration", setup, run)]
+
+GROUPS = {
+    "export": lambda recording, output_dir: _exporter_benchmarks(recording, output_dir),
+    "transcript": lambda recording, output_dir: _transcript_benchmarks(recording, output_dir),
+    "pipeline": lambda recording, output_dir: _pipeline_benchmarks(recording, output_dir),
+}
+
+def measure(benchmark: Benchmark, repeat: int) -> Dict[str, float]:
+    """Best-of-`repeat` wall time, then one more run under tracemalloc for the peak allocation."""
+    times = []
+    for _ in range(repeat):
+        argument = benchmark.setup()
+        gc.collect()
+        start = time.perf_counter()
+        benchmark.run(argument)
+        times.append(time.perf_counter() - start)
+
+    # Traced separately: tracemalloc slows allocation-heavy code several times over
+    argument = benchmark.setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        benchmark.run(argument)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": round(min(times), 4), "peak_mb": round(peak / (1024 * 1024), 2)}
+
+def _selected(name, pattern):
+    return name == pattern or name.startswith(pattern + ".")
+
+def run_suite(duration=3600.0, speakers=4, turns_per_minute=6.0, repeat=3, only=None, progress=None) -> Dict[str, Any]:
+    """Run the selected benchmark groups and return {"config": ..., "results": {name: measurement}}."""
+    config = {"duration": duration, "speakers": speakers, "turns_per_minute": turns_per_minute}
+    recording = synthetic_recording(duration, speakers, turns_per_minute)
+    config.update(segments=len(recording.diarized["segments"]), words=len(recording.diarized["word_segments"]))
+
+    results = {}
+    output_dir = tempfile.mkdtemp(prefix="bench-suite-")
+    try:
+        for group, build in GROUPS.items():
+            if only and not any(_selected(group, o) or _selected(o, group) for o in only):
+                continue
+            for benchmark in build(recording, output_dir):
+                if only and not any(_selected(benchmark.name, o) for o in only):
+                    continue
+                results[benchmark.name] = measure(benchmark, repeat)
+                if progress:
+                    progress(benchmark.name, results[benchmark.name])
+    finally:
+        shutil.rmtree(output_dir)
+    return {"config": config, "results": results}
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """Descriptions of every measurement that regressed past the threshold; benchmarks missing from either side are ignored."""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric, unit, floor in (("seconds", "s", MIN_SECONDS_DELTA), ("peak_mb", " MB", MIN_PEAK_MB_DELTA)):
+            if metric not in base:
+                continue
+            if current[metric] > base[metric] * (1 + threshold) and current[metric] - base[metric] > floor:
+                regressions.append(f"{name} {metric}: {current[metric]}{unit} vs baseline {base[metric]}{unit} "
+                                   f"(+{(current[metric] / base[metric] - 1) * 100 if base[metric] else float('inf'):.0f}%)")
+    return regressions
+
+def load_baseline(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_baseline(path, run):
+    data = dict(run, machine={"python": platform.python_version(), "platform": platform.platform(),
+                              "cpus": os.cpu_count()})
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark exporters and pipeline overhead on a synthetic recording")
+    parser.add_argument("--duration", type=float, default=3600.0, help="Recording length in seconds (default: 3600)")
+    parser.add_argument("--speakers", type=int, default=4, help="Number of speakers (default: 4)")
+    parser.add_argument("--turns-per-minute", type=float, default=6.0, help="Speaker changes per minute (default: 6)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark; the best is kept (default: 3)")
+    parser.add_argument("--only", nargs="+", help="Run only these groups or benchmarks (e.g. export, export.pdf, pipeline)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline file (default: benchmarks/baselines.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run's numbers to the baseline file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown or memory growth as a fraction (default: 0.25)")
+    args = parser.parse_args()
+
+    print(f"🎙️  {args.duration:.0f}s synthetic recording, {args.speakers} speakers, "
+          f"{args.turns_per_minute:g} turns/min, {os.cpu_count()} CPU(s)")
+    run = run_suite(args.duration, args.speakers, args.turns_per_minute, args.repeat, args.only,
+                    progress=lambda name, m: print(f"  {name:<28} {m['seconds']:9.4f}s  {m['peak_mb']:9.2f} MB peak"))
+    print(f"📊 {run['config']['segments']} segments, {run['config']['words']} words")
+
+    if args.save_baseline:
+        if os.path.exists(args.baseline):
+            # Keep baselines for benchmarks this run skipped
+            previous = load_baseline(args.baseline)
+            if previous.get("config") == run["config"]:
+                run["results"] = dict(previous.get("results", {}), **run["results"])
+        save_baseline(args.baseline, run)
+        print(f"💾 Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"ℹ️  No baseline at {args.baseline}; run with --save-baseline to record one")
+        return 0
+    baseline = load_baseline(args.baseline)
+    if baseline.get("config") != run["config"]:
+        print(f"⚠️  Baseline was recorded with {baseline.get('config')}; not comparing")
+        return 0
+    regressions = compare(run["results"], baseline.get("results", {}), args.threshold)
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) past {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"   {line}")
+        return 1
+    print(f"✅ No regressions past {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""Synthetic recordings for the benchmarks: what each pipeline stage would return for a conversation."""
+
+import random
+from typing import Any, Dict, List, NamedTuple
+
+VOCABULARY = ["the", "model", "speaker", "episode", "really", "think", "about", "transcript", "and", "we",
+              "going", "to", "talk", "data", "yeah", "right", "so", "that", "is", "interesting"]
+
+class SyntheticRecording(NamedTuple):
+    transcribed: Dict[str, Any]          # whisper output: segments without words
+    aligned: Dict[str, Any]              # alignment output: segments with timed words
+    turns: List[Dict[str, Any]]          # diarization output as records
+    diarized: Dict[str, Any]             # aligned result with speakers on segments and words
+
+def synthetic_recording(duration=3600.0, num_speakers=4, turns_per_minute=6.0, seed=0) -> SyntheticRecording:
+    """A conversation of `duration` seconds where the speaker changes `turns_per_minute` times a minute.
+
+    Speech runs at about 2.5 words a second in segments of 4-16 words;
+    roughly one turn change in five overlaps the previous speaker by up
+    to a second, as crosstalk does in real diarization output.
+    """
+    rng = random.Random(seed)
+    mean_turn = 60.0 / max(turns_per_minute, 0.01)
+
+    turns = []
+    t, speaker = 0.0, 0
+    while t < duration:
+        length = min(rng.expovariate(1.0 / mean_turn) + 0.5, duration - t)
+        start = t - rng.uniform(0.0, 1.0) if turns and rng.random() < 0.2 else t
+        turns.append({"start": round(max(start, 0.0), 3), "end": round(t + length, 3), "speaker": f"SPEAKER_{speaker:02d}"})
+        t += length + rng.uniform(0.0, 0.4)
+        if num_speakers > 1:
+            speaker = (speaker + rng.randrange(1, num_speakers)) % num_speakers
+
+    transcribed, aligned, diarized = [], [], []
+    for turn in turns:
+        t = turn["start"]
+        while t < turn["end"] - 0.5:
+            words = []
+            for _ in range(rng.randint(4, 16)):
+                length = rng.uniform(0.15, 0.6)
+                if t + length > turn["end"]:
+                    break
+                words.append({"word": rng.choice(VOCABULARY), "start": round(t, 3), "end": round(t + length, 3),
+                              "score": round(rng.uniform(0.5, 1.0), 3)})
+                t += length + rng.uniform(0.0, 0.1)
+            if not words:
+                break
+            text = " " + " ".join(w["word"] for w in words)
+            start, end = words[0]["start"], words[-1]["end"]
+            transcribed.append({"start": start, "end": end, "text": text})
+            aligned.append({"start": start, "end": end, "text": text, "words": words})
+            diarized.append({"start": start, "end": end, "text": text, "speaker": turn["speaker"],
+                             "words": [dict(w, speaker=turn["speaker"]) for w in words]})
+            t += rng.uniform(0.1, 0.8)
+
+    return SyntheticRecording(
+        {"segments": transcribed, "language": "en"},
+        {"segments": aligned, "word_segments": [w for s in aligned for w in s["words"]]},
+        turns,
+        {"segments": diarized, "word_segments": [w for s in diarized for w in s["words"]], "language": "en"},
+    )
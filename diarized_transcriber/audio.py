@@ -0,0 +1,30 @@
+import subprocess
+
+import numpy as np
+
+# whisperx.load_audio always resamples to this rate
+SAMPLE_RATE = 16000
+
+def probe_duration(audio_path: str) -> float:
+    """Duration in seconds, read from the container with ffprobe."""
+    cmd = ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+           "-of", "default=noprint_wrappers=1:nokey=1", audio_path]
+    try:
+        out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to probe audio: {e.stderr.decode()}") from e
+    return float(out.strip())
+
+def load_audio_window(audio_path: str, start: float, duration: float, sr: int = SAMPLE_RATE) -> np.ndarray:
+    """Decode only [start, start + duration) as 16 kHz mono float32, like whisperx.load_audio."""
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0",
+        "-ss", f"{start:.3f}", "-t", f"{duration:.3f}",
+        "-i", audio_path,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sr), "-",
+    ]
+    try:
+        out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to load audio: {e.stderr.decode()}") from e
+    return np.frombuffer(out, np.int16).flatten().astype(np.float32) / 32768.0
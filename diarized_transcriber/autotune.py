@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import platform
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .files import atomic_write
+
+# Bump when the stored profile layout changes so old profiles are ignored
+PROFILE_VERSION = 1
+
+PROFILES_ENV = "DIARIZED_TRANSCRIBER_PROFILES"
+
+# CTranslate2 compute types that run on CPUs; float16 needs a GPU
+DEFAULT_COMPUTE_TYPES = ["int8", "int8_float32", "float32"]
+DEFAULT_BATCH_SIZES = [1, 4, 8, 16]
+
+def default_profiles_path() -> str:
+    if os.getenv(PROFILES_ENV):
+        return os.environ[PROFILES_ENV]
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "diarized-transcriber", "cpu-profiles.json")
+
+def _cpu_model() -> str:
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or "unknown"
+
+def host_info() -> Dict[str, Any]:
+    """What makes one machine type tune differently from another."""
+    return {"machine": platform.machine(), "cpu": _cpu_model(), "cpus": os.cpu_count() or 1, "system": platform.system()}
+
+def host_key(info: Optional[Dict[str, Any]] = None) -> str:
+    payload = json.dumps(info or host_info(), sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+def default_thread_counts(cpus: Optional[int] = None) -> List[int]:
+    """A few thread counts up to the core count; past that, threads only contend."""
+    cpus = cpus or os.cpu_count() or 1
+    return sorted({max(1, cpus // 4), max(1, cpus // 2), cpus})
+
+def _read_profiles(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != PROFILE_VERSION:
+        return {}
+    return data.get("profiles", {})
+
+def load_profile(model_size: str, path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """The tuned profile for this host and model ({"compute_type", "batch_size", "threads", ...}), if any."""
+    return _read_profiles(path or default_profiles_path()).get(f"{host_key()}/{model_size}")
+
+def save_profile(model_size: str, profile: Dict[str, Any], path: Optional[str] = None) -> str:
+    """Store a profile for this host and model, keeping those of other hosts and models; returns the path."""
+    path = path or default_profiles_path()
+    profiles = _read_profiles(path)
+    profiles[f"{host_key()}/{model_size}"] = dict(profile, model=model_size, host=host_info(), tuned_at=time.time())
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # Concurrent readers never see half a file
+    with atomic_write(path) as f:
+        json.dump({"version": PROFILE_VERSION, "profiles": profiles}, f, indent=2)
+    return path
+
+def _load_cpu_model(model_size, compute_type, threads):
+    import whisperx
+    return whisperx.load_model(model_size, "cpu", compute_type=compute_type, threads=threads)
+
+def autotune(audio, model_size: str, compute_types: Sequence[str] = DEFAULT_COMPUTE_TYPES,
+             batch_sizes: Sequence[int] = DEFAULT_BATCH_SIZES, thread_counts: Optional[Sequence[int]] = None,
+             load_model: Callable[[str, str, int], Any] = _load_cpu_model, language: Optional[str] = None,
+             on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+             clock: Callable[[], float] = time.perf_counter) -> Dict[str, Any]:
+    """Time every compute type, thread count and batch size on a reference clip.
+
+    audio is 16 kHz mono samples. Each model is loaded once per compute
+    type and thread count and warmed up with one untimed pass, then timed
+    at every batch size. Candidates that fail to load or run (e.g. a
+    compute type this CPU lacks) are recorded with their error and
+    skipped. Returns the fastest as a profile, with every measurement
+    under "candidates"; raises RuntimeError if none ran.
+    """
+    from .audio import SAMPLE_RATE
+
+    clip_seconds = len(audio) / SAMPLE_RATE
+    candidates = []
+    for compute_type in compute_types:
+        for threads in thread_counts or default_thread_counts():
+            try:
+                model = load_model(model_size, compute_type, threads)
+                kwargs = {"language": language} if language else {}
+                # The first pass pays one-off costs (allocations, kernel selection)
+                warm = model.transcribe(audio, batch_size=min(batch_sizes), **kwargs)
+                kwargs["language"] = language or warm.get("language")
+            except Exception as e:
+                failure = {"compute_type": compute_type, "threads": threads, "error": f"{type(e).__name__}: {e}"}
+                candidates.append(failure)
+                if on_result:
+                    on_result(failure)
+                continue
+            for batch_size in batch_sizes:
+                candidate = {"compute_type": compute_type, "threads": threads, "batch_size": batch_size}
+                try:
+                    start = clock()
+                    model.transcribe(audio, batch_size=batch_size, **kwargs)
+                    elapsed = clock() - start
+                    candidate["seconds"] = round(elapsed, 3)
+                    candidate["rtf"] = round(elapsed / clip_seconds, 4) if clip_seconds else None
+                except Exception as e:
+                    candidate["error"] = f"{type(e).__name__}: {e}"
+                candidates.append(candidate)
+                if on_result:
+                    on_result(candidate)
+            del model
+
+    timed = [c for c in candidates if "seconds" in c]
+    if not timed:
+        raise RuntimeError("No candidate configuration could transcribe the reference clip")
+    best = min(timed, key=lambda c: c["seconds"])
+    return {
+        "compute_type": best["compute_type"],
+        "batch_size": best["batch_size"],
+        "threads": best["threads"],
+        "rtf": best["rtf"],
+        "clip_seconds": round(clip_seconds, 1),
+        "candidates": candidates,
+    }
@@ -0,0 +1,172 @@
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent import futures as concurrent_futures
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Read by the OpenMP and BLAS runtimes behind torch and CTranslate2 when
+# their thread pools start, so they must be set before those libraries load
+THREAD_ENV_VARS = ["OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "VECLIB_MAXIMUM_THREADS",
+                   "NUMEXPR_NUM_THREADS"]
+
+def collect_audio_paths(paths: Iterable[str], manifest: Optional[str] = None) -> List[str]:
+    """Expand paths, glob patterns and manifest entries into an ordered list without duplicates.
+
+    Manifest files list one path or pattern per line; blank lines and lines
+    starting with '#' are ignored, and relative entries are resolved against
+    the manifest's own directory.
+    """
+    entries = list(paths)
+    if manifest:
+        manifest_dir = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                entries.append(line if os.path.isabs(line) else os.path.join(manifest_dir, line))
+
+    audio_paths = []
+    seen = set()
+    for entry in entries:
+        # Patterns are expanded here so quoted globs work the same as shell ones
+        matches = sorted(glob.glob(entry)) if any(c in entry for c in "*?[") else [entry]
+        for path in matches:
+            key = os.path.abspath(path)
+            if key not in seen:
+                seen.add(key)
+                audio_paths.append(path)
+    return audio_paths
+
+def output_base_filename(audio_path: str, used: set) -> str:
+    """Build the '<name>-transcript' base filename, keeping it unique within a batch."""
+    audio_basename = os.path.splitext(os.path.basename(audio_path))[0]
+    base_filename = f"{audio_basename}-transcript"
+    candidate = base_filename
+    suffix = 2
+    while candidate in used:
+        candidate = f"{base_filename}-{suffix}"
+        suffix += 1
+    used.add(candidate)
+    return candidate
+
+def process_one(process_file: Callable[[str], Dict[str, Any]], audio_path: str) -> Dict[str, Any]:
+    """Run process_file on one path and build its record, capturing any failure."""
+    start_time = time.time()
+    record: Dict[str, Any] = {"audio_path": audio_path}
+    try:
+        record.update(process_file(audio_path))
+        record["status"] = "ok"
+    except Exception as e:
+        record["status"] = "failed"
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["elapsed"] = round(time.time() - start_time, 3)
+    return record
+
+def run_batch(audio_paths: List[str], process_file: Callable[[str], Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Run process_file on every path, recording failures instead of aborting the batch.
+
+    process_file returns a dict of details (segment count, outputs, ...) that
+    is merged into the per-file record.
+    """
+    return [process_one(process_file, audio_path) for audio_path in audio_paths]
+
+def estimate_durations(audio_paths: List[str]) -> Dict[str, float]:
+    """Seconds of audio per path from ffprobe.
+
+    If any file can't be probed, every file is measured by its size in bytes
+    instead, which still orders recordings of one codec by length.
+    """
+    from .audio import probe_duration
+
+    try:
+        return {path: probe_duration(path) for path in audio_paths}
+    except (OSError, RuntimeError, ValueError):
+        return {path: float(os.path.getsize(path)) if os.path.exists(path) else 0.0 for path in audio_paths}
+
+def longest_first(audio_paths: List[str], durations: Dict[str, float]) -> List[str]:
+    """Paths ordered by descending duration, so the long files don't all start last and leave workers idle."""
+    return sorted(audio_paths, key=lambda path: -durations.get(path, 0.0))
+
+def split_cores(jobs: int, total: Optional[int] = None) -> int:
+    """Threads each of `jobs` workers may use without oversubscribing the machine."""
+    total = total or os.cpu_count() or 1
+    return max(1, total // max(1, jobs))
+
+def limit_threads(num_threads: int):
+    """Cap the native thread pools of this process at num_threads."""
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(num_threads)
+    # Only matters if torch was imported before the limit was set
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(num_threads)
+
+def _init_worker(num_threads: int):
+    limit_threads(num_threads)
+    # Progress output from concurrent files would interleave; the parent reports each file as it finishes
+    sys.stdout = open(os.devnull, "w")
+
+def _process_in_worker(process_file, audio_path):
+    record = process_one(process_file, audio_path)
+    record["worker"] = os.getpid()
+    return record
+
+def run_batch_parallel(audio_paths: List[str], process_file: Callable[[str], Dict[str, Any]], jobs: int,
+                       threads_per_job: Optional[int] = None, durations: Optional[Dict[str, float]] = None,
+                       on_record: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """Like run_batch, but spreads the files over `jobs` worker processes.
+
+    Each worker caps its native thread pools at threads_per_job (by default
+    the cores divided evenly between workers), since torch and CTranslate2
+    otherwise each grab every core. Files are submitted longest first for
+    better packing. process_file must be picklable, e.g. a module-level
+    function or a functools.partial of one. on_record is called in this
+    process as each file finishes; records are returned in input order.
+    """
+    threads_per_job = threads_per_job or split_cores(jobs)
+    if durations is None:
+        durations = estimate_durations(audio_paths)
+    # Workers are spawned rather than forked so they don't inherit this process's threads or locks
+    context = multiprocessing.get_context("spawn")
+    records: Dict[str, Dict[str, Any]] = {}
+    with concurrent_futures.ProcessPoolExecutor(max_workers=jobs, mp_context=context, initializer=_init_worker,
+                                                initargs=(threads_per_job,)) as executor:
+        pending = {executor.submit(_process_in_worker, process_file, path): path
+                   for path in longest_first(audio_paths, durations)}
+        for future in concurrent_futures.as_completed(pending):
+            path = pending[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                # The worker itself died (e.g. killed for memory), so nothing was recorded
+                record = {"audio_path": path, "status": "failed", "error": f"{type(e).__name__}: {e}", "elapsed": 0.0}
+            records[path] = record
+            if on_record is not None:
+                on_record(record)
+    return [records[path] for path in audio_paths]
+
+def summarize_batch(records: List[Dict[str, Any]], wall_time: Optional[float] = None) -> Dict[str, Any]:
+    """Build the batch summary written next to the per-file outputs.
+
+    total_time sums the per-file times; with parallel workers, pass the
+    batch's wall_time as well.
+    """
+    failed = [r for r in records if r["status"] != "ok"]
+    summary = {
+        "total_files": len(records),
+        "succeeded": len(records) - len(failed),
+        "failed": len(failed),
+        "total_time": round(sum(r["elapsed"] for r in records), 3),
+        "files": records,
+    }
+    if wall_time is not None:
+        summary["wall_time"] = round(wall_time, 3)
+    return summary
+
+def save_batch_summary(summary: Dict[str, Any], output_path: str):
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
@@ -0,0 +1,98 @@
+import json
+import mmap
+import struct
+from typing import Any, Callable, Dict, NamedTuple, Optional, Union
+
+import numpy as np
+
+from .files import atomic_write, to_builtin
+
+# The container behind .dtr transcripts, the speaker index and search index
+# parts: an 8-byte magic, then a little-endian uint32 version and uint32
+# header length, then the JSON header, then each array's raw bytes and
+# finally an optional text blob, every block starting on an ALIGNMENT
+# boundary so the file can be memory-mapped rather than read. The header
+# records each array's offset (from the end of the header), dtype and
+# length under "arrays", and the text's offset and size under "text".
+ALIGNMENT = 64
+
+_PREAMBLE = struct.Struct("<8sII")
+
+class Blocks(NamedTuple):
+    header: Dict[str, Any]
+    arrays: Dict[str, np.ndarray]
+    text: memoryview
+
+def _padding(offset: int) -> int:
+    return -offset % ALIGNMENT
+
+def write_blocks(path: str, magic: bytes, version: int, header: Dict[str, Any], arrays: Dict[str, np.ndarray],
+                 text: bytes = b""):
+    """Write header, arrays (in their own dtypes) and text as one file.
+
+    The file is written to a temp file and renamed, so readers never see
+    half of it.
+    """
+    layout: Dict[str, Any] = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset += _padding(offset)
+        layout[name] = {"offset": offset, "dtype": array.dtype.str, "count": len(array)}
+        offset += array.nbytes
+    offset += _padding(offset)
+    header = dict(header, arrays=layout, text={"offset": offset, "nbytes": len(text)})
+    header_bytes = json.dumps(header, default=to_builtin).encode("utf-8")
+    header_bytes += b" " * _padding(_PREAMBLE.size + len(header_bytes))
+
+    with atomic_write(path, "wb") as f:
+        f.write(_PREAMBLE.pack(magic, version, len(header_bytes)))
+        f.write(header_bytes)
+        position = 0
+        for name, array in arrays.items():
+            f.write(b"\0" * (layout[name]["offset"] - position))
+            f.write(memoryview(np.ascontiguousarray(array)).cast("B"))
+            position = layout[name]["offset"] + array.nbytes
+        f.write(b"\0" * (header["text"]["offset"] - position))
+        f.write(text)
+
+def read_blocks(path: str, magic: bytes, version: int, kind: str, use_mmap: bool = True,
+                default_layout: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None) -> Blocks:
+    """Read a file written by write_blocks.
+
+    With use_mmap the arrays and text are read-only views of the mapped
+    file, so reading costs only the header parse and pages are read as
+    they are touched. default_layout gives the arrays' layout from the
+    header of files that don't record one. Raises ValueError, naming the
+    file as a `kind`, for a wrong magic or another version.
+    """
+    with open(path, "rb") as f:
+        preamble = f.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size:
+            raise ValueError(f"{path} is not a {kind}")
+        file_magic, file_version, header_length = _PREAMBLE.unpack(preamble)
+        if file_magic != magic:
+            raise ValueError(f"{path} is not a {kind}")
+        if file_version != version:
+            raise ValueError(f"{path} uses {kind} version {file_version}; this version reads {version}")
+        header = json.loads(f.read(header_length))
+        buffer: Union[mmap.mmap, bytes]
+        if use_mmap:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            f.seek(0)
+            buffer = f.read()
+    base = _PREAMBLE.size + header_length
+
+    arrays = {}
+    layout = header["arrays"] if "arrays" in header or default_layout is None else default_layout(header)
+    for name, block in layout.items():
+        dtype = np.dtype(block["dtype"])
+        if block["count"]:
+            array = np.frombuffer(buffer, dtype=dtype, count=block["count"], offset=base + block["offset"])
+        else:
+            array = np.empty(0, dtype=dtype)
+        # Native byte order, which is a no-op (and keeps the mapping) on little-endian machines
+        arrays[name] = array.astype(dtype.newbyteorder("="), copy=False)
+    text = header.get("text", {"offset": 0, "nbytes": 0})
+    start = base + text["offset"]
+    return Blocks(header, arrays, memoryview(buffer)[start:start + text["nbytes"]])
@@ -0,0 +1,117 @@
+import json
+import os
+import shutil
+import threading
+from typing import Any, Dict, Optional
+
+from .files import atomic_write, to_builtin
+
+# Pipeline stages in the order they run
+STAGES = ["transcribe", "align", "diarize", "assign"]
+
+# Settings each stage's output depends on; a stage is only reused when these
+# (and the audio) match, so e.g. a new --num-speakers keeps the transcript.
+# segment_languages is only in the settings of --multilingual runs
+STAGE_SETTINGS = {
+    "transcribe": ("model", "language", "segment_languages"),
+    "align": ("model", "language", "segment_languages"),
+    "diarize": ("num_speakers",),
+    "assign": ("model", "language", "segment_languages", "num_speakers"),
+}
+
+MANIFEST_NAME = "manifest.json"
+
+def checkpoint_dir_for(checkpoint_root: str, audio_path: str, audio_digest: str) -> str:
+    """<name>-<digest prefix>, so same-named files in different directories (or --jobs workers) never share one."""
+    audio_basename = os.path.splitext(os.path.basename(audio_path))[0]
+    return os.path.join(checkpoint_root, f"{audio_basename}-{audio_digest[:16]}")
+
+def _dump_json(data: Any, path: str):
+    with atomic_write(path) as f:
+        json.dump(data, f, default=to_builtin)
+
+def diarization_to_records(diarize_segments) -> list:
+    """Keep the columns speaker assignment reads; pyannote Segment objects don't serialize."""
+    columns = [c for c in ("start", "end", "speaker", "label") if c in diarize_segments.columns]
+    return diarize_segments[columns].to_dict("records")
+
+def diarization_from_records(records: list):
+    import pandas as pd
+    return pd.DataFrame.from_records(records)
+
+class StageCheckpoint:
+    """Per-file checkpoint directory holding the output of each completed stage.
+
+    The manifest records the audio digest and the settings each stage ran
+    with; load() only returns a stage when both still match, and saving a
+    stage drops any later stages, since those were computed from the old
+    output.
+    """
+
+    def __init__(self, checkpoint_dir: str, audio_digest: str, settings: Dict[str, Any], resume: bool = False):
+        self.checkpoint_dir = checkpoint_dir
+        self.audio_digest = audio_digest
+        self.settings = settings
+        self.manifest: Dict[str, Any] = {"audio_digest": audio_digest, "stages": {}}
+        self.discarded_reason: Optional[str] = None
+        # Diarization may checkpoint from its own thread while ASR runs
+        self._lock = threading.Lock()
+        if resume:
+            self._load_manifest()
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.checkpoint_dir, MANIFEST_NAME)
+
+    def _stage_path(self, stage: str) -> str:
+        return os.path.join(self.checkpoint_dir, f"{stage}.json")
+
+    def _stage_settings(self, stage: str) -> Dict[str, Any]:
+        return {name: self.settings.get(name) for name in STAGE_SETTINGS[stage]}
+
+    def _load_manifest(self):
+        try:
+            with open(self._manifest_path(), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return
+        if manifest.get("audio_digest") != self.audio_digest:
+            self.discarded_reason = "audio file changed since the checkpoint was written"
+            return
+        self.manifest = manifest
+
+    def completed(self, stage: str) -> bool:
+        recorded = self.manifest["stages"].get(stage)
+        return recorded is not None and recorded == self._stage_settings(stage)
+
+    def completed_stages(self):
+        return [stage for stage in STAGES if self.completed(stage)]
+
+    def load(self, stage: str) -> Optional[Any]:
+        """Output of a completed stage whose settings still match, else None."""
+        if not self.completed(stage):
+            return None
+        try:
+            with open(self._stage_path(stage), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if stage == "diarize":
+            return diarization_from_records(data)
+        return data
+
+    def save(self, stage: str, output: Any):
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        data = diarization_to_records(output) if stage == "diarize" else output
+        _dump_json(data, self._stage_path(stage))
+        with self._lock:
+            stages = self.manifest["stages"]
+            stages[stage] = self._stage_settings(stage)
+            # Later stages were derived from the previous output of this one
+            for later in STAGES[STAGES.index(stage) + 1:]:
+                if later == "diarize" and stage in ("transcribe", "align"):
+                    continue  # diarization only depends on the audio
+                stages.pop(later, None)
+            _dump_json(self.manifest, self._manifest_path())
+
+    def clear(self):
+        shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
@@ -0,0 +1,342 @@
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .audio import load_audio_window, probe_duration
+from .rich_progress import PersistentProgress
+
+DEFAULT_CHUNK_SECONDS = 30 * 60
+DEFAULT_OVERLAP_SECONDS = 60.0
+
+# Minimum cosine similarity for linking a chunk's speaker to an earlier one by voice alone
+EMBEDDING_MATCH_THRESHOLD = 0.6
+
+# Languages whisperx aligns per character, so their words join without spaces
+CHARACTER_LANGUAGES = {"ja", "zh", "th", "lo", "my", "km", "yue"}
+
+def plan_windows(duration: float, chunk_seconds: float = DEFAULT_CHUNK_SECONDS,
+                 overlap_seconds: float = DEFAULT_OVERLAP_SECONDS) -> List[Tuple[float, float]]:
+    """Split [0, duration] into windows of chunk_seconds that overlap by overlap_seconds."""
+    if overlap_seconds >= chunk_seconds:
+        raise ValueError("Chunk overlap must be shorter than the chunk")
+    windows = []
+    start = 0.0
+    while True:
+        end = min(start + chunk_seconds, duration)
+        windows.append((start, end))
+        if end >= duration:
+            return windows
+        start = end - overlap_seconds
+
+def offset_result(result: Dict[str, Any], offset: float) -> Dict[str, Any]:
+    """Shift a window's segment and word timestamps onto the recording's timeline."""
+    for seg in result["segments"]:
+        for field in ("start", "end"):
+            if field in seg:
+                seg[field] += offset
+        for word in seg.get("words", []):
+            for field in ("start", "end"):
+                if field in word:
+                    word[field] += offset
+    return result
+
+def _word_times(seg: Dict[str, Any]) -> List[float]:
+    """Start time of every word, borrowing from neighbours for words alignment couldn't place."""
+    times = []
+    last = seg.get("start", 0.0)
+    for word in seg.get("words", []):
+        last = word.get("start", last)
+        times.append(last)
+    return times
+
+def choose_cut(segments: List[Dict[str, Any]], lo: float, hi: float) -> float:
+    """Pick the seam between two chunks: the middle of the longest pause in the overlap [lo, hi].
+
+    Only the central half of the overlap is searched, away from the chunk
+    edges where recognition is least reliable. Cutting in silence means no
+    word straddles the seam, so each word is kept from exactly one chunk.
+    """
+    margin = (hi - lo) / 4
+    lo, hi = lo + margin, hi - margin
+    spans = []
+    for seg in segments:
+        if seg.get("end", 0.0) < lo or seg.get("start", 0.0) > hi:
+            continue
+        for word in seg.get("words") or [seg]:
+            if "start" in word and "end" in word:
+                spans.append((word["start"], word["end"]))
+    spans.sort()
+
+    best_gap, cut = -1.0, (lo + hi) / 2
+    edge = lo
+    for start, end in spans:
+        gap_end = min(start, hi)
+        if gap_end - edge > best_gap:
+            best_gap, cut = gap_end - edge, (edge + gap_end) / 2
+        edge = max(edge, end)
+        if edge >= hi:
+            break
+    if hi - edge > best_gap:
+        cut = (edge + hi) / 2
+    return cut
+
+def _trim_segment(seg: Dict[str, Any], keep_before: Optional[float], keep_from: Optional[float],
+                  joiner: str) -> Optional[Dict[str, Any]]:
+    """Keep the words of seg that start before keep_before or at/after keep_from."""
+    words = seg.get("words")
+    if not words:
+        start = seg.get("start", 0.0)
+        if keep_before is not None and start >= keep_before:
+            return None
+        if keep_from is not None and start < keep_from:
+            return None
+        return seg
+
+    times = _word_times(seg)
+    kept = [
+        word for word, t in zip(words, times)
+        if (keep_before is None or t < keep_before) and (keep_from is None or t >= keep_from)
+    ]
+    if not kept:
+        return None
+    if len(kept) == len(words):
+        return seg
+    trimmed = dict(seg)
+    trimmed["words"] = kept
+    trimmed["text"] = joiner.join(w["word"].strip() for w in kept)
+    timed = [w for w in kept if "start" in w]
+    if timed:
+        trimmed["start"] = timed[0]["start"]
+        trimmed["end"] = max(w.get("end", w["start"]) for w in timed)
+    return trimmed
+
+def _same_speech(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+    """Whether two segments overlap for at least half of the shorter one."""
+    overlap = min(a.get("end", 0.0), b.get("end", 0.0)) - max(a.get("start", 0.0), b.get("start", 0.0))
+    shorter = min(a.get("end", 0.0) - a.get("start", 0.0), b.get("end", 0.0) - b.get("start", 0.0))
+    return overlap > 0 and overlap >= shorter / 2
+
+def stitch(stitched: List[Dict[str, Any]], incoming: List[Dict[str, Any]], cut: float,
+           language: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Join a chunk's segments onto the transcript so far, seamed at cut.
+
+    Words starting before the cut come from the earlier chunk and words from
+    the cut on come from the later one, so text in the overlap is neither
+    duplicated nor dropped. Segments without words are split by their start
+    and end times instead.
+    """
+    joiner = "" if language in CHARACTER_LANGUAGES else " "
+    # Only the tail of the transcript can reach past the cut
+    tail_start = len(stitched)
+    while tail_start > 0 and stitched[tail_start - 1].get("end", 0.0) > cut:
+        tail_start -= 1
+    kept_tail = [s for s in (_trim_segment(seg, cut, None, joiner) for seg in stitched[tail_start:]) if s]
+    kept_incoming = [s for s in (_trim_segment(seg, None, cut, joiner) for seg in incoming) if s]
+    # Segments without aligned words go by their start alone, and the two
+    # chunks can place the same speech either side of the cut. A word-less
+    # copy of a segment kept from the other chunk is dropped, keeping the
+    # earlier chunk's when neither has words
+    kept_incoming = [s for s in kept_incoming
+                     if s.get("words") or not any(_same_speech(s, t) for t in kept_tail)]
+    kept_tail = [s for s in kept_tail
+                 if s.get("words") or not any(_same_speech(s, t) for t in kept_incoming if t.get("words"))]
+    return stitched[:tail_start] + kept_tail + kept_incoming
+
+def settled_prefix(segments: List[Dict[str, Any]], emitted: int, boundary: float) -> int:
+    """Index up to which the transcript can no longer change once the next window starts at boundary.
+
+    Stitching only touches segments ending after the next cut, and the cut
+    always falls after the next window's start.
+    """
+    settled = emitted
+    while settled < len(segments) and segments[settled].get("end", 0.0) <= boundary:
+        settled += 1
+    return settled
+
+class SpeakerLinker:
+    """Maps each chunk's local speaker labels onto labels that are stable for the whole recording.
+
+    A chunk speaker is matched to a known speaker by how long they talk at
+    the same time in the overlap with the previous chunk, and failing that
+    by cosine similarity of their voice embeddings. Unmatched speakers get a
+    new label.
+    """
+
+    def __init__(self, threshold: float = EMBEDDING_MATCH_THRESHOLD):
+        self.threshold = threshold
+        self.centroids: Dict[str, np.ndarray] = {}
+        self.counts: Dict[str, int] = {}
+        self.previous_turns: List[Tuple[float, float, str]] = []
+
+    def _new_label(self) -> str:
+        label = f"SPEAKER_{len(self.counts):02d}"
+        self.counts[label] = 0
+        return label
+
+    def link(self, turns: List[Tuple[float, float, str]], overlap: Optional[Tuple[float, float]] = None,
+             embeddings: Optional[Dict[str, List[float]]] = None) -> Dict[str, str]:
+        """Return {local label: global label} for one chunk's (start, end, speaker) turns."""
+        local_speakers = sorted({speaker for _, _, speaker in turns})
+        scores = []
+        if overlap is not None:
+            lo, hi = overlap
+            for local in local_speakers:
+                for start, end, speaker in turns:
+                    if speaker != local:
+                        continue
+                    for p_start, p_end, known in self.previous_turns:
+                        shared = min(end, p_end, hi) - max(start, p_start, lo)
+                        if shared > 0:
+                            scores.append((shared, local, known))
+        # Overlap evidence (seconds) always outranks embedding similarity (<= 1)
+        totals: Dict[Tuple[str, str], float] = {}
+        for shared, local, known in scores:
+            totals[(local, known)] = totals.get((local, known), 0.0) + shared
+        candidates = [(1.0 + seconds, local, known) for (local, known), seconds in totals.items()]
+        if embeddings:
+            for local in local_speakers:
+                vector = embeddings.get(local)
+                if vector is None:
+                    continue
+                vector = np.asarray(vector, dtype=np.float64)
+                for known, centroid in self.centroids.items():
+                    denom = np.linalg.norm(vector) * np.linalg.norm(centroid)
+                    if not denom:
+                        continue
+                    similarity = float(vector @ centroid / denom)
+                    if similarity >= self.threshold:
+                        candidates.append((similarity, local, known))
+
+        mapping: Dict[str, str] = {}
+        taken = set()
+        for _, local, known in sorted(candidates, reverse=True):
+            if local not in mapping and known not in taken:
+                mapping[local] = known
+                taken.add(known)
+        for local in local_speakers:
+            if local not in mapping:
+                mapping[local] = self._new_label()
+
+        if embeddings:
+            for local, known in mapping.items():
+                vector = embeddings.get(local)
+                if vector is None:
+                    continue
+                vector = np.asarray(vector, dtype=np.float64)
+                count = self.counts.get(known, 0)
+                previous = self.centroids.get(known)
+                self.centroids[known] = vector if previous is None else (previous * count + vector) / (count + 1)
+                self.counts[known] = count + 1
+        self.previous_turns = [(start, end, mapping[speaker]) for start, end, speaker in turns]
+        return mapping
+
+def run_chunked_transcription(audio_path, output_dir, model_size="large-v3", skip_diarization=False, num_speakers=None,
+                              quiet=False, pool=None, chunk_seconds=DEFAULT_CHUNK_SECONDS,
+                              overlap_seconds=DEFAULT_OVERLAP_SECONDS, on_segment=None, compute_type=None, batch_size=None,
+                              threads=None, speaker_index=None, match_threshold=None, show_progress=True):
+    """Transcribe, align and diarize a long recording one overlapping window at a time.
+
+    Only one window of audio and its intermediate results are held at once,
+    so their memory depends on chunk_seconds rather than the recording length.
+    The stitched segments, which are returned, still grow with the recording;
+    the speaker linker keeps just the last window's turns and a voice per speaker.
+    on_segment, if given, is called with each segment, in order, as soon as
+    later windows can no longer change it. compute_type, batch_size and
+    threads configure the Whisper model, and speaker_index names enrolled
+    speakers, as in run_transcribe_with_diarization; segments already passed
+    to on_segment keep the linked SPEAKER_nn labels. show_progress=False
+    hides the spinner, e.g. when several run in one process.
+    """
+    # Imported here to avoid a cycle: diarization dispatches to this module
+    import whisperx
+    from .diarization import select_device, load_whisper_model, load_alignment_model, load_diarization_pipeline
+    from .model_pool import get_default_pool
+    from .speaker_assignment import assign_word_speakers
+    from .speaker_index import DEFAULT_MATCH_THRESHOLD, format_matches, identify_speakers
+
+    if pool is None:
+        pool = get_default_pool()
+    device, default_compute_type = select_device()
+    compute_type = compute_type or default_compute_type
+    token = os.getenv("HUGGINGFACE_TOKEN")
+    run_diarization = not skip_diarization and bool(token)
+
+    duration = probe_duration(audio_path)
+    windows = plan_windows(duration, chunk_seconds, overlap_seconds)
+    if not quiet:
+        print(f"🔧 Using device: {device.upper()}")
+        print(f"⚙️  Compute type: {compute_type}")
+        print(f"🧩 Chunked mode: {len(windows)} window(s) of up to {chunk_seconds / 60:.0f} min, "
+              f"{overlap_seconds:.0f}s overlap")
+        if not skip_diarization and not token:
+            print("⚠️  Warning: HUGGINGFACE_TOKEN not set — diarization may fail.")
+            print("⏩ Continuing without speaker diarization...")
+
+    linker = SpeakerLinker()
+    segments: List[Dict[str, Any]] = []
+    language = None
+    previous_end = None
+    emitted = 0
+
+    with PersistentProgress(quiet=not show_progress) as progress:
+        progress.audio_seconds = duration
+        for index, (start, end) in enumerate(windows, 1):
+            label = f"window {index}/{len(windows)}"
+            progress.start_task(f"Decoding {label}", stage="decode")
+            audio = load_audio_window(audio_path, start, end - start)
+
+            progress.start_task(f"Transcribing {label}", stage="transcribe")
+            model = load_whisper_model(pool, model_size, device, compute_type, threads)
+            # The first window fixes the language so later windows can't drift
+            kwargs = {"batch_size": batch_size} if batch_size else {}
+            if language:
+                kwargs["language"] = language
+            transcribed = model.transcribe(audio, **kwargs)
+            language = language or transcribed["language"]
+
+            progress.start_task(f"Aligning {label}", stage="align")
+            model_a, metadata = load_alignment_model(pool, language, device)
+            result = whisperx.align(transcribed["segments"], model_a, metadata, audio, device)
+            offset_result(result, start)
+
+            if run_diarization:
+                progress.start_task(f"Diarizing {label}", stage="diarize")
+                diarize_pipeline = load_diarization_pipeline(pool, token, device)
+                # A window may not contain every speaker, so the count is an upper bound here
+                kwargs = {"max_speakers": num_speakers} if num_speakers else {}
+                output = diarize_pipeline(audio, return_embeddings=True, **kwargs)
+                diarize_segments, embeddings = output if isinstance(output, tuple) else (output, None)
+                diarize_segments["start"] = diarize_segments["start"] + start
+                diarize_segments["end"] = diarize_segments["end"] + start
+                turns = list(zip(diarize_segments["start"], diarize_segments["end"], diarize_segments["speaker"]))
+                overlap = (start, previous_end) if previous_end is not None else None
+                mapping = linker.link(turns, overlap, embeddings)
+                diarize_segments["speaker"] = diarize_segments["speaker"].map(mapping)
+                result = assign_word_speakers(diarize_segments, result)
+
+            if previous_end is None:
+                segments = result["segments"]
+            else:
+                cut = choose_cut(segments, start, previous_end)
+                segments = stitch(segments, result["segments"], cut, language)
+            previous_end = end
+            if on_segment is not None:
+                boundary = windows[index][0] if index < len(windows) else float("inf")
+                settled = settled_prefix(segments, emitted, boundary)
+                for seg in segments[emitted:settled]:
+                    on_segment(seg)
+                emitted = settled
+            del audio
+            progress.complete_task(f"Processed {label} - {len(segments)} segments so far")
+
+    word_segments = [word for seg in segments for word in seg.get("words", [])]
+    result = {"segments": segments, "word_segments": word_segments, "language": language, "metrics": progress.metrics()}
+    # Each recording-wide speaker's voice is the running mean of its windows' embeddings
+    if linker.centroids:
+        result["speaker_embeddings"] = {label: centroid.tolist() for label, centroid in linker.centroids.items()}
+    if speaker_index is not None:
+        matches = identify_speakers(result, speaker_index, DEFAULT_MATCH_THRESHOLD if match_threshold is None else match_threshold)
+        if matches and not quiet:
+            print(f"🪪 Identified {len(matches)} speaker(s): {format_matches(matches)}")
+    return result
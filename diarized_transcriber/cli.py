@@ -7,6 +7,7 @@ import logging
 import time
 import sys
 import contextlib
+import functools
 import io
 from dotenv import load_dotenv
 
@@ -20,10 +21,6 @@ os.environ["SPEECHBRAIN_VERBOSITY"] = "ERROR"
 os.environ["PYTORCH_LIGHTNING_VERBOSITY"] = "ERROR"
 os.environ["PYANNOTE_VERBOSITY"] = "ERROR"
 
-# Redirect stderr to suppress DEBUG messages early
-original_stderr = sys.stderr
-sys.stderr = io.StringIO()
-
 # Configure logging BEFORE any other imports - more aggressive suppression
 logging.basicConfig(level=logging.ERROR)  # Only show ERROR and above by default
 logging.getLogger("whisperx").setLevel(logging.ERROR)
@@ -42,13 +39,15 @@ logging.getLogger("pytorch_lightning.utilities.migration.utils").setLevel(loggin
 # Load environment variables from .env file
 load_dotenv()
 
-from diarized_transcriber.diarization import run_transcribe_with_diarization
-from diarized_transcriber.srt_exporter import generate_speaker_aware_srt
-from diarized_transcriber.txt_exporter import generate_txt
-from diarized_transcriber.markdown_exporter import generate_markdown_transcript
-from diarized_transcriber.html_exporter import generate_html_transcript
-from diarized_transcriber.pdf_exporter import generate_pdf_transcript
-from diarized_transcriber.rich_progress import PersistentProgress, print_success_panel
+# Only lightweight modules are imported up front so --help, argument errors
+# and the cache subcommand start quickly; torch/whisperx, rich, NumPy and
+# the exporters are imported by the code paths that use them
+from diarized_transcriber.model_pool import get_default_pool
+from diarized_transcriber.batch import (collect_audio_paths, output_base_filename, run_batch, run_batch_parallel,
+                                        save_batch_summary, split_cores, summarize_batch)
+from diarized_transcriber.checkpoint import StageCheckpoint, checkpoint_dir_for
+from diarized_transcriber.result_cache import ResultCache, DEFAULT_ARTIFACTS_SIZE_MB, DEFAULT_CACHE_SIZE_MB, audio_digest, cache_key, result_settings
+from diarized_transcriber.metrics import StageRecorder, peak_rss_mb, save_metrics
 
 def format_duration(seconds: float) -> str:
     """Convert seconds to H:MM:SS format, showing hours only when needed."""
@@ -61,19 +60,715 @@ def format_duration(seconds: float) -> str:
     else:
         return f"{minutes}:{secs:02d}"
 
+@contextlib.contextmanager
+def suppressed_stderr(debug=False):
+    """Swallow library noise on stderr while a run is in progress, unless debugging."""
+    if debug:
+        yield
+        return
+    with contextlib.redirect_stderr(io.StringIO()):
+        yield
+
+def open_result_cache(args):
+    """Result cache for this run, or None when caching is disabled."""
+    if args.no_cache:
+        return None
+    return ResultCache(args.cache_dir, args.cache_size_mb)
+
+def transcribe_file(args, audio_path, pool=None, cache=None, on_segment=None, shared=None):
+    """Run the pipeline for one file, reusing a cached result when the audio and settings match.
+
+    Each stage is checkpointed so a failed run can continue with --resume;
+    the checkpoint is removed once the file completes. Returns the result
+    as a compact Transcript, so the per-word dicts can be freed before
+    export, whether it came from the cache, and the per-stage metrics (for
+    cached results, the cache lookup). shared is the (audio, transcription)
+    pair from a --cross-file-batch group, when this file was part of one.
+
+    Diarized runs also cache the aligned transcript and the diarizer's
+    speaker embeddings, so running again with another --num-speakers only
+    re-clusters and reassigns speakers.
+    """
+    from diarized_transcriber.transcript import Transcript
+
+    settings = result_settings(args.model, skip_diarization=args.skip_diarization, num_speakers=args.num_speakers,
+                               multilingual=args.multilingual, languages=args.languages)
+    # Hashing the audio and reading the cache are all a cached run does
+    lookup = StageRecorder()
+    lookup.start("cache_lookup", "Hashing audio and checking the result cache")
+    digest = None
+    if cache is not None or not args.no_checkpoint:
+        digest = audio_digest(audio_path)
+
+    key = None
+    if cache is not None:
+        key = cache_key(digest, settings)
+        cached = cache.get(key)
+        if cached is not None:
+            transcript = identify_known_speakers(args, Transcript.from_result(cached))
+            lookup.stop()
+            return transcript, True, lookup.summary()
+    lookup.stop()
+
+    aligned = artifacts = on_artifacts = None
+    reusable = cache is not None and not args.skip_diarization and not args.chunk_minutes \
+        and os.getenv("HUGGINGFACE_TOKEN")
+    if reusable:
+        # NumPy is only needed once a diarized run is on its way
+        from diarized_transcriber.recluster import DiarizationArtifactStore, artifacts_key
+
+        # What alignment produced doesn't depend on speakers, so it is the skip-diarization result
+        aligned_key = cache_key(digest, result_settings(args.model, skip_diarization=True,
+                                                        multilingual=args.multilingual, languages=args.languages))
+        aligned = cache.get(aligned_key)
+        store = DiarizationArtifactStore(os.path.join(cache.cache_dir, "diarization"), args.embeddings_cache_size_mb)
+        store_key = artifacts_key(digest)
+        artifacts = store.get(store_key)
+        if artifacts is None:
+            on_artifacts = lambda captured: store.put(store_key, captured, audio_path=audio_path)
+
+    checkpoint = None
+    if not args.no_checkpoint:
+        checkpoint_root = args.checkpoint_dir or os.path.join(args.output_dir, ".checkpoints")
+        checkpoint = StageCheckpoint(checkpoint_dir_for(checkpoint_root, audio_path, digest), digest, settings, resume=args.resume)
+
+    # Suppress stderr during transcription if not in debug mode
+    with contextlib.redirect_stderr(io.StringIO()) if not args.debug else contextlib.nullcontext():
+        # torch and whisperx take seconds to import, so they load with the first file
+        from diarized_transcriber.diarization import run_transcribe_with_diarization
+        from diarized_transcriber.autotune import load_profile
+
+        result = run_transcribe_with_diarization(
+            audio_path=audio_path,
+            output_dir=args.output_dir,
+            model_size=args.model,
+            skip_diarization=args.skip_diarization,
+            num_speakers=args.num_speakers,
+            quiet=args.quiet,
+            pool=pool,
+            checkpoint=checkpoint,
+            concurrent=args.concurrent,
+            asr_threads=args.asr_threads,
+            diarize_threads=args.diarize_threads,
+            chunk_seconds=args.chunk_minutes * 60 if args.chunk_minutes else None,
+            overlap_seconds=args.chunk_overlap,
+            on_segment=on_segment,
+            compute_type=args.compute_type,
+            batch_size=args.batch_size,
+            cpu_profile=None if args.no_profile else load_profile(args.model),
+            audio=shared[0] if shared else None,
+            transcription=shared[1] if shared else None,
+            aligned=aligned,
+            artifacts=artifacts,
+            on_artifacts=on_artifacts,
+            multilingual=args.multilingual,
+            languages=args.languages
+        )
+
+    if checkpoint is not None:
+        checkpoint.clear()
+
+    # Metrics describe this run, not the transcript, so they are neither cached nor exported
+    metrics = result.pop("metrics", None)
+
+    # Without a token diarization is silently skipped, so don't cache that
+    # result under settings that asked for speakers
+    if cache is not None and (args.skip_diarization or os.getenv("HUGGINGFACE_TOKEN")):
+        cache.put(key, result, audio_path=os.path.abspath(audio_path), settings=settings)
+    if reusable and aligned is None:
+        from diarized_transcriber.speaker_assignment import strip_speakers
+        cache.put(aligned_key, strip_speakers(result), audio_path=os.path.abspath(audio_path),
+                  settings=result_settings(args.model, skip_diarization=True, multilingual=args.multilingual,
+                                           languages=args.languages))
+    return identify_known_speakers(args, Transcript.from_result(result)), False, metrics
+
+def identify_known_speakers(args, transcript):
+    """Rename speakers whose voices are enrolled in the speaker index.
+
+    Applied after the result cache, which keeps the diarizer's labels and
+    voice embeddings, so cached transcripts pick up speakers enrolled since.
+    """
+    if args.no_identify or not transcript.metadata.get("speaker_embeddings"):
+        return transcript
+    from diarized_transcriber.speaker_index import (DEFAULT_MATCH_THRESHOLD, format_matches, identify_speakers,
+                                                    load_speaker_index)
+
+    try:
+        index = load_speaker_index(args.speaker_index)
+    except ValueError as e:
+        print(f"⚠️  Not identifying speakers: {e}")
+        return transcript
+    if index is None:
+        return transcript
+    threshold = DEFAULT_MATCH_THRESHOLD if args.match_threshold is None else args.match_threshold
+    matches = identify_speakers(transcript, index, threshold)
+    if matches and not args.quiet:
+        print(f"🪪 Identified {len(matches)} speaker(s): {format_matches(matches)}")
+    return transcript
+
+def file_metrics(audio_path, from_cache, pipeline_metrics, export_metrics):
+    """The --metrics record for one file."""
+    return {
+        "audio_path": audio_path,
+        "cached": from_cache,
+        "pipeline": pipeline_metrics,
+        "export": export_metrics,
+    }
+
+def open_transcript_stream(args, base_filename):
+    """Streaming writers for --stream, or None when the formats are written after transcription."""
+    if not args.stream:
+        return None
+    from diarized_transcriber.export import TranscriptStream
+
+    has_speakers = not args.skip_diarization and bool(os.getenv("HUGGINGFACE_TOKEN"))
+    return TranscriptStream(args.output_dir, base_filename, args.formats,
+                            include_timestamps=not args.no_timestamps, has_speakers=has_speakers)
+
+def export_result(args, result, base_filename, stream=None):
+    """Finish any streamed formats and write the rest; returns the paths written."""
+    from diarized_transcriber.export import export_transcript
+
+    if stream is None:
+        return export_transcript(result, args.output_dir, base_filename, args.formats, include_timestamps=not args.no_timestamps)
+    stream.finish(result)
+    return stream.paths + export_transcript(result, args.output_dir, base_filename, stream.remaining_formats,
+                                            include_timestamps=not args.no_timestamps)
+
+def transcribe_group(args, audio_paths, pool, cache):
+    """Transcribe a --cross-file-batch group in one pass with their speech segments pooled into shared batches.
+
+    Returns {path: (audio, transcription)} for process_batch_file. Missing
+    files and files with a cached result are left to their own run, and if
+    the shared pass fails every file falls back to transcribing on its own.
+    """
+    settings = result_settings(args.model, skip_diarization=args.skip_diarization, num_speakers=args.num_speakers,
+                               multilingual=args.multilingual, languages=args.languages)
+    pending = [path for path in audio_paths if os.path.isfile(path)
+               and (cache is None or cache_key(audio_digest(path), settings) not in cache)]
+    if len(pending) < 2:
+        return {}
+    if not args.quiet:
+        print(f"🧺 Transcribing {len(pending)} files together in shared batches...")
+    start_time = time.time()
+    try:
+        with contextlib.redirect_stderr(io.StringIO()) if not args.debug else contextlib.nullcontext():
+            from diarized_transcriber.diarization import transcribe_files
+            from diarized_transcriber.autotune import load_profile
+
+            shared = transcribe_files(pending, args.model, pool=pool, compute_type=args.compute_type,
+                                      batch_size=args.batch_size, asr_threads=args.asr_threads,
+                                      cpu_profile=None if args.no_profile else load_profile(args.model),
+                                      multilingual=args.multilingual, languages=args.languages)
+    except Exception as e:
+        if not args.quiet:
+            print(f"⚠️  Shared transcription failed ({type(e).__name__}: {e}); transcribing files one at a time")
+        return {}
+    if not args.quiet:
+        segments = sum(len(transcription["segments"]) for _, transcription in shared.values())
+        print(f"✅ {segments} segments from {len(shared)} files in {format_duration(time.time() - start_time)}")
+    return shared
+
+def process_batch_file(args, base_filenames, audio_path, pool=None, cache=None, shared=None):
+    """Transcribe and export one file of a batch; the per-file details for the summary.
+
+    Module-level so parallel batches can send it to worker processes, which
+    use their own model pool and result cache. shared holds the output of
+    transcribe_group; this file's entry is removed as it is used, so the
+    group's audio is freed file by file.
+    """
+    if not args.quiet:
+        print(f"📁 Audio file: {audio_path}")
+    if not os.path.isfile(audio_path):
+        raise FileNotFoundError(f"No such file: {audio_path}")
+    in_worker = pool is None
+    if in_worker:
+        pool = get_default_pool()
+        cache = open_result_cache(args)
+    base_filename = base_filenames[audio_path]
+    stream = open_transcript_stream(args, base_filename)
+    try:
+        result, from_cache, pipeline_metrics = transcribe_file(args, audio_path, pool=pool, cache=cache,
+                                                               on_segment=stream.write if stream else None,
+                                                               shared=shared.pop(audio_path, None) if shared else None)
+    except Exception:
+        if stream is not None:
+            stream.close()
+        raise
+    recorder = StageRecorder()
+    recorder.start("export")
+    outputs = export_result(args, result, base_filename, stream)
+    recorder.stop()
+    details = {"segments": len(result), "outputs": outputs, "cached": from_cache,
+               "metrics": file_metrics(audio_path, from_cache, pipeline_metrics, recorder.summary())}
+    if in_worker:
+        details["model_pool"] = pool.stats()
+    return details
+
+def run_batch_mode(args, audio_paths):
+    """Transcribe every file with one set of loaded models and write a summary.
+
+    With --jobs above 1 the files are spread over that many worker
+    processes, each loading its own models and limited to its share of the
+    CPU threads. With --cross-file-batch above 1 files are transcribed in
+    groups of that many, their speech segments sharing Whisper batches,
+    before each is aligned, diarized and exported on its own.
+    """
+    os.makedirs(args.output_dir, exist_ok=True)
+    # Output names are fixed up front so they don't depend on which file finishes first
+    used_names = set()
+    base_filenames = {path: output_base_filename(path, used_names) for path in audio_paths}
+
+    start_time = time.time()
+    pool = None
+    if args.jobs > 1:
+        threads = args.threads_per_job or split_cores(args.jobs)
+        # Explicit thread counts for torch and CTranslate2 in every stage of each worker
+        args.asr_threads = args.asr_threads or threads
+        args.diarize_threads = args.diarize_threads or threads
+        if not args.quiet:
+            print(f"🧵 {args.jobs} worker processes with {threads} thread(s) each, longest files first")
+
+        def report(record):
+            if not args.quiet:
+                status = "✅" if record["status"] == "ok" else "❌"
+                print(f"{status} Finished {record['audio_path']} in {format_duration(record['elapsed'])}")
+
+        records = run_batch_parallel(audio_paths, functools.partial(process_batch_file, args, base_filenames),
+                                     args.jobs, threads, on_record=report)
+    else:
+        pool = get_default_pool()
+        cache = open_result_cache(args)
+        group_size = max(1, args.cross_file_batch)
+        records = []
+        for start in range(0, len(audio_paths), group_size):
+            group = audio_paths[start:start + group_size]
+            shared = transcribe_group(args, group, pool, cache) if group_size > 1 else None
+            records += run_batch(group, functools.partial(process_batch_file, args, base_filenames,
+                                                          pool=pool, cache=cache, shared=shared))
+
+    if pool is not None:
+        summary = summarize_batch(records)
+        summary["model_pool"] = pool.stats()
+    else:
+        # Workers report their pool's running totals with every file; the
+        # counters only grow, so each worker's maximum is its final count
+        worker_pools = {}
+        for record in records:
+            stats = record.pop("model_pool", None)
+            if stats is not None:
+                totals = worker_pools.setdefault(record["worker"], {})
+                for key in ("hits", "misses", "evictions", "used_mb"):
+                    totals[key] = max(totals.get(key, 0), stats[key])
+        summary = summarize_batch(records, wall_time=time.time() - start_time)
+        summary["model_pool"] = {key: round(sum(totals[key] for totals in worker_pools.values()), 1)
+                                 for key in ("hits", "misses", "evictions", "used_mb")}
+        summary["workers"] = len({record["worker"] for record in records if "worker" in record})
+        summary["jobs"] = args.jobs
+        summary["threads_per_job"] = args.asr_threads
+    summary_path = os.path.join(args.output_dir, "batch-summary.json")
+    save_batch_summary(summary, summary_path)
+    if args.metrics:
+        save_metrics({"files": [r["metrics"] for r in records if "metrics" in r], "peak_rss_mb": peak_rss_mb()},
+                     args.metrics)
+
+    if not args.quiet:
+        print("─" * 50)
+        for record in records:
+            if record["status"] == "ok":
+                print(f"✅ {record['audio_path']} - {record['segments']} segments in {format_duration(record['elapsed'])}")
+            else:
+                print(f"❌ {record['audio_path']} - {record['error']}")
+        elapsed = summary.get("wall_time", summary["total_time"])
+        print(f"📊 {summary['succeeded']}/{summary['total_files']} file(s) transcribed in {format_duration(elapsed)}")
+        stats = summary["model_pool"]
+        print(f"🧠 Model pool: {stats['hits']} hit(s), {stats['misses']} miss(es), {stats['evictions']} eviction(s), {stats['used_mb']} MB resident")
+        print(f"🧾 Summary saved to: {summary_path}")
+        if args.metrics:
+            print(f"📈 Metrics saved to: {args.metrics}")
+
+    return summary
+
+def serve_main(argv):
+    """`transcribe serve`: keep models warm and take jobs over local HTTP."""
+    from diarized_transcriber.server import serve
+
+    parser = argparse.ArgumentParser(
+        prog="transcribe serve",
+        description="Run a local server that keeps models loaded and transcribes queued jobs.",
+        epilog="Example: transcribe serve --port 8765 --preload-model medium"
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765)")
+    parser.add_argument("--queue-size", dest="queue_size", type=int, default=16, help="Maximum number of waiting jobs (default: 16)")
+    parser.add_argument("--workers", type=int, default=1, help="Jobs transcribed concurrently (default: 1)")
+    parser.add_argument("--preload-model", dest="preload_model", help="Whisper model to load before accepting jobs")
+    parser.add_argument("--model-memory-mb", dest="model_memory_mb", type=float, help="Memory budget for resident models (default: unlimited)")
+    parser.add_argument("--quiet", action="store_true", help="Suppress startup output")
+    args = parser.parse_args(argv)
+
+    if args.model_memory_mb:
+        get_default_pool().set_budget(args.model_memory_mb)
+    serve(host=args.host, port=args.port, max_queued=args.queue_size, workers=args.workers,
+          preload_model=args.preload_model, quiet=args.quiet)
+
+def cache_main(argv):
+    """`transcribe cache`: inspect or purge the result cache."""
+    parser = argparse.ArgumentParser(
+        prog="transcribe cache",
+        description="Inspect or purge cached transcription results.",
+        epilog="Example: transcribe cache purge --older-than-days 30"
+    )
+    parser.add_argument("action", choices=["info", "list", "purge"], help="info: totals, list: entries, purge: delete entries")
+    parser.add_argument("--cache-dir", dest="cache_dir", help="Result cache directory (default: ~/.cache/diarized-transcriber/results)")
+    parser.add_argument("--cache-size-mb", dest="cache_size_mb", type=float, default=DEFAULT_CACHE_SIZE_MB, help=f"Size limit to report against (default: {DEFAULT_CACHE_SIZE_MB})")
+    parser.add_argument("--embeddings-cache-size-mb", dest="embeddings_cache_size_mb", type=float, default=DEFAULT_ARTIFACTS_SIZE_MB, help=f"Size limit of the stored speaker embeddings to report against (default: {DEFAULT_ARTIFACTS_SIZE_MB})")
+    parser.add_argument("--older-than-days", dest="older_than_days", type=float, help="Only purge entries unused for this many days")
+    args = parser.parse_args(argv)
+
+    from diarized_transcriber.recluster import DiarizationArtifactStore
+
+    cache = ResultCache(args.cache_dir, args.cache_size_mb)
+    # Speaker embeddings kept for re-clustering live in a subdirectory with their own size limit
+    artifacts = DiarizationArtifactStore(os.path.join(cache.cache_dir, "diarization"), args.embeddings_cache_size_mb)
+    if args.action == "info":
+        entries = cache.entries()
+        size_mb = sum(e["size"] for e in entries) / (1024 * 1024)
+        print(f"📂 Cache directory: {cache.cache_dir}")
+        print(f"🗃️  Entries: {len(entries)}")
+        print(f"💾 Size: {size_mb:.1f} MB of {args.cache_size_mb:.0f} MB")
+        stored = artifacts.entries()
+        if stored:
+            print(f"🧬 Stored speaker embeddings: {len(stored)} file(s), "
+                  f"{sum(e['size'] for e in stored) / (1024 * 1024):.1f} MB of {args.embeddings_cache_size_mb:.0f} MB")
+    elif args.action == "list":
+        for entry in cache.entries():
+            info = cache.describe(entry["key"]) or {}
+            settings = info.get("settings") or {}
+            last_used = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["last_used"]))
+            print(f"{entry['key'][:12]}  {entry['size'] / 1024:8.0f} KB  {last_used}  "
+                  f"{settings.get('model', '?')}  {info.get('audio_path', '?')}")
+    else:
+        removed = cache.purge(args.older_than_days)
+        print(f"🧹 Removed {removed} cached result(s)")
+        removed = artifacts.purge(args.older_than_days)
+        if removed:
+            print(f"🧹 Removed stored speaker embeddings for {removed} file(s)")
+
+def load_saved_transcript(path):
+    """A Transcript from a .dtr file or a JSON result written by the json format."""
+    from diarized_transcriber.transcript import Transcript
+    from diarized_transcriber.transcript_file import load_transcript
+
+    if path.lower().endswith(".json"):
+        import json
+        with open(path, encoding="utf-8") as f:
+            return Transcript.from_result(json.load(f))
+    return load_transcript(path)
+
+def export_main(argv):
+    """`transcribe export`: render formats from a saved transcript without loading any models."""
+    parser = argparse.ArgumentParser(
+        prog="transcribe export",
+        description="Render output formats from a transcript saved with --formats dtr (or json).",
+        epilog="Example: transcribe export episode-transcript.dtr --formats srt pdf"
+    )
+    parser.add_argument("transcript", help="Saved transcript (.dtr, or a .json result)")
+    parser.add_argument("--output-dir", dest="output_dir", default=".", help="Directory to save outputs (default: current directory)")
+    parser.add_argument("--formats", nargs="+", default=["md"], help="Output formats: txt, md, srt, json, html, viewer, pdf, dtr, all (all excludes viewer)")
+    parser.add_argument("--name", help="Base name for the output files (default: the transcript's file name)")
+    parser.add_argument("--no-timestamps", dest="no_timestamps", action="store_true", help="Exclude timestamps from output files")
+    parser.add_argument("--quiet", action="store_true", help="Suppress output")
+    args = parser.parse_args(argv)
+
+    from diarized_transcriber.export import export_transcript
+
+    start_time = time.time()
+    try:
+        transcript = load_saved_transcript(args.transcript)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    base_filename = args.name or os.path.splitext(os.path.basename(args.transcript))[0]
+    os.makedirs(args.output_dir, exist_ok=True)
+    written = export_transcript(transcript, args.output_dir, base_filename, args.formats,
+                                include_timestamps=not args.no_timestamps)
+    if not args.quiet:
+        for path in written:
+            print(f"📄 {path}")
+        print(f"📊 Exported {len(written)} format(s) from {len(transcript)} segments in {time.time() - start_time:.2f}s")
+
+def autotune_main(argv):
+    """`transcribe autotune`: find the fastest CPU settings for this machine and save them."""
+    from diarized_transcriber.autotune import (DEFAULT_BATCH_SIZES, DEFAULT_COMPUTE_TYPES, autotune,
+                                               default_profiles_path, default_thread_counts, save_profile)
+
+    parser = argparse.ArgumentParser(
+        prog="transcribe autotune",
+        description="Benchmark compute types, batch sizes and thread counts on a reference clip and save the "
+                    "fastest as this machine's CPU profile, applied automatically by later runs.",
+        epilog="Example: transcribe autotune sample.wav --model medium --seconds 60"
+    )
+    parser.add_argument("clip", help="Reference audio; speech representative of your recordings works best")
+    parser.add_argument("--model", default="medium", help="Whisper model to tune for (default: medium)")
+    parser.add_argument("--seconds", type=float, default=60.0, help="Seconds of the clip to use (default: 60)")
+    parser.add_argument("--language", help="Language of the clip (default: detected)")
+    parser.add_argument("--compute-types", dest="compute_types", nargs="+", default=DEFAULT_COMPUTE_TYPES,
+                        help=f"Compute types to try (default: {' '.join(DEFAULT_COMPUTE_TYPES)})")
+    parser.add_argument("--batch-sizes", dest="batch_sizes", nargs="+", type=int, default=DEFAULT_BATCH_SIZES,
+                        help=f"Batch sizes to try (default: {' '.join(map(str, DEFAULT_BATCH_SIZES))})")
+    parser.add_argument("--threads", nargs="+", type=int, help="Thread counts to try (default: a quarter, half and all cores)")
+    parser.add_argument("--profiles", help=f"Profile file (default: {default_profiles_path()})")
+    parser.add_argument("--dry-run", dest="dry_run", action="store_true", help="Report the results without saving a profile")
+    args = parser.parse_args(argv)
+
+    if not os.path.isfile(args.clip):
+        parser.error(f"No such file: {args.clip}")
+    thread_counts = args.threads or default_thread_counts()
+    total = len(args.compute_types) * len(thread_counts) * len(args.batch_sizes)
+    print(f"🎛️  Tuning '{args.model}' on {args.seconds:.0f}s of {args.clip}: {total} configuration(s)")
+
+    with contextlib.redirect_stderr(io.StringIO()):
+        import whisperx
+        from diarized_transcriber.audio import SAMPLE_RATE
+        audio = whisperx.load_audio(args.clip)[:int(args.seconds * SAMPLE_RATE)]
+
+        def report(candidate):
+            if "error" in candidate:
+                print(f"❌ {candidate['compute_type']}, {candidate['threads']} thread(s): {candidate['error']}")
+            else:
+                print(f"⏱️  {candidate['compute_type']:<13} {candidate['threads']:>3} thread(s)  batch {candidate['batch_size']:>3}"
+                      f"  {candidate['seconds']:7.2f}s  (RTF {candidate['rtf']:.3f})")
+
+        try:
+            profile = autotune(audio, args.model, args.compute_types, args.batch_sizes, thread_counts,
+                               language=args.language, on_result=report)
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+
+    print(f"🏆 Fastest: {profile['compute_type']}, batch size {profile['batch_size']}, "
+          f"{profile['threads']} thread(s) (RTF {profile['rtf']:.3f})")
+    if args.dry_run:
+        return
+    path = save_profile(args.model, profile, args.profiles)
+    print(f"💾 Saved CPU profile to {path}; runs with --model {args.model} on this machine will use it "
+          "(override with --compute-type, --batch-size, --asr-threads or --no-profile)")
+
+def speakers_main(argv):
+    """`transcribe speakers`: enroll known voices so transcripts name them."""
+    from diarized_transcriber.speaker_index import SpeakerIndex, default_index_path, load_speaker_index
+
+    parser = argparse.ArgumentParser(
+        prog="transcribe speakers",
+        description="Manage the index of enrolled voices. Transcribed speakers whose voice matches an "
+                    "enrolled one are labelled with its name instead of SPEAKER_nn.",
+        epilog="Examples: transcribe speakers enroll \"Ada Lovelace\" --from ep1-transcript.json --speaker SPEAKER_01\n"
+               "          transcribe speakers enroll \"Ada Lovelace\" --audio ada-intro.wav"
+    )
+    parser.add_argument("action", choices=["enroll", "list", "remove"],
+                        help="enroll: add a voice, list: enrolled names, remove: forget a name")
+    parser.add_argument("name", nargs="?", help="Speaker name (enroll and remove)")
+    parser.add_argument("--from", dest="transcript", help="Transcript (.json or .dtr) whose speaker to enroll")
+    parser.add_argument("--speaker", help="Label of the speaker in --from or --audio (default for --audio: whoever talks most)")
+    parser.add_argument("--audio", help="Recording of the speaker to enroll; needs HUGGINGFACE_TOKEN")
+    parser.add_argument("--index", help=f"Speaker index file (default: {default_index_path()})")
+    args = parser.parse_args(argv)
+
+    path = args.index or default_index_path()
+    try:
+        index = load_speaker_index(path) or SpeakerIndex()
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.action == "list":
+        counts = index.counts()
+        print(f"📇 {len(counts)} enrolled speaker(s), {len(index)} voice embedding(s) in {path}")
+        for name, count in sorted(counts.items()):
+            print(f"   {name} ({count} embedding{'s' if count != 1 else ''})")
+        return
+    if not args.name:
+        parser.error(f"{args.action} needs a speaker name")
+    if args.action == "remove":
+        removed = index.remove(args.name)
+        if not removed:
+            parser.error(f"No enrolled speaker named {args.name!r}")
+        index.save(path)
+        print(f"🧹 Removed {args.name} ({removed} embedding(s))")
+        return
+
+    if bool(args.transcript) == bool(args.audio):
+        parser.error("enroll needs exactly one of --from or --audio")
+    if args.transcript:
+        try:
+            transcript = load_saved_transcript(args.transcript)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        embeddings = transcript.metadata.get("speaker_embeddings") or {}
+        if not embeddings:
+            parser.error(f"{args.transcript} has no voice embeddings; re-transcribe it with diarization to get them")
+        if not args.speaker:
+            parser.error(f"--speaker is required with --from (one of: {', '.join(sorted(embeddings))})")
+        label = args.speaker
+    else:
+        if not os.path.isfile(args.audio):
+            parser.error(f"No such file: {args.audio}")
+        # Only the library chatter is silenced; the error is reported once stderr is back
+        error = None
+        with contextlib.redirect_stderr(io.StringIO()):
+            from diarized_transcriber.diarization import voice_embeddings
+            try:
+                embeddings, talk = voice_embeddings(args.audio)
+            except RuntimeError as e:
+                error = e
+        if error is not None:
+            parser.error(str(error))
+        if not embeddings:
+            parser.error(f"No voice embeddings found in {args.audio}")
+        # A clip of one person may still pick up a second voice (an interviewer, a jingle)
+        label = args.speaker or max(talk, key=talk.get)
+    if label not in embeddings:
+        parser.error(f"No speaker {label!r}; speakers with embeddings: {', '.join(sorted(embeddings))}")
+
+    try:
+        index.add(args.name, embeddings[label])
+    except ValueError as e:
+        parser.error(str(e))
+    index.save(path)
+    print(f"🪪 Enrolled {label} as {args.name} ({index.counts()[args.name]} embedding(s)) in {path}")
+
+def index_main(argv):
+    """`transcribe index`: add saved transcripts to the search index."""
+    from diarized_transcriber.search_index import SearchIndex, default_index_dir
+
+    parser = argparse.ArgumentParser(
+        prog="transcribe index",
+        description="Index saved transcripts (.json and .dtr results) for `transcribe search`. Only new and "
+                    "changed files are read; indexed files that no longer exist are dropped.",
+        epilog="Examples: transcribe index ~/podcasts/transcripts\n"
+               "          transcribe index    (rescan everything indexed before)"
+    )
+    parser.add_argument("paths", nargs="*", help="Transcript files, directories or glob patterns (default: the ones indexed before)")
+    parser.add_argument("--index", help=f"Search index directory (default: {default_index_dir()})")
+    parser.add_argument("--quiet", action="store_true", help="Don't print each file as it is indexed")
+    args = parser.parse_args(argv)
+
+    index = SearchIndex(args.index)
+    if not args.paths and not index.manifest["sources"]:
+        parser.error("Nothing indexed yet; give the transcripts to index")
+    start = time.perf_counter()
+    try:
+        stats = index.update(args.paths, progress=None if args.quiet else lambda path: print(f"   {path}"))
+    except ValueError as e:
+        parser.error(str(e))
+    seconds = time.perf_counter() - start
+    for path in stats["missing"]:
+        print(f"⚠️  No transcripts found at {path}")
+    for path, error in stats["failed"]:
+        print(f"⚠️  Skipped {path}: {error}")
+    print(f"🔎 Indexed {stats['added']} new and {stats['updated']} changed transcript(s), removed {stats['removed']}, "
+          f"{stats['unchanged']} unchanged ({seconds:.1f}s)")
+    print(f"📚 {len(index)} transcript(s), {index.word_count()} words in {index.directory}")
+    index.close()
+
+def search_main(argv):
+    """`transcribe search`: find words and phrases in indexed transcripts."""
+    from diarized_transcriber.search_index import SearchIndex, default_index_dir
+
+    parser = argparse.ArgumentParser(
+        prog="transcribe search",
+        description="Search the transcripts indexed with `transcribe index`. Every word must occur in the same "
+                    "segment; quote words to match them as a phrase. Case and punctuation are ignored.",
+        epilog="Examples: transcribe search '\"machine learning\"' --speaker \"Ada Lovelace\"\n"
+               "          transcribe search budget forecast --json"
+    )
+    parser.add_argument("query", nargs="+", help="Words, and \"quoted phrases\", to find")
+    parser.add_argument("--speaker", help="Only match words spoken by this speaker (name or SPEAKER_nn)")
+    parser.add_argument("--limit", type=int, default=20, help="Most hits to show (default: 20; 0 for all)")
+    parser.add_argument("--index", help=f"Search index directory (default: {default_index_dir()})")
+    parser.add_argument("--json", action="store_true", help="Print hits as JSON lines")
+    args = parser.parse_args(argv)
+    if args.limit < 0:
+        parser.error("--limit can't be negative")
+
+    index = SearchIndex(args.index)
+    if not index.manifest["parts"]:
+        parser.error(f"The search index at {index.directory} is empty; run `transcribe index` first")
+    start = time.perf_counter()
+    try:
+        hits, total = index.search(" ".join(args.query), speaker=args.speaker, limit=args.limit or None)
+    except ValueError as e:
+        parser.error(str(e))
+    milliseconds = (time.perf_counter() - start) * 1000
+    index.close()
+
+    if args.json:
+        import json
+        for hit in hits:
+            print(json.dumps(hit._asdict(), ensure_ascii=False))
+        return
+    for hit in hits:
+        speaker = f" {hit.speaker}:" if hit.speaker else ""
+        print(f"{hit.path} [{format_duration(hit.start)}]{speaker} {hit.text}")
+    shown = f", showing {len(hits)}" if len(hits) < total else ""
+    print(f"📊 {total} hit(s){shown} in {milliseconds:.1f} ms")
+
+# Subcommands take over the whole argument list; anything else is treated as audio paths
+SUBCOMMANDS = {
+    "serve": serve_main,
+    "cache": cache_main,
+    "export": export_main,
+    "autotune": autotune_main,
+    "speakers": speakers_main,
+    "index": index_main,
+    "search": search_main,
+}
+
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] in SUBCOMMANDS:
+        SUBCOMMANDS[sys.argv[1]](sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(
         prog="transcribe",
         description="Transcribe and optionally diarize an audio file, exporting to various formats.",
         epilog="Example: transcribe audio.wav --formats all"
     )
-    parser.add_argument("audio_path", help="Path to audio file (e.g., .wav)")
+    parser.add_argument("audio_paths", nargs="*", metavar="audio_path", help="Path(s) or glob pattern(s) of audio files (e.g., .wav)")
+    parser.add_argument("--manifest", help="File listing audio paths or glob patterns, one per line")
     parser.add_argument("--output-dir", dest="output_dir", default=".", help="Directory to save outputs (default: current directory)")
     parser.add_argument("--model", default="medium", help="Whisper model to use (default: medium)")
     parser.add_argument("--skip-diarization", dest="skip_diarization", action="store_true", help="Skip speaker diarization")
     parser.add_argument("--num-speakers", type=int, help="Exact number of speakers (improves diarization accuracy)")
     parser.add_argument("--no-timestamps", dest="no_timestamps", action="store_true", help="Exclude timestamps from output files")
-    parser.add_argument("--formats", nargs="+", default=["md"], help="Output formats: txt, md, srt, json, html, pdf, all")
+    parser.add_argument("--formats", nargs="+", default=["md"], help="Output formats: txt, md, srt, json, html, viewer, pdf, dtr, all (all excludes viewer)")
+    parser.add_argument("--model-memory-mb", dest="model_memory_mb", type=float, help="Memory budget for models kept loaded between files (default: unlimited)")
+    parser.add_argument("--no-cache", dest="no_cache", action="store_true", help="Always transcribe, ignoring and not updating the result cache")
+    parser.add_argument("--cache-dir", dest="cache_dir", help="Result cache directory (default: ~/.cache/diarized-transcriber/results)")
+    parser.add_argument("--cache-size-mb", dest="cache_size_mb", type=float, default=DEFAULT_CACHE_SIZE_MB, help=f"Result cache size limit (default: {DEFAULT_CACHE_SIZE_MB})")
+    parser.add_argument("--embeddings-cache-size-mb", dest="embeddings_cache_size_mb", type=float, default=DEFAULT_ARTIFACTS_SIZE_MB, help=f"Size limit of the speaker embeddings kept for re-clustering (default: {DEFAULT_ARTIFACTS_SIZE_MB})")
+    parser.add_argument("--compute-type", dest="compute_type", help="Whisper compute type, e.g. int8 or float32 (default: tuned profile, else float32 on CPU)")
+    parser.add_argument("--batch-size", dest="batch_size", type=int, help="Whisper batch size (default: tuned profile, else whisperx's default)")
+    parser.add_argument("--no-profile", dest="no_profile", action="store_true", help="Ignore the CPU profile saved by `transcribe autotune`")
+    parser.add_argument("--concurrent", action="store_true", help="Run diarization alongside transcription and alignment")
+    parser.add_argument("--asr-threads", dest="asr_threads", type=int, help="CPU threads for transcription and alignment (default: tuned profile; half the cores in --concurrent mode)")
+    parser.add_argument("--diarize-threads", dest="diarize_threads", type=int, help="CPU threads for diarization in --concurrent mode (default: half the cores)")
+    parser.add_argument("--chunk-minutes", dest="chunk_minutes", type=float, help="Process long recordings in windows of this many minutes to cap memory")
+    parser.add_argument("--chunk-overlap", dest="chunk_overlap", type=float, default=60.0, help="Seconds of overlap between --chunk-minutes windows (default: 60)")
+    parser.add_argument("--stream", action="store_true", help="Write txt/md/srt/html incrementally so they can be tailed (segments arrive during --chunk-minutes runs)")
+    parser.add_argument("--jobs", type=int, default=1, help="Transcribe this many files at once in worker processes (batch mode, default: 1)")
+    parser.add_argument("--threads-per-job", dest="threads_per_job", type=int, help="CPU threads per --jobs worker (default: cores divided by jobs)")
+    parser.add_argument("--cross-file-batch", dest="cross_file_batch", type=int, default=1,
+                        help="Transcribe this many files together, pooling their speech segments into shared Whisper batches (batch mode; suits many short clips)")
+    parser.add_argument("--multilingual", action="store_true", help="Detect the language of each speech segment and align each language with its own model (for recordings that switch languages)")
+    parser.add_argument("--languages", type=lambda value: [code.strip() for code in value.split(",") if code.strip()],
+                        help="Comma-separated language codes --multilingual chooses from, e.g. en,es (default: any)")
+    parser.add_argument("--speaker-index", dest="speaker_index", help="Enrolled voices to name speakers from (default: the index managed by `transcribe speakers`)")
+    parser.add_argument("--match-threshold", dest="match_threshold", type=float, help="Minimum cosine similarity to name an enrolled speaker (default: 0.7)")
+    parser.add_argument("--no-identify", dest="no_identify", action="store_true", help="Keep SPEAKER_nn labels even for enrolled voices")
+    parser.add_argument("--resume", action="store_true", help="Continue from the last stage completed by an interrupted run")
+    parser.add_argument("--checkpoint-dir", dest="checkpoint_dir", help="Directory for per-file stage checkpoints (default: <output-dir>/.checkpoints)")
+    parser.add_argument("--no-checkpoint", dest="no_checkpoint", action="store_true", help="Don't save stage checkpoints")
+    parser.add_argument("--metrics", help="Write per-stage wall time, CPU time, peak memory and real-time factor to this JSON file")
     parser.add_argument("--debug", action="store_true", help="Show detailed debug warnings and logs")
     parser.add_argument("--quiet", action="store_true", help="Suppress all output except progress bars")
 
@@ -98,6 +793,39 @@ def main():
         logging.getLogger("urllib3").setLevel(logging.DEBUG)
         logging.getLogger("requests").setLevel(logging.DEBUG)
 
+    if args.model_memory_mb:
+        get_default_pool().set_budget(args.model_memory_mb)
+
+    audio_paths = collect_audio_paths(args.audio_paths, args.manifest)
+    if not audio_paths:
+        parser.error("no audio files given (pass paths, glob patterns or --manifest)")
+
+    if args.cross_file_batch > 1 and (args.jobs > 1 or args.chunk_minutes):
+        parser.error("--cross-file-batch can't be combined with --jobs or --chunk-minutes")
+    if args.languages:
+        args.multilingual = True
+    if args.multilingual and args.chunk_minutes:
+        parser.error("--multilingual can't be combined with --chunk-minutes")
+
+    # Several inputs run as a batch that loads each model only once
+    if len(audio_paths) > 1 or args.manifest:
+        if not args.quiet:
+            print(f"🎙️ Starting batch transcription of {len(audio_paths)} file(s)...")
+        with suppressed_stderr(args.debug):
+            summary = run_batch_mode(args, audio_paths)
+        if summary["failed"]:
+            sys.exit(1)
+        return
+
+    with suppressed_stderr(args.debug):
+        run_single_file(args, audio_paths[0])
+
+def run_single_file(args, audio_path):
+    """Transcribe one file with progress output, then export it."""
+    from diarized_transcriber.rich_progress import PersistentProgress
+
+    args.audio_path = audio_path
+
     # Generate base filename from input audio file
     audio_basename = os.path.splitext(os.path.basename(args.audio_path))[0]
     base_filename = f"{audio_basename}-transcript"
@@ -119,32 +847,28 @@ def main():
     print()  # Add blank line before progress bars
 
     start_time = time.time()
-    
-    # Suppress stderr during transcription if not in debug mode
-    if not args.debug:
-        with contextlib.redirect_stderr(io.StringIO()):
-            result = run_transcribe_with_diarization(
-                audio_path=args.audio_path,
-                output_dir=args.output_dir,
-                model_size=args.model,
-                skip_diarization=args.skip_diarization,
-                num_speakers=args.num_speakers,
-                quiet=args.quiet
-            )
-    else:
-        result = run_transcribe_with_diarization(
-            audio_path=args.audio_path,
-            output_dir=args.output_dir,
-            model_size=args.model,
-            skip_diarization=args.skip_diarization,
-            num_speakers=args.num_speakers,
-            quiet=args.quiet
-        )
+
+    # Streamed formats are opened up front so they can be tailed during transcription
+    stream = None
+    if args.stream:
+        os.makedirs(args.output_dir, exist_ok=True)
+        stream = open_transcript_stream(args, base_filename)
+        if not args.quiet:
+            print(f"📡 Streaming {', '.join(stream.paths)} as segments are finalized")
+    try:
+        result, from_cache, pipeline_metrics = transcribe_file(args, args.audio_path, cache=open_result_cache(args),
+                                                               on_segment=stream.write if stream else None)
+    except Exception:
+        if stream is not None:
+            stream.close()
+        raise
 
     transcription_time = time.time() - start_time
-    if not args.quiet:
+    if not args.quiet and from_cache:
+        print("♻️  Reused cached transcription - skipping ASR, alignment and diarization")
+    elif not args.quiet:
         print(f"✅ Transcription completed in {format_duration(transcription_time)}")
-        print(f"📝 Found {len(result['segments'])} segments")
+        print(f"📝 Found {len(result)} segments")
     
     # Create output directory if it doesn't exist
     if args.output_dir != ".":
@@ -158,60 +882,30 @@ def main():
     print()  # Add blank line before progress bars
     export_start_time = time.time()
     
-    # Determine which formats to export
-    export_formats = []
-    if "all" in args.formats:
-        export_formats = ["srt", "txt", "md", "html", "pdf"]
-    else:
-        export_formats = args.formats
-    
-    formats_exported = 0
-    total_formats = len(export_formats)
-    
     # Export with Persistent progress
     with PersistentProgress() as progress:
-        progress.start_task("Exporting formats")
-        
-        for i, format_type in enumerate(export_formats):
-            if format_type == "srt":
-                srt_path = os.path.join(args.output_dir, f"{base_filename}.srt")
-                generate_speaker_aware_srt(result["segments"], srt_path)
-                formats_exported += 1
-
-            elif format_type == "txt":
-                txt_path = os.path.join(args.output_dir, f"{base_filename}.txt")
-                generate_txt(result["segments"], txt_path, include_timestamps=not args.no_timestamps)
-                formats_exported += 1
-
-            elif format_type == "md":
-                md_path = os.path.join(args.output_dir, f"{base_filename}.md")
-                generate_markdown_transcript(result["segments"], md_path, include_timestamps=not args.no_timestamps)
-                formats_exported += 1
-
-            elif format_type == "html":
-                html_path = os.path.join(args.output_dir, f"{base_filename}.html")
-                generate_html_transcript(result["segments"], html_path)
-                formats_exported += 1
-
-            elif format_type == "pdf":
-                pdf_path = os.path.join(args.output_dir, f"{base_filename}.pdf")
-                generate_pdf_transcript(result["segments"], pdf_path)
-                formats_exported += 1
-        
+        progress.start_task("Exporting formats", stage="export")
+        written = export_result(args, result, base_filename, stream)
+        formats_exported = len(written)
         progress.complete_task(f"Exported {formats_exported} format(s)")
 
     export_time = time.time() - export_start_time
     total_time = time.time() - start_time
-    
-    # Restore stderr
-    sys.stderr = original_stderr
-    
+
+    if args.metrics:
+        metrics = file_metrics(args.audio_path, from_cache, pipeline_metrics, progress.metrics())
+        metrics["total_wall_seconds"] = round(total_time, 4)
+        metrics["peak_rss_mb"] = peak_rss_mb()
+        save_metrics(metrics, args.metrics)
+
     if not args.quiet:
         print("─" * 50)
         print(f"🎉 Transcription completed successfully!")
         print(f"⏱️  Total time: {total_time:.1f}s")
         print(f"📊 Exported {formats_exported} format(s)")
         print(f"📁 All files saved to: {args.output_dir}")
+        if args.metrics:
+            print(f"📈 Metrics saved to: {args.metrics}")
 
 if __name__ == "__main__":
     main()
@@ -1,71 +1,568 @@
 import os
+import numpy as np
 import torch
 import whisperx
 from whisperx import diarize
+from .audio import SAMPLE_RATE
 from .rich_progress import PersistentProgress, print_success_panel
+from .model_pool import PoolKey, get_default_pool
+from .speaker_assignment import assign_word_speakers
+from .speaker_index import DEFAULT_MATCH_THRESHOLD, format_matches, identify_speakers
+from .recluster import diarize_keeping_artifacts, recluster
+import contextlib
 import threading
 import time
+from concurrent import futures as concurrent_futures
 
-def run_transcribe_with_diarization(audio_path, output_dir, model_size="large-v3", skip_diarization=False, num_speakers=None, quiet=False):
+def select_device():
+    """Pick the device and default compute type for this machine."""
     device = "cuda" if torch.cuda.is_available() else "cpu"
     compute_type = "float16" if device == "cuda" else "float32"
-    
+    return device, compute_type
+
+def whisper_key(model_size, device, compute_type, threads=None):
+    return PoolKey("whisper", model_size, device, compute_type, threads=threads)
+
+def align_key(language, device):
+    return PoolKey("align", device=device, language=language)
+
+def diarize_key(device):
+    return PoolKey("diarize", device=device)
+
+def load_whisper_model(pool, model_size, device, compute_type, threads=None):
+    # CTranslate2 fixes its thread count at load time, so it is part of the key
+    kwargs = {"compute_type": compute_type}
+    if threads:
+        kwargs["threads"] = threads
+    return pool.get(whisper_key(model_size, device, compute_type, threads),
+                    lambda: whisperx.load_model(model_size, device, **kwargs))
+
+def load_alignment_model(pool, language, device):
+    return pool.get(align_key(language, device),
+                    lambda: whisperx.load_align_model(language, device))
+
+def load_diarization_pipeline(pool, token, device):
+    return pool.get(diarize_key(device),
+                    lambda: diarize.DiarizationPipeline(use_auth_token=token, device=device))
+
+def apply_cpu_profile(device, compute_type, batch_size, asr_threads, cpu_profile, concurrent=False):
+    """Fill unset compute type, batch size and ASR threads from a tuned CPU profile.
+
+    Explicit values always win, and profiles only apply on CPU. The tuned
+    thread count assumed ASR had the machine to itself, so it isn't used
+    when diarization runs alongside.
+    """
+    if device != "cpu" or not cpu_profile:
+        return compute_type, batch_size, asr_threads
+    compute_type = compute_type or cpu_profile.get("compute_type")
+    batch_size = batch_size or cpu_profile.get("batch_size")
+    if not concurrent:
+        asr_threads = asr_threads or cpu_profile.get("threads")
+    return compute_type, batch_size, asr_threads
+
+def split_thread_budget(total=None):
+    """Split the CPU cores between the ASR branch and the diarization branch."""
+    total = total or os.cpu_count() or 2
+    diarize_threads = max(1, total // 2)
+    return max(1, total - diarize_threads), diarize_threads
+
+@contextlib.contextmanager
+def torch_threads(num_threads):
+    """Cap torch intra-op threads for work started from the current thread."""
+    if not num_threads:
+        yield
+        return
+    previous = torch.get_num_threads()
+    torch.set_num_threads(num_threads)
+    try:
+        yield
+    finally:
+        torch.set_num_threads(previous)
+
+# whisperx leaves batching off unless asked; pooling files is pointless without it
+DEFAULT_POOLED_BATCH_SIZE = 16
+
+def vad_segments(model, audio, chunk_size=30):
+    """Speech segments of one recording, cut and merged as model.transcribe would."""
+    from whisperx.vads import Pyannote, Vad
+    if isinstance(model.vad_model, Vad):
+        waveform = model.vad_model.preprocess_audio(audio)
+        merge_chunks = model.vad_model.merge_chunks
+    else:
+        waveform = Pyannote.preprocess_audio(audio)
+        merge_chunks = Pyannote.merge_chunks
+    segments = model.vad_model({"waveform": waveform, "sample_rate": SAMPLE_RATE})
+    return merge_chunks(segments, chunk_size, onset=model._vad_params["vad_onset"], offset=model._vad_params["vad_offset"])
+
+def use_language(model, language):
+    """Point the pipeline's tokenizer at a language, as model.transcribe does on each call."""
+    from faster_whisper.tokenizer import Tokenizer
+    tokenizer = model.tokenizer
+    if tokenizer is None or tokenizer.language_code != language or tokenizer.task != "transcribe":
+        model.tokenizer = Tokenizer(model.model.hf_tokenizer, model.model.model.is_multilingual,
+                                    task="transcribe", language=language)
+
+def detect_languages(model, clips, batch_size=None, languages=None):
+    """Most likely language of each clip of up to 30 s, detected in batches.
+
+    Does what model.detect_language does for the start of a recording, for
+    many clips at once. languages, if given, restricts the choice to those
+    codes (e.g. the two languages of a bilingual show).
+    """
+    from whisperx.audio import N_SAMPLES, log_mel_spectrogram
+    n_mels = model.model.feat_kwargs.get("feature_size") or 80
+    detected = []
+    batch_size = batch_size or 1
+    for first in range(0, len(clips), batch_size):
+        features = np.stack([log_mel_spectrogram(clip[:N_SAMPLES], n_mels=n_mels,
+                                                 padding=N_SAMPLES - len(clip[:N_SAMPLES])).numpy()
+                             for clip in clips[first:first + batch_size]])
+        # One list of (token, probability) per clip, most likely first; tokens look like "<|en|>"
+        for candidates in model.model.model.detect_language(model.model.encode(features)):
+            codes = [token[2:-2] for token, _ in candidates]
+            allowed = [code for code in codes if code in languages] if languages else codes
+            detected.append(allowed[0] if allowed else codes[0])
+    return detected
+
+def transcribe_batched(model, audios, batch_size=None, language=None, chunk_size=30, multilingual=False,
+                       languages=None):
+    """Transcribe several recordings with their speech segments pooled into shared batches.
+
+    model.transcribe only batches the segments of one recording, so a short
+    clip leaves most of every batch empty. Here the segments of all the
+    recordings go through the pipeline together, one language at a time
+    since the tokenizer fixes it, and each decoded segment is routed back
+    to its recording and timestamps. Returns one {"segments", "language"}
+    result per recording, in order, as model.transcribe would.
+
+    With multilingual, the language is detected per speech segment instead
+    of once per recording (from languages, if given). Segments then carry
+    their "language", the result's "language" is the one spoken longest and
+    "languages" holds the seconds of speech in each.
+    """
+    language = language or model.preset_language
+    segments = [vad_segments(model, audio, chunk_size) for audio in audios]
+    batch_size = batch_size or model._batch_size
+    multilingual = multilingual and not language
+
+    def clip(index, seg):
+        return audios[index][int(seg["start"] * SAMPLE_RATE):int(seg["end"] * SAMPLE_RATE)]
+
+    pooled = [(index, seg) for index in range(len(audios)) for seg in segments[index]]
+    if multilingual:
+        segment_languages = detect_languages(model, [clip(index, seg) for index, seg in pooled],
+                                             batch_size, languages)
+        results = [{"segments": [], "language": None, "languages": {}} for _ in audios]
+    else:
+        file_languages = [language or model.detect_language(audio) for audio in audios]
+        segment_languages = [file_languages[index] for index, _ in pooled]
+        results = [{"segments": [], "language": lang} for lang in file_languages]
+
+    for lang in dict.fromkeys(segment_languages):
+        group = [item for item, seg_language in zip(pooled, segment_languages) if seg_language == lang]
+        use_language(model, lang)
+        inputs = ({"inputs": clip(index, seg)} for index, seg in group)
+        # The pipeline yields outputs in input order
+        for (index, seg), out in zip(group, model(inputs, batch_size=batch_size, num_workers=0)):
+            unbatched = batch_size in (0, 1, None)
+            segment = {"text": out["text"][0] if unbatched else out["text"],
+                       "start": round(seg["start"], 3), "end": round(seg["end"], 3)}
+            if "avg_logprob" in out:
+                segment["avg_logprob"] = out["avg_logprob"][0] if unbatched else out["avg_logprob"]
+            if multilingual:
+                segment["language"] = lang
+                spoken = results[index]["languages"]
+                spoken[lang] = round(spoken.get(lang, 0.0) + seg["end"] - seg["start"], 3)
+            results[index]["segments"].append(segment)
+
+    if multilingual:
+        for audio, result in zip(audios, results):
+            # Languages were decoded one after another, so restore time order
+            result["segments"].sort(key=lambda seg: seg["start"])
+            spoken = result["languages"]
+            result["language"] = max(spoken, key=spoken.get) if spoken else model.detect_language(audio)
+
+    # Like model.transcribe, detect the language afresh next time unless it was fixed at load
+    if model.preset_language is None:
+        model.tokenizer = None
+    return results
+
+def align_by_language(transcription, audio, pool, device):
+    """whisperx.align for a transcript whose segments each carry their own "language".
+
+    Segments are aligned one language at a time, each group with that
+    language's alignment model from the pool (so a model loads once per
+    language, not per segment), and merged back into time order. Segments
+    in a language with no alignment model keep their ASR timings.
+    """
+    groups = {}
+    for seg in transcription["segments"]:
+        groups.setdefault(seg.get("language", transcription["language"]), []).append(seg)
+
+    segments = []
+    for language, group in groups.items():
+        try:
+            model_a, metadata = load_alignment_model(pool, language, device)
+        except ValueError:
+            # whisperx has no default alignment model for this language
+            segments.extend(group)
+            continue
+        for seg in whisperx.align(group, model_a, metadata, audio, device)["segments"]:
+            seg["language"] = language
+            segments.append(seg)
+
+    segments.sort(key=lambda seg: seg["start"])
+    # Stretches of speech in one language; unlike the per-segment keys these
+    # survive the conversion to a columnar Transcript, so exports carry them
+    spans = []
+    for seg in segments:
+        if spans and spans[-1]["language"] == seg["language"]:
+            spans[-1]["end"] = seg["end"]
+        else:
+            spans.append({"start": seg["start"], "end": seg["end"], "language": seg["language"]})
+    aligned = {"segments": segments, "word_segments": [word for seg in segments for word in seg.get("words", [])],
+               "language_spans": spans}
+    for key in ("language", "languages"):
+        if key in transcription:
+            aligned[key] = transcription[key]
+    return aligned
+
+def transcribe_files(audio_paths, model_size="large-v3", pool=None, compute_type=None, batch_size=None,
+                     asr_threads=None, cpu_profile=None, language=None, multilingual=False, languages=None):
+    """Decode several files and transcribe them together with transcribe_batched.
+
+    Returns {path: (audio, transcription)} for every file that decoded; hand
+    both to run_transcribe_with_diarization so that file's run skips its own
+    decode and transcription. Files that fail to decode are left out for
+    their own run to report.
+    """
+    if pool is None:
+        pool = get_default_pool()
+    device, default_compute_type = select_device()
+    compute_type, batch_size, asr_threads = apply_cpu_profile(device, compute_type, batch_size, asr_threads, cpu_profile)
+    compute_type = compute_type or default_compute_type
+
+    audios = {}
+    for path in audio_paths:
+        try:
+            audios[path] = whisperx.load_audio(path)
+        except Exception:
+            continue
+    if not audios:
+        return {}
+    with torch_threads(asr_threads):
+        model = load_whisper_model(pool, model_size, device, compute_type, asr_threads)
+        results = transcribe_batched(model, list(audios.values()), batch_size or DEFAULT_POOLED_BATCH_SIZE, language,
+                                     multilingual=multilingual, languages=languages)
+    return {path: (audio, result) for (path, audio), result in zip(audios.items(), results)}
+
+def voice_embeddings(audio_path, pool=None, num_speakers=None):
+    """Each speaker's voice embedding in a recording, and the seconds they talk, for speaker enrollment."""
+    token = os.getenv("HUGGINGFACE_TOKEN")
+    if not token:
+        raise RuntimeError("HUGGINGFACE_TOKEN is required to compute voice embeddings")
+    if pool is None:
+        pool = get_default_pool()
+    device, _ = select_device()
+    diarize_pipeline = load_diarization_pipeline(pool, token, device)
+    kwargs = {"num_speakers": num_speakers} if num_speakers else {}
+    output = diarize_pipeline(whisperx.load_audio(audio_path), return_embeddings=True, **kwargs)
+    turns, embeddings = output if isinstance(output, tuple) else (output, None)
+    talk = {}
+    for start, end, speaker in zip(turns["start"], turns["end"], turns["speaker"]):
+        talk[speaker] = talk.get(speaker, 0.0) + end - start
+    return embeddings or {}, talk
+
+def run_transcribe_with_diarization(audio_path, output_dir, model_size="large-v3", skip_diarization=False, num_speakers=None, quiet=False, pool=None, checkpoint=None,
+                                    concurrent=False, asr_threads=None, diarize_threads=None, chunk_seconds=None, overlap_seconds=None, on_segment=None,
+                                    compute_type=None, batch_size=None, cpu_profile=None, audio=None, transcription=None,
+                                    speaker_index=None, match_threshold=DEFAULT_MATCH_THRESHOLD, aligned=None,
+                                    artifacts=None, on_artifacts=None, multilingual=False, languages=None,
+                                    show_progress=True):
+    # Models come from a pool so repeated calls in one process skip reloading
+    if pool is None:
+        pool = get_default_pool()
+
+    # compute_type, batch_size and asr_threads override the profile saved by `transcribe autotune`
+    device, default_compute_type = select_device()
+    compute_type, batch_size, asr_threads = apply_cpu_profile(device, compute_type, batch_size, asr_threads,
+                                                              cpu_profile, concurrent)
+    compute_type = compute_type or default_compute_type
+
+    # Long recordings can be processed in overlapping windows with bounded memory.
+    # Only chunked mode settles segments before the end, so on_segment is only
+    # called there; callers write whatever it didn't deliver from the result
+    if chunk_seconds:
+        from .chunked import run_chunked_transcription, DEFAULT_OVERLAP_SECONDS
+        return run_chunked_transcription(audio_path, output_dir, model_size=model_size, skip_diarization=skip_diarization,
+                                         num_speakers=num_speakers, quiet=quiet, show_progress=show_progress, pool=pool,
+                                         chunk_seconds=chunk_seconds,
+                                         overlap_seconds=overlap_seconds or DEFAULT_OVERLAP_SECONDS,
+                                         on_segment=on_segment, compute_type=compute_type, batch_size=batch_size,
+                                         threads=asr_threads, speaker_index=speaker_index,
+                                         match_threshold=match_threshold)
+
     if not quiet:
         print(f"🔧 Using device: {device.upper()}")
         print(f"⚙️  Compute type: {compute_type}")
+        if batch_size or asr_threads:
+            print(f"🎛️  Batch size: {batch_size or 'default'} | ASR threads: {asr_threads or 'default'}")
+
+    token = os.getenv("HUGGINGFACE_TOKEN")
+    run_diarization = not skip_diarization and bool(token)
+
+    # Stages already finished by an earlier, interrupted run
+    resumed = {}
+    if checkpoint is not None:
+        for stage in ("transcribe", "align", "diarize", "assign"):
+            if stage == "diarize" and not run_diarization:
+                continue
+            output = checkpoint.load(stage)
+            if output is not None:
+                resumed[stage] = output
+        if checkpoint.discarded_reason and not quiet:
+            print(f"⚠️  Ignoring checkpoint: {checkpoint.discarded_reason}")
+        if resumed and not quiet:
+            print(f"⏯️  Resuming from checkpoint - completed: {', '.join(resumed)}")
+
+    def save(stage, output):
+        if checkpoint is not None:
+            checkpoint.save(stage, output)
+
+    # Speakers enrolled in speaker_index get their names; the checkpoints keep
+    # the diarizer's labels, so identification reruns against the current index
+    def identified(result):
+        matches = identify_speakers(result, speaker_index, match_threshold) if speaker_index is not None else {}
+        if matches and not quiet:
+            print(f"🪪 Identified {len(matches)} speaker(s): {format_matches(matches)}")
+        return result
+
+    # One progress instance for all steps. Its metrics go on whatever result
+    # comes back, including the resumed and reused results returned early
+    progress = PersistentProgress(quiet=not show_progress)
+    result = None
+    try:
+        with progress:
+            if run_diarization and "assign" in resumed:
+                progress.start_task("Loading speaker-assigned transcript from checkpoint", stage="assign")
+                result = identified(resumed["assign"])
+                progress.complete_task(f"Resumed transcript with speakers - {len(result['segments'])} segments")
+                return result
+            if not run_diarization and "align" in resumed:
+                progress.start_task("Loading aligned transcript from checkpoint", stage="align")
+                result = resumed["align"]
+                progress.complete_task(f"Resumed aligned transcript - {len(result['segments'])} segments")
+                return result
+            if not run_diarization and aligned is not None:
+                progress.start_task("Using aligned transcript from an earlier run", stage="align")
+                result = aligned
+                progress.complete_task(f"Aligned transcript ready - {len(result['segments'])} segments")
+                return result
+
+            # A re-run with other speaker bounds can reuse the aligned transcript and
+            # the diarizer's stored embeddings (see recluster.py); then nothing reads the audio
+            needs_audio = aligned is None and "align" not in resumed or \
+                run_diarization and artifacts is None and "diarize" not in resumed
+
+            # Both branches only need the audio, so they can overlap when asked to
+            overlap = concurrent and run_diarization and "align" not in resumed and "diarize" not in resumed \
+                and aligned is None and artifacts is None
+            if overlap and device == "cpu" and not (asr_threads and diarize_threads):
+                default_asr, default_diarize = split_thread_budget()
+                asr_threads = asr_threads or default_asr
+                diarize_threads = diarize_threads or default_diarize
+
+            # Decode once to a 16 kHz mono buffer shared by every stage below,
+            # instead of letting each stage run its own ffmpeg decode. Callers
+            # that transcribed several files together (transcribe_files) already
+            # have the audio and its transcription
+            if needs_audio:
+                progress.start_task("Decoding audio", stage="decode")
+                if audio is None:
+                    audio = whisperx.load_audio(audio_path)
+                progress.audio_seconds = len(audio) / SAMPLE_RATE
+                progress.complete_task(f"Audio decoded - {progress.audio_seconds:.1f}s at {SAMPLE_RATE} Hz")
+            elif artifacts is not None:
+                progress.audio_seconds = artifacts.duration
+
+            def asr_branch():
+                """Transcription and alignment."""
+                if "align" in resumed:
+                    result = resumed["align"]
+                    progress.start_task("Loading aligned transcript from checkpoint", stage="align")
+                    progress.complete_task(f"Resumed aligned transcript - {len(result['segments'])} segments")
+                    return result
+                if aligned is not None:
+                    progress.start_task("Using aligned transcript from an earlier run", stage="align")
+                    progress.complete_task(f"Aligned transcript ready - {len(aligned['segments'])} segments")
+                    save("align", aligned)
+                    return aligned
+
+                with torch_threads(asr_threads):
+                    if "transcribe" in resumed:
+                        result = resumed["transcribe"]
+                        progress.start_task("Loading transcript from checkpoint", stage="transcribe")
+                        progress.complete_task(f"Resumed transcript - {len(result['segments'])} segments")
+                    elif transcription is not None:
+                        result = transcription
+                        progress.start_task("Using transcript from the shared batch", stage="transcribe")
+                        progress.complete_task(f"Transcript ready - {len(result['segments'])} segments")
+                        save("transcribe", result)
+                    else:
+                        # Load Whisper model
+                        progress.start_task("Loading Whisper model", stage="load_whisper_model")
+                        cached = whisper_key(model_size, device, compute_type, asr_threads) in pool
+                        model = load_whisper_model(pool, model_size, device, compute_type, asr_threads)
+                        if cached:
+                            progress.complete_task(f"Reusing loaded model '{model_size}'")
+                        else:
+                            progress.complete_task(f"Model '{model_size}' loaded successfully")
 
-    # Use a single persistent progress instance for all steps
-    with PersistentProgress() as progress:
-        # Load Whisper model
-        progress.start_task("Loading Whisper model")
-        model = whisperx.load_model(model_size, device, compute_type=compute_type)
-        progress.complete_task(f"Model '{model_size}' loaded successfully")
-        
-        # Transcribe
-        progress.start_task("Transcribing audio")
-        result = model.transcribe(audio_path)
-        progress.complete_task(f"Transcription complete - {len(result['segments'])} segments found")
-
-        # Load alignment model
-        progress.start_task("Loading alignment model")
-        model_a, metadata = whisperx.load_align_model(language_code=result["language"], device=device)
-        progress.complete_task(f"Alignment model loaded for language: {result['language']}")
-        
-        # Align
-        progress.start_task("Aligning ASR with audio")
-        result = whisperx.align(result["segments"], model_a, metadata, audio_path, device)
-        progress.complete_task("Audio alignment completed")
-
-        if not skip_diarization:
-            token = os.getenv("HUGGINGFACE_TOKEN")
-            if not token:
+                        # Transcribe
+                        progress.start_task("Transcribing audio", stage="transcribe")
+                        if multilingual:
+                            result = transcribe_batched(model, [audio], batch_size, multilingual=True,
+                                                        languages=languages)[0]
+                        elif batch_size:
+                            result = model.transcribe(audio, batch_size=batch_size)
+                        else:
+                            result = model.transcribe(audio)
+                        progress.complete_task(f"Transcription complete - {len(result['segments'])} segments found")
+                        save("transcribe", result)
+
+                    if len(result.get("languages", ())) > 1:
+                        # Code-switching recording: align each language with its own model
+                        spoken = ", ".join(f"{lang} {seconds:.0f}s" for lang, seconds in result["languages"].items())
+                        progress.start_task("Aligning ASR with audio by language", stage="align")
+                        result = align_by_language(result, audio, pool, device)
+                        progress.complete_task(f"Audio alignment completed - {spoken}")
+                        save("align", result)
+                        return result
+
+                    # Load alignment model
+                    progress.start_task("Loading alignment model", stage="load_align_model")
+                    cached = align_key(result["language"], device) in pool
+                    model_a, metadata = load_alignment_model(pool, result["language"], device)
+                    if cached:
+                        progress.complete_task(f"Reusing alignment model for language: {result['language']}")
+                    else:
+                        progress.complete_task(f"Alignment model loaded for language: {result['language']}")
+
+                    # Align
+                    progress.start_task("Aligning ASR with audio", stage="align")
+                    language, spoken = result["language"], result.get("languages")
+                    result = whisperx.align(result["segments"], model_a, metadata, audio, device)
+                    # whisperx.align drops the language; keep it so a resumed run can use it
+                    result.setdefault("language", language)
+                    if spoken:
+                        result["languages"] = spoken
+                    progress.complete_task("Audio alignment completed")
+                    save("align", result)
+                return result
+
+            def diarize_branch():
+                """Speaker diarization, which needs only the audio."""
+                if "diarize" in resumed:
+                    progress.start_task("Loading speaker turns from checkpoint", stage="diarize")
+                    progress.complete_task("Resumed speaker diarization")
+                    return resumed["diarize"]
+
+                with torch_threads(diarize_threads):
+                    # Load diarization model
+                    progress.start_task("Loading speaker diarization model", stage="load_diarize_model")
+                    cached = diarize_key(device) in pool
+                    diarize_pipeline = load_diarization_pipeline(pool, token, device)
+                    if cached:
+                        progress.complete_task("Reusing loaded diarization model")
+                    else:
+                        progress.complete_task("Diarization model loaded")
+
+                    if num_speakers and not quiet:
+                        print(f"🎯 Specifying exact number of speakers: {num_speakers}")
+                    if artifacts is not None:
+                        # Only clustering depends on the speaker count
+                        progress.start_task("Re-clustering stored speaker embeddings", stage="diarize")
+                        diarize_segments, embeddings = recluster(diarize_pipeline, artifacts, num_speakers=num_speakers)
+                    elif on_artifacts is not None:
+                        progress.start_task("Running speaker diarization", stage="diarize")
+                        diarize_segments, embeddings, captured = diarize_keeping_artifacts(diarize_pipeline, audio,
+                                                                                           num_speakers=num_speakers)
+                        if captured is not None:
+                            on_artifacts(captured)
+                    else:
+                        # Run diarization
+                        progress.start_task("Running speaker diarization", stage="diarize")
+                        if num_speakers:
+                            output = diarize_pipeline(audio, num_speakers=num_speakers, return_embeddings=True)
+                        else:
+                            output = diarize_pipeline(audio, return_embeddings=True)
+                        diarize_segments, embeddings = output if isinstance(output, tuple) else (output, None)
+                    # One voice embedding per speaker, used to match enrolled speakers
+                    if embeddings:
+                        speaker_embeddings.update(embeddings)
+                    progress.complete_task("Speaker diarization completed")
+                    save("diarize", diarize_segments)
+                return diarize_segments
+
+            # Filled by diarize_branch; a resumed diarization has none
+            speaker_embeddings = {}
+            timings = {}
+            branch_timings = None
+
+            def timed(name, branch):
+                branch_start = time.time()
+                try:
+                    return branch()
+                finally:
+                    timings[name] = time.time() - branch_start
+
+            if overlap:
+                # Diarization runs in a worker thread; both branches join before speaker assignment
+                branches_start = time.time()
+                with concurrent_futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="diarize") as executor:
+                    diarize_future = executor.submit(timed, "diarization", diarize_branch)
+                    result = timed("asr", asr_branch)
+                    diarize_segments = diarize_future.result()
+                wall = time.time() - branches_start
+                branch_timings = {
+                    "asr": round(timings["asr"], 3),
+                    "diarization": round(timings["diarization"], 3),
+                    "wall": round(wall, 3),
+                    "overlap_saved": round(timings["asr"] + timings["diarization"] - wall, 3),
+                    "asr_threads": asr_threads,
+                    "diarize_threads": diarize_threads,
+                }
                 if not quiet:
-                    print("⚠️  Warning: HUGGINGFACE_TOKEN not set — diarization may fail.")
-                    print("💡 Set HUGGINGFACE_TOKEN environment variable for speaker diarization")
-                    print("⏩ Continuing without speaker diarization...")
+                    print(f"⏱️  ASR {timings['asr']:.1f}s | diarization {timings['diarization']:.1f}s | "
+                          f"overlapped wall {wall:.1f}s (saved {timings['asr'] + timings['diarization'] - wall:.1f}s)")
             else:
-                # Diarization steps with same persistent progress
-                # Load diarization model
-                progress.start_task("Loading speaker diarization model")
-                diarize_pipeline = diarize.DiarizationPipeline(use_auth_token=token, device=device)
-                progress.complete_task("Diarization model loaded")
-                
-                # Run diarization
-                progress.start_task("Running speaker diarization")
-                if num_speakers:
+                result = asr_branch()
+
+            if not skip_diarization:
+                if not token:
                     if not quiet:
-                        print(f"🎯 Specifying exact number of speakers: {num_speakers}")
-                    diarize_segments = diarize_pipeline(audio_path, num_speakers=num_speakers)
+                        print("⚠️  Warning: HUGGINGFACE_TOKEN not set — diarization may fail.")
+                        print("💡 Set HUGGINGFACE_TOKEN environment variable for speaker diarization")
+                        print("⏩ Continuing without speaker diarization...")
                 else:
-                    diarize_segments = diarize_pipeline(audio_path)
-                progress.complete_task("Speaker diarization completed")
+                    if not overlap:
+                        diarize_segments = diarize_branch()
 
-                # Assign speakers
-                progress.start_task("Assigning speakers to words")
-                result = diarize.assign_word_speakers(diarize_segments, result)
-                progress.complete_task("Speaker assignment completed")
-        else:
-            if not quiet:
-                print("⏩ Skipping diarization as requested.")
+                    # Assign speakers
+                    progress.start_task("Assigning speakers to words", stage="assign")
+                    result = assign_word_speakers(diarize_segments, result)
+                    if speaker_embeddings:
+                        result["speaker_embeddings"] = speaker_embeddings
+                    progress.complete_task("Speaker assignment completed")
+                    save("assign", result)
+                    identified(result)
+            else:
+                if not quiet:
+                    print("⏩ Skipping diarization as requested.")
 
-    return result
+        if branch_timings:
+            result["branch_timings"] = branch_timings
+        return result
+    finally:
+        if result is not None:
+            result["metrics"] = progress.metrics()
@@ -0,0 +1,167 @@
+import itertools
+import multiprocessing
+import os
+from concurrent import futures as concurrent_futures
+from .streaming import build_turns
+from .transcript import Transcript
+
+ALL_FORMATS = ["srt", "txt", "md", "html", "pdf", "json", "dtr"]
+
+# Formats only written when asked for by name, not by "all"; the viewer
+# writes a directory of data files next to its page
+EXTRA_FORMATS = ["viewer"]
+
+# File extensions for formats not named after theirs
+EXTENSIONS = {"viewer": "viewer.html"}
+
+# Formats whose files grow on disk as segments arrive; PDF is only written at the end
+STREAM_FORMATS = ["srt", "txt", "md", "html", "viewer"]
+
+# Formats rendered in worker processes for long transcripts (PDF layout and
+# indented JSON encoding are pure Python and hold the GIL), and the length at
+# which that beats the cost of starting the processes
+PROCESS_FORMATS = ["pdf", "json"]
+PROCESS_EXPORT_MIN_SEGMENTS = 2000
+
+def expand_formats(formats):
+    # Determine which formats to export
+    if "all" in formats:
+        return list(ALL_FORMATS)
+    return list(dict.fromkeys(formats))
+
+def output_path(output_dir, base_filename, format_type):
+    return os.path.join(output_dir, f"{base_filename}.{EXTENSIONS.get(format_type, format_type)}")
+
+def result_segments(result):
+    """The segments of a result dict, or the Transcript itself (it iterates as segments)."""
+    return result if isinstance(result, Transcript) else result["segments"]
+
+def open_writer(format_type, path, include_timestamps=True, has_speakers=None, autoflush=True):
+    """Writer for one turn-based format, or None for formats that aren't written from segments.
+
+    Exporters are imported on first use, so fpdf only loads when a PDF is requested.
+    """
+    if format_type == "srt":
+        from .srt_exporter import SrtWriter
+        return SrtWriter(path, has_speakers=has_speakers, autoflush=autoflush)
+    if format_type == "txt":
+        from .txt_exporter import TxtWriter
+        return TxtWriter(path, include_timestamps=include_timestamps, has_speakers=has_speakers, autoflush=autoflush)
+    if format_type == "md":
+        from .markdown_exporter import MarkdownWriter
+        return MarkdownWriter(path, include_timestamps=include_timestamps, has_speakers=has_speakers, autoflush=autoflush)
+    if format_type == "html":
+        from .html_exporter import HtmlWriter
+        return HtmlWriter(path, has_speakers=has_speakers, autoflush=autoflush)
+    if format_type == "viewer":
+        from .html_exporter import HtmlViewerWriter
+        return HtmlViewerWriter(path, has_speakers=has_speakers, autoflush=autoflush)
+    if format_type == "pdf":
+        from .pdf_exporter import PdfWriter
+        return PdfWriter(path, has_speakers=has_speakers, autoflush=autoflush)
+    return None
+
+def _render(format_type, path, result, turns, has_speakers, include_timestamps):
+    if format_type == "json":
+        from .json_exporter import save_json
+        save_json(result, path)
+        return
+    if format_type == "dtr":
+        from .transcript_file import save_transcript
+        save_transcript(result, path)
+        return
+    with open_writer(format_type, path, include_timestamps, has_speakers, autoflush=False) as writer:
+        writer.write_turns(turns, has_speakers)
+
+def export_transcript(result, output_dir, base_filename, formats, include_timestamps=True, max_workers=None):
+    """Write the requested formats for one result (dict or Transcript) and return the paths written.
+
+    Segments are grouped into speaker turns once and every format renders
+    from those turns. With more than one CPU the formats render concurrently:
+    for long transcripts PDF and JSON go to worker processes while the
+    other formats are written on threads. Unknown formats are skipped.
+    """
+    jobs = []
+    for format_type in expand_formats(formats):
+        if format_type in ALL_FORMATS or format_type in EXTRA_FORMATS:
+            jobs.append((format_type, output_path(output_dir, base_filename, format_type)))
+    if not jobs:
+        return []
+
+    segments = result_segments(result)
+    turns, has_speakers = build_turns(segments)
+    # Rendering is CPU-bound, so on a single core concurrency only adds overhead
+    workers = max_workers or min(len(jobs), os.cpu_count() or 1)
+    if len(jobs) == 1 or workers == 1:
+        for format_type, path in jobs:
+            _render(format_type, path, result, turns, has_speakers, include_timestamps)
+        return [path for _, path in jobs]
+
+    # A Transcript may be backed by a mapped file, so only plain results are sent to other processes
+    process_jobs = [f for f, _ in jobs if f == "pdf" or (f in PROCESS_FORMATS and isinstance(result, dict))]
+    process_pool = None
+    if len(segments) >= PROCESS_EXPORT_MIN_SEGMENTS and process_jobs:
+        try:
+            # Spawned, not forked: forking a process that holds torch and other threads can deadlock
+            process_pool = concurrent_futures.ProcessPoolExecutor(max_workers=len(process_jobs),
+                                                                  mp_context=multiprocessing.get_context("spawn"))
+        except (OSError, NotImplementedError):
+            process_pool = None  # no multiprocessing here, e.g. a locked-down sandbox
+
+    pending = []
+    try:
+        with concurrent_futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export") as executor:
+            for format_type, path in jobs:
+                if process_pool is not None and format_type in process_jobs:
+                    # Each worker only gets what its format reads
+                    if format_type == "json":
+                        future = process_pool.submit(_render, format_type, path, result, None, has_speakers, include_timestamps)
+                    else:
+                        future = process_pool.submit(_render, format_type, path, None, turns, has_speakers, include_timestamps)
+                else:
+                    future = executor.submit(_render, format_type, path, result, turns, has_speakers, include_timestamps)
+                pending.append(future)
+            for future in pending:
+                future.result()
+    finally:
+        if process_pool is not None:
+            process_pool.shutdown()
+    return [path for _, path in jobs]
+
+class TranscriptStream:
+    """Fans segments out to a streaming writer per requested text format.
+
+    Pass write() as the pipeline's on_segment callback to have the files
+    grow while a long job runs, then finish() with the final segments to
+    write whatever the pipeline didn't deliver and close the files.
+    Formats that can't stream are listed in remaining_formats.
+    """
+
+    def __init__(self, output_dir, base_filename, formats, include_timestamps=True, has_speakers=None):
+        self.writers = {}
+        self.remaining_formats = []
+        for format_type in expand_formats(formats):
+            path = output_path(output_dir, base_filename, format_type)
+            if format_type in STREAM_FORMATS:
+                self.writers[format_type] = open_writer(format_type, path, include_timestamps, has_speakers)
+            else:
+                self.remaining_formats.append(format_type)
+        self.count = 0
+
+    @property
+    def paths(self):
+        return [writer.output_path for writer in self.writers.values()]
+
+    def write(self, seg):
+        for writer in self.writers.values():
+            writer.write(seg)
+        self.count += 1
+
+    def finish(self, segments):
+        for seg in itertools.islice(segments, self.count, None):
+            self.write(seg)
+        self.close()
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
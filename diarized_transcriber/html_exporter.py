@@ -1,24 +1,375 @@
-def generate_html_transcript(segments, output_path):
-    # Check if any segments have speaker information (indicating diarization was used)
-    has_speakers = any("speaker" in seg and seg["speaker"] is not None for seg in segments)
-    
-    with open(output_path, "w") as f:
-        f.write("<html><body>\n")
-        
-        if has_speakers:
-            # Use speaker-aware format
-            current_speaker = None
-            for seg in segments:
-                speaker = seg.get("speaker", "SPEAKER")
-                text = seg["text"].strip()
-                if speaker != current_speaker:
-                    f.write(f"<h3>{speaker}</h3>\n")
-                    current_speaker = speaker
-                f.write(f"<p>{text}</p>\n")
+import html
+import json
+import os
+from urllib.parse import quote
+
+from .files import atomic_write
+from .streaming import SegmentWriter, scan_has_speakers
+
+# Segments per viewer data file; the viewer keeps at most a few files' worth in the page
+CHUNK_SEGMENTS = 500
+
+class HtmlWriter(SegmentWriter):
+    """HTML with a heading at each change of speaker; the closing tags are written on close()."""
+
+    def begin(self):
+        self._emit("<html><body>\n")
+
+    def start_turn(self, speaker, start):
+        if self.has_speakers:
+            self._emit(f"<h3>{html.escape(speaker)}</h3>\n")
+
+    def add_segment(self, start, end, text, speaker):
+        self._emit(f"<p>{html.escape(text, quote=False)}</p>\n")
+
+    def end(self):
+        self._emit("</body></html>")
+
+def _script_json(value) -> str:
+    """JSON that is also safe inside an HTML page and in older JavaScript parsers."""
+    return (json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+            .replace("<", "\\u003c").replace("\u2028", "\\u2028").replace("\u2029", "\\u2029"))
+
+class HtmlViewerWriter(SegmentWriter):
+    """A fixed-size viewer page plus the transcript in chunked data files it loads on demand.
+
+    Segments go to <name>_files/chunk-NNNNN.js, CHUNK_SEGMENTS at a time,
+    and <name>_files/index.js lists each chunk's time range and the
+    speakers whose turns start in it, for jumping by time or speaker. The
+    data files are scripts wrapping JSON, rather than .json files, so the
+    viewer also works opened straight from disk, where browsers block
+    fetch(). With autoflush the index is rewritten after every chunk, so a
+    streamed transcript can be read while it is still being written.
+    """
+
+    def __init__(self, output_path, has_speakers=None, autoflush=True, title=None):
+        name = os.path.basename(output_path)
+        for suffix in (".html", ".viewer"):
+            if name.endswith(suffix):
+                name = name[:-len(suffix)]
+        self.title = title or name
+        self.data_dir = os.path.splitext(output_path)[0] + "_files"
+        super().__init__(output_path, has_speakers=has_speakers, autoflush=autoflush)
+
+    def _open(self):
+        return None
+
+    def begin(self):
+        os.makedirs(self.data_dir, exist_ok=True)
+        # Drop the data files of an earlier, possibly longer, export
+        for name in os.listdir(self.data_dir):
+            if name == "index.js" or (name.startswith("chunk-") and name.endswith(".js")):
+                os.remove(os.path.join(self.data_dir, name))
+        self._speakers = {}
+        self._chunks = []
+        self._rows = []
+        self._continued = False
+        self._turn_speaker = -1
+        self._turn_start = False
+        page = (VIEWER_PAGE.replace("__TITLE__", html.escape(self.title))
+                .replace("__DATA_DIR__", _script_json(quote(os.path.basename(self.data_dir)))))
+        with open(self.output_path, "w", encoding="utf-8") as f:
+            f.write(page)
+        self._write_index(complete=False)
+
+    def start_turn(self, speaker, start):
+        if speaker is None:
+            self._turn_speaker = -1
         else:
-            # Use simple format without speaker labels
-            for seg in segments:
-                text = seg["text"].strip()
-                f.write(f"<p>{text}</p>\n")
-                
-        f.write("</body></html>")
+            self._turn_speaker = self._speakers.setdefault(speaker, len(self._speakers))
+        self._turn_start = True
+
+    def add_segment(self, start, end, text, speaker):
+        if not self._rows:
+            self._continued = not self._turn_start
+        # Rows name their speaker where a turn starts (and at the top of a chunk), otherwise -1
+        labelled = self._turn_start or not self._rows
+        self._rows.append([round(start, 2), round(end, 2), text, self._turn_speaker if labelled else -1])
+        self._turn_start = False
+        if len(self._rows) >= CHUNK_SEGMENTS:
+            self._write_chunk()
+            if self.autoflush:
+                self._write_index(complete=False)
+
+    def _write_chunk(self):
+        rows, self._rows = self._rows, []
+        number = len(self._chunks)
+        speakers = {row[3] for i, row in enumerate(rows) if row[3] >= 0 and (i or not self._continued)}
+        self._chunks.append([rows[0][0], max(row[1] for row in rows), len(rows), sorted(speakers)])
+        with open(os.path.join(self.data_dir, f"chunk-{number:05d}.js"), "w", encoding="utf-8") as f:
+            f.write(f"transcriptChunk({number},{_script_json({'continued': self._continued, 'rows': rows})});\n")
+
+    def _write_index(self, complete):
+        index = {"title": self.title, "speakers": list(self._speakers), "chunks": self._chunks, "complete": complete}
+        # Replaced in one step so a reader refreshing mid-stream never sees half an index
+        with atomic_write(os.path.join(self.data_dir, "index.js")) as f:
+            f.write(f"transcriptIndex({_script_json(index)});\n")
+
+    def end(self):
+        if self._rows:
+            self._write_chunk()
+        self._write_index(complete=True)
+
+def generate_html_transcript(segments, output_path):
+    with HtmlWriter(output_path, has_speakers=scan_has_speakers(segments), autoflush=False) as writer:
+        writer.write_all(segments)
+
+def generate_html_viewer(segments, output_path):
+    with HtmlViewerWriter(output_path, has_speakers=scan_has_speakers(segments), autoflush=False) as writer:
+        writer.write_all(segments)
+
+VIEWER_PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>__TITLE__</title>
+<style>
+body { margin: 0; color: #222; font: 16px/1.5 -apple-system, "Segoe UI", Helvetica, Arial, sans-serif; overflow-anchor: none; }
+header { position: sticky; top: 0; z-index: 1; display: flex; flex-wrap: wrap; gap: 8px; align-items: center;
+         padding: 8px 16px; background: #f6f6f6; border-bottom: 1px solid #ddd; }
+header h1 { margin: 0 16px 0 0; font-size: 17px; }
+header form { display: inline; }
+main { max-width: 860px; margin: 0 auto; padding: 8px 16px 50vh; }
+.turn { margin: 18px 0 2px; font-weight: bold; }
+.seg { margin: 2px 0; }
+.seg a { margin-right: 8px; color: #888; font-size: 12px; text-decoration: none; font-variant-numeric: tabular-nums; }
+.seg.target { background: #fff3bf; }
+#status { color: #777; font-size: 13px; }
+</style>
+</head>
+<body>
+<header>
+<h1>__TITLE__</h1>
+<select id="page" aria-label="Page"></select>
+<form id="jump"><input id="time" placeholder="h:mm:ss" size="8" aria-label="Jump to time"> <button>Go</button></form>
+<span id="speaker-nav" hidden><select id="speaker" aria-label="Speaker"></select>
+<button id="prev-turn" title="Previous turn by this speaker">&#9664;</button><button id="next-turn" title="Next turn by this speaker">&#9654;</button></span>
+<span id="status">Loading&hellip;</span>
+</header>
+<main><div id="top"></div><div id="chunks"></div><div id="bottom"></div></main>
+<script>
+(function () {
+  "use strict";
+  var DATA_DIR = __DATA_DIR__;
+  var KEEP = 3;                 // chunks rendered at once; the rest stay on disk
+  var index = null, loaded = {}, loading = {}, rendered = [], busy = false;
+  var $ = function (id) { return document.getElementById(id); };
+  var chunksEl = $("chunks"), header = document.querySelector("header");
+
+  function pad(n) { return (n < 10 ? "0" : "") + n; }
+  function clock(t) {
+    t = Math.floor(t);
+    var h = Math.floor(t / 3600), m = Math.floor(t / 60) % 60, s = t % 60;
+    return (h ? h + ":" + pad(m) : m) + ":" + pad(s);
+  }
+  function parseClock(text) {
+    var parts = text.trim().split(":"), t = 0;
+    for (var i = 0; i < parts.length; i++) {
+      if (parts[i] === "" || isNaN(parts[i])) return null;
+      t = t * 60 + Number(parts[i]);
+    }
+    return t;
+  }
+  function status(text) { $("status").textContent = text; }
+
+  function script(src, done, failed) {
+    var el = document.createElement("script");
+    el.src = src;
+    el.onload = function () { el.remove(); done(); };
+    el.onerror = function () { el.remove(); failed(); };
+    document.head.appendChild(el);
+  }
+  window.transcriptIndex = function (data) { index = data; };
+  window.transcriptChunk = function (n, data) { loaded[n] = data; };
+
+  function load(n) {
+    if (loaded[n]) return Promise.resolve(loaded[n]);
+    if (!loading[n]) {
+      loading[n] = new Promise(function (resolve, reject) {
+        var name = "0000" + n;
+        script(DATA_DIR + "/chunk-" + name.slice(name.length - 5) + ".js",
+               function () { delete loading[n]; resolve(loaded[n]); },
+               function () { delete loading[n]; reject(new Error("Can't load part " + (n + 1))); });
+      });
+    }
+    return loading[n];
+  }
+
+  function render(n, data) {
+    var section = document.createElement("section");
+    section.dataset.chunk = n;
+    data.rows.forEach(function (row, i) {
+      if (row[3] >= 0) {
+        var turn = document.createElement("div");
+        turn.className = "turn";
+        turn.textContent = index.speakers[row[3]] + (i === 0 && data.continued ? " (continued)" : "");
+        section.appendChild(turn);
+      }
+      var p = document.createElement("p"), a = document.createElement("a");
+      p.className = "seg";
+      p.dataset.row = i;
+      a.href = "#t=" + row[0];
+      a.textContent = clock(row[0]);
+      p.appendChild(a);
+      p.appendChild(document.createTextNode(row[2]));
+      section.appendChild(p);
+    });
+    return section;
+  }
+
+  function forget(entry) {
+    entry.el.remove();
+    delete loaded[entry.n];
+  }
+  function append(n, data) {
+    var el = render(n, data);
+    chunksEl.appendChild(el);
+    rendered.push({n: n, el: el});
+    while (rendered.length > KEEP) {
+      var gone = rendered.shift(), height = gone.el.offsetHeight;
+      forget(gone);
+      window.scrollBy(0, -height);
+    }
+  }
+  function prepend(n, data) {
+    var el = render(n, data);
+    chunksEl.insertBefore(el, chunksEl.firstChild);
+    rendered.unshift({n: n, el: el});
+    window.scrollBy(0, el.offsetHeight);
+    while (rendered.length > KEEP) forget(rendered.pop());
+  }
+
+  // First row whose top is in view below the header, as [chunk, row]
+  function position() {
+    var top = header.offsetHeight - 4;
+    for (var i = 0; i < rendered.length; i++) {
+      if (rendered[i].el.getBoundingClientRect().bottom <= top) continue;
+      var rows = rendered[i].el.querySelectorAll(".seg");
+      for (var j = 0; j < rows.length; j++) {
+        if (rows[j].getBoundingClientRect().top >= top) return [rendered[i].n, j];
+      }
+    }
+    return [rendered.length ? rendered[0].n : 0, 0];
+  }
+
+  function update() {
+    if (!index || !rendered.length) return;
+    var n = position()[0];
+    $("page").value = n;
+    status("Part " + (n + 1) + " of " + index.chunks.length + (index.complete ? "" : " (still being written)"));
+  }
+
+  // Show chunk n with the given row at the top, keeping the already rendered window when n is in it
+  function go(n, row) {
+    var show = rendered.some(function (entry) { return entry.n === n; }) ? Promise.resolve() :
+      load(n).then(function (data) {
+        while (rendered.length) forget(rendered.pop());
+        append(n, data);
+      });
+    return show.then(function () {
+      var section = chunksEl.querySelector('section[data-chunk="' + n + '"]');
+      var target = section.querySelector('.seg[data-row="' + row + '"]');
+      var old = chunksEl.querySelector(".target");
+      if (old) old.classList.remove("target");
+      target.classList.add("target");
+      var label = target.previousSibling;
+      var anchor = label && label.className === "turn" ? label : target;
+      window.scrollBy(0, anchor.getBoundingClientRect().top - header.offsetHeight - 8);
+      recheck();
+      update();
+    }, function (error) { status(error.message); });
+  }
+
+  function jumpTo(t) {
+    var chunks = index.chunks, lo = 0, hi = chunks.length - 1;
+    if (hi < 0) return;
+    // The first chunk still running at t
+    while (lo < hi) {
+      var mid = (lo + hi) >> 1;
+      if (chunks[mid][1] >= t) hi = mid; else lo = mid + 1;
+    }
+    load(lo).then(function (data) {
+      var row = 0;
+      while (row < data.rows.length - 1 && data.rows[row][1] < t) row++;
+      go(lo, row);
+    }, function (error) { status(error.message); });
+  }
+
+  function turnIn(data, speaker, from, step) {
+    for (var i = from; i >= 0 && i < data.rows.length; i += step) {
+      if (data.rows[i][3] === speaker && (i > 0 || !data.continued)) return i;
+    }
+    return -1;
+  }
+  function nextTurn(step) {
+    var speaker = Number($("speaker").value), here = position(), n = here[0];
+    (function search(n, from) {
+      load(n).then(function (data) {
+        var row = turnIn(data, speaker, from === null ? (step > 0 ? 0 : data.rows.length - 1) : from, step);
+        if (row >= 0) return go(n, row);
+        do { n += step; } while (n >= 0 && n < index.chunks.length && index.chunks[n][3].indexOf(speaker) < 0);
+        if (n < 0 || n >= index.chunks.length) return status("No " + (step > 0 ? "later" : "earlier") + " turn by " + index.speakers[speaker]);
+        search(n, null);
+      }, function (error) { status(error.message); });
+    })(n, here[1] + step);
+  }
+
+  var observer = new IntersectionObserver(function (entries) {
+    entries.forEach(function (entry) {
+      if (!entry.isIntersecting || busy || !rendered.length) return;
+      var n = entry.target.id === "bottom" ? rendered[rendered.length - 1].n + 1 : rendered[0].n - 1;
+      if (n < 0 || n >= index.chunks.length) return;
+      busy = true;
+      load(n).then(function (data) {
+        if (entry.target.id === "bottom") append(n, data); else prepend(n, data);
+      }).catch(function (error) { status(error.message); }).then(function () { busy = false; recheck(); update(); });
+    });
+  }, {rootMargin: "1500px 0px"});
+  // Observing again reports the current state, so loading continues while a sentinel stays in range
+  function recheck() {
+    ["top", "bottom"].forEach(function (id) { observer.unobserve($(id)); observer.observe($(id)); });
+  }
+
+  function fromHash() {
+    var match = /^#t=([\\d.]+)$/.exec(location.hash);
+    if (match) jumpTo(Number(match[1]));
+    return Boolean(match);
+  }
+
+  function start() {
+    if (!index) return status("Can't read the transcript index in " + DATA_DIR);
+    var page = $("page"), speakers = $("speaker");
+    index.chunks.forEach(function (chunk, n) {
+      page.add(new Option("Part " + (n + 1) + ": " + clock(chunk[0]) + "\u2013" + clock(chunk[1]), n));
+    });
+    index.speakers.map(function (name, i) { return [name, i]; }).sort().forEach(function (speaker) {
+      speakers.add(new Option(speaker[0], speaker[1]));
+    });
+    $("speaker-nav").hidden = !index.speakers.length;
+    page.onchange = function () { go(Number(page.value), 0); };
+    $("jump").onsubmit = function (event) {
+      event.preventDefault();
+      var t = parseClock($("time").value);
+      if (t === null) status("Enter a time such as 1:02:03"); else jumpTo(t);
+    };
+    $("prev-turn").onclick = function () { nextTurn(-1); };
+    $("next-turn").onclick = function () { nextTurn(1); };
+    window.addEventListener("hashchange", fromHash);
+    var waiting = false;
+    window.addEventListener("scroll", function () {
+      if (waiting) return;
+      waiting = true;
+      requestAnimationFrame(function () { waiting = false; update(); });
+    });
+    if (!index.chunks.length) return status(index.complete ? "Empty transcript" : "No segments yet; reload to check again");
+    if (!fromHash()) go(0, 0);
+  }
+
+  // Cache-busted so a reload picks up chunks added by a still-running export
+  script(DATA_DIR + "/index.js?" + Date.now(), start, function () { index = null; start(); });
+})();
+</script>
+</body>
+</html>
+"""
@@ -1,5 +1,10 @@
 import json
 
+from .files import to_builtin
+from .transcript import Transcript
+
 def save_json(result, output_path):
-    with open(output_path, "w") as f:
-        json.dump(result, f, indent=2)
+    if isinstance(result, Transcript):
+        result = result.to_result()
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, default=to_builtin)
@@ -1,32 +1,41 @@
+from .streaming import SegmentWriter, scan_has_speakers
+
 def format_timestamp(seconds):
     """Convert seconds to MM:SS format"""
     minutes = int(seconds // 60)
     seconds = int(seconds % 60)
     return f"{minutes:02d}:{seconds:02d}"
 
-def generate_markdown_transcript(segments, output_path, include_timestamps=False):
-    # Check if any segments have speaker information (indicating diarization was used)
-    has_speakers = any("speaker" in seg and seg["speaker"] is not None for seg in segments)
-    
-    with open(output_path, "w", encoding='utf-8') as f:
-        if has_speakers:
-            # Use speaker-aware format
-            current_speaker = None
-            for seg in segments:
-                speaker = seg.get("speaker", "SPEAKER")
-                text = seg["text"].strip()
-                timestamp = f"[{format_timestamp(seg['start'])}]" if include_timestamps else ""
-                
-                if speaker != current_speaker:
-                    if current_speaker is not None:
-                        f.write("\n")
-                    f.write(f"**{speaker}:** {timestamp}\n")
-                    current_speaker = speaker
-                f.write(f"{text}\n")
+class MarkdownWriter(SegmentWriter):
+    """Markdown with a bold speaker heading at each change of speaker."""
+
+    encoding = "utf-8"
+
+    def __init__(self, output_path, include_timestamps=False, has_speakers=None, autoflush=True):
+        self.include_timestamps = include_timestamps
+        super().__init__(output_path, has_speakers=has_speakers, autoflush=autoflush)
+
+    def start_turn(self, speaker, start):
+        if not self.has_speakers:
+            return
+        # Use speaker-aware format
+        timestamp = f"[{format_timestamp(start)}]" if self.include_timestamps else ""
+        if self.turns:
+            self._emit("\n")
+        self._emit(f"**{speaker}:** {timestamp}\n")
+
+    def add_segment(self, start, end, text, speaker):
+        if self.has_speakers:
+            self._emit(f"{text}\n")
         else:
             # Use simple format without speaker labels
-            for seg in segments:
-                text = seg["text"].strip()
-                timestamp = f"[{format_timestamp(seg['start'])}] " if include_timestamps else ""
-                f.write(f"{timestamp}{text}\n")
-        f.write("\n")
+            timestamp = f"[{format_timestamp(start)}] " if self.include_timestamps else ""
+            self._emit(f"{timestamp}{text}\n")
+
+    def end(self):
+        self._emit("\n")
+
+def generate_markdown_transcript(segments, output_path, include_timestamps=False):
+    with MarkdownWriter(output_path, include_timestamps=include_timestamps,
+                        has_speakers=scan_has_speakers(segments), autoflush=False) as writer:
+        writer.write_all(segments)
@@ -0,0 +1,104 @@
+import json
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def peak_rss_mb() -> Optional[float]:
+    """High-water mark of this process's resident memory, or None where it can't be read."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes everywhere else
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def _rtf(wall: float, audio_seconds: Optional[float]) -> Optional[float]:
+    return round(wall / audio_seconds, 4) if audio_seconds else None
+
+class StageRecorder:
+    """Wall time, CPU time and peak RSS for each pipeline stage.
+
+    A stage runs from start() until stop() or the next start() on the same
+    thread, so stages on concurrent branches are tracked independently.
+    CPU time is process-wide (model libraries run their own threads), so
+    stages that overlap each count the other's CPU. Peak RSS is the
+    process high-water mark when the stage ended; peak_rss_growth_mb is
+    how much the stage raised it.
+    """
+
+    def __init__(self):
+        self.stages: List[Dict[str, Any]] = []
+        self._open: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+
+    def start(self, stage: str, description: Optional[str] = None):
+        self.stop()
+        record = {
+            "stage": stage,
+            "description": description or stage,
+            "_wall": time.perf_counter(),
+            "_cpu": time.process_time(),
+            "_rss": peak_rss_mb(),
+        }
+        with self._lock:
+            self._open[threading.get_ident()] = record
+
+    def stop(self):
+        """End the current thread's stage, if one is running."""
+        with self._lock:
+            record = self._open.pop(threading.get_ident(), None)
+        if record is not None:
+            self._finish(record)
+
+    def stop_all(self):
+        with self._lock:
+            records, self._open = list(self._open.values()), {}
+        for record in records:
+            self._finish(record)
+
+    def _finish(self, record):
+        rss = peak_rss_mb()
+        start_rss = record.pop("_rss")
+        record["wall_seconds"] = round(time.perf_counter() - record.pop("_wall"), 4)
+        record["cpu_seconds"] = round(time.process_time() - record.pop("_cpu"), 4)
+        record["peak_rss_mb"] = rss
+        record["peak_rss_growth_mb"] = round(rss - start_rss, 1) if rss is not None else None
+        with self._lock:
+            self.stages.append(record)
+
+    def summary(self, audio_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """Metrics for the run so far, with real-time factors (wall / audio duration) when the duration is known.
+
+        totals sums stages sharing a name, e.g. every window of a chunked run.
+        """
+        wall = time.perf_counter() - self._wall_start
+        with self._lock:
+            stages = [dict(s, rtf=_rtf(s["wall_seconds"], audio_seconds)) for s in self.stages]
+        totals: Dict[str, Dict[str, Any]] = {}
+        for s in stages:
+            total = totals.setdefault(s["stage"], {"count": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0})
+            total["count"] += 1
+            total["wall_seconds"] = round(total["wall_seconds"] + s["wall_seconds"], 4)
+            total["cpu_seconds"] = round(total["cpu_seconds"] + s["cpu_seconds"], 4)
+        for total in totals.values():
+            total["rtf"] = _rtf(total["wall_seconds"], audio_seconds)
+        return {
+            "audio_seconds": round(audio_seconds, 3) if audio_seconds else None,
+            "wall_seconds": round(wall, 4),
+            "cpu_seconds": round(time.process_time() - self._cpu_start, 4),
+            "peak_rss_mb": peak_rss_mb(),
+            "rtf": _rtf(wall, audio_seconds),
+            "stages": stages,
+            "totals": totals,
+        }
+
+def save_metrics(metrics: Any, output_path: str):
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(metrics, f, indent=2)
@@ -0,0 +1,208 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+# Rough resident sizes (MB) of Whisper checkpoints at float16, used when a
+# loaded model does not expose its parameters (CTranslate2-backed pipelines)
+WHISPER_SIZES_MB = {
+    "tiny": 75,
+    "base": 145,
+    "small": 485,
+    "medium": 1500,
+    "large": 3100,
+    "turbo": 1600,
+}
+
+# Budget used by the default pool when none is configured
+DEFAULT_BUDGET_ENV = "DIARIZED_TRANSCRIBER_MODEL_POOL_MB"
+
+class PoolKey(NamedTuple):
+    kind: str
+    model_size: Optional[str] = None
+    device: Optional[str] = None
+    compute_type: Optional[str] = None
+    language: Optional[str] = None
+    threads: Optional[int] = None
+
+# Sizes (MB) assumed for models whose size can't be measured: Whisper names
+# missing from the table count as large, alignment models as a large wav2vec2
+# and diarization pipelines as pyannote's segmentation and embedding models.
+# Anything else gets DEFAULT_MODEL_MB, so no model counts as free
+FALLBACK_SIZES_MB = {
+    "whisper": WHISPER_SIZES_MB["large"],
+    "align": 1200,
+    "diarize": 100,
+}
+DEFAULT_MODEL_MB = 1024
+
+def _tensors(value: Any, found: Dict[int, Any], seen: set, depth: int = 4):
+    """Collect the parameters and buffers of the torch modules in value, its containers and attributes."""
+    if id(value) in seen or isinstance(value, (str, bytes, int, float, bool, type(None))):
+        return
+    seen.add(id(value))
+    parameters = getattr(value, "parameters", None)
+    if callable(parameters):
+        buffers = getattr(value, "buffers", None)
+        try:
+            for tensor in list(parameters()) + (list(buffers()) if callable(buffers) else []):
+                found[id(tensor)] = tensor
+            return
+        except Exception:
+            pass
+    if depth == 0:
+        return
+    if isinstance(value, dict):
+        children = list(value.values())
+    elif isinstance(value, (list, tuple)):
+        children = list(value)
+    else:
+        children = list(getattr(value, "__dict__", {}).values())
+    for child in children:
+        _tensors(child, found, seen, depth - 1)
+
+def estimate_model_bytes(model: Any, key: Optional[PoolKey] = None) -> int:
+    """Estimate how much memory a loaded model holds.
+
+    torch modules are measured from their parameters and buffers, found
+    through wrappers such as whisperx's alignment tuple and diarization
+    pipeline. Whisper models count at least their checkpoint size from the
+    table, and models with nothing to measure their FALLBACK_SIZES_MB.
+    """
+    found: Dict[int, Any] = {}
+    _tensors(model, found, set())
+    total = 0
+    for tensor in found.values():
+        try:
+            total += tensor.numel() * tensor.element_size()
+        except Exception:
+            continue
+    if key is None or key.kind != "whisper":
+        return total or FALLBACK_SIZES_MB.get(key.kind if key else None, DEFAULT_MODEL_MB) * 1024 * 1024
+
+    # CTranslate2 weights aren't torch tensors; what is measured then is only
+    # helpers such as the VAD model, far smaller than the checkpoint
+    family = (key.model_size or "").split("-")[0].split(".")[0]
+    size_mb = WHISPER_SIZES_MB.get(family, FALLBACK_SIZES_MB["whisper"])
+    if key.compute_type == "float32":
+        size_mb *= 2
+    elif key.compute_type and key.compute_type.startswith("int8"):
+        size_mb //= 2
+    return max(total, size_mb * 1024 * 1024)
+
+class ModelPool:
+    """LRU cache of loaded models bounded by an approximate memory budget.
+
+    Models are looked up by PoolKey. When adding a model pushes the total
+    estimated size over the budget, the least recently used models are
+    dropped until it fits again; the model just requested is never evicted,
+    so a single model larger than the budget still loads.
+    """
+
+    def __init__(self, memory_budget_mb: Optional[float] = None,
+                 size_estimator: Callable[[Any, Optional[PoolKey]], int] = estimate_model_bytes):
+        self.memory_budget_bytes = int(memory_budget_mb * 1024 * 1024) if memory_budget_mb else None
+        self.size_estimator = size_estimator
+        self._entries: "OrderedDict[PoolKey, tuple]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._loading: Dict[PoolKey, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: PoolKey, loader: Callable[[], Any]) -> Any:
+        """Return the pooled model for key, calling loader on a miss.
+
+        Loads of different keys run in parallel; concurrent requests for the
+        same key wait for a single load.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key][0]
+                self.misses += 1
+            model = loader()
+            size = self.size_estimator(model, key)
+            with self._lock:
+                self._entries[key] = (model, size)
+                self._loading.pop(key, None)
+                self._evict(keep=key)
+            return model
+
+    def __contains__(self, key: PoolKey) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def used_bytes(self) -> int:
+        return sum(size for _, size in self._entries.values())
+
+    def _evict(self, keep: PoolKey):
+        if self.memory_budget_bytes is None:
+            return
+        evicted = 0
+        while self.used_bytes > self.memory_budget_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            if oldest == keep:
+                break
+            del self._entries[oldest]
+            evicted += 1
+        self.evictions += evicted
+        # Let CUDA hand the freed weights back to other processes
+        if evicted:
+            _release_cuda_cache()
+
+    def set_budget(self, memory_budget_mb: Optional[float]):
+        """Change the budget, evicting immediately if the pool is now over it."""
+        with self._lock:
+            self.memory_budget_bytes = int(memory_budget_mb * 1024 * 1024) if memory_budget_mb else None
+            self._evict(keep=next(reversed(self._entries), None))
+
+    def clear(self):
+        """Drop every pooled model and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters and sizes for tuning the memory budget."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "models": len(self._entries),
+                "used_mb": round(self.used_bytes / (1024 * 1024), 1),
+                "budget_mb": round(self.memory_budget_bytes / (1024 * 1024), 1) if self.memory_budget_bytes else None,
+                "keys": [key._asdict() for key in self._entries],
+            }
+
+def _release_cuda_cache():
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except ImportError:
+        pass
+
+_default_pool: Optional[ModelPool] = None
+
+def get_default_pool() -> ModelPool:
+    """Process-wide pool used when callers don't pass their own."""
+    global _default_pool
+    if _default_pool is None:
+        budget = os.getenv(DEFAULT_BUDGET_ENV)
+        _default_pool = ModelPool(float(budget) if budget else None)
+    return _default_pool
@@ -0,0 +1,262 @@
+import hashlib
+import io
+import os
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+# Unicode text needs a TrueType font to embed; this overrides the search below
+PDF_FONT_ENV = "DIARIZED_TRANSCRIBER_PDF_FONT"
+
+# Fonts with broad Unicode coverage that commonly ship with the OS
+FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/noto/NotoSans-Regular.ttf",
+    "/usr/share/fonts/noto/NotoSans-Regular.ttf",
+    "/System/Library/Fonts/Supplemental/Arial Unicode.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+    "C:\\Windows\\Fonts\\arial.ttf",
+]
+
+# Bold file names next to each regular one above
+_BOLD_NAMES = {"DejaVuSans.ttf": "DejaVuSans-Bold.ttf", "NotoSans-Regular.ttf": "NotoSans-Bold.ttf",
+               "arial.ttf": "arialbd.ttf"}
+
+def find_unicode_font() -> Optional[str]:
+    """Path of a TrueType font for text the core PDF fonts can't show, or None."""
+    if os.getenv(PDF_FONT_ENV):
+        return os.environ[PDF_FONT_ENV]
+    return next((path for path in FONT_CANDIDATES if os.path.exists(path)), None)
+
+def bold_variant(path: str) -> Optional[str]:
+    name = _BOLD_NAMES.get(os.path.basename(path))
+    bold = os.path.join(os.path.dirname(path), name) if name else None
+    return bold if bold and os.path.exists(bold) else None
+
+def _escape(data: bytes) -> bytes:
+    return data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)").replace(b"\r", b"\\r")
+
+class CoreFont:
+    """One of the 14 standard PDF fonts with WinAnsi (cp1252) encoding: nothing to embed.
+
+    encode() returns a word's bytes for a PDF string between the font's
+    delimiters, and its width in 1/1000 em.
+    """
+
+    delimiters = (b"(", b")")
+    space_code = b" "
+
+    def __init__(self, base_font: str, widths_key: str):
+        from fpdf.fonts import fpdf_charwidths  # AFM glyph widths, indexed like cp1252 bytes
+        widths = fpdf_charwidths[widths_key]
+        self.base_font = base_font
+        self.widths = [widths[chr(i)] for i in range(256)]
+        self.space = self.widths[32]
+
+    def can_encode(self, text: str) -> bool:
+        try:
+            text.encode("cp1252")
+        except UnicodeEncodeError:
+            return False
+        return True
+
+    def encode(self, word: str) -> Tuple[bytes, int]:
+        # Characters outside cp1252 become '?'
+        data = word.encode("cp1252", errors="replace")
+        return _escape(data), sum(self.widths[b] for b in data)
+
+    def objects(self, document: "PdfDocument", font_id: int):
+        document.write_object(font_id, f"<< /Type /Font /Subtype /Type1 /BaseFont /{self.base_font} "
+                                       f"/Encoding /WinAnsiEncoding >>".encode("ascii"))
+
+class TrueTypeFont:
+    """An embedded TrueType font addressed by glyph id (Identity-H), so any character it has can be shown.
+
+    Only the glyphs actually used are embedded, and a ToUnicode map keeps
+    the text searchable and copyable. Needs fontTools.
+    """
+
+    delimiters = (b"<", b">")
+
+    def __init__(self, path: str):
+        from fontTools.ttLib import TTFont
+        self.path = path
+        font = TTFont(path, lazy=True)
+        if "glyf" not in font:
+            raise ValueError(f"{path} has no TrueType outlines; use a .ttf font")
+        self._cmap = font.getBestCmap()
+        self._glyph_ids = {name: i for i, name in enumerate(font.getGlyphOrder())}
+        self._scale = 1000.0 / font["head"].unitsPerEm
+        metrics = font["hmtx"].metrics
+        self._advance = {name: round(metrics[name][0] * self._scale) for name in set(self._cmap.values())}
+        self.name = font["name"].getDebugName(6) or os.path.splitext(os.path.basename(path))[0]
+        head, hhea = font["head"], font["hhea"]
+        os2 = font["OS/2"] if "OS/2" in font else None
+        self.bbox = [round(v * self._scale) for v in (head.xMin, head.yMin, head.xMax, head.yMax)]
+        self.ascent = round(hhea.ascent * self._scale)
+        self.descent = round(hhea.descent * self._scale)
+        self.cap_height = round(os2.sCapHeight * self._scale) if os2 is not None and hasattr(os2, "sCapHeight") \
+            else self.ascent
+        self._chars: Dict[str, Tuple[int, int]] = {}
+        self.used: Dict[int, Tuple[int, str]] = {0: (0, "")}   # glyph id -> (width, text)
+        space_id, self.space = self._char(" ")
+        self.space_code = f"{space_id:04x}".encode("ascii")
+
+    def _char(self, char: str) -> Tuple[int, int]:
+        found = self._chars.get(char)
+        if found is None:
+            name = self._cmap.get(ord(char))
+            # Characters the font lacks show as its .notdef glyph
+            found = (self._glyph_ids[name], self._advance[name]) if name is not None else (0, 0)
+            self._chars[char] = found
+            if found[0] not in self.used:
+                self.used[found[0]] = (found[1], char)
+        return found
+
+    def can_encode(self, text: str) -> bool:
+        return True
+
+    def encode(self, word: str) -> Tuple[bytes, int]:
+        glyphs = [self._char(char) for char in word]
+        return "".join(f"{gid:04x}" for gid, _ in glyphs).encode("ascii"), sum(w for _, w in glyphs)
+
+    def _subset(self) -> bytes:
+        from fontTools import subset
+        from fontTools.ttLib import TTFont
+        options = subset.Options()
+        # Glyph ids in the page content must stay valid
+        options.retain_gids = True
+        options.notdef_outline = True
+        options.layout_features = []
+        options.name_IDs = []
+        # FontForge's timestamp table, which fontTools can't subset and warns about on stderr
+        options.drop_tables += ["FFTM"]
+        font = TTFont(self.path)
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(gids=sorted(self.used))
+        subsetter.subset(font)
+        buffer = io.BytesIO()
+        font.save(buffer)
+        return buffer.getvalue()
+
+    def _to_unicode(self) -> bytes:
+        mappings = [(gid, text) for gid, (_, text) in sorted(self.used.items()) if text]
+        lines = [b"/CIDInit /ProcSet findresource begin 12 dict begin begincmap",
+                 b"/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def",
+                 b"/CMapName /Adobe-Identity-UCS def /CMapType 2 def",
+                 b"1 begincodespacerange <0000> <FFFF> endcodespacerange"]
+        for first in range(0, len(mappings), 100):
+            block = mappings[first:first + 100]
+            lines.append(f"{len(block)} beginbfchar".encode("ascii"))
+            lines.extend(f"<{gid:04x}> <{text.encode('utf-16-be').hex()}>".encode("ascii") for gid, text in block)
+            lines.append(b"endbfchar")
+        lines.append(b"endcmap CMapName currentdict /CMap defineresource pop end end")
+        return b"\n".join(lines)
+
+    def objects(self, document: "PdfDocument", font_id: int):
+        # Subset fonts are named with a tag derived from the glyphs they hold
+        tag = "".join(chr(65 + b % 26) for b in hashlib.sha1(repr(sorted(self.used)).encode()).digest()[:6])
+        base_font = f"{tag}+{''.join(c for c in self.name if c.isalnum() or c == '-')}"
+        cid_id, descriptor_id, file_id, unicode_id = (document.allocate() for _ in range(4))
+
+        widths = []
+        gids = sorted(self.used)
+        run_start = 0
+        for i in range(1, len(gids) + 1):
+            if i == len(gids) or gids[i] != gids[i - 1] + 1:
+                run = gids[run_start:i]
+                widths.append(f"{run[0]} [{' '.join(str(self.used[gid][0]) for gid in run)}]")
+                run_start = i
+
+        document.write_object(font_id, (f"<< /Type /Font /Subtype /Type0 /BaseFont /{base_font} /Encoding /Identity-H "
+                                        f"/DescendantFonts [{cid_id} 0 R] /ToUnicode {unicode_id} 0 R >>").encode("ascii"))
+        document.write_object(cid_id, (f"<< /Type /Font /Subtype /CIDFontType2 /BaseFont /{base_font} "
+                                       f"/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> "
+                                       f"/FontDescriptor {descriptor_id} 0 R /CIDToGIDMap /Identity "
+                                       f"/W [{' '.join(widths)}] >>").encode("ascii"))
+        document.write_object(descriptor_id, (f"<< /Type /FontDescriptor /FontName /{base_font} /Flags 32 "
+                                              f"/FontBBox [{' '.join(map(str, self.bbox))}] /ItalicAngle 0 "
+                                              f"/Ascent {self.ascent} /Descent {self.descent} "
+                                              f"/CapHeight {self.cap_height} /StemV 80 /FontFile2 {file_id} 0 R >>").encode("ascii"))
+        font_file = self._subset()
+        document.write_stream(file_id, font_file, extra=f" /Length1 {len(font_file)}")
+        document.write_stream(unicode_id, self._to_unicode())
+
+class PdfDocument:
+    """A PDF written page by page: each finished page goes straight to disk.
+
+    Only object offsets and page ids stay in memory, so a document of
+    thousands of pages costs no more memory than one page. Fonts and the
+    page tree are written by close(), once every page is known.
+    """
+
+    def __init__(self, path: str, width: float, height: float, title: Optional[str] = None, compress: bool = True):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.title = title
+        self.compress = compress
+        self._file = open(path, "wb")
+        self._file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._offsets: Dict[int, int] = {}
+        self._next_id = 4
+        # Fixed ids for objects written last: catalog, page tree, shared resources
+        self._catalog_id, self._pages_id, self._resources_id = 1, 2, 3
+        self._page_ids: List[int] = []
+        self._fonts: Dict[str, Tuple[object, int]] = {}
+
+    def allocate(self) -> int:
+        object_id = self._next_id
+        self._next_id += 1
+        return object_id
+
+    def write_object(self, object_id: int, body: bytes):
+        self._offsets[object_id] = self._file.tell()
+        self._file.write(f"{object_id} 0 obj\n".encode("ascii") + body + b"\nendobj\n")
+
+    def write_stream(self, object_id: int, data: bytes, compress: Optional[bool] = None, extra: str = ""):
+        if self.compress if compress is None else compress:
+            data = zlib.compress(data, 6)
+            header = f"<< /Length {len(data)} /Filter /FlateDecode{extra} >>"
+        else:
+            header = f"<< /Length {len(data)}{extra} >>"
+        self.write_object(object_id, header.encode("ascii") + b"\nstream\n" + data + b"\nendstream")
+
+    def font(self, key: str, font) -> str:
+        """Resource name (e.g. F1) for a font, registering it on first use."""
+        if key not in self._fonts:
+            self._fonts[key] = (font, self.allocate())
+        return f"F{list(self._fonts).index(key) + 1}"
+
+    def add_page(self, content: bytes):
+        content_id, page_id = self.allocate(), self.allocate()
+        self.write_stream(content_id, content)
+        self.write_object(page_id, (f"<< /Type /Page /Parent {self._pages_id} 0 R /Resources {self._resources_id} 0 R "
+                                    f"/MediaBox [0 0 {self.width:.2f} {self.height:.2f}] "
+                                    f"/Contents {content_id} 0 R >>").encode("ascii"))
+        self._page_ids.append(page_id)
+
+    @property
+    def page_count(self) -> int:
+        return len(self._page_ids)
+
+    def close(self):
+        fonts = " ".join(f"/F{i + 1} {font_id} 0 R" for i, (_, font_id) in enumerate(self._fonts.values()))
+        for font, font_id in self._fonts.values():
+            font.objects(self, font_id)
+        self.write_object(self._resources_id, f"<< /Font << {fonts} >> /ProcSet [/PDF /Text] >>".encode("ascii"))
+        kids = " ".join(f"{page_id} 0 R" for page_id in self._page_ids)
+        self.write_object(self._pages_id, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>".encode("ascii"))
+        self.write_object(self._catalog_id, f"<< /Type /Catalog /Pages {self._pages_id} 0 R >>".encode("ascii"))
+        info_id = self.allocate()
+        title = b"(" + _escape(b"\xfe\xff" + self.title.encode("utf-16-be")) + b")" if self.title else b"()"
+        self.write_object(info_id, b"<< /Producer (diarized-transcriber) /Title " + title + b" >>")
+
+        xref = self._file.tell()
+        lines = [f"xref\n0 {self._next_id}\n", "0000000000 65535 f \n"]
+        lines.extend(f"{self._offsets[i]:010d} 00000 n \n" for i in range(1, self._next_id))
+        lines.append(f"trailer\n<< /Size {self._next_id} /Root {self._catalog_id} 0 R /Info {info_id} 0 R >>\n"
+                     f"startxref\n{xref}\n%%EOF\n")
+        self._file.write("".join(lines).encode("ascii"))
+        self._file.close()
@@ -1,32 +1,215 @@
-from fpdf import FPDF
-
-def generate_pdf_transcript(segments, output_path):
-    # Check if any segments have speaker information (indicating diarization was used)
-    has_speakers = any("speaker" in seg and seg["speaker"] is not None for seg in segments)
-    
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.set_font("Arial", size=12)
-
-    if has_speakers:
-        # Use speaker-aware format
-        current_speaker = None
-        for seg in segments:
-            speaker = seg.get("speaker", "SPEAKER")
-            text = seg["text"].strip()
-            if speaker != current_speaker:
-                pdf.set_font("Arial", style="B", size=12)
-                pdf.cell(0, 10, f"{speaker}:", ln=True)
-                pdf.set_font("Arial", size=12)
-                current_speaker = speaker
-            pdf.multi_cell(0, 10, text)
-            pdf.ln(5)  # Add space between segments
-    else:
-        # Use simple format without speaker labels
-        for seg in segments:
-            text = seg["text"].strip()
-            pdf.multi_cell(0, 10, text)
-            pdf.ln(5)  # Add space between segments
-
-    pdf.output(output_path)
+import os
+from typing import Dict, List, Optional, Tuple
+
+from .pdf_document import CoreFont, PdfDocument, TrueTypeFont, bold_variant, find_unicode_font
+from .streaming import SegmentWriter, scan_has_speakers
+
+# A4 in points, as FPDF's default page
+PAGE_WIDTH, PAGE_HEIGHT = 595.28, 841.89
+MARGIN = 56.69                # 20 mm
+FONT_SIZE = 11
+LEADING = 15                  # baseline to baseline
+PARAGRAPH_GAP = 7
+
+# Within a speaker's turn (or a transcript without speakers), a pause this
+# long in seconds starts a new paragraph
+PARAGRAPH_PAUSE = 2.0
+# ...and so does this much text, which bounds what a paragraph holds in memory
+MAX_PARAGRAPH_CHARS = 8000
+# Distinct words whose widths are cached per font before the cache starts over
+MAX_CACHED_WORDS = 20000
+
+class PdfWriter(SegmentWriter):
+    """Lays out speaker paragraphs and writes each page to disk as soon as it is full.
+
+    Consecutive segments of a turn are merged into one paragraph under a
+    bold speaker label, instead of one block per segment, and each
+    paragraph is broken into lines with cached word widths. Latin text
+    uses the standard Helvetica fonts, which need no embedding; any
+    paragraph with characters outside cp1252 uses a Unicode TrueType font
+    (DIARIZED_TRANSCRIBER_PDF_FONT, or one found on the system), embedded
+    with only the glyphs used.
+    """
+
+    def __init__(self, output_path: str, has_speakers: Optional[bool] = None, autoflush: bool = True,
+                 font_path: Optional[str] = None):
+        self.font_path = font_path
+        super().__init__(output_path, has_speakers=has_speakers, autoflush=autoflush)
+
+    def _open(self):
+        return None
+
+    def begin(self):
+        title = os.path.splitext(os.path.basename(self.output_path))[0]
+        self.document = PdfDocument(self.output_path, PAGE_WIDTH, PAGE_HEIGHT, title=title)
+        self._core = (CoreFont("Helvetica", "helvetica"), CoreFont("Helvetica-Bold", "helveticaB"))
+        self._unicode = None
+        # Encoded bytes and width of every distinct word, per font
+        self._measured: Dict[int, Dict[str, Tuple[bytes, int]]] = {}
+        self._content: List[bytes] = []
+        self._y = PAGE_HEIGHT - MARGIN - FONT_SIZE
+        self._label: Optional[str] = None
+        self._paragraph: List[str] = []
+        self._paragraph_chars = 0
+        self._last_end: Optional[float] = None
+
+    def _unicode_fonts(self):
+        """(regular, bold, fake bold) TrueType fonts, or None when there is no usable font."""
+        if self._unicode is None:
+            self._unicode = False
+            path = self.font_path or find_unicode_font()
+            try:
+                regular = TrueTypeFont(path) if path else None
+                bold_path = bold_variant(path) if path else None
+                bold = TrueTypeFont(bold_path) if bold_path else regular
+            except (ImportError, OSError, ValueError) as e:
+                print(f"⚠️  PDF: can't use Unicode font {path}: {e}")
+                regular = None
+            if regular is None:
+                print("⚠️  PDF: text outside Latin-1 is shown as '?'; set DIARIZED_TRANSCRIBER_PDF_FONT to a .ttf font")
+            else:
+                self._unicode = (regular, bold, bold is regular)
+        return self._unicode or None
+
+    def _fonts(self, text: str):
+        regular, bold = self._core
+        if not regular.can_encode(text):
+            fonts = self._unicode_fonts()
+            if fonts:
+                return fonts
+        return regular, bold, False
+
+    def _lines(self, font, text: str) -> List[bytes]:
+        """Greedy line breaking; each line is returned as the bytes of one PDF string."""
+        limit = (PAGE_WIDTH - 2 * MARGIN) * 1000 / FONT_SIZE
+        open_, close = font.delimiters
+        measured = self._measured.setdefault(id(font), {})
+        if len(measured) > MAX_CACHED_WORDS:
+            measured.clear()
+        lines, line, width = [], [], 0
+        for word in text.split():
+            encoded = measured.get(word)
+            if encoded is None:
+                encoded = measured[word] = font.encode(word)
+            data, word_width = encoded
+            if word_width > limit:
+                # A word longer than a line is split between characters
+                pieces = [font.encode(char) for char in word]
+                for data, char_width in pieces:
+                    if line and width + char_width > limit:
+                        lines.append(open_ + b"".join(line) + close)
+                        line, width = [], 0
+                    line.append(data)
+                    width += char_width
+                continue
+            if line and width + font.space + word_width > limit:
+                lines.append(open_ + b"".join(line) + close)
+                line, width = [], 0
+            if line:
+                line.append(font.space_code)
+                width += font.space
+            line.append(data)
+            width += word_width
+        if line:
+            lines.append(open_ + b"".join(line) + close)
+        return lines
+
+    def _new_page(self):
+        if self._content:
+            self.document.add_page(b"\n".join(self._content))
+        self._content = []
+        self._y = PAGE_HEIGHT - MARGIN - FONT_SIZE
+
+    def _resource(self, font) -> bytes:
+        return f"/{self.document.font(str(id(font)), font)} {FONT_SIZE} Tf".encode("ascii")
+
+    def _flush_paragraph(self):
+        if not self._paragraph:
+            return
+        text = " ".join(self._paragraph)
+        label = self._label
+        self._paragraph, self._paragraph_chars, self._label = [], 0, None
+
+        regular, bold, fake_bold = self._fonts(text + (label or ""))
+        lines = self._lines(regular, text)
+        # Keep a label on the same page as the first line it introduces
+        if self._y - (LEADING if label else 0) < MARGIN:
+            self._new_page()
+        if label:
+            label_line = self._lines(bold, f"{label}:")[0]
+            style = b" 0.3 w 2 Tr" if fake_bold else b""
+            self._content.append(b"BT " + self._resource(bold) + style +
+                                 f" {MARGIN:.2f} {self._y:.2f} Td ".encode("ascii") + label_line +
+                                 (b" Tj 0 Tr ET" if fake_bold else b" Tj ET"))
+            self._y -= LEADING
+
+        first = 0
+        while first < len(lines):
+            fit = max(1, int((self._y - MARGIN) // LEADING) + 1)
+            block = lines[first:first + fit]
+            # Td places the first line; ' moves down by TL and shows each following one
+            self._content.append(b"BT " + self._resource(regular) + f" {LEADING} TL {MARGIN:.2f} {self._y:.2f} Td ".encode("ascii")
+                                 + block[0] + b" Tj " + b"".join(line + b" ' " for line in block[1:]) + b"ET")
+            self._y -= LEADING * len(block)
+            first += len(block)
+            if first < len(lines):
+                self._new_page()
+        self._y -= PARAGRAPH_GAP
+
+    def start_turn(self, speaker, start):
+        self._flush_paragraph()
+        self._label = speaker if self.has_speakers else None
+        self._last_end = None
+
+    def add_segment(self, start, end, text, speaker):
+        if not text:
+            return
+        if self._paragraph and (start - self._last_end >= PARAGRAPH_PAUSE or self._paragraph_chars >= MAX_PARAGRAPH_CHARS):
+            self._flush_paragraph()
+        self._paragraph.append(text)
+        self._paragraph_chars += len(text)
+        self._last_end = end
+
+    def end_turn(self):
+        self._flush_paragraph()
+
+    def end(self):
+        self._flush_paragraph()
+        # A PDF needs at least one page, even for an empty transcript
+        if self._content or not self.document.page_count:
+            self.document.add_page(b"\n".join(self._content))
+        self.document.close()
+
+class FpdfWriter(SegmentWriter):
+    """The previous FPDF renderer: one multi_cell per segment, core Arial font (Latin-1 only).
+
+    Kept so benchmarks/bench_pdf.py can compare the two.
+    """
+
+    def _open(self):
+        return None
+
+    def begin(self):
+        from fpdf import FPDF
+        self.pdf = FPDF()
+        self.pdf.add_page()
+        self.pdf.set_auto_page_break(auto=True, margin=15)
+        self.pdf.set_font("Arial", size=12)
+
+    def start_turn(self, speaker, start):
+        if self.has_speakers:
+            # Use speaker-aware format
+            self.pdf.set_font("Arial", style="B", size=12)
+            self.pdf.cell(0, 10, f"{speaker}:", ln=True)
+            self.pdf.set_font("Arial", size=12)
+
+    def add_segment(self, start, end, text, speaker):
+        self.pdf.multi_cell(0, 10, text)
+        self.pdf.ln(5)  # Add space between segments
+
+    def end(self):
+        self.pdf.output(self.output_path)
+
+def generate_pdf_transcript(segments, output_path, font_path=None):
+    with PdfWriter(output_path, has_speakers=scan_has_speakers(segments), autoflush=False, font_path=font_path) as writer:
+        writer.write_all(segments)
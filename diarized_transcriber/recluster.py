@@ -0,0 +1,138 @@
+import copy
+import inspect
+import json
+import os
+import time
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .files import atomic_write
+from .result_cache import DEFAULT_ARTIFACTS_SIZE_MB, ResultCache, cache_key
+
+# Bump when the stored artifact layout changes so old entries stop matching
+ARTIFACTS_VERSION = 1
+
+class DiarizationArtifacts(NamedTuple):
+    """What pyannote computes before clustering; none of it depends on the number of speakers."""
+    segmentation: np.ndarray             # (chunks, frames, local speakers) frame activations
+    window: Tuple[float, float, float]   # start, duration and step of the sliding chunks
+    embeddings: np.ndarray               # (chunks, local speakers, dimension)
+    duration: float                      # seconds of audio
+
+def artifacts_key(digest: str) -> str:
+    return cache_key(digest, {"version": ARTIFACTS_VERSION, "stage": "diarization"})
+
+class DiarizationArtifactStore(ResultCache):
+    """Diarization artifacts per audio file, one .npz each, evicted like the result cache.
+
+    The store has its own size limit, DEFAULT_ARTIFACTS_SIZE_MB unless
+    given (--embeddings-cache-size-mb), on top of the result cache's.
+    """
+
+    SUFFIX = ".npz"
+
+    def __init__(self, cache_dir: Optional[str] = None, max_size_mb: float = DEFAULT_ARTIFACTS_SIZE_MB):
+        super().__init__(cache_dir, max_size_mb)
+
+    def get(self, key: str) -> Optional[DiarizationArtifacts]:
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                artifacts = DiarizationArtifacts(data["segmentation"], tuple(float(v) for v in data["window"]),
+                                                 data["embeddings"], float(data["duration"]))
+        except (OSError, ValueError, KeyError):
+            return None
+        os.utime(path)
+        return artifacts
+
+    def put(self, key: str, artifacts: DiarizationArtifacts, audio_path: Optional[str] = None,
+            settings: Optional[Dict[str, Any]] = None):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = {"key": key, "audio_path": audio_path, "settings": settings, "created_at": time.time()}
+        # Written to a temp file first so a crash never leaves a truncated entry
+        with atomic_write(self._path(key), "wb") as f:
+            # Segmentation activations are mostly 0 and 1, so they compress well
+            np.savez_compressed(f, segmentation=artifacts.segmentation, window=np.array(artifacts.window),
+                                embeddings=artifacts.embeddings, duration=np.array(artifacts.duration),
+                                entry=np.array(json.dumps(entry)))
+        self.evict(keep=key)
+
+    def describe(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with np.load(self._path(key)) as data:
+                return json.loads(str(data["entry"]))
+        except (OSError, ValueError, KeyError):
+            return None
+
+def _apply_kwargs(model, num_speakers=None, min_speakers=None, max_speakers=None) -> Dict[str, Any]:
+    kwargs = {"num_speakers": num_speakers, "min_speakers": min_speakers, "max_speakers": max_speakers}
+    # pyannote 3.x only returns speaker centroids when asked; 4.x always does and warns about the flag
+    if "return_embeddings" in inspect.signature(model.apply).parameters:
+        kwargs["return_embeddings"] = True
+    return kwargs
+
+def _to_frame(output):
+    """whisperx's (DataFrame, {speaker: embedding}) diarization output from a pyannote result."""
+    import pandas as pd
+
+    if isinstance(output, tuple):
+        diarization, centroids = output
+    elif hasattr(output, "speaker_diarization"):
+        diarization, centroids = output.speaker_diarization, output.speaker_embeddings
+    else:
+        diarization, centroids = output, None
+    frame = pd.DataFrame(diarization.itertracks(yield_label=True), columns=["segment", "label", "speaker"])
+    frame["start"] = frame["segment"].apply(lambda segment: segment.start)
+    frame["end"] = frame["segment"].apply(lambda segment: segment.end)
+    embeddings = None
+    if centroids is not None:
+        embeddings = {speaker: centroids[i].tolist() for i, speaker in enumerate(diarization.labels())}
+    return frame, embeddings
+
+def diarize_keeping_artifacts(diarize_pipeline, audio, num_speakers=None, min_speakers=None, max_speakers=None):
+    """Run whisperx's diarization pipeline and also return its pre-clustering artifacts.
+
+    Returns (turns DataFrame, {speaker: embedding}, DiarizationArtifacts);
+    the artifacts are None when the recording has no speech, as pyannote
+    then stops before computing embeddings.
+    """
+    import torch
+    from .audio import SAMPLE_RATE
+
+    captured = {}
+
+    def hook(step_name, step_artifact, file=None, total=None, completed=None):
+        # Progress updates carry total/completed; the finished step's output doesn't
+        if total is None and step_name in ("segmentation", "embeddings"):
+            captured[step_name] = step_artifact
+
+    model = diarize_pipeline.model
+    output = model({"waveform": torch.from_numpy(audio[None, :]), "sample_rate": SAMPLE_RATE}, hook=hook,
+                   **_apply_kwargs(model, num_speakers, min_speakers, max_speakers))
+    artifacts = None
+    if "segmentation" in captured and "embeddings" in captured:
+        segmentation = captured["segmentation"]
+        window = segmentation.sliding_window
+        artifacts = DiarizationArtifacts(np.asarray(segmentation.data, dtype=np.float32),
+                                         (window.start, window.duration, window.step),
+                                         np.asarray(captured["embeddings"], dtype=np.float32), len(audio) / SAMPLE_RATE)
+    return (*_to_frame(output), artifacts)
+
+def recluster(diarize_pipeline, artifacts: DiarizationArtifacts, num_speakers=None, min_speakers=None, max_speakers=None):
+    """Diarize again from stored artifacts with new speaker bounds; (turns DataFrame, {speaker: embedding}).
+
+    pyannote's own apply() runs on a shallow copy of the pipeline whose
+    segmentation and embedding steps return the stored outputs, so only
+    clustering and the reconstruction of speaker turns are computed, and
+    the loaded pipeline (which may be shared) is left untouched.
+    """
+    from pyannote.core import SlidingWindow, SlidingWindowFeature
+
+    start, duration, step = artifacts.window
+    segmentations = SlidingWindowFeature(artifacts.segmentation, SlidingWindow(start=start, duration=duration, step=step))
+    model = copy.copy(diarize_pipeline.model)
+    model.get_segmentations = lambda file, hook=None: segmentations
+    model.get_embeddings = lambda file, binary_segmentations, exclude_overlap=False, hook=None: artifacts.embeddings
+    output = model.apply({"uri": "recluster"}, **_apply_kwargs(model, num_speakers, min_speakers, max_speakers))
+    return _to_frame(output)
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from .files import atomic_write, to_builtin
+
+# Bump when the cached result layout changes so old entries stop matching
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_SIZE_MB = 2048
+# Separate limit for the diarization artifacts kept for re-clustering (see recluster.py)
+DEFAULT_ARTIFACTS_SIZE_MB = 1024
+
+def default_cache_dir() -> str:
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "diarized-transcriber", "results")
+
+def audio_digest(audio_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of the audio file's bytes, read in chunks."""
+    digest = hashlib.sha256()
+    with open(audio_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def result_settings(model_size, language=None, skip_diarization=False, num_speakers=None, multilingual=False,
+                    languages=None) -> Dict[str, Any]:
+    """The settings that change the transcription result (exporter options don't)."""
+    settings = {
+        "version": CACHE_VERSION,
+        "model": model_size,
+        "language": language or "auto",
+        "diarization": not skip_diarization,
+        "num_speakers": None if skip_diarization else num_speakers,
+    }
+    # Only present when set, so keys of single-language results are unchanged
+    if multilingual:
+        settings["segment_languages"] = sorted(languages) if languages else "auto"
+    return settings
+
+def cache_key(digest: str, settings: Dict[str, Any]) -> str:
+    payload = json.dumps({"audio": digest, "settings": settings}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResultCache:
+    """On-disk cache of final aligned and diarized results.
+
+    Each entry is a JSON file named after its key. Reads refresh the file's
+    modification time, and writes evict the least recently used entries
+    once the directory grows past max_size_mb.
+    """
+
+    SUFFIX = ".json"
+
+    def __init__(self, cache_dir: Optional[str] = None, max_size_mb: float = DEFAULT_CACHE_SIZE_MB):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}{self.SUFFIX}")
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        os.utime(path)
+        return entry["result"]
+
+    def put(self, key: str, result: Dict[str, Any], audio_path: Optional[str] = None,
+            settings: Optional[Dict[str, Any]] = None):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = {
+            "key": key,
+            "audio_path": audio_path,
+            "settings": settings,
+            "created_at": time.time(),
+            "result": result,
+        }
+        # Written to a temp file first so a crash never leaves a truncated entry
+        with atomic_write(self._path(key)) as f:
+            json.dump(entry, f, default=to_builtin)
+        self.evict(keep=key)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Cached entries, most recently used first (without their results)."""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(self.SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            stat = os.stat(path)
+            entries.append({
+                "key": name[:-len(self.SUFFIX)],
+                "path": path,
+                "size": stat.st_size,
+                "last_used": stat.st_mtime,
+            })
+        entries.sort(key=lambda e: e["last_used"], reverse=True)
+        return entries
+
+    def describe(self, key: str) -> Optional[Dict[str, Any]]:
+        """Entry metadata (source file, settings) without the result body."""
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        entry.pop("result", None)
+        return entry
+
+    def total_size(self) -> int:
+        return sum(e["size"] for e in self.entries())
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """Remove least recently used entries until the cache fits its size limit."""
+        entries = self.entries()
+        total = sum(e["size"] for e in entries)
+        removed = 0
+        for entry in reversed(entries):
+            if total <= self.max_size_bytes:
+                break
+            if entry["key"] == keep:
+                continue
+            os.remove(entry["path"])
+            total -= entry["size"]
+            removed += 1
+        return removed
+
+    def purge(self, older_than_days: Optional[float] = None) -> int:
+        """Delete every entry, or only those unused for older_than_days."""
+        cutoff = time.time() - older_than_days * 86400 if older_than_days is not None else None
+        removed = 0
+        for entry in self.entries():
+            if cutoff is None or entry["last_used"] < cutoff:
+                os.remove(entry["path"])
+                removed += 1
+        return removed
@@ -9,12 +9,22 @@ from rich.spinner import Spinner
 from rich.layout import Layout
 from rich.columns import Columns
 
+from .metrics import StageRecorder
+
 console = Console()
 
 class PersistentProgress:
-    """Persistent spinner at bottom of screen with current step and time counter."""
+    """Persistent spinner at bottom of screen with current step and time counter.
+
+    Every task is also recorded as a stage with its wall time, CPU time and
+    peak memory; metrics() returns them once the block has finished.
+    Set audio_seconds to get real-time factors. With quiet nothing is
+    shown and only the metrics are kept, so several can run at once (rich
+    allows one live display per console).
+    """
     
-    def __init__(self):
+    def __init__(self, quiet: bool = False):
+        self.quiet = quiet
         self.spinner = Spinner("dots", text="")
         self.total_start_time: float = 0.0
         self.running = False
@@ -22,6 +32,9 @@ class PersistentProgress:
         self.live = None
         self.spinner_thread = None
         self.spinner_started = False
+        self.stopped = threading.Event()
+        self.recorder = StageRecorder()
+        self.audio_seconds: Optional[float] = None
         
     def __enter__(self):
         self.total_start_time = time.time()
@@ -30,17 +43,24 @@ class PersistentProgress:
         
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.running = False
+        self.stopped.set()
+        self.recorder.stop_all()
         if self.live:
             self.live.stop()
         if self.spinner_thread and self.spinner_thread.is_alive():
             self.spinner_thread.join(timeout=1)
         
-    def start_task(self, description: str):
-        """Start a new task with persistent spinner."""
+    def start_task(self, description: str, stage: Optional[str] = None):
+        """Start a new task with persistent spinner.
+
+        stage names the task in the metrics (defaults to the description);
+        starting a task ends the one this thread was running.
+        """
+        self.recorder.start(stage or description, description)
         self.current_text = description
         
         # Only start the spinner once, then just update the text
-        if not self.spinner_started:
+        if not self.spinner_started and not self.quiet:
             def update_spinner():
                 with Live(self.spinner, console=console, refresh_per_second=1, transient=True) as live:
                     self.live = live
@@ -52,7 +72,8 @@ class PersistentProgress:
                         
                         # Update spinner text with description and time
                         self.spinner.text = f"{self.current_text} {time_str}"
-                        time.sleep(1)
+                        # Woken early on exit so leaving the block doesn't wait out the tick
+                        self.stopped.wait(1)
             
             # Run the spinner in a daemon thread
             self.spinner_thread = threading.Thread(target=update_spinner, daemon=True)
@@ -64,9 +85,14 @@ class PersistentProgress:
                 
     def complete_task(self, final_message: Optional[str] = None):
         """Complete the current task."""
-        if final_message:
+        self.recorder.stop()
+        if final_message and not self.quiet:
             console.print(f"✅ {final_message}")
 
+    def metrics(self) -> Dict[str, Any]:
+        """Per-stage and overall wall time, CPU time, peak RSS and real-time factor."""
+        return self.recorder.summary(self.audio_seconds)
+
 def print_success_panel(message: str):
     """Print a success message in a nice panel."""
     panel = Panel(
@@ -0,0 +1,545 @@
+import glob
+import json
+import os
+import re
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .block_file import read_blocks, write_blocks
+from .files import atomic_write, locked
+from .transcript import NO_SPEAKER, Transcript
+from .transcript_file import load_transcript
+
+# Parts are block files (see block_file.py): the header holds the documents
+# and speakers, the arrays the vocabulary, postings and word columns, and
+# the text block the words
+MAGIC = b"DTRSERCH"
+VERSION = 1
+PART_SUFFIX = ".dsi"
+MANIFEST = "manifest.json"
+# Bump when the manifest layout changes; an index with another version is rebuilt
+MANIFEST_VERSION = 1
+LOCK = "lock"
+SEARCH_INDEX_ENV = "DIARIZED_TRANSCRIBER_SEARCH_INDEX"
+
+# Saved results the index reads: the dtr and json formats
+SOURCE_SUFFIXES = (".dtr", ".json")
+
+# Terms are cut to this many UTF-8 bytes, when indexing and querying alike,
+# so a part's vocabulary is a fixed-width array binary-searched in place
+MAX_TERM_BYTES = 32
+
+# New transcripts go into a part of their own once this many words are
+# pending, which bounds the memory an update needs
+PART_WORDS = 1_000_000
+# Parts under MERGE_PART_WORDS live words are merged once there are more than
+# MAX_SMALL_PARTS of them, so the part count stays small as the archive grows
+# while no merge ever rewrites more than MERGE_PART_WORDS words
+MAX_SMALL_PARTS = 8
+MERGE_PART_WORDS = 4_000_000
+
+# Words of context shown either side of a hit
+SNIPPET_WORDS = 8
+
+# On-disk dtypes of the word arrays; "terms" is stored as fixed-width bytes
+ARRAYS = {
+    "term_postings": "<i8",   # offsets into postings, len(terms) + 1
+    "postings": "<i4",        # word numbers of each term, ascending
+    "word_term": "<i4",
+    "word_time": "<f4",       # word start, or its segment's when it has none
+    "word_speaker": "<i4",    # into the part's speakers, or -1
+    "word_segment": "<i4",    # segment number across the part
+    "word_text": "<i8",       # offsets into the text, len(words) + 1
+    "doc_words": "<i8",       # each document's first word, len(documents) + 1
+}
+
+_EDGE_PUNCTUATION = re.compile(r"^\W+|\W+$")
+_QUERY = re.compile(r'"([^"]*)"?|(\S+)')
+
+class SearchHit(NamedTuple):
+    path: str
+    speaker: Optional[str]
+    start: float
+    text: str
+
+def default_index_dir() -> str:
+    if os.getenv(SEARCH_INDEX_ENV):
+        return os.environ[SEARCH_INDEX_ENV]
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "diarized-transcriber", "search")
+
+def normalize_term(word: str) -> bytes:
+    """Lowercased, without leading or trailing punctuation ("Hello," -> b"hello", "U.S." -> b"u.s")."""
+    return _EDGE_PUNCTUATION.sub("", word.casefold()).encode("utf-8")[:MAX_TERM_BYTES]
+
+def parse_query(query: str) -> List[List[bytes]]:
+    """Clauses of a query: each "quoted phrase" is one clause of several terms, every other word one of its own."""
+    clauses = []
+    for phrase, word in _QUERY.findall(query):
+        terms = [normalize_term(w) for w in (phrase.split() if phrase else [word])]
+        terms = [t for t in terms if t]
+        if terms:
+            clauses.append(terms)
+    return clauses
+
+def load_source(path: str) -> Optional[Transcript]:
+    """A Transcript from a .dtr file or a JSON result, or None for JSON that isn't a result (e.g. a batch summary).
+
+    Raises ValueError for unreadable files.
+    """
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            try:
+                result = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path} is not valid JSON: {e}") from None
+        if not isinstance(result, dict) or not isinstance(result.get("segments"), list):
+            return None
+        return Transcript.from_result(result)
+    return load_transcript(path)
+
+def find_sources(paths: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """Saved results under the given files, directories and glob patterns, and the paths that matched nothing."""
+    found, missing = set(), []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                found.update(os.path.join(root, n) for n in names if n.lower().endswith(SOURCE_SUFFIXES))
+        elif os.path.isfile(path):
+            found.add(path)
+        else:
+            matches = [p for p in glob.glob(path, recursive=True) if os.path.isfile(p) and p.lower().endswith(SOURCE_SUFFIXES)]
+            if not matches:
+                missing.append(path)
+            found.update(matches)
+    return sorted(os.path.abspath(p) for p in found), missing
+
+class _Words(NamedTuple):
+    """One document's words, as the columns a part stores."""
+    terms: np.ndarray         # fixed-width bytes
+    times: np.ndarray
+    speakers: List[str]       # labels indexed by speaker_ids
+    speaker_ids: np.ndarray   # -1 for none
+    segments: np.ndarray      # segment number within the document
+    texts: List[str]
+
+def _transcript_words(transcript: Transcript) -> _Words:
+    """Every indexable word of a transcript, with its start, speaker and segment.
+
+    Segments without aligned words are split on whitespace and their words
+    take the segment's start; words without a start or speaker take their
+    segment's.
+    """
+    text = transcript.text
+    seg_words, seg_text = transcript.seg_words.tolist(), transcript.seg_text.tolist()
+    seg_start, seg_speaker = transcript.seg_start.tolist(), transcript.seg_speaker.tolist()
+    word_text, word_start, word_speaker = transcript.word_text.tolist(), transcript.word_start.tolist(), transcript.word_speaker.tolist()
+
+    terms, times, speakers, segments, texts = [], [], [], [], []
+    # Speech repeats a small vocabulary, so each distinct word is normalized once
+    normalized: Dict[str, bytes] = {}
+    for i in range(len(seg_start)):
+        start = seg_start[i] if seg_start[i] == seg_start[i] else (times[-1] if times else 0.0)
+        if seg_words[i] < seg_words[i + 1]:
+            words = [(text[word_text[j]:word_text[j + 1]].strip(), word_start[j], word_speaker[j])
+                     for j in range(seg_words[i], seg_words[i + 1])]
+        else:
+            words = [(word, start, seg_speaker[i]) for word in text[seg_text[i]:seg_text[i + 1]].split()]
+        for word, time, speaker in words:
+            term = normalized.get(word)
+            if term is None:
+                term = normalized[word] = normalize_term(word)
+            if not term:
+                continue
+            terms.append(term)
+            # NaN is the only value not equal to itself
+            times.append(time if time == time else start)
+            speakers.append(speaker if speaker != NO_SPEAKER else seg_speaker[i])
+            segments.append(i)
+            texts.append(word)
+    return _Words(np.array(terms, dtype=f"S{MAX_TERM_BYTES}"), np.array(times, dtype=np.float32), list(transcript.speakers),
+                  np.array(speakers, dtype=np.int32), np.array(segments, dtype=np.int32), texts)
+
+class _PartBuilder:
+    """Collects documents' words and writes them as one part with its inverted index."""
+
+    def __init__(self):
+        self.documents: List[Dict[str, Any]] = []
+        self.speakers: List[str] = []
+        self._speaker_ids: Dict[str, int] = {}
+        self._columns: List[_Words] = []
+        self.words = 0
+        self._segments = 0
+
+    def add(self, document: Dict[str, Any], words: _Words):
+        # Speakers and segments are renumbered across the part
+        table = np.array([self._speaker_ids.setdefault(s, len(self._speaker_ids)) for s in words.speakers] + [-1],
+                         dtype=np.int32)
+        self.speakers = list(self._speaker_ids)
+        segments = words.segments + self._segments
+        self._segments += int(words.segments.max()) + 1 if len(words.segments) else 0
+        self._columns.append(words._replace(speaker_ids=table[words.speaker_ids], segments=segments))
+        self.documents.append(document)
+        self.words += len(words.terms)
+
+    def write(self, path: str):
+        columns = self._columns
+        terms = np.concatenate([c.terms for c in columns]) if columns else np.empty(0, dtype="S1")
+        vocabulary, word_term = np.unique(terms, return_inverse=True)
+        # Stable, so each term's postings come out in word order
+        postings = np.argsort(word_term, kind="stable")
+        term_postings = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(word_term, minlength=len(vocabulary)), out=term_postings[1:])
+
+        texts = [text for c in columns for text in c.texts]
+        lengths = np.fromiter((len(t.encode("utf-8")) + 1 for t in texts), dtype=np.int64, count=len(texts))
+        word_text = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=word_text[1:])
+        # Words are joined by spaces, so a run of them is one slice
+        text = " ".join(texts).encode("utf-8")
+        doc_words = np.zeros(len(columns) + 1, dtype=np.int64)
+        np.cumsum([len(c.terms) for c in columns], out=doc_words[1:])
+
+        empty = lambda dtype: np.empty(0, dtype=dtype)
+        arrays = {
+            "term_postings": term_postings,
+            "postings": postings,
+            "word_term": word_term,
+            "word_time": np.concatenate([c.times for c in columns]) if columns else empty(np.float32),
+            "word_speaker": np.concatenate([c.speaker_ids for c in columns]) if columns else empty(np.int32),
+            "word_segment": np.concatenate([c.segments for c in columns]) if columns else empty(np.int32),
+            "word_text": word_text,
+            "doc_words": doc_words,
+        }
+        width = max(int(np.char.str_len(vocabulary).max()), 1) if len(vocabulary) else 1
+        blocks = {"terms": np.ascontiguousarray(vocabulary, dtype=f"S{width}")}
+        blocks.update((name, np.ascontiguousarray(arrays[name], dtype=dtype)) for name, dtype in ARRAYS.items())
+        # Written to a temp file and renamed, so a search never sees half a part
+        write_blocks(path, MAGIC, VERSION, {"documents": self.documents, "speakers": self.speakers}, blocks, text)
+
+class SearchPart:
+    """One memory-mapped part: a term -> word postings index plus each word's time, speaker and text."""
+
+    def __init__(self, path: str):
+        header, arrays, self._text = read_blocks(path, MAGIC, VERSION, "search index part")
+        for name, array in arrays.items():
+            setattr(self, name, array)
+        self.documents: List[Dict[str, Any]] = header["documents"]
+        self.speakers: List[str] = header["speakers"]
+
+    @property
+    def word_count(self) -> int:
+        return len(self.word_term)
+
+    def lookup(self, term: bytes) -> np.ndarray:
+        """Word numbers of every occurrence of term."""
+        i = int(np.searchsorted(self.terms, term))
+        if i == len(self.terms) or self.terms[i] != term:
+            return np.empty(0, dtype=np.int32)
+        return self.postings[self.term_postings[i]:self.term_postings[i + 1]]
+
+    def document_of(self, words: np.ndarray) -> np.ndarray:
+        return np.searchsorted(self.doc_words, words, side="right") - 1
+
+    def phrase(self, terms: List[bytes]) -> np.ndarray:
+        """Word numbers where the terms occur consecutively within one document."""
+        words = self.lookup(terms[0])
+        for k, term in enumerate(terms[1:], 1):
+            if not len(words):
+                break
+            words = words[np.isin(words + k, self.lookup(term), assume_unique=True)]
+        if len(terms) > 1 and len(words):
+            words = words[self.document_of(words) == self.document_of(words + len(terms) - 1)]
+        return words
+
+    def matches(self, clauses: List[List[bytes]], speaker: Optional[str] = None, deleted: Iterable[int] = ()) -> np.ndarray:
+        """First word of the first clause in every segment where all clauses occur, in word order.
+
+        With speaker, only occurrences spoken by that speaker (compared
+        case-insensitively) count.
+        """
+        speaker_ids = None
+        if speaker is not None:
+            wanted = speaker.casefold()
+            speaker_ids = [i for i, label in enumerate(self.speakers) if label.casefold() == wanted]
+            if not speaker_ids:
+                return np.empty(0, dtype=np.int32)
+
+        hits = None
+        for clause in clauses:
+            words = self.phrase(clause)
+            if speaker_ids is not None:
+                words = words[np.isin(self.word_speaker[words], speaker_ids)]
+            if hits is None:
+                hits = words
+            else:
+                hits = hits[np.isin(self.word_segment[hits], self.word_segment[words])]
+            if not len(hits):
+                return hits
+        deleted = list(deleted)
+        if deleted:
+            hits = hits[~np.isin(self.document_of(hits), deleted)]
+        # Segment numbers only grow with word order, so this keeps each segment's first hit
+        _, first = np.unique(self.word_segment[hits], return_index=True)
+        return hits[np.sort(first)]
+
+    def text(self, first: int, last: int) -> str:
+        """Words first to last - 1, separated by spaces."""
+        return bytes(self._text[self.word_text[first]:max(self.word_text[last] - 1, self.word_text[first])]).decode("utf-8")
+
+    def words(self, first: int, last: int) -> List[str]:
+        """Words first to last - 1 as a list."""
+        offsets = (self.word_text[first:last + 1] - self.word_text[first]).tolist()
+        data = bytes(self._text[self.word_text[first]:self.word_text[last]])
+        return [data[a:b - 1].decode("utf-8") for a, b in zip(offsets[:-1], offsets[1:])]
+
+    def hit(self, word: int, length: int) -> SearchHit:
+        """The hit at word, with up to SNIPPET_WORDS words of its segment either side of the length words matched."""
+        doc = int(self.document_of(np.array([word]))[0])
+        segment = self.word_segment[word]
+        first = int(np.searchsorted(self.word_segment, segment, side="left"))
+        # A phrase may run on into the next segment
+        last = max(int(np.searchsorted(self.word_segment, segment, side="right")), word + length)
+        speaker = int(self.word_speaker[word])
+        snippet = self.text(max(first, word - SNIPPET_WORDS), min(last, word + length + SNIPPET_WORDS))
+        return SearchHit(self.documents[doc]["path"], self.speakers[speaker] if speaker >= 0 else None,
+                         round(float(self.word_time[word]), 3), snippet)
+
+    def close(self):
+        self._text.release()
+
+class SearchIndex:
+    """An on-disk full-text index over saved transcripts, updated incrementally.
+
+    The index is a directory of immutable parts plus a manifest naming the
+    live parts, every indexed file with the size and modification time it
+    had, and the documents in each part that were removed or replaced since
+    it was written. update() only reads new and changed files, writes them
+    as new parts and merges small parts; search() maps each part and looks
+    terms up by binary search, so it reads little more than the postings of
+    the query's terms. update() holds a lock file in the directory, so
+    concurrent updates take turns rather than overwrite each other's
+    manifest.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or default_index_dir()
+        self._manifest_path = os.path.join(self.directory, MANIFEST)
+        self.manifest = self._read_manifest()
+        self._parts: Dict[str, SearchPart] = {}
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        """The saved manifest, or an empty one if it's missing, unreadable or of another version.
+
+        An empty manifest keeps the remembered sources where it can, so the
+        next update rebuilds the index from them.
+        """
+        manifest: Dict[str, Any] = {"version": MANIFEST_VERSION, "parts": [], "next_part": 0, "files": {},
+                                    "deleted": {}, "sources": [], "ignored": {}}
+        try:
+            with open(self._manifest_path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return manifest
+        if not isinstance(saved, dict):
+            return manifest
+        if saved.get("version") != MANIFEST_VERSION or set(saved) != set(manifest):
+            if isinstance(saved.get("sources"), list):
+                manifest["sources"] = [path for path in saved["sources"] if isinstance(path, str)]
+            return manifest
+        return saved
+
+    def part(self, name: str) -> SearchPart:
+        if name not in self._parts:
+            self._parts[name] = SearchPart(os.path.join(self.directory, name))
+        return self._parts[name]
+
+    def __len__(self) -> int:
+        return len(self.manifest["files"])
+
+    def word_count(self) -> int:
+        return sum(self._live_words(name) for name in self.manifest["parts"])
+
+    def _live_words(self, name: str) -> int:
+        part = self.part(name)
+        deleted = self.manifest["deleted"].get(name, [])
+        return part.word_count - sum(int(part.doc_words[d + 1] - part.doc_words[d]) for d in deleted)
+
+    def _save_manifest(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with atomic_write(self._manifest_path) as f:
+            json.dump(self.manifest, f)
+
+    def _new_part_name(self) -> str:
+        name = f"part-{self.manifest['next_part']:05d}{PART_SUFFIX}"
+        self.manifest["next_part"] += 1
+        return name
+
+    def _write_part(self, builder: _PartBuilder):
+        """Write a built part and point the manifest's files at it (the manifest is saved by the caller)."""
+        name = self._new_part_name()
+        os.makedirs(self.directory, exist_ok=True)
+        builder.write(os.path.join(self.directory, name))
+        self.manifest["parts"].append(name)
+        for doc, document in enumerate(builder.documents):
+            self.manifest["files"][document["path"]] = {"part": name, "doc": doc, "size": document["size"],
+                                                        "mtime_ns": document["mtime_ns"]}
+
+    def _forget(self, path: str):
+        entry = self.manifest["files"].pop(path)
+        self.manifest["deleted"].setdefault(entry["part"], []).append(entry["doc"])
+
+    def update(self, paths: Iterable[str] = (), progress=None) -> Dict[str, Any]:
+        """Index new and changed transcripts under paths, and drop indexed files that no longer exist.
+
+        paths are files, directories (searched recursively for .dtr and
+        .json) and glob patterns; those that match are remembered, and an
+        update without paths rescans the remembered ones. Returns counts of
+        added, updated, removed and unchanged files, the paths that matched
+        nothing under "missing", and the files that couldn't be read as
+        (path, error) pairs under "failed". JSON files that aren't results
+        are remembered and skipped until they change.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with locked(os.path.join(self.directory, LOCK)):
+            # Another process may have updated the index since this one read it
+            self.close()
+            self.manifest = self._read_manifest()
+            stats = self._update(list(paths), progress)
+            self._remove_unlisted_parts()
+        return stats
+
+    def _update(self, paths: List[str], progress) -> Dict[str, Any]:
+        sources = self.manifest["sources"]
+        found, missing = find_sources(paths or sources)
+        for path in paths:
+            if path not in missing and os.path.abspath(path) not in sources:
+                sources.append(os.path.abspath(path))
+        stats: Dict[str, Any] = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0, "missing": missing, "failed": []}
+
+        for path in [p for p in self.manifest["files"] if not os.path.exists(p)]:
+            self._forget(path)
+            stats["removed"] += 1
+        ignored = self.manifest["ignored"]
+        for path in [p for p in ignored if not os.path.exists(p)]:
+            del ignored[path]
+
+        own_files = os.path.join(os.path.abspath(self.directory), "")
+        builder = _PartBuilder()
+        for path in found:
+            if path.startswith(own_files):
+                continue
+            stat = os.stat(path)
+            version = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            entry = self.manifest["files"].get(path)
+            if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                stats["unchanged"] += 1
+                continue
+            if ignored.get(path) == version:
+                continue
+            try:
+                transcript = load_source(path)
+            except (OSError, ValueError, UnicodeDecodeError) as e:
+                stats["failed"].append((path, str(e)))
+                continue
+            if entry:
+                self._forget(path)
+            if transcript is None:
+                ignored[path] = version
+                if entry:
+                    stats["removed"] += 1
+                continue
+            ignored.pop(path, None)
+            words = _transcript_words(transcript)
+            stats["updated" if entry else "added"] += 1
+            builder.add(dict(version, path=path), words)
+            if progress:
+                progress(path)
+            if builder.words >= PART_WORDS:
+                self._write_part(builder)
+                builder = _PartBuilder()
+        if builder.documents:
+            self._write_part(builder)
+        self._compact()
+        self._save_manifest()
+        return stats
+
+    def _remove_unlisted_parts(self):
+        """Delete parts the manifest doesn't name, left by a rebuild or an update that was interrupted."""
+        live = set(self.manifest["parts"])
+        for path in glob.glob(os.path.join(glob.escape(self.directory), f"part-*{PART_SUFFIX}")):
+            if os.path.basename(path) not in live:
+                os.remove(path)
+
+    def _compact(self):
+        """Drop fully removed parts and merge small ones (see MAX_SMALL_PARTS)."""
+        obsolete = []
+        for name in list(self.manifest["parts"]):
+            deleted = self.manifest["deleted"].get(name, [])
+            if len(deleted) == len(self.part(name).documents):
+                self.manifest["parts"].remove(name)
+                self.manifest["deleted"].pop(name, None)
+                obsolete.append(name)
+        while True:
+            small = sorted((self._live_words(name), name) for name in self.manifest["parts"])
+            small = [(words, name) for words, name in small if words < MERGE_PART_WORDS]
+            if len(small) <= MAX_SMALL_PARTS:
+                break
+            group, total = [], 0
+            for words, name in small:
+                if len(group) >= 2 and total + words > MERGE_PART_WORDS:
+                    break
+                group.append(name)
+                total += words
+            self._merge(group)
+            obsolete.extend(group)
+        for name in obsolete:
+            part = self._parts.pop(name, None)
+            if part is not None:
+                part.close()
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def _merge(self, names: List[str]):
+        """Rewrite the live documents of the named parts as one part."""
+        builder = _PartBuilder()
+        for name in names:
+            part = self.part(name)
+            deleted = set(self.manifest["deleted"].pop(name, []))
+            for doc, document in enumerate(part.documents):
+                if doc in deleted:
+                    continue
+                first, last = int(part.doc_words[doc]), int(part.doc_words[doc + 1])
+                segments = part.word_segment[first:last]
+                builder.add(document, _Words(
+                    part.terms[part.word_term[first:last]], part.word_time[first:last].copy(), part.speakers,
+                    part.word_speaker[first:last].copy(), segments - (segments[0] if len(segments) else 0),
+                    part.words(first, last)))
+            self.manifest["parts"].remove(name)
+        self._write_part(builder)
+
+    def search(self, query: str, speaker: Optional[str] = None, limit: Optional[int] = 20) -> Tuple[List[SearchHit], int]:
+        """Segments matching every clause of query (see parse_query), as (first `limit` hits, total hits).
+
+        Hits are ordered by part, then file, then time.
+        """
+        clauses = parse_query(query)
+        if not clauses:
+            return [], 0
+        hits: List[SearchHit] = []
+        total = 0
+        for name in self.manifest["parts"]:
+            part = self.part(name)
+            words = part.matches(clauses, speaker, self.manifest["deleted"].get(name, ()))
+            total += len(words)
+            for word in words[:None if limit is None else max(limit - len(hits), 0)].tolist():
+                hits.append(part.hit(word, len(clauses[0])))
+        return hits, total
+
+    def close(self):
+        for part in self._parts.values():
+            part.close()
+        self._parts = {}
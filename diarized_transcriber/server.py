@@ -0,0 +1,304 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+from .batch import output_base_filename
+from .files import to_builtin
+from .model_pool import ModelPool, get_default_pool
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+# Job options accepted by submit, mirroring the transcribe CLI flags
+JOB_DEFAULTS = {
+    "output_dir": ".",
+    "model": "medium",
+    "skip_diarization": False,
+    "num_speakers": None,
+    "no_timestamps": False,
+    "formats": ["md"],
+}
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+class JobStateError(Exception):
+    """Raised when an operation doesn't apply to a job in its current state."""
+
+def default_transcribe(audio_path, options, pool):
+    # Imported here so the server module loads without torch/whisperx
+    from .diarization import run_transcribe_with_diarization
+    return run_transcribe_with_diarization(
+        audio_path=audio_path,
+        output_dir=options["output_dir"],
+        model_size=options["model"],
+        skip_diarization=options["skip_diarization"],
+        num_speakers=options["num_speakers"],
+        quiet=True,
+        # rich allows one live display at a time, and several workers may be running
+        show_progress=False,
+        pool=pool
+    )
+
+def default_export(result, output_dir, base_filename, formats, include_timestamps=True):
+    from .export import export_transcript
+    return export_transcript(result, output_dir, base_filename, formats, include_timestamps=include_timestamps)
+
+class Job:
+    def __init__(self, audio_path: str, options: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.audio_path = audio_path
+        self.options = options
+        self.state = QUEUED
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.outputs: List[str] = []
+        self.error: Optional[str] = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "audio_path": self.audio_path,
+            "state": self.state,
+            "options": self.options,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "outputs": self.outputs,
+            "error": self.error,
+        }
+
+class JobQueue:
+    """Bounded job queue served by worker threads that share one model pool.
+
+    transcribe and export are injectable so the queue can run against stub
+    models; by default they call the regular pipeline and exporters.
+    Cancelled jobs leave the queue at once, so they don't hold capacity.
+    """
+
+    def __init__(self, max_queued: int = 16, workers: int = 1, pool: Optional[ModelPool] = None,
+                 transcribe: Callable = default_transcribe, export: Callable = default_export,
+                 max_history: int = 100):
+        self.pool = pool if pool is not None else get_default_pool()
+        self.transcribe = transcribe
+        self.export = export
+        self.max_history = max_history
+        self.max_queued = max_queued
+        self._pending: "deque[Job]" = deque()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Signalled when a job is queued or on stop; shares the lock guarding the jobs
+        self._changed = threading.Condition(self._lock)
+        self._stopping = threading.Event()
+        self._threads = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        self._started = False
+        self._used_names: set = set()
+
+    def start(self):
+        if not self._started:
+            for thread in self._threads:
+                thread.start()
+            self._started = True
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the workers after the job each one is currently running."""
+        with self._changed:
+            self._stopping.set()
+            self._changed.notify_all()
+        for thread in self._threads:
+            if thread.is_alive():
+                thread.join(timeout)
+
+    def submit(self, audio_path: str, **options) -> Job:
+        unknown = set(options) - set(JOB_DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown job option(s): {', '.join(sorted(unknown))}")
+        job_options = dict(JOB_DEFAULTS, **{k: v for k, v in options.items() if v is not None})
+        if isinstance(job_options["formats"], str):
+            job_options["formats"] = [job_options["formats"]]
+        job = Job(audio_path, job_options)
+        with self._changed:
+            if len(self._pending) >= self.max_queued:
+                raise QueueFullError(f"Queue is full ({self.max_queued} jobs waiting)")
+            self._pending.append(job)
+            self._jobs[job.id] = job
+            self._trim_history()
+            self._changed.notify()
+        return job
+
+    def get(self, job_id: str) -> Job:
+        with self._lock:
+            if job_id not in self._jobs:
+                raise KeyError(job_id)
+            return self._jobs[job_id]
+
+    def cancel(self, job_id: str) -> Job:
+        """Cancel a job that has not started yet."""
+        job = self.get(job_id)
+        with self._lock:
+            if job.state != QUEUED:
+                raise JobStateError(f"Job {job_id} is {job.state} and can no longer be cancelled")
+            job.state = CANCELLED
+            job.finished_at = time.time()
+            self._pending.remove(job)
+        return job
+
+    def result(self, job_id: str) -> Dict[str, Any]:
+        job = self.get(job_id)
+        if job.state != DONE:
+            raise JobStateError(f"Job {job_id} is {job.state}, no result available")
+        return job.result or {}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            states: Dict[str, int] = {}
+            for job in self._jobs.values():
+                states[job.state] = states.get(job.state, 0) + 1
+            queued = len(self._pending)
+        return {
+            "queued": queued,
+            "capacity": self.max_queued,
+            "jobs": states,
+            "model_pool": self.pool.stats(),
+        }
+
+    def _trim_history(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.state in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.max_history)]:
+            del self._jobs[job_id]
+
+    def _work(self):
+        while True:
+            with self._changed:
+                while not self._pending and not self._stopping.is_set():
+                    self._changed.wait()
+                if self._stopping.is_set():
+                    return
+                job = self._pending.popleft()
+                job.state = RUNNING
+                job.started_at = time.time()
+            try:
+                self._run(job)
+                job.state = DONE
+            except Exception as e:
+                job.error = f"{type(e).__name__}: {e}"
+                job.state = FAILED
+            job.finished_at = time.time()
+
+    def _run(self, job: Job):
+        options = job.options
+        if not os.path.isfile(job.audio_path):
+            raise FileNotFoundError(f"No such file: {job.audio_path}")
+        result = self.transcribe(job.audio_path, options, self.pool)
+        # Metrics describe this run, not the transcript, so they are neither exported nor served
+        result.pop("metrics", None)
+        os.makedirs(options["output_dir"], exist_ok=True)
+        with self._lock:
+            base_filename = output_base_filename(job.audio_path, self._used_names)
+        job.outputs = self.export(result, options["output_dir"], base_filename, options["formats"],
+                                  include_timestamps=not options["no_timestamps"])
+        job.result = result
+
+class _Handler(BaseHTTPRequestHandler):
+    """JSON API: POST /jobs, GET /jobs/<id>, GET /jobs/<id>/result, DELETE /jobs/<id>, GET /health."""
+
+    jobs: JobQueue
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: Dict[str, Any]):
+        # Results hold numpy scalars and arrays (word scores, timings, embeddings)
+        payload = json.dumps(body, default=to_builtin).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _route(self):
+        parts = [p for p in self.path.split("?")[0].split("/") if p]
+        return parts
+
+    def do_GET(self):
+        parts = self._route()
+        try:
+            if parts == ["health"]:
+                self._send(200, self.jobs.stats())
+            elif len(parts) == 2 and parts[0] == "jobs":
+                self._send(200, self.jobs.get(parts[1]).status())
+            elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "result":
+                self._send(200, self.jobs.result(parts[1]))
+            else:
+                self._send(404, {"error": "not found"})
+        except KeyError:
+            self._send(404, {"error": "unknown job"})
+        except JobStateError as e:
+            self._send(409, {"error": str(e)})
+
+    def do_POST(self):
+        if self._route() != ["jobs"]:
+            self._send(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            audio_path = body.pop("audio_path")
+            job = self.jobs.submit(audio_path, **body)
+        except (ValueError, KeyError, TypeError) as e:
+            self._send(400, {"error": f"invalid job: {e}"})
+            return
+        except QueueFullError as e:
+            self._send(503, {"error": str(e)})
+            return
+        self._send(202, job.status())
+
+    def do_DELETE(self):
+        parts = self._route()
+        if len(parts) != 2 or parts[0] != "jobs":
+            self._send(404, {"error": "not found"})
+            return
+        try:
+            self._send(200, self.jobs.cancel(parts[1]).status())
+        except KeyError:
+            self._send(404, {"error": "unknown job"})
+        except JobStateError as e:
+            self._send(409, {"error": str(e)})
+
+def create_server(jobs: JobQueue, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    """Build an HTTP server bound to the job queue; port 0 picks a free port."""
+    handler = type("JobHandler", (_Handler,), {"jobs": jobs})
+    return ThreadingHTTPServer((host, port), handler)
+
+def serve(host: str = "127.0.0.1", port: int = 8765, max_queued: int = 16, workers: int = 1,
+          preload_model: Optional[str] = None, quiet: bool = False):
+    """Run the warm-model server until interrupted."""
+    jobs = JobQueue(max_queued=max_queued, workers=workers)
+    if preload_model:
+        from .diarization import load_whisper_model, select_device
+        device, compute_type = select_device()
+        load_whisper_model(jobs.pool, preload_model, device, compute_type)
+    jobs.start()
+    server = create_server(jobs, host, port)
+    if not quiet:
+        print(f"🛰️  Serving transcription jobs on http://{host}:{server.server_address[1]}")
+        print(f"📥 Queue capacity: {max_queued} job(s), {workers} worker(s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        jobs.stop(timeout=1)
@@ -0,0 +1,162 @@
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from .transcript import NO_SPEAKER, Transcript
+
+def turn_arrays(diarize_segments) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]:
+    """(starts, ends, speaker indexes, labels) for diarization turns, labels sorted.
+
+    Accepts the pipeline's DataFrame or a list of {"start", "end", "speaker"} records.
+    """
+    if hasattr(diarize_segments, "columns"):
+        starts = diarize_segments["start"].to_numpy(dtype=np.float64)
+        ends = diarize_segments["end"].to_numpy(dtype=np.float64)
+        speakers = [str(s) for s in diarize_segments["speaker"]]
+    else:
+        starts = np.array([t["start"] for t in diarize_segments], dtype=np.float64)
+        ends = np.array([t["end"] for t in diarize_segments], dtype=np.float64)
+        speakers = [str(t["speaker"]) for t in diarize_segments]
+    labels = sorted(set(speakers))
+    index = {label: i for i, label in enumerate(labels)}
+    return starts, ends, np.array([index[s] for s in speakers], dtype=np.int64), labels
+
+def _ranges(first: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(owner, position) for every position in the ranges [first[i], first[i] + counts[i])."""
+    total = int(counts.sum())
+    owner = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    return owner, np.arange(total) + np.repeat(first - offsets, counts)
+
+def dominant_speakers(turn_start: np.ndarray, turn_end: np.ndarray, turn_speaker: np.ndarray, num_speakers: int,
+                      query_start: np.ndarray, query_end: np.ndarray) -> np.ndarray:
+    """Speaker index with the most overlap for each query interval, or -1 where none overlaps.
+
+    Matches whisperx's assign_word_speakers: per query, the intersections
+    with every positively overlapping turn are summed per speaker and the
+    largest total wins. Ties, which are common for words inside overlapping
+    speech, go to the alphabetically first label as in the pinned whisperx
+    3.4 (later releases break them by turn order instead).
+
+    A turn overlaps [s, e) either because it is active at s or because it
+    starts inside (s, e). The first set comes from a sweep over the turn
+    boundaries that records the turns active between each pair of
+    consecutive boundaries; the second is a contiguous run of the turns
+    sorted by start. Both only ever hold turns that really overlap, so the
+    cost is O((queries + turns) log turns) plus the overlaps found and the
+    sweep's size (turns x the most turns active at once), however long any
+    one turn is.
+    """
+    result = np.full(len(query_start), NO_SPEAKER, dtype=np.int64)
+    if not len(query_start) or not len(turn_start):
+        return result
+
+    order = np.argsort(turn_start, kind="stable")
+    starts, ends, speakers = turn_start[order], turn_end[order], turn_speaker[order]
+
+    # Sweep: the turns active in each elementary interval [points[k], points[k + 1])
+    points = np.unique(np.concatenate((starts, ends)))
+    first_interval = np.searchsorted(points, starts, side="left")
+    spans = np.maximum(np.searchsorted(points, ends, side="left") - first_interval, 0)
+    active_turn, interval = _ranges(first_interval, spans)
+    by_interval = np.argsort(interval, kind="stable")
+    active_turn = active_turn[by_interval]
+    interval_first = np.zeros(len(points) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(interval, minlength=len(points)), out=interval_first[1:])
+
+    # Turns active at s: those of the interval containing it (none before the first boundary)
+    k = np.searchsorted(points, query_start, side="right") - 1
+    inside = k >= 0
+    k = np.maximum(k, 0)
+    active_count = np.where(inside, interval_first[k + 1] - interval_first[k], 0)
+    active_query, position = _ranges(interval_first[k], active_count)
+    # Turns starting in (s, e); a turn starting exactly at s is active at s
+    lo = np.searchsorted(starts, query_start, side="right")
+    later_count = np.maximum(np.searchsorted(starts, query_end, side="left") - lo, 0)
+    later_query, later_turn = _ranges(lo, later_count)
+
+    query = np.concatenate((active_query, later_query))
+    turn = np.concatenate((active_turn[position], later_turn))
+    if not len(query):
+        return result
+    intersection = np.minimum(ends[turn], query_end[query]) - np.maximum(starts[turn], query_start[query])
+    hit = intersection > 0
+    query, turn, intersection = query[hit], turn[hit], intersection[hit]
+    if not len(query):
+        return result
+
+    # Sum each query's overlaps in turn order, so float rounding doesn't depend on which set a turn came from
+    summed = np.lexsort((turn, query))
+    query, turn, intersection = query[summed], turn[summed], intersection[summed]
+    totals = np.zeros((len(query_start), num_speakers), dtype=np.float64)
+    np.add.at(totals, (query, speakers[turn]), intersection)
+    matched = np.unique(query)
+    result[matched] = np.argmax(totals[matched], axis=1)
+    return result
+
+def assign_word_speakers(diarize_segments, result: Dict[str, Any]):
+    """Label segments and words with the speaker they overlap most, like whisperx.diarize.assign_word_speakers.
+
+    result may be the pipeline's dict, which is updated in place and
+    returned, or a Transcript, whose speaker columns are replaced.
+    Segments and words with no overlapping turn are left unlabelled;
+    words without timings are skipped.
+    """
+    turn_start, turn_end, turn_speaker, labels = turn_arrays(diarize_segments)
+    if isinstance(result, Transcript):
+        return _assign_transcript(turn_start, turn_end, turn_speaker, labels, result)
+
+    segments = result.get("segments", [])
+    if not segments or not labels:
+        return result
+
+    seg_best = dominant_speakers(turn_start, turn_end, turn_speaker, len(labels),
+                                 np.array([seg["start"] for seg in segments], dtype=np.float64),
+                                 np.array([seg["end"] for seg in segments], dtype=np.float64))
+    words = [word for seg in segments for word in seg.get("words", []) if "start" in word]
+    word_best = dominant_speakers(turn_start, turn_end, turn_speaker, len(labels),
+                                  np.array([w["start"] for w in words], dtype=np.float64),
+                                  np.array([w.get("end", w["start"]) for w in words], dtype=np.float64))
+
+    for seg, best in zip(segments, seg_best.tolist()):
+        if best != NO_SPEAKER:
+            seg["speaker"] = labels[best]
+    for word, best in zip(words, word_best.tolist()):
+        if best != NO_SPEAKER:
+            word["speaker"] = labels[best]
+    return result
+
+def _assign_transcript(turn_start, turn_end, turn_speaker, labels, transcript: Transcript) -> Transcript:
+    # Keep the transcript's existing label order and append any new labels
+    speakers = list(transcript.speakers)
+    for label in labels:
+        if label not in speakers:
+            speakers.append(label)
+    remap = np.array([speakers.index(label) for label in labels] + [NO_SPEAKER], dtype=np.int32)
+
+    seg_best = dominant_speakers(turn_start, turn_end, turn_speaker, len(labels),
+                                 transcript.seg_start, transcript.seg_end)
+    word_end = np.where(np.isnan(transcript.word_end), transcript.word_start, transcript.word_end)
+    word_best = dominant_speakers(turn_start, turn_end, turn_speaker, len(labels),
+                                  transcript.word_start, word_end)
+    # -1 indexes the trailing NO_SPEAKER entry of remap
+    transcript.seg_speaker = np.where(seg_best == NO_SPEAKER, transcript.seg_speaker, remap[seg_best])
+    timed = ~np.isnan(transcript.word_start)
+    transcript.word_speaker = np.where((word_best == NO_SPEAKER) | ~timed, transcript.word_speaker, remap[word_best])
+    transcript.speakers = speakers
+    return transcript
+
+# Top-level keys that come from diarization rather than from the transcript itself
+DIARIZATION_KEYS = ("speaker_embeddings", "speaker_matches", "branch_timings")
+
+def strip_speakers(result: Dict[str, Any]) -> Dict[str, Any]:
+    """A copy of a diarized result dict as alignment left it, without speaker labels."""
+    def unlabelled(item):
+        return {k: v for k, v in item.items() if k != "speaker"}
+
+    stripped = {k: v for k, v in result.items() if k not in DIARIZATION_KEYS}
+    stripped["segments"] = [dict(unlabelled(seg), words=[unlabelled(w) for w in seg["words"]]) if "words" in seg
+                            else unlabelled(seg) for seg in result.get("segments", [])]
+    if "word_segments" in result:
+        stripped["word_segments"] = [unlabelled(w) for w in result["word_segments"]]
+    return stripped
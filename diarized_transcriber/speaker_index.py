@@ -0,0 +1,231 @@
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .block_file import ALIGNMENT, read_blocks, write_blocks
+from .transcript import Transcript
+
+# A block file (see block_file.py): the header holds the names and matrix
+# shape, the arrays the row -> name id column and the float32 embedding
+# matrix
+MAGIC = b"DTRSPKRS"
+VERSION = 1
+SPEAKERS_ENV = "DIARIZED_TRANSCRIBER_SPEAKERS"
+
+# Naming the wrong person is worse than leaving a label anonymous, so this is
+# stricter than the threshold chunked mode uses to link speakers within a recording
+DEFAULT_MATCH_THRESHOLD = 0.7
+
+def default_index_path() -> str:
+    if os.getenv(SPEAKERS_ENV):
+        return os.environ[SPEAKERS_ENV]
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "diarized-transcriber", "speakers.idx")
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+class SpeakerIndex:
+    """Enrolled voice embeddings with vectorized nearest-neighbour matching by name.
+
+    A name can hold several embeddings (e.g. one per enrolled episode); a
+    query's score for a name is its best cosine similarity with any of them.
+    Rows are stored unit-normalized, so matching is one matrix product
+    against every enrolled row followed by a per-name maximum.
+    """
+
+    def __init__(self, dimension: Optional[int] = None):
+        self.names: List[str] = []
+        self._name_ids: Dict[str, int] = {}
+        self.dimension = dimension
+        self._row_names = np.empty(0, dtype=np.int32)
+        self._vectors = np.empty((0, dimension or 0), dtype=np.float32)
+        self._size = 0
+        self._grouping = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[:self._size]
+
+    @property
+    def row_names(self) -> np.ndarray:
+        return self._row_names[:self._size]
+
+    def counts(self) -> Dict[str, int]:
+        """Enrolled embeddings per name."""
+        counts = np.bincount(self.row_names, minlength=len(self.names))
+        return {name: int(count) for name, count in zip(self.names, counts) if count}
+
+    def add(self, name: str, embeddings) -> int:
+        """Enroll one embedding, or several as rows of a 2-D array, under name; returns the rows added."""
+        vectors = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+        if self.dimension is None:
+            self.dimension = vectors.shape[1]
+            self._vectors = np.empty((0, self.dimension), dtype=np.float32)
+        if vectors.shape[1] != self.dimension:
+            raise ValueError(f"Embedding has {vectors.shape[1]} dimensions; this index holds {self.dimension}")
+        if name not in self._name_ids:
+            self._name_ids[name] = len(self.names)
+            self.names.append(name)
+
+        # Capacity doubles so enrolling row by row stays linear overall; a
+        # loaded (read-only, mapped) index is copied on its first add
+        needed = self._size + len(vectors)
+        if needed > len(self._vectors) or not self._vectors.flags.writeable:
+            capacity = max(needed, 2 * len(self._vectors), 64)
+            grown = np.empty((capacity, self.dimension), dtype=np.float32)
+            grown[:self._size] = self.vectors
+            grown_names = np.empty(capacity, dtype=np.int32)
+            grown_names[:self._size] = self.row_names
+            self._vectors, self._row_names = grown, grown_names
+        self._vectors[self._size:needed] = _normalize(vectors)
+        self._row_names[self._size:needed] = self._name_ids[name]
+        self._size = needed
+        self._grouping = None
+        return len(vectors)
+
+    def remove(self, name: str) -> int:
+        """Drop every embedding enrolled under name; returns how many were removed."""
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            return 0
+        keep = self.row_names != name_id
+        removed = int(self._size - keep.sum())
+        vectors, row_names = self.vectors[keep], self.row_names[keep]
+        # Later names move down one id
+        row_names = np.where(row_names > name_id, row_names - 1, row_names).astype(np.int32)
+        del self.names[name_id]
+        self._name_ids = {n: i for i, n in enumerate(self.names)}
+        self._vectors, self._row_names, self._size = vectors, row_names, len(vectors)
+        self._grouping = None
+        return removed
+
+    def _grouped(self):
+        """Row order that groups rows by name (None if they already are), and where each name's group starts."""
+        if self._grouping is None:
+            row_names = self.row_names
+            order = None if (np.diff(row_names) >= 0).all() else np.argsort(row_names, kind="stable")
+            names_present, starts = np.unique(row_names if order is None else row_names[order], return_index=True)
+            self._grouping = (order, starts, names_present)
+        return self._grouping
+
+    def scores(self, embeddings) -> Tuple[np.ndarray, List[str]]:
+        """Best cosine similarity of each query embedding (rows) with each enrolled name (columns)."""
+        queries = _normalize(np.atleast_2d(np.asarray(embeddings, dtype=np.float32)))
+        if not self._size:
+            return np.empty((len(queries), 0), dtype=np.float32), []
+        order, starts, names_present = self._grouped()
+        # One pass over the enrolled matrix, which dominates the cost at scale
+        similarity = (self.vectors @ queries.T).T
+        if order is not None:
+            similarity = similarity[:, order]
+        best = np.maximum.reduceat(similarity, starts, axis=1)
+        return best, [self.names[i] for i in names_present]
+
+    def match(self, embeddings: Dict[str, Any], threshold: float = DEFAULT_MATCH_THRESHOLD) -> Dict[str, Dict[str, Any]]:
+        """Match {label: embedding} to enrolled names as {label: {"name", "similarity"}}.
+
+        Labels are speakers of one recording, so each name goes to at most
+        one label, best similarity first. Labels with no name at or above
+        the threshold are left out.
+        """
+        labels = [label for label, vector in embeddings.items() if vector is not None]
+        if not labels or not self._size:
+            return {}
+        best, names = self.scores([embeddings[label] for label in labels])
+        candidates = [(float(best[i, j]), labels[i], names[j])
+                      for i, j in zip(*np.nonzero(best >= threshold))]
+        matches: Dict[str, Dict[str, Any]] = {}
+        taken = set()
+        for similarity, label, name in sorted(candidates, reverse=True):
+            if label not in matches and name not in taken:
+                matches[label] = {"name": name, "similarity": round(similarity, 4)}
+                taken.add(name)
+        return matches
+
+    def save(self, path: str):
+        """Write the index so load() can map it instead of reading it."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        header = {"names": self.names, "rows": self._size, "dimension": self.dimension}
+        arrays = {"row_names": np.ascontiguousarray(self.row_names, dtype="<i4"),
+                  "vectors": np.ascontiguousarray(self.vectors, dtype="<f4").reshape(-1)}
+        write_blocks(path, MAGIC, VERSION, header, arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "SpeakerIndex":
+        """Read an index written by save(); the embeddings stay memory-mapped until the next add.
+
+        Raises ValueError for anything that isn't a speaker index of a
+        supported version.
+        """
+        header, arrays, _ = read_blocks(path, MAGIC, VERSION, "speaker index", default_layout=_default_layout)
+        rows, dimension = header["rows"], header["dimension"]
+        index = cls(dimension)
+        index.names = header["names"]
+        index._name_ids = {name: i for i, name in enumerate(index.names)}
+        if rows:
+            index._row_names = arrays["row_names"]
+            index._vectors = arrays["vectors"].reshape(rows, dimension)
+            index._size = rows
+        return index
+
+def _default_layout(header: Dict[str, Any]) -> Dict[str, Any]:
+    """Where save() put the arrays before it recorded their layout."""
+    rows = header["rows"]
+    return {"row_names": {"offset": 0, "dtype": "<i4", "count": rows},
+            "vectors": {"offset": rows * 4 + -(rows * 4) % ALIGNMENT, "dtype": "<f4",
+                        "count": rows * (header["dimension"] or 0)}}
+
+def load_speaker_index(path: Optional[str] = None) -> Optional[SpeakerIndex]:
+    """The index at path (default: default_index_path()), or None if there is none yet."""
+    path = path or default_index_path()
+    if not os.path.exists(path):
+        return None
+    return SpeakerIndex.load(path)
+
+def rename_speakers(result, names: Dict[str, str]):
+    """Relabel speakers of a result dict or Transcript in place using {label: new label}."""
+    embeddings = result.metadata.get("speaker_embeddings") if isinstance(result, Transcript) \
+        else result.get("speaker_embeddings")
+    if embeddings:
+        for label in [label for label in embeddings if label in names]:
+            embeddings[names[label]] = embeddings.pop(label)
+    if isinstance(result, Transcript):
+        result.speakers = [names.get(label, label) for label in result.speakers]
+        return result
+    for seg in result.get("segments", []):
+        if seg.get("speaker") in names:
+            seg["speaker"] = names[seg["speaker"]]
+        for word in seg.get("words", []):
+            if word.get("speaker") in names:
+                word["speaker"] = names[word["speaker"]]
+    for word in result.get("word_segments", []):
+        if word.get("speaker") in names:
+            word["speaker"] = names[word["speaker"]]
+    return result
+
+def format_matches(matches: Dict[str, Dict[str, Any]]) -> str:
+    return ", ".join(f"{label} → {m['name']} ({m['similarity']:.2f})" for label, m in sorted(matches.items()))
+
+def identify_speakers(result, index: SpeakerIndex, threshold: float = DEFAULT_MATCH_THRESHOLD) -> Dict[str, Dict[str, Any]]:
+    """Rename the diarizer's speakers to the enrolled names their voices match.
+
+    result is a pipeline result dict or a Transcript carrying the per-speaker
+    "speaker_embeddings" the diarizer produced; without them nothing is
+    renamed. Returns the matches, which are also recorded under
+    "speaker_matches" so a later run can tell which labels were identified.
+    """
+    metadata = result.metadata if isinstance(result, Transcript) else result
+    embeddings = metadata.get("speaker_embeddings")
+    if not embeddings or index is None:
+        return {}
+    matches = index.match(embeddings, threshold)
+    if matches:
+        rename_speakers(result, {label: match["name"] for label, match in matches.items()})
+        metadata["speaker_matches"] = matches
+    return matches
@@ -0,0 +1,182 @@
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .transcript import NO_SPEAKER, Transcript
+
+# Label for segments the diarizer left without a speaker
+UNKNOWN_SPEAKER = "SPEAKER"
+
+# Buffered text is handed to the file once this many pieces have accumulated
+FLUSH_PIECES = 4096
+
+class Turn(NamedTuple):
+    """Consecutive segments from one speaker, text already stripped.
+
+    speaker is None when the transcript has no speaker labels, in which
+    case the whole transcript is a single turn.
+    """
+    speaker: Optional[str]
+    segments: List[Tuple[float, float, str]]
+
+def segment_has_speaker(seg: Dict[str, Any]) -> bool:
+    return "speaker" in seg and seg["speaker"] is not None
+
+def scan_has_speakers(segments: Iterable[Dict[str, Any]]) -> Optional[bool]:
+    """Whether diarization labelled any segment, or None when segments is a one-shot iterator.
+
+    Lists can be scanned up front; for iterators the writer decides from
+    the first segment it receives instead.
+    """
+    if isinstance(segments, Transcript):
+        return segments.has_speakers
+    if isinstance(segments, (list, tuple)):
+        return any(segment_has_speaker(seg) for seg in segments)
+    return None
+
+def _transcript_turns(transcript: Transcript) -> Tuple[List[Turn], bool]:
+    offsets = transcript.seg_text.tolist()
+    text = transcript.text
+    rows = list(zip(transcript.seg_start.tolist(), transcript.seg_end.tolist(),
+                    (text[offsets[i]:offsets[i + 1]].strip() for i in range(len(transcript)))))
+    if not transcript.has_speakers:
+        return [Turn(None, rows)], False
+
+    # Turns start wherever the speaker index changes
+    speakers = transcript.seg_speaker
+    edges = [0] + (np.flatnonzero(speakers[1:] != speakers[:-1]) + 1).tolist() + [len(rows)]
+    labels = [UNKNOWN_SPEAKER if index == NO_SPEAKER else transcript.speakers[index]
+              for index in speakers[edges[:-1]].tolist()]
+    return [Turn(label, rows[a:b]) for label, a, b in zip(labels, edges[:-1], edges[1:])], True
+
+def build_turns(segments) -> Tuple[List[Turn], bool]:
+    """Normalize segments (a list of dicts or a Transcript) into speaker turns in a single pass.
+
+    Returns (turns, has_speakers).
+    """
+    if isinstance(segments, Transcript):
+        return _transcript_turns(segments)
+    has_speakers = any(segment_has_speaker(seg) for seg in segments)
+    if not has_speakers:
+        return [Turn(None, [(seg["start"], seg.get("end", seg["start"]), seg["text"].strip()) for seg in segments])], False
+
+    turns: List[Turn] = []
+    current = None
+    for seg in segments:
+        speaker = seg.get("speaker") or UNKNOWN_SPEAKER
+        if speaker != current:
+            turns.append(Turn(speaker, []))
+            current = speaker
+        turns[-1].segments.append((seg["start"], seg.get("end", seg["start"]), seg["text"].strip()))
+    return turns, True
+
+class SegmentWriter:
+    """Base class for exporters that write one segment or one speaker turn at a time.
+
+    Subclasses keep only constant state and implement begin(), start_turn(),
+    add_segment(), end_turn() and end(). Output is gathered in a small
+    buffer; with autoflush it reaches the file after every segment so a
+    partial transcript can be tailed while the pipeline is still running.
+
+    has_speakers picks the speaker-aware layout; when it is None it is
+    decided by the first segment written.
+    """
+
+    encoding: Optional[str] = None
+
+    def __init__(self, output_path: str, has_speakers: Optional[bool] = None, autoflush: bool = True):
+        self.output_path = output_path
+        self.has_speakers = has_speakers
+        self.autoflush = autoflush
+        self.count = 0
+        self.turns = 0
+        self._speaker: Optional[str] = None
+        self._pieces: List[str] = []
+        self._file = self._open()
+        self._closed = False
+        self.begin()
+
+    def _open(self):
+        return open(self.output_path, "w", encoding=self.encoding)
+
+    def _emit(self, text: str):
+        self._pieces.append(text)
+
+    def flush(self):
+        if self._pieces and self._file is not None:
+            self._file.write("".join(self._pieces))
+            self._file.flush()
+        self._pieces = []
+
+    def begin(self):
+        pass
+
+    def start_turn(self, speaker: Optional[str], start: float):
+        pass
+
+    def add_segment(self, start: float, end: float, text: str, speaker: Optional[str]):
+        raise NotImplementedError
+
+    def end_turn(self):
+        pass
+
+    def end(self):
+        pass
+
+    def write(self, seg: Dict[str, Any]):
+        """Add one raw pipeline segment."""
+        if self.has_speakers is None:
+            self.has_speakers = segment_has_speaker(seg)
+        speaker = (seg.get("speaker") or UNKNOWN_SPEAKER) if self.has_speakers else None
+        if not self.turns or speaker != self._speaker:
+            if self.turns:
+                self.end_turn()
+            self.start_turn(speaker, seg["start"])
+            self._speaker = speaker
+            self.turns += 1
+        self.count += 1
+        self.add_segment(seg["start"], seg.get("end", seg["start"]), seg["text"].strip(), speaker)
+        if self.autoflush:
+            self.flush()
+
+    def write_all(self, segments: Iterable[Dict[str, Any]]):
+        for seg in segments:
+            self.write(seg)
+        return self
+
+    def write_turns(self, turns: List[Turn], has_speakers: bool):
+        """Write turns already built by build_turns; used by the export engine."""
+        self.has_speakers = has_speakers
+        for turn in turns:
+            if not turn.segments:
+                continue
+            if self.turns:
+                self.end_turn()
+            self.start_turn(turn.speaker, turn.segments[0][0])
+            self._speaker = turn.speaker
+            self.turns += 1
+            for start, end, text in turn.segments:
+                self.count += 1
+                self.add_segment(start, end, text, turn.speaker)
+                if len(self._pieces) >= FLUSH_PIECES:
+                    self.flush()
+        return self
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self.has_speakers is None:
+            self.has_speakers = False
+        if self.turns:
+            self.end_turn()
+        self.end()
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,196 @@
+import sys
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+# Speaker index of segments and words the diarizer left unlabelled
+NO_SPEAKER = -1
+
+def _column(values: List[float]) -> np.ndarray:
+    return np.array(values, dtype=np.float64)
+
+def _offsets(lengths: List[int]) -> np.ndarray:
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+def _number(item: Dict[str, Any], key: str) -> float:
+    value = item.get(key)
+    return float("nan") if value is None else value
+
+def _optional(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+class Transcript:
+    """Columnar transcript: NumPy arrays instead of one dict per segment and word.
+
+    Segment and word timings, scores and speaker indexes are parallel
+    arrays; speaker labels are stored once in `speakers`, and all text lives
+    in a single string addressed by offsets. Missing times and scores are
+    NaN and a missing speaker is -1, so from_result()/to_result() round-trip
+    the dict format the pipeline produces (start, end, text, speaker and
+    words on segments; word, start, end, score and speaker on words).
+
+    Iterating yields lightweight segment dicts (start, end, text, speaker),
+    which is all the exporters read.
+    """
+
+    def __init__(self, seg_start, seg_end, seg_speaker, seg_text, seg_words, word_start, word_end, word_score,
+                 word_speaker, word_text, text: str, speakers: List[str], metadata: Optional[Dict[str, Any]] = None):
+        self.seg_start = seg_start
+        self.seg_end = seg_end
+        self.seg_speaker = seg_speaker
+        self.seg_text = seg_text          # offsets into text, len(segments) + 1
+        self.seg_words = seg_words        # offsets into the word arrays, len(segments) + 1
+        self.word_start = word_start
+        self.word_end = word_end
+        self.word_score = word_score
+        self.word_speaker = word_speaker
+        self.word_text = word_text        # offsets into text, len(words) + 1
+        self.text = text
+        self.speakers = speakers
+        self.metadata = metadata or {}
+
+    @classmethod
+    def from_result(cls, result: Dict[str, Any]) -> "Transcript":
+        """Build from a pipeline result dict ({"segments": [...], "language": ...})."""
+        speaker_index: Dict[str, int] = {}
+
+        def intern(label):
+            if label is None:
+                return NO_SPEAKER
+            return speaker_index.setdefault(label, len(speaker_index))
+
+        seg_start, seg_end, seg_speaker, seg_lengths, seg_word_counts = [], [], [], [], []
+        word_start, word_end, word_score, word_speaker, word_lengths = [], [], [], [], []
+        seg_texts, word_texts = [], []
+        for seg in result.get("segments", []):
+            seg_start.append(_number(seg, "start"))
+            seg_end.append(_number(seg, "end"))
+            seg_speaker.append(intern(seg.get("speaker")))
+            seg_texts.append(seg.get("text", ""))
+            seg_lengths.append(len(seg_texts[-1]))
+            words = seg.get("words", [])
+            seg_word_counts.append(len(words))
+            for word in words:
+                word_start.append(_number(word, "start"))
+                word_end.append(_number(word, "end"))
+                word_score.append(_number(word, "score"))
+                word_speaker.append(intern(word.get("speaker")))
+                word_texts.append(word.get("word", ""))
+                word_lengths.append(len(word_texts[-1]))
+
+        # Segment text first, then word text, in one buffer
+        text = "".join(seg_texts) + "".join(word_texts)
+        seg_text = _offsets(seg_lengths)
+        word_text = _offsets(word_lengths) + seg_text[-1]
+        metadata = {k: v for k, v in result.items() if k not in ("segments", "word_segments")}
+        return cls(
+            _column(seg_start), _column(seg_end), np.array(seg_speaker, dtype=np.int32), seg_text,
+            _offsets(seg_word_counts), _column(word_start), _column(word_end), _column(word_score),
+            np.array(word_speaker, dtype=np.int32), word_text, text,
+            list(speaker_index), metadata,
+        )
+
+    def to_result(self) -> Dict[str, Any]:
+        """The dict format: segments with their words, word_segments and metadata."""
+        text = self.text
+        labels = self.speakers
+        word_offsets = self.word_text.tolist()
+        words = []
+        columns = zip(self.word_start.tolist(), self.word_end.tolist(), self.word_score.tolist(), self.word_speaker.tolist())
+        for j, (start, end, score, speaker) in enumerate(columns):
+            word: Dict[str, Any] = {"word": text[word_offsets[j]:word_offsets[j + 1]]}
+            # NaN is the only value not equal to itself
+            if start == start:
+                word["start"] = start
+            if end == end:
+                word["end"] = end
+            if score == score:
+                word["score"] = score
+            if speaker != NO_SPEAKER:
+                word["speaker"] = labels[speaker]
+            words.append(word)
+
+        word_ranges = self.seg_words.tolist()
+        segments = []
+        for i, seg in enumerate(self):
+            seg["words"] = words[word_ranges[i]:word_ranges[i + 1]]
+            segments.append(seg)
+
+        result = dict(self.metadata)
+        result["segments"] = segments
+        result["word_segments"] = words
+        return result
+
+    def __len__(self) -> int:
+        return len(self.seg_start)
+
+    @property
+    def word_count(self) -> int:
+        return len(self.word_start)
+
+    @property
+    def language(self) -> Optional[str]:
+        return self.metadata.get("language")
+
+    @property
+    def has_speakers(self) -> bool:
+        return bool(len(self) and (self.seg_speaker != NO_SPEAKER).any())
+
+    def speaker_label(self, index: int) -> Optional[str]:
+        return None if index == NO_SPEAKER else self.speakers[index]
+
+    def segment_text(self, i: int) -> str:
+        return self.text[self.seg_text[i]:self.seg_text[i + 1]]
+
+    def _word(self, j: int) -> Dict[str, Any]:
+        word: Dict[str, Any] = {"word": self.text[self.word_text[j]:self.word_text[j + 1]]}
+        for key, column in (("start", self.word_start), ("end", self.word_end), ("score", self.word_score)):
+            value = _optional(column[j])
+            if value is not None:
+                word[key] = value
+        speaker = self.speaker_label(self.word_speaker[j])
+        if speaker is not None:
+            word["speaker"] = speaker
+        return word
+
+    def segment(self, i: int) -> Dict[str, Any]:
+        """Segment i as a full dict, words included."""
+        seg = self._segment_fields(i)
+        seg["words"] = [self._word(j) for j in range(self.seg_words[i], self.seg_words[i + 1])]
+        return seg
+
+    def _segment_fields(self, i: int) -> Dict[str, Any]:
+        seg: Dict[str, Any] = {}
+        for key, column in (("start", self.seg_start), ("end", self.seg_end)):
+            value = _optional(column[i])
+            if value is not None:
+                seg[key] = value
+        seg["text"] = self.segment_text(i)
+        speaker = self.speaker_label(self.seg_speaker[i])
+        if speaker is not None:
+            seg["speaker"] = speaker
+        return seg
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        # Columns are converted once up front; indexing arrays per element is slow
+        starts, ends = self.seg_start.tolist(), self.seg_end.tolist()
+        speakers, offsets = self.seg_speaker.tolist(), self.seg_text.tolist()
+        text = self.text
+        for i in range(len(starts)):
+            seg: Dict[str, Any] = {}
+            if starts[i] == starts[i]:
+                seg["start"] = starts[i]
+            if ends[i] == ends[i]:
+                seg["end"] = ends[i]
+            seg["text"] = text[offsets[i]:offsets[i + 1]]
+            if speakers[i] != NO_SPEAKER:
+                seg["speaker"] = self.speakers[speakers[i]]
+            yield seg
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the arrays and the text buffer."""
+        arrays = (self.seg_start, self.seg_end, self.seg_speaker, self.seg_text, self.seg_words, self.word_start,
+                  self.word_end, self.word_score, self.word_speaker, self.word_text)
+        return sum(a.nbytes for a in arrays) + sys.getsizeof(self.text)
@@ -0,0 +1,44 @@
+import numpy as np
+
+from .block_file import read_blocks, write_blocks
+from .transcript import Transcript
+
+# A block file (see block_file.py) holding the Transcript's columns as
+# arrays and its text as the text block; the header also carries the
+# speakers and metadata
+MAGIC = b"DTRSCRPT"
+VERSION = 1
+SUFFIX = ".dtr"
+
+# Transcript attribute -> on-disk dtype
+ARRAYS = {
+    "seg_start": "<f8",
+    "seg_end": "<f8",
+    "seg_speaker": "<i4",
+    "seg_text": "<i8",
+    "seg_words": "<i8",
+    "word_start": "<f8",
+    "word_end": "<f8",
+    "word_score": "<f8",
+    "word_speaker": "<i4",
+    "word_text": "<i8",
+}
+
+def save_transcript(transcript: Transcript, output_path: str):
+    """Write a Transcript (or a result dict) as a memory-mappable binary file."""
+    if not isinstance(transcript, Transcript):
+        transcript = Transcript.from_result(transcript)
+    arrays = {name: np.ascontiguousarray(getattr(transcript, name), dtype=dtype) for name, dtype in ARRAYS.items()}
+    write_blocks(output_path, MAGIC, VERSION, {"speakers": transcript.speakers, "metadata": transcript.metadata},
+                 arrays, transcript.text.encode("utf-8"))
+
+def load_transcript(path: str, use_mmap: bool = True) -> Transcript:
+    """Read a file written by save_transcript.
+
+    With use_mmap the arrays are read-only views of the mapped file, so
+    loading costs only the header parse and the text decode, and pages are
+    read as they are touched. Raises ValueError for anything that isn't a
+    transcript file of a supported version.
+    """
+    header, arrays, text = read_blocks(path, MAGIC, VERSION, "transcript file", use_mmap=use_mmap)
+    return Transcript(text=str(text, "utf-8"), speakers=header["speakers"], metadata=header["metadata"], **arrays)
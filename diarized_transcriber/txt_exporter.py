@@ -1,39 +1,48 @@
+from .streaming import SegmentWriter, scan_has_speakers
+
 def format_timestamp(seconds):
     """Convert seconds to MM:SS format"""
     minutes = int(seconds // 60)
     seconds = int(seconds % 60)
     return f"{minutes:02d}:{seconds:02d}"
 
-def generate_txt(segments, output_path, include_timestamps=False):
-    # Check if any segments have speaker information (indicating diarization was used)
-    has_speakers = any("speaker" in seg and seg["speaker"] is not None for seg in segments)
-    
-    with open(output_path, "w") as f:
-        if has_speakers:
-            # Use speaker-aware format
-            current_speaker = None
-            buffer = []
-            
-            for seg in segments:
-                speaker = seg.get("speaker", "SPEAKER")
-                text = seg["text"].strip()
-
-                if speaker != current_speaker:
-                    if buffer:
-                        timestamp = f"[{format_timestamp(seg['start'])}] " if include_timestamps else ""
-                        f.write(f"{current_speaker}: {timestamp}{' '.join(buffer)}\n\n")
-                        buffer = []
-                    current_speaker = speaker
-
-                buffer.append(text)
-
-            if buffer:
-                timestamp = f"[{format_timestamp(segments[-1]['start'])}] " if include_timestamps else ""
-                f.write(f"{current_speaker}: {timestamp}{' '.join(buffer)}\n")
+class TxtWriter(SegmentWriter):
+    """Plain text, one paragraph per speaker turn (buffered until the speaker changes)."""
+
+    def __init__(self, output_path, include_timestamps=False, has_speakers=None, autoflush=True):
+        self.include_timestamps = include_timestamps
+        self.buffer = []
+        self.turn_start = None
+        self.paragraphs = 0
+        super().__init__(output_path, has_speakers=has_speakers, autoflush=autoflush)
+
+    def start_turn(self, speaker, start):
+        self.buffer = []
+        self.turn_start = start
+
+    def add_segment(self, start, end, text, speaker):
+        if self.has_speakers:
+            self.buffer.append(text)
         else:
             # Use simple format without speaker labels
-            for seg in segments:
-                text = seg["text"].strip()
-                timestamp = f"[{format_timestamp(seg['start'])}] " if include_timestamps else ""
-                f.write(f"{timestamp}{text}\n")
-            f.write("\n")
+            timestamp = f"[{format_timestamp(start)}] " if self.include_timestamps else ""
+            self._emit(f"{timestamp}{text}\n")
+
+    def end_turn(self):
+        if not self.has_speakers or not self.buffer:
+            return
+        # Use speaker-aware format, paragraphs separated by a blank line
+        timestamp = f"[{format_timestamp(self.turn_start)}] " if self.include_timestamps else ""
+        separator = "\n" if self.paragraphs else ""
+        self._emit(f"{separator}{self._speaker}: {timestamp}{' '.join(self.buffer)}\n")
+        self.paragraphs += 1
+        self.buffer = []
+
+    def end(self):
+        if not self.has_speakers:
+            self._emit("\n")
+
+def generate_txt(segments, output_path, include_timestamps=False):
+    with TxtWriter(output_path, include_timestamps=include_timestamps,
+                   has_speakers=scan_has_speakers(segments), autoflush=False) as writer:
+        writer.write_all(segments)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+
+import unittest
+import json
+import os
+import tempfile
+from unittest import mock
+
+import numpy as np
+
+from diarized_transcriber import autotune
+from diarized_transcriber.diarization import apply_cpu_profile
+
+
+class FakeModel:
+    """Takes `cost[batch_size]` fake seconds per transcribe; the clock advances by that much."""
+
+    def __init__(self, clock, cost, fail_batch=None):
+        self.clock = clock
+        self.cost = cost
+        self.fail_batch = fail_batch
+
+    def transcribe(self, audio, batch_size=1, language=None):
+        if batch_size == self.fail_batch:
+            raise MemoryError("out of memory")
+        self.clock.now += self.cost[batch_size]
+        return {"segments": [], "language": "en"}
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestAutotune(unittest.TestCase):
+
+    def setUp(self):
+        self.audio = np.zeros(16000 * 10, dtype=np.float32)
+        self.clock = FakeClock()
+
+    def test_picks_fastest(self):
+        """Test the fastest compute type, thread count and batch size wins"""
+        costs = {("int8", 2): {1: 5.0, 4: 2.0}, ("int8", 4): {1: 4.0, 4: 1.5}, ("float32", 2): {1: 9.0, 4: 6.0},
+                 ("float32", 4): {1: 8.0, 4: 5.0}}
+        load = lambda model, compute_type, threads: FakeModel(self.clock, costs[(compute_type, threads)])
+        seen = []
+        profile = autotune.autotune(self.audio, "tiny", ["int8", "float32"], [1, 4], [2, 4], load_model=load,
+                                    on_result=seen.append, clock=self.clock)
+        self.assertEqual((profile["compute_type"], profile["threads"], profile["batch_size"]), ("int8", 4, 4))
+        self.assertAlmostEqual(profile["rtf"], 0.15)
+        self.assertEqual(len(profile["candidates"]), 8)
+        self.assertEqual(seen, profile["candidates"])
+
+    def test_failures_recorded(self):
+        """Test configurations that fail to load or run are recorded and skipped"""
+        def load(model, compute_type, threads):
+            if compute_type == "int8":
+                raise ValueError("unsupported compute type")
+            return FakeModel(self.clock, {1: 3.0, 8: 1.0}, fail_batch=8)
+
+        profile = autotune.autotune(self.audio, "tiny", ["int8", "float32"], [1, 8], [1], load_model=load,
+                                    clock=self.clock)
+        self.assertEqual((profile["compute_type"], profile["batch_size"]), ("float32", 1))
+        errors = [c for c in profile["candidates"] if "error" in c]
+        self.assertEqual(len(errors), 2)
+        self.assertIn("unsupported", errors[0]["error"])
+
+        def broken(model, compute_type, threads):
+            raise ValueError("no")
+        with self.assertRaises(RuntimeError):
+            autotune.autotune(self.audio, "tiny", ["int8"], [1], [1], load_model=broken, clock=self.clock)
+
+
+class TestProfiles(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "profiles", "cpu-profiles.json")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_roundtrip(self):
+        """Test profiles are saved per host and model without clobbering others"""
+        self.assertIsNone(autotune.load_profile("tiny", self.path))
+        autotune.save_profile("tiny", {"compute_type": "int8", "batch_size": 8, "threads": 4}, self.path)
+        autotune.save_profile("medium", {"compute_type": "float32", "batch_size": 4, "threads": 2}, self.path)
+        with mock.patch.object(autotune, "host_key", return_value="otherhost"):
+            autotune.save_profile("tiny", {"compute_type": "float32", "batch_size": 1, "threads": 1}, self.path)
+            self.assertEqual(autotune.load_profile("tiny", self.path)["threads"], 1)
+
+        profile = autotune.load_profile("tiny", self.path)
+        self.assertEqual((profile["compute_type"], profile["batch_size"], profile["threads"]), ("int8", 8, 4))
+        self.assertEqual(autotune.load_profile("medium", self.path)["compute_type"], "float32")
+        self.assertIsNone(autotune.load_profile("large-v2", self.path))
+
+    def test_failed_save_keeps_old_profiles(self):
+        """Test a profile that can't be written leaves the saved profiles and no temp file behind"""
+        autotune.save_profile("tiny", {"compute_type": "int8", "batch_size": 8, "threads": 4}, self.path)
+        with self.assertRaises(TypeError):
+            autotune.save_profile("medium", {"compute_type": object()}, self.path)
+        self.assertEqual(autotune.load_profile("tiny", self.path)["compute_type"], "int8")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["cpu-profiles.json"])
+
+    def test_other_versions_ignored(self):
+        """Test profiles from another layout version or a corrupt file are ignored"""
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as f:
+            json.dump({"version": autotune.PROFILE_VERSION + 1,
+                       "profiles": {f"{autotune.host_key()}/tiny": {"compute_type": "int8"}}}, f)
+        self.assertIsNone(autotune.load_profile("tiny", self.path))
+        with open(self.path, "w") as f:
+            f.write("{not json")
+        self.assertIsNone(autotune.load_profile("tiny", self.path))
+
+    def test_env_path(self):
+        """Test the profile location can be moved with an environment variable"""
+        with mock.patch.dict(os.environ, {autotune.PROFILES_ENV: self.path}):
+            self.assertEqual(autotune.default_profiles_path(), self.path)
+
+    def test_default_thread_counts(self):
+        """Test candidate thread counts stay within the core count"""
+        self.assertEqual(autotune.default_thread_counts(8), [2, 4, 8])
+        self.assertEqual(autotune.default_thread_counts(1), [1])
+
+
+class TestApplyProfile(unittest.TestCase):
+
+    profile = {"compute_type": "int8", "batch_size": 8, "threads": 4}
+
+    def test_fills_unset(self):
+        """Test a profile fills only the settings that weren't given"""
+        self.assertEqual(apply_cpu_profile("cpu", None, None, None, self.profile), ("int8", 8, 4))
+        self.assertEqual(apply_cpu_profile("cpu", "float32", None, 2, self.profile), ("float32", 8, 2))
+
+    def test_cpu_only(self):
+        """Test profiles are ignored on GPU and when there is none"""
+        self.assertEqual(apply_cpu_profile("cuda", None, None, None, self.profile), (None, None, None))
+        self.assertEqual(apply_cpu_profile("cpu", None, None, None, None), (None, None, None))
+
+    def test_concurrent_keeps_threads(self):
+        """Test the tuned thread count isn't used when diarization shares the cores"""
+        self.assertEqual(apply_cpu_profile("cpu", None, None, None, self.profile, concurrent=True), ("int8", 8, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import tempfile
+import shutil
+from diarized_transcriber.batch import (collect_audio_paths, estimate_durations, longest_first, output_base_filename,
+                                        run_batch, run_batch_parallel, split_cores, summarize_batch)
+
+
+def process_in_worker(path):
+    """Module-level so worker processes can unpickle it"""
+    if path == "bad.wav":
+        raise RuntimeError("decode failed")
+    return {"threads": os.environ.get("OMP_NUM_THREADS"), "pid": os.getpid()}
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        """Create a directory with a few empty audio files"""
+        self.tmpdir = tempfile.mkdtemp()
+        for name in ["a.wav", "b.wav", "c.mp3"]:
+            open(os.path.join(self.tmpdir, name), "w").close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_collect_expands_globs_and_deduplicates(self):
+        """Test glob expansion keeps order and drops repeated files"""
+        first = os.path.join(self.tmpdir, "b.wav")
+        pattern = os.path.join(self.tmpdir, "*.wav")
+        paths = collect_audio_paths([first, pattern])
+        self.assertEqual([os.path.basename(p) for p in paths], ["b.wav", "a.wav"])
+
+    def test_collect_reads_manifest(self):
+        """Test manifest entries are resolved relative to the manifest"""
+        manifest = os.path.join(self.tmpdir, "episodes.txt")
+        with open(manifest, "w") as f:
+            f.write("# weekly episodes\n\nc.mp3\n*.wav\n")
+        paths = collect_audio_paths([], manifest)
+        self.assertEqual([os.path.basename(p) for p in paths], ["c.mp3", "a.wav", "b.wav"])
+
+    def test_output_base_filename_unique(self):
+        """Test files sharing a name in different folders get distinct outputs"""
+        used = set()
+        self.assertEqual(output_base_filename("x/show.wav", used), "show-transcript")
+        self.assertEqual(output_base_filename("y/show.mp3", used), "show-transcript-2")
+
+    def test_failure_does_not_abort_batch(self):
+        """Test a failing file is recorded and the rest still run"""
+        def process_file(path):
+            if path == "bad.wav":
+                raise RuntimeError("decode failed")
+            return {"segments": 3}
+
+        records = run_batch(["one.wav", "bad.wav", "two.wav"], process_file)
+        self.assertEqual([r["status"] for r in records], ["ok", "failed", "ok"])
+        self.assertIn("decode failed", records[1]["error"])
+
+        summary = summarize_batch(records)
+        self.assertEqual(summary["succeeded"], 2)
+        self.assertEqual(summary["failed"], 1)
+
+
+    def test_longest_first(self):
+        """Test files are ordered by descending duration"""
+        durations = {"short.wav": 60.0, "long.wav": 3600.0, "mid.wav": 900.0}
+        self.assertEqual(longest_first(["short.wav", "long.wav", "mid.wav"], durations),
+                         ["long.wav", "mid.wav", "short.wav"])
+
+    def test_durations_fall_back_to_size(self):
+        """Test files ffprobe can't read are ordered by size instead"""
+        big = os.path.join(self.tmpdir, "big.wav")
+        with open(big, "wb") as f:
+            f.write(b"\0" * 1000)
+        small = os.path.join(self.tmpdir, "a.wav")
+        self.assertEqual(estimate_durations([small, big]), {small: 0.0, big: 1000.0})
+
+    def test_split_cores(self):
+        """Test each worker gets an even share of the cores and at least one"""
+        self.assertEqual(split_cores(4, total=64), 16)
+        self.assertEqual(split_cores(3, total=64), 21)
+        self.assertEqual(split_cores(8, total=4), 1)
+
+    def test_parallel_batch(self):
+        """Test worker processes honour the thread budget and failures land in the report in input order"""
+        finished = []
+        paths = ["one.wav", "bad.wav", "two.wav", "three.wav"]
+        records = run_batch_parallel(paths, process_in_worker, jobs=2, threads_per_job=3,
+                                     durations={"two.wav": 10.0}, on_record=finished.append)
+        self.assertEqual([r["audio_path"] for r in records], paths)
+        self.assertEqual([r["status"] for r in records], ["ok", "failed", "ok", "ok"])
+        self.assertIn("decode failed", records[1]["error"])
+        self.assertEqual({r["threads"] for r in records if r["status"] == "ok"}, {"3"})
+        self.assertNotIn(os.getpid(), {r["worker"] for r in records})
+        self.assertEqual(sorted(r["audio_path"] for r in finished), sorted(paths))
+
+        summary = summarize_batch(records, wall_time=1.5)
+        self.assertEqual(summary["failed"], 1)
+        self.assertEqual(summary["wall_time"], 1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
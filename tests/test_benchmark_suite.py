@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from suite import compare, run_suite
+from synthetic import synthetic_recording
+
+
+class TestSyntheticRecording(unittest.TestCase):
+
+    def test_shape(self):
+        """Test every stage's output covers the same segments and words fall inside their speaker's turn"""
+        recording = synthetic_recording(duration=600, num_speakers=3, turns_per_minute=12)
+        segments = recording.diarized["segments"]
+        self.assertEqual(len(segments), len(recording.transcribed["segments"]))
+        self.assertEqual(len(segments), len(recording.aligned["segments"]))
+        self.assertEqual({t["speaker"] for t in recording.turns}, {"SPEAKER_00", "SPEAKER_01", "SPEAKER_02"})
+        # Roughly the requested rate of speaker changes
+        self.assertGreater(len(recording.turns), 60)
+        self.assertLess(len(recording.turns), 200)
+        for seg in segments:
+            self.assertTrue(any(t["start"] <= seg["start"] and seg["end"] <= t["end"] and t["speaker"] == seg["speaker"]
+                                for t in recording.turns))
+
+    def test_deterministic(self):
+        """Test the same seed gives the same recording so baselines stay comparable"""
+        self.assertEqual(synthetic_recording(120), synthetic_recording(120))
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+
+    def test_run_selected(self):
+        """Test --only picks whole groups and single benchmarks"""
+        run = run_suite(duration=120, repeat=1, only=["export.txt", "transcript"])
+        self.assertEqual(sorted(run["results"]), ["export.txt", "transcript.assign_speakers", "transcript.from_result",
+                                                  "transcript.load_dtr", "transcript.save_dtr", "transcript.to_result"])
+        self.assertEqual(run["config"]["duration"], 120)
+        for measurement in run["results"].values():
+            self.assertGreater(measurement["seconds"], 0)
+            self.assertGreaterEqual(measurement["peak_mb"], 0)
+
+    def test_compare(self):
+        """Test regressions past the threshold are reported and noise below the floors is not"""
+        baseline = {"a": {"seconds": 1.0, "peak_mb": 100.0}, "b": {"seconds": 0.001, "peak_mb": 0.1},
+                    "gone": {"seconds": 1.0, "peak_mb": 1.0}}
+        results = {"a": {"seconds": 1.3, "peak_mb": 110.0}, "b": {"seconds": 0.005, "peak_mb": 0.5},
+                   "new": {"seconds": 9.0, "peak_mb": 9.0}}
+        regressions = compare(results, baseline, threshold=0.25)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("a seconds"))
+        self.assertEqual(compare(results, baseline, threshold=0.5), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
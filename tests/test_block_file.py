@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+import unittest
+import json
+import os
+import shutil
+import struct
+import tempfile
+from unittest.mock import patch
+
+import numpy as np
+
+from diarized_transcriber.block_file import ALIGNMENT, read_blocks, write_blocks
+
+MAGIC = b"TESTBLKS"
+
+
+class TestBlockFile(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "data.bin")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_round_trip(self):
+        """Test arrays of several dtypes, the text and extra header keys come back, mapped or read"""
+        arrays = {"small": np.arange(3, dtype="<i4"), "floats": np.linspace(0, 1, 5).astype("<f8"),
+                  "empty": np.empty(0, dtype="<i8"), "terms": np.array([b"a", b"bcd"], dtype="S3")}
+        write_blocks(self.path, MAGIC, 2, {"name": "test"}, arrays, "héllo".encode("utf-8"))
+        for use_mmap in (True, False):
+            header, loaded, text = read_blocks(self.path, MAGIC, 2, "test file", use_mmap=use_mmap)
+            self.assertEqual(header["name"], "test")
+            self.assertEqual(str(text, "utf-8"), "héllo")
+            for name, array in arrays.items():
+                np.testing.assert_array_equal(loaded[name], array)
+        # Every array starts on an aligned address of the mapping
+        self.assertEqual(loaded["floats"].ctypes.data % 8, 0)
+        self.assertFalse(read_blocks(self.path, MAGIC, 2, "test file").arrays["floats"].flags.writeable)
+
+    def test_rejects_other_files(self):
+        """Test a wrong magic, another version or a short file raise ValueError naming the kind"""
+        write_blocks(self.path, MAGIC, 1, {}, {})
+        with self.assertRaisesRegex(ValueError, "not a test file"):
+            read_blocks(self.path, b"OTHERMAG", 1, "test file")
+        with self.assertRaisesRegex(ValueError, "test file version 1; this version reads 2"):
+            read_blocks(self.path, MAGIC, 2, "test file")
+        with open(self.path, "wb") as f:
+            f.write(b"{}")
+        with self.assertRaisesRegex(ValueError, "not a test file"):
+            read_blocks(self.path, MAGIC, 1, "test file")
+
+    def test_failed_write_leaves_nothing(self):
+        """Test a write that fails part-way keeps the old file and leaves no temp file behind"""
+        write_blocks(self.path, MAGIC, 1, {"generation": 1}, {"a": np.arange(4)})
+        with patch("diarized_transcriber.files.os.replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                write_blocks(self.path, MAGIC, 1, {"generation": 2}, {"a": np.arange(8)})
+        with self.assertRaises(TypeError):
+            write_blocks(self.path, MAGIC, 1, {"generation": object()}, {})
+        self.assertEqual(os.listdir(self.temp_dir), ["data.bin"])
+        self.assertEqual(read_blocks(self.path, MAGIC, 1, "test file").header["generation"], 1)
+
+    def test_default_layout(self):
+        """Test files whose header doesn't record the layout are read with the one given"""
+        header = json.dumps({"rows": 2}).encode("utf-8")
+        header += b" " * (-(16 + len(header)) % ALIGNMENT)
+        with open(self.path, "wb") as f:
+            f.write(struct.pack("<8sII", MAGIC, 1, len(header)) + header)
+            f.write(np.array([7, 9], dtype="<i4").tobytes())
+        _, arrays, _ = read_blocks(self.path, MAGIC, 1, "test file", default_layout=lambda header: {
+            "values": {"offset": 0, "dtype": "<i4", "count": header["rows"]}})
+        self.assertEqual(arrays["values"].tolist(), [7, 9])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import shutil
+import tempfile
+from diarized_transcriber.checkpoint import StageCheckpoint, checkpoint_dir_for
+
+
+class TestStageCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.checkpoint_dir = os.path.join(self.tmpdir, "episode")
+        self.settings = {"model": "medium", "language": "auto", "diarization": True, "num_speakers": 2}
+        self.transcript = {"segments": [{"start": 0.0, "end": 1.5, "text": "Hello"}], "language": "en"}
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def checkpoint(self, digest="abc", resume=True, **overrides):
+        return StageCheckpoint(self.checkpoint_dir, digest, dict(self.settings, **overrides), resume=resume)
+
+    def test_directory_per_audio_content(self):
+        """Test same-named recordings in different folders get separate checkpoint directories"""
+        first = checkpoint_dir_for(self.tmpdir, "a/talk.wav", "1f" * 32)
+        second = checkpoint_dir_for(self.tmpdir, "b/talk.wav", "2e" * 32)
+        self.assertNotEqual(first, second)
+        self.assertTrue(os.path.basename(first).startswith("talk-"))
+        self.assertEqual(first, checkpoint_dir_for(self.tmpdir, "moved/talk.wav", "1f" * 32))
+
+    def test_resume_loads_completed_stages(self):
+        """Test saved stages come back on resume"""
+        first = self.checkpoint(resume=False)
+        first.save("transcribe", self.transcript)
+        first.save("align", self.transcript)
+
+        resumed = self.checkpoint()
+        self.assertEqual(resumed.completed_stages(), ["transcribe", "align"])
+        self.assertEqual(resumed.load("align"), self.transcript)
+        self.assertIsNone(resumed.load("assign"))
+
+    def test_without_resume_nothing_is_reused(self):
+        """Test a fresh run ignores an existing checkpoint"""
+        self.checkpoint(resume=False).save("transcribe", self.transcript)
+        self.assertEqual(self.checkpoint(resume=False).completed_stages(), [])
+
+    def test_changed_audio_discards_checkpoint(self):
+        """Test a different audio digest reuses nothing"""
+        self.checkpoint(resume=False).save("transcribe", self.transcript)
+        resumed = self.checkpoint(digest="other")
+        self.assertEqual(resumed.completed_stages(), [])
+        self.assertIn("audio", resumed.discarded_reason)
+
+    def test_changed_settings_only_invalidate_dependent_stages(self):
+        """Test a new speaker count keeps the transcript but redoes speaker assignment"""
+        first = self.checkpoint(resume=False)
+        first.save("transcribe", self.transcript)
+        first.save("align", self.transcript)
+        first.save("assign", self.transcript)
+
+        self.assertEqual(self.checkpoint(num_speakers=3).completed_stages(), ["transcribe", "align"])
+        self.assertEqual(self.checkpoint(model="large-v3").completed_stages(), [])
+
+    def test_multilingual_invalidates_transcript(self):
+        """Test switching --multilingual on or changing --languages redoes the transcript"""
+        first = self.checkpoint(resume=False)
+        for stage in ("transcribe", "align", "assign"):
+            first.save(stage, self.transcript)
+        self.assertEqual(self.checkpoint(segment_languages="auto").completed_stages(), [])
+
+        self.checkpoint(resume=False, segment_languages=["en", "es"]).save("transcribe", self.transcript)
+        self.assertEqual(self.checkpoint(segment_languages=["en", "es"]).completed_stages(), ["transcribe"])
+        self.assertEqual(self.checkpoint(segment_languages=["en", "fr"]).completed_stages(), [])
+        self.assertEqual(self.checkpoint().completed_stages(), [])
+
+    def test_resaving_a_stage_drops_later_ones(self):
+        """Test later stages are invalidated when an earlier stage is redone"""
+        first = self.checkpoint(resume=False)
+        for stage in ("transcribe", "align", "assign"):
+            first.save(stage, self.transcript)
+        first.save("align", self.transcript)
+        self.assertEqual(self.checkpoint().completed_stages(), ["transcribe", "align"])
+
+    def test_diarization_round_trip(self):
+        """Test speaker turns survive as a DataFrame with the columns assignment needs"""
+        import pandas as pd
+        turns = pd.DataFrame([{"start": 0.0, "end": 1.0, "speaker": "SPEAKER_00", "segment": object()}])
+        self.checkpoint(resume=False).save("diarize", turns)
+        loaded = self.checkpoint().load("diarize")
+        self.assertEqual(list(loaded["speaker"]), ["SPEAKER_00"])
+        self.assertEqual(list(loaded["end"]), [1.0])
+
+    def test_clear(self):
+        checkpoint = self.checkpoint(resume=False)
+        checkpoint.save("transcribe", self.transcript)
+        checkpoint.clear()
+        self.assertFalse(os.path.exists(self.checkpoint_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
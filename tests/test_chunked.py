@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+
+import unittest
+import numpy as np
+from unittest.mock import patch, MagicMock
+from diarized_transcriber.chunked import (
+    plan_windows, choose_cut, stitch, offset_result, SpeakerLinker, run_chunked_transcription
+)
+from diarized_transcriber.model_pool import ModelPool
+
+
+def make_words(words, start, step=1.0, speaker=None):
+    """Consecutive 0.8s words starting at start, one every step seconds"""
+    out = []
+    for i, text in enumerate(words):
+        word = {"word": text, "start": start + i * step, "end": start + i * step + 0.8}
+        if speaker:
+            word["speaker"] = speaker
+        out.append(word)
+    return out
+
+
+def make_segment(words):
+    return {"start": words[0]["start"], "end": words[-1]["end"],
+            "text": " ".join(w["word"] for w in words), "words": words}
+
+
+class TestChunkPlanning(unittest.TestCase):
+
+    def test_plan_windows_cover_duration_with_overlap(self):
+        """Test windows are bounded, overlap and reach the end"""
+        windows = plan_windows(250, chunk_seconds=100, overlap_seconds=10)
+        self.assertEqual(windows, [(0.0, 100), (90, 190), (180, 250)])
+        self.assertEqual(plan_windows(50, chunk_seconds=100, overlap_seconds=10), [(0.0, 50)])
+        with self.assertRaises(ValueError):
+            plan_windows(100, chunk_seconds=10, overlap_seconds=10)
+
+    def test_offset_result(self):
+        result = {"segments": [make_segment(make_words(["a", "b"], 1.0))]}
+        offset_result(result, 100)
+        self.assertEqual(result["segments"][0]["start"], 101.0)
+        self.assertEqual(result["segments"][0]["words"][1]["start"], 102.0)
+
+    def test_choose_cut_lands_in_longest_pause(self):
+        """Test the seam goes in the silence rather than through a word"""
+        words = make_words(["one", "two", "three"], 100) + make_words(["four", "five"], 110)
+        cut = choose_cut([make_segment(words)], 98, 118)
+        self.assertGreater(cut, words[2]["end"])
+        self.assertLess(cut, words[3]["start"])
+
+
+class TestStitch(unittest.TestCase):
+
+    def test_overlap_is_neither_duplicated_nor_dropped(self):
+        """Test words heard by both chunks appear exactly once"""
+        script = [f"w{i}" for i in range(30)]
+        # Chunk A covers words 0-19, chunk B (overlapping) covers words 12-29, both at 1 word per second
+        chunk_a = [make_segment(make_words(script[:10], 0)), make_segment(make_words(script[10:20], 10))]
+        chunk_b = [make_segment(make_words(script[12:16], 12)), make_segment(make_words(script[16:30], 16))]
+
+        cut = choose_cut(chunk_a, 12, 20)
+        stitched = stitch(chunk_a, chunk_b, cut)
+        words = [w["word"] for seg in stitched for w in seg["words"]]
+        self.assertEqual(words, script)
+        for seg in stitched:
+            self.assertEqual(seg["text"], " ".join(w["word"] for w in seg["words"]))
+        starts = [seg["start"] for seg in stitched]
+        self.assertEqual(starts, sorted(starts))
+
+    def test_segments_without_words_use_segment_start(self):
+        earlier = [{"start": 0.0, "end": 4.0, "text": "kept"}, {"start": 9.0, "end": 11.0, "text": "dropped"}]
+        later = [{"start": 9.0, "end": 11.0, "text": "replacement"}]
+        stitched = stitch(earlier, later, cut=8.0)
+        self.assertEqual([s["text"] for s in stitched], ["kept", "replacement"])
+
+    def test_segments_without_words_across_the_cut(self):
+        """Test a word-less segment both chunks heard, placed either side of the cut, appears once"""
+        earlier = [{"start": 0.0, "end": 4.0, "text": "kept"}, {"start": 7.9, "end": 10.0, "text": "hello there"}]
+        later = [{"start": 8.1, "end": 10.1, "text": "hello there"}, {"start": 11.0, "end": 12.0, "text": "next"}]
+        stitched = stitch(earlier, later, cut=8.0)
+        self.assertEqual([(s["start"], s["text"]) for s in stitched],
+                         [(0.0, "kept"), (7.9, "hello there"), (11.0, "next")])
+
+        # When the later chunk aligned the words, its copy wins
+        aligned = [make_segment(make_words(["hello", "there"], 8.2))]
+        stitched = stitch(earlier, aligned, cut=8.0)
+        self.assertEqual([s["text"] for s in stitched], ["kept", "hello there"])
+        self.assertEqual(stitched[1]["words"][0]["start"], 8.2)
+
+
+class TestSpeakerLinker(unittest.TestCase):
+
+    def test_labels_follow_overlap(self):
+        """Test swapped local labels in the next chunk map back to the same speakers"""
+        linker = SpeakerLinker()
+        first = linker.link([(0, 95, "SPEAKER_00"), (95, 100, "SPEAKER_01")])
+        self.assertEqual(first, {"SPEAKER_00": "SPEAKER_00", "SPEAKER_01": "SPEAKER_01"})
+
+        # In chunk two the diarizer happened to number the speakers the other way round
+        second = linker.link([(90, 95, "SPEAKER_01"), (95, 150, "SPEAKER_00")], overlap=(90, 100))
+        self.assertEqual(second["SPEAKER_00"], "SPEAKER_01")
+        self.assertEqual(second["SPEAKER_01"], "SPEAKER_00")
+
+    def test_embeddings_link_speakers_absent_from_overlap(self):
+        """Test a voice returning after a gap is matched by embedding similarity"""
+        linker = SpeakerLinker()
+        linker.link([(0, 10, "A"), (10, 20, "B")], embeddings={"A": [1.0, 0.0], "B": [0.0, 1.0]})
+        mapping = linker.link([(25, 30, "X"), (30, 40, "Y")], overlap=(20, 25),
+                              embeddings={"X": [0.1, 0.99], "Y": [-1.0, 0.0]})
+        self.assertEqual(mapping["X"], "SPEAKER_01")
+        self.assertEqual(mapping["Y"], "SPEAKER_02")
+
+
+class TestChunkedPipeline(unittest.TestCase):
+
+    @patch('torch.cuda.is_available', return_value=False)
+    @patch('diarized_transcriber.chunked.probe_duration', return_value=250.0)
+    @patch('diarized_transcriber.chunked.load_audio_window')
+    @patch('whisperx.load_model')
+    @patch('whisperx.load_align_model')
+    @patch('whisperx.align')
+    def test_windows_decoded_separately_and_stitched(self, mock_align, mock_load_align, mock_load_model,
+                                                     mock_load_window, mock_probe, mock_cuda):
+        """Test each window is decoded on its own and the transcript has every word once"""
+        script = [f"w{i}" for i in range(250)]
+        windows = []
+
+        def load_window(path, start, duration):
+            windows.append((start, duration))
+            return np.zeros(int(duration * 10), dtype=np.float32)
+
+        def align(segments, model, metadata, audio, device):
+            # One word per second of the window's audio, in window-relative time
+            start = windows[-1][0]
+            count = int(windows[-1][1])
+            words = make_words(script[int(start):int(start) + count], 0)
+            return {"segments": [make_segment(words[i:i + 10]) for i in range(0, len(words), 10)]}
+
+        mock_load_window.side_effect = load_window
+        mock_model = MagicMock()
+        mock_model.transcribe.return_value = {"segments": [], "language": "en"}
+        mock_load_model.return_value = mock_model
+        mock_load_align.return_value = (MagicMock(), {})
+        mock_align.side_effect = align
+
+        result = run_chunked_transcription("long.wav", ".", model_size="base", skip_diarization=True, quiet=True,
+                                           pool=ModelPool(), chunk_seconds=100, overlap_seconds=20)
+
+        self.assertEqual(len(windows), 3)
+        self.assertTrue(all(duration <= 100 for _, duration in windows))
+        mock_load_model.assert_called_once()
+        words = [w["word"] for seg in result["segments"] for w in seg["words"]]
+        self.assertEqual(words, script)
+        self.assertEqual(result["language"], "en")
+
+    @patch('torch.cuda.is_available', return_value=False)
+    @patch('diarized_transcriber.chunked.probe_duration', return_value=250.0)
+    @patch('diarized_transcriber.chunked.load_audio_window')
+    @patch('whisperx.load_model')
+    @patch('whisperx.load_align_model')
+    @patch('whisperx.align')
+    def test_segments_delivered_as_windows_settle(self, mock_align, mock_load_align, mock_load_model,
+                                                  mock_load_window, mock_probe, mock_cuda):
+        """Test on_segment gets every final segment once, before later windows are decoded"""
+        script = [f"w{i}" for i in range(250)]
+        windows = []
+        delivered = []
+
+        def load_window(path, start, duration):
+            windows.append((start, duration))
+            return np.zeros(int(duration * 10), dtype=np.float32)
+
+        def align(segments, model, metadata, audio, device):
+            start = windows[-1][0]
+            count = int(windows[-1][1])
+            words = make_words(script[int(start):int(start) + count], 0)
+            return {"segments": [make_segment(words[i:i + 10]) for i in range(0, len(words), 10)]}
+
+        mock_load_window.side_effect = load_window
+        mock_model = MagicMock()
+        mock_model.transcribe.return_value = {"segments": [], "language": "en"}
+        mock_load_model.return_value = mock_model
+        mock_load_align.return_value = (MagicMock(), {})
+        mock_align.side_effect = align
+
+        result = run_chunked_transcription("long.wav", ".", model_size="base", skip_diarization=True, quiet=True,
+                                           pool=ModelPool(), chunk_seconds=100, overlap_seconds=20,
+                                           on_segment=lambda seg: delivered.append((len(windows), seg)))
+
+        self.assertEqual([seg for _, seg in delivered], result["segments"])
+        # Everything before the second window's start was written after the first window
+        first_window = [seg for decoded, seg in delivered if decoded == 1]
+        self.assertTrue(first_window)
+        self.assertTrue(all(seg["end"] <= 80 for seg in first_window))
+
+    @patch('torch.cuda.is_available', return_value=False)
+    @patch('diarized_transcriber.chunked.probe_duration', return_value=50.0)
+    @patch('diarized_transcriber.chunked.load_audio_window', return_value=np.zeros(500, dtype=np.float32))
+    @patch('whisperx.load_model')
+    @patch('whisperx.load_align_model', return_value=(MagicMock(), {}))
+    @patch('whisperx.align', return_value={"segments": []})
+    @patch('diarized_transcriber.speaker_index.identify_speakers', return_value={})
+    def test_zero_match_threshold_is_kept(self, mock_identify, mock_align, mock_load_align, mock_load_model,
+                                          mock_load_window, mock_probe, mock_cuda):
+        """Test an explicit match threshold of 0 reaches speaker identification instead of the default"""
+        mock_load_model.return_value.transcribe.return_value = {"segments": [], "language": "en"}
+        speaker_index = MagicMock()
+        run_chunked_transcription("long.wav", ".", model_size="base", skip_diarization=True, quiet=True,
+                                  pool=ModelPool(), chunk_seconds=100, overlap_seconds=20,
+                                  speaker_index=speaker_index, match_threshold=0)
+        mock_identify.assert_called_once()
+        self.assertEqual(mock_identify.call_args.args[1:], (speaker_index, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+import unittest
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Importing the CLI used to take seconds because of torch and whisperx; it
+# now needs only the standard library and python-dotenv
+IMPORT_BUDGET_SECONDS = 0.5
+
+HEAVY_MODULES = ["torch", "whisperx", "pyannote", "fpdf", "rich", "numpy", "pandas"]
+
+
+def run_python(code, *args):
+    env = dict(os.environ, PYTHONPATH=PROJECT_ROOT)
+    return subprocess.run([sys.executable, "-c", code, *args], capture_output=True, text=True, env=env,
+                          cwd=PROJECT_ROOT, timeout=120)
+
+
+class TestCliStartup(unittest.TestCase):
+
+    def test_import_is_light(self):
+        """Test importing the CLI stays within budget and loads no heavy dependency"""
+        code = (
+            "import json, sys, time\n"
+            "start = time.perf_counter()\n"
+            "import diarized_transcriber.cli\n"
+            "elapsed = time.perf_counter() - start\n"
+            f"print(json.dumps({{'elapsed': elapsed, 'loaded': [m for m in {HEAVY_MODULES!r} if m in sys.modules],"
+            " 'stderr_intact': sys.stderr is sys.__stderr__}))\n"
+        )
+        completed = run_python(code)
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        report = json.loads(completed.stdout)
+        self.assertEqual(report["loaded"], [])
+        self.assertTrue(report["stderr_intact"])
+        self.assertLess(report["elapsed"], IMPORT_BUDGET_SECONDS)
+
+    def test_argument_errors_reach_stderr(self):
+        """Test argparse errors are shown rather than swallowed by the stderr suppression"""
+        completed = run_python("import sys; from diarized_transcriber.cli import main; sys.argv[0] = 'transcribe'; main()",
+                               "--no-such-flag")
+        self.assertEqual(completed.returncode, 2)
+        self.assertIn("unrecognized arguments: --no-such-flag", completed.stderr)
+
+    def test_export_imports_requested_exporters_only(self):
+        """Test exporting markdown doesn't load the PDF library"""
+        with tempfile.TemporaryDirectory() as output_dir:
+            code = (
+                "import sys\n"
+                "from diarized_transcriber.export import export_transcript\n"
+                "result = {'segments': [{'start': 0.0, 'end': 1.0, 'text': 'Hi', 'speaker': 'SPEAKER_00'}]}\n"
+                "export_transcript(result, sys.argv[1], 'talk', ['md'])\n"
+                "print('fpdf' in sys.modules)\n"
+            )
+            completed = run_python(code, output_dir)
+            self.assertEqual(completed.returncode, 0, completed.stderr)
+            self.assertEqual(completed.stdout.strip(), "False")
+            self.assertTrue(os.path.exists(os.path.join(output_dir, "talk.md")))
+
+
+if __name__ == '__main__':
+    unittest.main()
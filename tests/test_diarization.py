@@ -4,7 +4,11 @@ import unittest
 import os
 import tempfile
 from unittest.mock import patch, MagicMock
-from diarized_transcriber.diarization import run_transcribe_with_diarization
+import numpy as np
+from diarized_transcriber.diarization import (align_by_language, detect_languages, run_transcribe_with_diarization,
+                                               transcribe_batched, transcribe_files)
+from diarized_transcriber.model_pool import ModelPool, get_default_pool
+from diarized_transcriber.checkpoint import StageCheckpoint
 
 
 class TestDiarization(unittest.TestCase):
@@ -13,6 +17,8 @@ class TestDiarization(unittest.TestCase):
         """Set up test fixtures"""
         self.test_audio_path = "test_audio.wav"
         self.test_output_dir = tempfile.mkdtemp()
+        # Each test loads its own mocked models
+        get_default_pool().clear()
         
     def tearDown(self):
         """Clean up test fixtures"""
@@ -20,13 +26,14 @@ class TestDiarization(unittest.TestCase):
         shutil.rmtree(self.test_output_dir)
     
     @patch('torch.cuda.is_available')
+    @patch('whisperx.load_audio')
     @patch('whisperx.load_model')
     @patch('whisperx.load_align_model')
     @patch('whisperx.align')
     @patch('whisperx.diarize.DiarizationPipeline')
-    @patch('whisperx.diarize.assign_word_speakers')
+    @patch('diarized_transcriber.diarization.assign_word_speakers')
     def test_run_transcribe_with_diarization_full_pipeline(self, mock_assign_speakers, mock_diarize_pipeline, 
-                                                          mock_align, mock_load_align, mock_load_model, mock_cuda):
+                                                          mock_align, mock_load_align, mock_load_model, mock_load_audio, mock_cuda):
         """Test the full transcription and diarization pipeline"""
         # Mock CUDA availability
         mock_cuda.return_value = False
@@ -74,7 +81,8 @@ class TestDiarization(unittest.TestCase):
         
         # Verify the pipeline was called correctly
         mock_load_model.assert_called_once_with("medium", "cpu", compute_type="float32")
-        mock_model.transcribe.assert_called_once_with(self.test_audio_path)
+        mock_load_audio.assert_called_once_with(self.test_audio_path)
+        mock_model.transcribe.assert_called_once_with(mock_load_audio.return_value)
         mock_load_align.assert_called_once_with("en", "cpu")
         mock_align.assert_called_once()
         mock_diarize_pipeline.assert_called_once()
@@ -85,12 +93,18 @@ class TestDiarization(unittest.TestCase):
         self.assertIn('language', result)
         self.assertEqual(len(result['segments']), 1)
         self.assertEqual(result['segments'][0]['speaker'], 'SPEAKER_1')
+
+        # Every stage boundary is recorded in the returned metrics
+        stages = [s['stage'] for s in result['metrics']['stages']]
+        self.assertEqual(stages, ['decode', 'load_whisper_model', 'transcribe', 'load_align_model', 'align',
+                                  'load_diarize_model', 'diarize', 'assign'])
     
     @patch('torch.cuda.is_available')
+    @patch('whisperx.load_audio')
     @patch('whisperx.load_model')
     @patch('whisperx.load_align_model')
     @patch('whisperx.align')
-    def test_run_transcribe_skip_diarization(self, mock_align, mock_load_align, mock_load_model, mock_cuda):
+    def test_run_transcribe_skip_diarization(self, mock_align, mock_load_align, mock_load_model, mock_load_audio, mock_cuda):
         """Test transcription without diarization"""
         # Mock CUDA availability
         mock_cuda.return_value = False
@@ -129,13 +143,14 @@ class TestDiarization(unittest.TestCase):
         self.assertNotIn('speaker', result['segments'][0])
     
     @patch('torch.cuda.is_available')
+    @patch('whisperx.load_audio')
     @patch('whisperx.load_model')
     @patch('whisperx.load_align_model')
     @patch('whisperx.align')
     @patch('whisperx.diarize.DiarizationPipeline')
-    @patch('whisperx.diarize.assign_word_speakers')
+    @patch('diarized_transcriber.diarization.assign_word_speakers')
     def test_run_transcribe_no_huggingface_token(self, mock_assign_speakers, mock_diarize_pipeline, 
-                                                mock_align, mock_load_align, mock_load_model, mock_cuda):
+                                                mock_align, mock_load_align, mock_load_model, mock_load_audio, mock_cuda):
         """Test behavior when HUGGINGFACE_TOKEN is not set"""
         # Mock CUDA availability
         mock_cuda.return_value = False
@@ -181,7 +196,8 @@ class TestDiarization(unittest.TestCase):
         # Test CPU selection
         mock_cuda.return_value = False
         
-        with patch('whisperx.load_model') as mock_load_model, \
+        with patch('whisperx.load_audio'), \
+             patch('whisperx.load_model') as mock_load_model, \
              patch('whisperx.load_align_model') as mock_load_align, \
              patch('whisperx.align') as mock_align:
             
@@ -213,6 +229,507 @@ class TestDiarization(unittest.TestCase):
             mock_load_model.assert_called_once_with("large-v3", "cpu", compute_type="float32")
             mock_load_align.assert_called_once_with("en", "cpu")
 
+    @patch('torch.cuda.is_available')
+    @patch('whisperx.load_audio')
+    @patch('whisperx.load_model')
+    @patch('whisperx.load_align_model')
+    @patch('whisperx.align')
+    @patch('whisperx.diarize.DiarizationPipeline')
+    @patch('diarized_transcriber.diarization.assign_word_speakers')
+    def test_audio_decoded_once_and_shared(self, mock_assign_speakers, mock_diarize_pipeline,
+                                           mock_align, mock_load_align, mock_load_model, mock_load_audio, mock_cuda):
+        """Test that the audio is decoded once and the same buffer reaches every stage"""
+        mock_cuda.return_value = False
+        audio = MagicMock(name="waveform")
+        mock_load_audio.return_value = audio
+
+        mock_model = MagicMock()
+        mock_model.transcribe.return_value = {
+            'segments': [{'start': 0, 'end': 5, 'text': 'Hello world'}],
+            'language': 'en'
+        }
+        mock_load_model.return_value = mock_model
+        mock_load_align.return_value = (MagicMock(), {'language': 'en'})
+        mock_align.return_value = {'segments': [{'start': 0, 'end': 5, 'text': 'Hello world'}]}
+        mock_diarize_pipe = MagicMock()
+        mock_diarize_pipeline.return_value = mock_diarize_pipe
+        mock_assign_speakers.return_value = {'segments': []}
+
+        with patch.dict(os.environ, {'HUGGINGFACE_TOKEN': 'test_token'}):
+            run_transcribe_with_diarization(
+                self.test_audio_path,
+                self.test_output_dir,
+                num_speakers=2,
+                quiet=True
+            )
+
+        mock_load_audio.assert_called_once_with(self.test_audio_path)
+        self.assertIs(mock_model.transcribe.call_args[0][0], audio)
+        self.assertIs(mock_align.call_args[0][3], audio)
+        self.assertIs(mock_diarize_pipe.call_args[0][0], audio)
+
+    @patch('torch.cuda.is_available')
+    @patch('whisperx.load_audio')
+    @patch('whisperx.load_model')
+    @patch('whisperx.load_align_model')
+    @patch('whisperx.align')
+    def test_pool_reuses_models_across_files(self, mock_align, mock_load_align, mock_load_model, mock_load_audio, mock_cuda):
+        """Test that a shared pool loads each model once for several files"""
+        mock_cuda.return_value = False
+        mock_model = MagicMock()
+        mock_model.transcribe.return_value = {
+            'segments': [{'start': 0, 'end': 5, 'text': 'Hello world'}],
+            'language': 'en'
+        }
+        mock_load_model.return_value = mock_model
+        mock_load_align.return_value = (MagicMock(), {'language': 'en'})
+        mock_align.return_value = {'segments': [{'start': 0, 'end': 5, 'text': 'Hello world'}]}
+
+        pool = ModelPool()
+        for path in ["one.wav", "two.wav", "three.wav"]:
+            run_transcribe_with_diarization(path, self.test_output_dir, model_size="base",
+                                            skip_diarization=True, quiet=True, pool=pool)
+
+        mock_load_model.assert_called_once()
+        mock_load_align.assert_called_once()
+        self.assertEqual(mock_model.transcribe.call_count, 3)
+        self.assertEqual(mock_load_audio.call_count, 3)
+        self.assertEqual(pool.stats()["misses"], 2)
+        self.assertEqual(pool.stats()["hits"], 4)
+
+        # A different model size is a different pool entry
+        run_transcribe_with_diarization("four.wav", self.test_output_dir, model_size="large-v3",
+                                        skip_diarization=True, quiet=True, pool=pool)
+        self.assertEqual(mock_load_model.call_count, 2)
+
+    @patch('torch.cuda.is_available')
+    @patch('whisperx.load_audio')
+    @patch('whisperx.load_model')
+    @patch('whisperx.load_align_model')
+    @patch('whisperx.align')
+    @patch('whisperx.diarize.DiarizationPipeline')
+    @patch('diarized_transcriber.diarization.assign_word_speakers')
+    def test_resume_skips_completed_stages(self, mock_assign_speakers, mock_diarize_pipeline,
+                                           mock_align, mock_load_align, mock_load_model, mock_load_audio, mock_cuda):
+        """Test a failed run resumes from its checkpoint without redoing finished stages"""
+        import pandas as pd
+        mock_cuda.return_value = False
+        mock_model = MagicMock()
+        mock_model.transcribe.return_value = {
+            'segments': [{'start': 0, 'end': 5, 'text': 'Hello world'}],
+            'language': 'en'
+        }
+        mock_load_model.return_value = mock_model
+        mock_load_align.return_value = (MagicMock(), {'language': 'en'})
+        mock_align.return_value = {'segments': [{'start': 0, 'end': 5, 'text': 'Hello world'}]}
+        mock_diarize_pipe = MagicMock()
+        mock_diarize_pipe.return_value = pd.DataFrame([{'start': 0.0, 'end': 5.0, 'speaker': 'SPEAKER_00'}])
+        mock_diarize_pipeline.return_value = mock_diarize_pipe
+        mock_assign_speakers.side_effect = [RuntimeError("killed"), {
+            'segments': [{'start': 0, 'end': 5, 'text': 'Hello world', 'speaker': 'SPEAKER_00'}]
+        }]
+
+        checkpoint_dir = os.path.join(self.test_output_dir, "checkpoint")
+        settings = {"model": "base", "language": "auto", "diarization": True, "num_speakers": None}
+        with patch.dict(os.environ, {'HUGGINGFACE_TOKEN': 'test_token'}):
+            with self.assertRaises(RuntimeError):
+                run_transcribe_with_diarization(self.test_audio_path, self.test_output_dir, model_size="base",
+                                                quiet=True, pool=ModelPool(),
+                                                checkpoint=StageCheckpoint(checkpoint_dir, "digest", settings))
+            result = run_transcribe_with_diarization(self.test_audio_path, self.test_output_dir, model_size="base",
+                                                     quiet=True, pool=ModelPool(),
+                                                     checkpoint=StageCheckpoint(checkpoint_dir, "digest", settings, resume=True))
+
+        mock_load_model.assert_called_once()
+        mock_model.transcribe.assert_called_once()
+        mock_align.assert_called_once()
+        mock_diarize_pipe.assert_called_once()
+        self.assertEqual(mock_assign_speakers.call_count, 2)
+        resumed_turns = mock_assign_speakers.call_args[0][0]
+        self.assertEqual(list(resumed_turns['speaker']), ['SPEAKER_00'])
+        self.assertEqual(result['segments'][0]['speaker'], 'SPEAKER_00')
+
+    @patch('torch.cuda.is_available')
+    @patch('whisperx.load_audio')
+    @patch('whisperx.load_model')
+    def test_early_returns_report_metrics(self, mock_load_model, mock_load_audio, mock_cuda):
+        """Test results resumed from a finished checkpoint or reused from an earlier run still carry metrics"""
+        mock_cuda.return_value = False
+        checkpoint_dir = os.path.join(self.test_output_dir, "checkpoint")
+        settings = {"model": "base", "language": "auto", "diarization": True, "num_speakers": None}
+        checkpoint = StageCheckpoint(checkpoint_dir, "digest", settings)
+        segments = [{'start': 0, 'end': 5, 'text': 'Hello world', 'speaker': 'SPEAKER_00'}]
+        for stage in ("transcribe", "align", "assign"):
+            checkpoint.save(stage, {'segments': segments, 'language': 'en'})
+
+        with patch.dict(os.environ, {'HUGGINGFACE_TOKEN': 'test_token'}):
+            resumed = run_transcribe_with_diarization(
+                self.test_audio_path, self.test_output_dir, model_size="base", quiet=True, pool=ModelPool(),
+                checkpoint=StageCheckpoint(checkpoint_dir, "digest", settings, resume=True))
+        reused = run_transcribe_with_diarization(self.test_audio_path, self.test_output_dir, model_size="base",
+                                                 skip_diarization=True, quiet=True, pool=ModelPool(),
+                                                 aligned={'segments': segments, 'language': 'en'})
+
+        mock_load_model.assert_not_called()
+        mock_load_audio.assert_not_called()
+        self.assertEqual([s['stage'] for s in resumed['metrics']['stages']], ['assign'])
+        self.assertEqual([s['stage'] for s in reused['metrics']['stages']], ['align'])
+
+    @patch('torch.cuda.is_available')
+    @patch('whisperx.load_audio')
+    @patch('whisperx.load_model')
+    @patch('whisperx.load_align_model')
+    @patch('whisperx.align')
+    @patch('whisperx.diarize.DiarizationPipeline')
+    @patch('diarized_transcriber.diarization.assign_word_speakers')
+    def test_concurrent_branches_overlap(self, mock_assign_speakers, mock_diarize_pipeline,
+                                         mock_align, mock_load_align, mock_load_model, mock_load_audio, mock_cuda):
+        """Test diarization runs alongside transcription with per-branch thread budgets and timings"""
+        import threading
+        mock_cuda.return_value = False
+        diarization_started = threading.Event()
+
+        def transcribe(audio):
+            # Only returns once diarization is running in the other branch
+            self.assertTrue(diarization_started.wait(timeout=5))
+            return {'segments': [{'start': 0, 'end': 5, 'text': 'Hello world'}], 'language': 'en'}
+
+        def diarize(audio, **kwargs):
+            diarization_started.set()
+            return [{'start': 0, 'end': 5, 'speaker': 'SPEAKER_00'}]
+
+        mock_model = MagicMock()
+        mock_model.transcribe.side_effect = transcribe
+        mock_load_model.return_value = mock_model
+        mock_load_align.return_value = (MagicMock(), {'language': 'en'})
+        mock_align.return_value = {'segments': [{'start': 0, 'end': 5, 'text': 'Hello world'}]}
+        mock_diarize_pipeline.return_value = MagicMock(side_effect=diarize)
+        mock_assign_speakers.return_value = {
+            'segments': [{'start': 0, 'end': 5, 'text': 'Hello world', 'speaker': 'SPEAKER_00'}]
+        }
+
+        with patch.dict(os.environ, {'HUGGINGFACE_TOKEN': 'test_token'}):
+            result = run_transcribe_with_diarization(self.test_audio_path, self.test_output_dir, model_size="base",
+                                                     quiet=True, pool=ModelPool(), concurrent=True,
+                                                     asr_threads=3, diarize_threads=2)
+
+        mock_load_model.assert_called_once_with("base", "cpu", compute_type="float32", threads=3)
+        mock_assign_speakers.assert_called_once()
+        self.assertEqual(mock_assign_speakers.call_args[0][0][0]['speaker'], 'SPEAKER_00')
+        timings = result['branch_timings']
+        self.assertEqual(timings['asr_threads'], 3)
+        self.assertEqual(timings['diarize_threads'], 2)
+        for name in ('asr', 'diarization', 'wall', 'overlap_saved'):
+            self.assertIn(name, timings)
+
+
+    @patch('torch.cuda.is_available')
+    @patch('whisperx.load_audio')
+    @patch('whisperx.load_model')
+    @patch('whisperx.load_align_model')
+    @patch('whisperx.align')
+    def test_shared_transcription_skips_decode_and_asr(self, mock_align, mock_load_align, mock_load_model,
+                                                       mock_load_audio, mock_cuda):
+        """Test audio and a transcription from a shared batch replace the file's own decode and ASR"""
+        mock_cuda.return_value = False
+        mock_load_align.return_value = (MagicMock(), {'language': 'de'})
+        mock_align.return_value = {'segments': [{'start': 0, 'end': 5, 'text': 'Hallo'}]}
+        audio = np.zeros(16000 * 5, dtype=np.float32)
+        transcription = {'segments': [{'start': 0, 'end': 5, 'text': 'Hallo'}], 'language': 'de'}
+
+        result = run_transcribe_with_diarization(self.test_audio_path, self.test_output_dir, skip_diarization=True,
+                                                 quiet=True, pool=ModelPool(), audio=audio, transcription=transcription)
+
+        mock_load_audio.assert_not_called()
+        mock_load_model.assert_not_called()
+        mock_load_align.assert_called_once_with('de', 'cpu')
+        self.assertIs(mock_align.call_args[0][3], audio)
+        self.assertEqual(result['metrics']['audio_seconds'], 5.0)
+
+
+    @patch('torch.cuda.is_available')
+    @patch('whisperx.load_audio')
+    @patch('whisperx.load_model')
+    @patch('whisperx.load_align_model')
+    @patch('whisperx.align')
+    @patch('whisperx.diarize.DiarizationPipeline')
+    def test_enrolled_speakers_named(self, mock_diarize_pipeline, mock_align, mock_load_align, mock_load_model,
+                                     mock_load_audio, mock_cuda):
+        """Test voice embeddings are kept with the result and enrolled voices replace the diarizer's labels"""
+        import pandas as pd
+        from diarized_transcriber.speaker_index import SpeakerIndex
+
+        mock_cuda.return_value = False
+        mock_load_audio.return_value = np.zeros(16000 * 4, dtype=np.float32)
+        mock_model = MagicMock()
+        mock_model.transcribe.return_value = {'segments': [], 'language': 'en'}
+        mock_load_model.return_value = mock_model
+        mock_load_align.return_value = (MagicMock(), {'language': 'en'})
+        mock_align.return_value = {'segments': [
+            {'start': 0.0, 'end': 2.0, 'text': 'Hi', 'words': [{'word': 'Hi', 'start': 0.0, 'end': 2.0}]},
+            {'start': 2.0, 'end': 4.0, 'text': 'Hello', 'words': [{'word': 'Hello', 'start': 2.0, 'end': 4.0}]},
+        ]}
+        turns = pd.DataFrame([{'start': 0.0, 'end': 2.0, 'speaker': 'SPEAKER_00'},
+                              {'start': 2.0, 'end': 4.0, 'speaker': 'SPEAKER_01'}])
+        embeddings = {'SPEAKER_00': [1.0, 0.0, 0.0], 'SPEAKER_01': [0.0, 0.9, 0.1]}
+        mock_diarize_pipe = MagicMock(return_value=(turns, embeddings))
+        mock_diarize_pipeline.return_value = mock_diarize_pipe
+        index = SpeakerIndex()
+        index.add('Grace', [0.0, 1.0, 0.0])
+        checkpoint = StageCheckpoint(os.path.join(self.test_output_dir, 'ckpt'), 'digest', {'model': 'base'})
+
+        with patch.dict(os.environ, {'HUGGINGFACE_TOKEN': 'test_token'}):
+            result = run_transcribe_with_diarization(self.test_audio_path, self.test_output_dir, model_size="base",
+                                                     quiet=True, pool=ModelPool(), checkpoint=checkpoint,
+                                                     speaker_index=index)
+
+        self.assertTrue(mock_diarize_pipe.call_args[1]['return_embeddings'])
+        self.assertEqual([seg['speaker'] for seg in result['segments']], ['SPEAKER_00', 'Grace'])
+        self.assertEqual(sorted(result['speaker_embeddings']), ['Grace', 'SPEAKER_00'])
+        self.assertEqual(result['speaker_matches']['SPEAKER_01']['name'], 'Grace')
+        # The checkpoint keeps the diarizer's labels so a resumed run matches against the index afresh
+        saved = StageCheckpoint(os.path.join(self.test_output_dir, 'ckpt'), 'digest', {'model': 'base'},
+                                resume=True).load('assign')
+        self.assertEqual(saved['segments'][1]['speaker'], 'SPEAKER_01')
+        self.assertIn('SPEAKER_01', saved['speaker_embeddings'])
+
+    @patch('torch.cuda.is_available')
+    @patch('whisperx.load_audio')
+    @patch('whisperx.load_model')
+    @patch('whisperx.load_align_model')
+    @patch('whisperx.align')
+    @patch('whisperx.diarize.DiarizationPipeline')
+    @patch('diarized_transcriber.diarization.recluster')
+    def test_recluster_from_stored_artifacts(self, mock_recluster, mock_diarize_pipeline, mock_align, mock_load_align,
+                                             mock_load_model, mock_load_audio, mock_cuda):
+        """Test a re-run with an aligned transcript and stored artifacts neither decodes, transcribes nor diarizes"""
+        import pandas as pd
+        from diarized_transcriber.recluster import DiarizationArtifacts
+
+        mock_cuda.return_value = False
+        aligned = {'language': 'en', 'segments': [
+            {'start': 0.0, 'end': 2.0, 'text': 'Hi', 'words': [{'word': 'Hi', 'start': 0.0, 'end': 2.0}]},
+            {'start': 2.0, 'end': 4.0, 'text': 'Hello', 'words': [{'word': 'Hello', 'start': 2.0, 'end': 4.0}]},
+        ]}
+        artifacts = DiarizationArtifacts(np.zeros((2, 10, 3), dtype=np.float32), (0.0, 2.0, 2.0),
+                                         np.zeros((2, 3, 4), dtype=np.float32), 4.0)
+        turns = pd.DataFrame([{'start': 0.0, 'end': 2.0, 'speaker': 'SPEAKER_00'},
+                              {'start': 2.0, 'end': 4.0, 'speaker': 'SPEAKER_01'}])
+        mock_recluster.return_value = (turns, {'SPEAKER_00': [1.0], 'SPEAKER_01': [0.5]})
+        mock_diarize_pipe = MagicMock()
+        mock_diarize_pipeline.return_value = mock_diarize_pipe
+
+        with patch.dict(os.environ, {'HUGGINGFACE_TOKEN': 'test_token'}):
+            result = run_transcribe_with_diarization(self.test_audio_path, self.test_output_dir, model_size="base",
+                                                     num_speakers=2, quiet=True, pool=ModelPool(), aligned=aligned,
+                                                     artifacts=artifacts)
+
+        mock_load_audio.assert_not_called()
+        mock_load_model.assert_not_called()
+        mock_align.assert_not_called()
+        mock_diarize_pipe.assert_not_called()
+        self.assertIs(mock_recluster.call_args[0][1], artifacts)
+        self.assertEqual(mock_recluster.call_args[1]['num_speakers'], 2)
+        self.assertEqual([seg['speaker'] for seg in result['segments']], ['SPEAKER_00', 'SPEAKER_01'])
+        self.assertEqual(result['speaker_embeddings']['SPEAKER_01'], [0.5])
+        self.assertEqual(result['metrics']['audio_seconds'], 4.0)
+
+
+class FakeWhisperPipeline:
+    """Stands in for whisperx's FasterWhisperPipeline: decodes each segment to '<file>:<samples>'.
+
+    Each test file's audio is filled with its index, so the text shows which
+    file and how much of it every segment came from.
+    """
+
+    def __init__(self, languages, preset_language=None):
+        self.languages = languages
+        self.preset_language = preset_language
+        self._batch_size = None
+        self.tokenizer = None
+        self.batches = []
+
+    def detect_language(self, audio):
+        return self.languages[int(audio[0])]
+
+    def __call__(self, inputs, batch_size=None, num_workers=0):
+        inputs = list(inputs)
+        language = self.tokenizer.language_code
+        self.batches.append((language, [int(i["inputs"][0]) for i in inputs]))
+        for i in inputs:
+            yield {"text": f"{int(i['inputs'][0])}:{len(i['inputs'])}:{language}"}
+
+
+def use_fake_language(model, language):
+    model.tokenizer = MagicMock(language_code=language)
+
+
+@patch('diarized_transcriber.diarization.use_language', side_effect=use_fake_language)
+@patch('diarized_transcriber.diarization.vad_segments')
+class TestCrossFileBatching(unittest.TestCase):
+
+    def setUp(self):
+        self.audios = [np.full(16000 * 10, index, dtype=np.float32) for index in range(3)]
+
+    def test_segments_routed_back(self, mock_vad, mock_language):
+        """Test segments from several files share one pass and come back to their own file and times"""
+        mock_vad.side_effect = lambda model, audio, chunk_size: [{"start": 0.0, "end": 1.0 + audio[0]},
+                                                                 {"start": 5.0, "end": 7.5}]
+        model = FakeWhisperPipeline(["en", "en", "en"])
+
+        results = transcribe_batched(model, self.audios, batch_size=8)
+
+        self.assertEqual(model.batches, [("en", [0, 0, 1, 1, 2, 2])])
+        for index, result in enumerate(results):
+            self.assertEqual(result["language"], "en")
+            self.assertEqual([s["text"] for s in result["segments"]],
+                             [f"{index}:{16000 * (1 + index)}:en", f"{index}:{40000}:en"])
+            self.assertEqual([(s["start"], s["end"]) for s in result["segments"]], [(0.0, 1.0 + index), (5.0, 7.5)])
+        # Detected afresh next time, as model.transcribe does
+        self.assertIsNone(model.tokenizer)
+
+    def test_languages_batched_separately(self, mock_vad, mock_language):
+        """Test files in different languages never share a batch and files without speech come back empty"""
+        mock_vad.side_effect = lambda model, audio, chunk_size: [] if audio[0] == 2 else [{"start": 0.0, "end": 1.0}]
+        model = FakeWhisperPipeline(["en", "fr", "en"])
+
+        results = transcribe_batched(model, self.audios, batch_size=4)
+
+        self.assertEqual(model.batches, [("en", [0]), ("fr", [1])])
+        self.assertEqual([r["language"] for r in results], ["en", "fr", "en"])
+        self.assertEqual(results[1]["segments"][0]["text"], "1:16000:fr")
+        self.assertEqual(results[2]["segments"], [])
+
+    def test_preset_language(self, mock_vad, mock_language):
+        """Test a language fixed at load time skips detection"""
+        mock_vad.return_value = [{"start": 0.0, "end": 1.0}]
+        model = FakeWhisperPipeline(["en", "fr", "en"], preset_language="de")
+
+        results = transcribe_batched(model, self.audios, batch_size=4)
+
+        self.assertEqual(model.batches, [("de", [0, 1, 2])])
+        self.assertEqual({r["language"] for r in results}, {"de"})
+        self.assertIsNotNone(model.tokenizer)
+
+    @patch('torch.cuda.is_available', return_value=False)
+    @patch('whisperx.load_model')
+    @patch('whisperx.load_audio')
+    def test_transcribe_files(self, mock_load_audio, mock_load_model, mock_cuda, mock_vad, mock_language):
+        """Test files are decoded, batched with one model, and undecodable files left out"""
+        def load_audio(path):
+            if path == "broken.wav":
+                raise RuntimeError("ffmpeg failed")
+            return self.audios[int(path[0])]
+
+        mock_load_audio.side_effect = load_audio
+        mock_vad.return_value = [{"start": 0.0, "end": 1.0}]
+        model = FakeWhisperPipeline(["en", "en", "en"])
+        mock_load_model.return_value = model
+
+        shared = transcribe_files(["0.wav", "broken.wav", "2.wav"], "tiny", pool=ModelPool())
+
+        mock_load_model.assert_called_once_with("tiny", "cpu", compute_type="float32")
+        self.assertEqual(list(shared), ["0.wav", "2.wav"])
+        self.assertEqual(model.batches, [("en", [0, 2])])
+        audio, transcription = shared["2.wav"]
+        self.assertIs(audio, self.audios[2])
+        self.assertEqual(transcription["segments"][0]["text"], "2:16000:en")
+
+
+@patch('diarized_transcriber.diarization.use_language', side_effect=use_fake_language)
+@patch('diarized_transcriber.diarization.vad_segments')
+class TestMultilingual(unittest.TestCase):
+
+    def setUp(self):
+        self.audio = np.zeros(16000 * 10, dtype=np.float32)
+        # One-second clips are Spanish, the rest English
+        self.detect = lambda model, clips, batch_size, languages: ["es" if len(c) == 16000 else "en" for c in clips]
+
+    def test_language_per_segment(self, mock_vad, mock_language):
+        """Test each segment is decoded in its own language and the result comes back in time order"""
+        mock_vad.return_value = [{"start": 0.0, "end": 2.0}, {"start": 3.0, "end": 4.0}, {"start": 6.0, "end": 9.0}]
+        model = FakeWhisperPipeline(["en"])
+
+        with patch('diarized_transcriber.diarization.detect_languages', side_effect=self.detect) as mock_detect:
+            result = transcribe_batched(model, [self.audio], batch_size=4, multilingual=True, languages=["en", "es"])[0]
+
+        self.assertEqual(mock_detect.call_args[0][3], ["en", "es"])
+        self.assertEqual(model.batches, [("en", [0, 0]), ("es", [0])])
+        self.assertEqual([(s["start"], s["language"]) for s in result["segments"]], [(0.0, "en"), (3.0, "es"), (6.0, "en")])
+        self.assertEqual(result["segments"][1]["text"], "0:16000:es")
+        self.assertEqual(result["languages"], {"en": 5.0, "es": 1.0})
+        self.assertEqual(result["language"], "en")
+
+    def test_preset_language_wins(self, mock_vad, mock_language):
+        """Test a language fixed at load time turns per-segment detection off"""
+        mock_vad.return_value = [{"start": 0.0, "end": 1.0}]
+        model = FakeWhisperPipeline(["en"], preset_language="de")
+
+        with patch('diarized_transcriber.diarization.detect_languages') as mock_detect:
+            result = transcribe_batched(model, [self.audio], multilingual=True)[0]
+
+        mock_detect.assert_not_called()
+        self.assertEqual(result["language"], "de")
+        self.assertNotIn("language", result["segments"][0])
+
+    def test_detect_languages(self, mock_vad, mock_language):
+        """Test clips are detected in batches and restricted to the allowed languages"""
+        encoded = []
+
+        def encode(features):
+            encoded.append(features.shape)
+            return features
+
+        candidates = [("<|fr|>", 0.5), ("<|es|>", 0.3), ("<|en|>", 0.2)]
+        whisper = MagicMock(feat_kwargs={"feature_size": 80}, encode=encode)
+        whisper.model.detect_language.side_effect = lambda features: [candidates] * len(features)
+        model = MagicMock(model=whisper)
+        clips = [np.zeros(16000 * n, dtype=np.float32) for n in (1, 2, 40)]
+
+        self.assertEqual(detect_languages(model, clips, batch_size=2), ["fr", "fr", "fr"])
+        self.assertEqual(encoded, [(2, 80, 3000), (1, 80, 3000)])
+        self.assertEqual(detect_languages(model, clips, languages=["en", "es"]), ["es", "es", "es"])
+        self.assertEqual(detect_languages(model, clips[:1], languages=["de"]), ["fr"])
+
+    @patch('whisperx.align')
+    @patch('whisperx.load_align_model')
+    def test_align_by_language(self, mock_load_align, mock_align, mock_vad, mock_language):
+        """Test each language is aligned with its own model, loaded once, and merged back in time order"""
+        def load_align_model(language, device):
+            if language == "xx":
+                raise ValueError("No default align-model for language: xx")
+            return f"model-{language}", {"language": language}
+
+        def align(segments, model, metadata, audio, device):
+            aligned = [dict(seg, words=[{"word": seg["text"], "start": seg["start"], "end": seg["end"]}])
+                       for seg in segments]
+            return {"segments": aligned, "word_segments": [w for seg in aligned for w in seg["words"]]}
+
+        mock_load_align.side_effect = load_align_model
+        mock_align.side_effect = align
+        transcription = {"language": "en", "languages": {"en": 4.0, "es": 2.0, "xx": 1.0}, "segments": [
+            {"start": 0.0, "end": 1.0, "text": "one", "language": "en"},
+            {"start": 1.0, "end": 2.0, "text": "dos", "language": "es"},
+            {"start": 2.0, "end": 3.0, "text": "three", "language": "en"},
+            {"start": 3.0, "end": 4.0, "text": "??", "language": "xx"},
+            {"start": 4.0, "end": 5.0, "text": "cinco", "language": "es"},
+        ]}
+        pool = ModelPool()
+
+        result = align_by_language(transcription, self.audio, pool, "cpu")
+        align_by_language(transcription, self.audio, pool, "cpu")
+
+        self.assertEqual(sorted(c[0][0] for c in mock_load_align.call_args_list), ["en", "es", "xx", "xx"])
+        self.assertEqual([c[0][1] for c in mock_align.call_args_list][:2], ["model-en", "model-es"])
+        self.assertEqual([[s["text"] for s in c[0][0]] for c in mock_align.call_args_list][:2],
+                         [["one", "three"], ["dos", "cinco"]])
+        self.assertEqual([s["text"] for s in result["segments"]], ["one", "dos", "three", "??", "cinco"])
+        self.assertEqual([s["language"] for s in result["segments"]], ["en", "es", "en", "xx", "es"])
+        self.assertEqual([w["word"] for w in result["word_segments"]], ["one", "dos", "three", "cinco"])
+        self.assertEqual(result["languages"], transcription["languages"])
+        self.assertEqual([(s["start"], s["end"], s["language"]) for s in result["language_spans"]],
+                         [(0.0, 1.0, "en"), (1.0, 2.0, "es"), (2.0, 3.0, "en"), (3.0, 4.0, "xx"), (4.0, 5.0, "es")])
+
 
 if __name__ == '__main__':
     unittest.main()
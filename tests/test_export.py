@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+import unittest
+import tempfile
+import shutil
+import json
+import os
+from unittest.mock import patch
+from diarized_transcriber.export import export_transcript
+from diarized_transcriber.streaming import build_turns
+from diarized_transcriber.txt_exporter import generate_txt
+from diarized_transcriber.markdown_exporter import generate_markdown_transcript
+from diarized_transcriber.srt_exporter import generate_speaker_aware_srt
+from diarized_transcriber.html_exporter import generate_html_transcript
+
+
+def make_result(count=12):
+    speakers = ["SPEAKER_00", "SPEAKER_00", "SPEAKER_01"]
+    segments = [{"start": i * 7.0, "end": i * 7.0 + 5.0, "text": f" Line {i}. ", "speaker": speakers[i % 3]}
+                for i in range(count)]
+    return {"segments": segments, "language": "en"}
+
+
+def read(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+class TestBuildTurns(unittest.TestCase):
+
+    def test_groups_consecutive_speakers(self):
+        """Test consecutive segments from one speaker form a single turn"""
+        turns, has_speakers = build_turns(make_result(6)["segments"])
+        self.assertTrue(has_speakers)
+        self.assertEqual([t.speaker for t in turns], ["SPEAKER_00", "SPEAKER_01", "SPEAKER_00", "SPEAKER_01"])
+        self.assertEqual(turns[0].segments, [(0.0, 5.0, "Line 0."), (7.0, 12.0, "Line 1.")])
+
+    def test_unlabelled_segments(self):
+        """Test a transcript without speakers is one unlabelled turn and gaps get the fallback label"""
+        turns, has_speakers = build_turns([{"start": 0, "end": 1, "text": "a"}, {"start": 1, "end": 2, "text": "b"}])
+        self.assertFalse(has_speakers)
+        self.assertEqual(len(turns), 1)
+        self.assertIsNone(turns[0].speaker)
+
+        turns, _ = build_turns([{"start": 0, "end": 1, "text": "a", "speaker": "SPEAKER_00"},
+                                {"start": 1, "end": 2, "text": "b"}])
+        self.assertEqual([t.speaker for t in turns], ["SPEAKER_00", "SPEAKER"])
+
+
+class TestExportEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def path(self, name):
+        return os.path.join(self.temp_dir, name)
+
+    def test_matches_individual_exporters(self):
+        """Test the engine writes the same files as each exporter on its own"""
+        result = make_result()
+        export_transcript(result, self.temp_dir, "engine", ["txt", "md", "srt", "html"], max_workers=4)
+        generate_txt(result["segments"], self.path("expected.txt"), include_timestamps=True)
+        generate_markdown_transcript(result["segments"], self.path("expected.md"), include_timestamps=True)
+        generate_speaker_aware_srt(result["segments"], self.path("expected.srt"))
+        generate_html_transcript(result["segments"], self.path("expected.html"))
+        for ext in ("txt", "md", "srt", "html"):
+            self.assertEqual(read(self.path(f"engine.{ext}")), read(self.path(f"expected.{ext}")), ext)
+
+    def test_txt_turn_timestamp_is_turn_start(self):
+        """Test each txt paragraph is stamped with the start of its own turn"""
+        export_transcript(make_result(6), self.temp_dir, "talk", ["txt"])
+        lines = [line for line in read(self.path("talk.txt")).splitlines() if line]
+        self.assertEqual(lines[0], "SPEAKER_00: [00:00] Line 0. Line 1.")
+        self.assertEqual(lines[1], "SPEAKER_01: [00:14] Line 2.")
+
+    def test_json_written(self):
+        """Test json is exported, including with --formats all"""
+        written = export_transcript(make_result(), self.temp_dir, "talk", ["json"])
+        self.assertEqual(written, [self.path("talk.json")])
+        self.assertEqual(json.loads(read(self.path("talk.json"))), make_result())
+
+        written = export_transcript(make_result(), self.temp_dir, "all", ["all"])
+        self.assertIn(self.path("all.json"), written)
+        self.assertEqual(len(written), 7)
+
+    def test_unknown_formats_skipped(self):
+        """Test unknown and duplicate formats don't produce files"""
+        written = export_transcript(make_result(), self.temp_dir, "talk", ["md", "docx", "md"])
+        self.assertEqual(written, [self.path("talk.md")])
+        self.assertEqual(os.listdir(self.temp_dir), ["talk.md"])
+
+    def test_pdf_and_json_with_text_formats(self):
+        """Test PDF and JSON land next to the text formats, in the order asked for"""
+        written = export_transcript(make_result(), self.temp_dir, "talk", ["pdf", "json", "txt"])
+        self.assertEqual(written, [self.path("talk.pdf"), self.path("talk.json"), self.path("talk.txt")])
+        with open(self.path("talk.pdf"), "rb") as f:
+            self.assertTrue(f.read().startswith(b"%PDF"))
+        self.assertEqual(json.loads(read(self.path("talk.json")))["language"], "en")
+
+    @patch('diarized_transcriber.export.PROCESS_EXPORT_MIN_SEGMENTS', 0)
+    def test_concurrent_export_matches_sequential(self):
+        """Test formats rendered on threads and in worker processes match the files written one by one"""
+        formats = ["pdf", "json", "txt", "srt", "dtr"]
+        os.makedirs(self.path("sequential"))
+        os.makedirs(self.path("concurrent"))
+        sequential = export_transcript(make_result(), self.path("sequential"), "talk", formats, max_workers=1)
+        concurrent = export_transcript(make_result(), self.path("concurrent"), "talk", formats, max_workers=3)
+        self.assertEqual(concurrent, [self.path(f"concurrent/talk.{f}") for f in formats])
+        for expected, written in zip(sequential, concurrent):
+            with open(expected, "rb") as f, open(written, "rb") as g:
+                self.assertEqual(f.read(), g.read(), written)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+import unittest
+import threading
+import time
+from diarized_transcriber.metrics import StageRecorder, peak_rss_mb
+from diarized_transcriber.rich_progress import PersistentProgress
+
+
+class TestStageRecorder(unittest.TestCase):
+
+    def test_stages_end_at_next_start(self):
+        """Test starting a stage ends the previous one and totals sum repeated stages"""
+        recorder = StageRecorder()
+        for _ in range(2):
+            recorder.start("decode")
+            recorder.start("transcribe", "Transcribing window")
+            sum(range(200000))
+        recorder.stop()
+
+        summary = recorder.summary(audio_seconds=10.0)
+        self.assertEqual([s["stage"] for s in summary["stages"]], ["decode", "transcribe", "decode", "transcribe"])
+        self.assertEqual(summary["stages"][1]["description"], "Transcribing window")
+        self.assertEqual(summary["totals"]["transcribe"]["count"], 2)
+        transcribe = summary["stages"][1]
+        self.assertGreater(transcribe["cpu_seconds"], 0)
+        self.assertAlmostEqual(transcribe["rtf"], transcribe["wall_seconds"] / 10.0, places=3)
+        self.assertEqual(summary["audio_seconds"], 10.0)
+
+    def test_concurrent_threads(self):
+        """Test stages on different threads don't end each other"""
+        recorder = StageRecorder()
+        recorder.start("asr")
+        worker = threading.Thread(target=lambda: (recorder.start("diarize"), time.sleep(0.05), recorder.stop()))
+        worker.start()
+        worker.join()
+        recorder.stop()
+
+        stages = {s["stage"]: s for s in recorder.summary()["stages"]}
+        self.assertEqual(set(stages), {"asr", "diarize"})
+        self.assertGreaterEqual(stages["asr"]["wall_seconds"], stages["diarize"]["wall_seconds"])
+        self.assertIsNone(stages["asr"]["rtf"])
+
+    def test_peak_rss(self):
+        """Test peak RSS is reported in megabytes"""
+        peak = peak_rss_mb()
+        if peak is not None:
+            self.assertGreater(peak, 1)
+
+
+class TestProgressMetrics(unittest.TestCase):
+
+    def test_tasks_recorded(self):
+        """Test progress tasks become metric stages and exiting closes an unfinished one"""
+        with PersistentProgress() as progress:
+            progress.audio_seconds = 60
+            progress.start_task("Loading model", stage="load")
+            progress.complete_task()
+            progress.start_task("Working")
+        metrics = progress.metrics()
+        self.assertEqual([s["stage"] for s in metrics["stages"]], ["load", "Working"])
+        self.assertEqual(metrics["audio_seconds"], 60)
+        self.assertIsNotNone(metrics["rtf"])
+
+    def test_exit_does_not_wait_for_spinner_tick(self):
+        """Test leaving the block returns promptly instead of waiting out the spinner's one-second tick"""
+        start = time.perf_counter()
+        with PersistentProgress() as progress:
+            progress.start_task("Quick")
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+    def test_quiet_progress_in_several_threads(self):
+        """Test quiet progress blocks record metrics side by side without starting a live display"""
+        metrics, errors = [], []
+
+        def run(name):
+            try:
+                with PersistentProgress(quiet=True) as progress:
+                    progress.start_task(name, stage="transcribe")
+                    progress.complete_task(f"{name} done")
+                    time.sleep(0.05)
+                self.assertIsNone(progress.spinner_thread)
+                metrics.append(progress.metrics())
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(f"job {i}",)) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual([m["stages"][0]["stage"] for m in metrics], ["transcribe"] * 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+
+import unittest
+from diarized_transcriber.model_pool import ModelPool, PoolKey, estimate_model_bytes
+
+MB = 1024 * 1024
+
+
+class FakeTensor:
+    def __init__(self, mb):
+        self.mb = mb
+
+    def numel(self):
+        return self.mb * MB // 4
+
+    def element_size(self):
+        return 4
+
+
+class FakeModule:
+    """Stands in for a torch module: parameters and buffers with sizes"""
+    def __init__(self, parameters_mb, buffers_mb=0):
+        self._parameters = [FakeTensor(parameters_mb)]
+        self._buffers = [FakeTensor(buffers_mb)] if buffers_mb else []
+
+    def parameters(self):
+        return iter(self._parameters)
+
+    def buffers(self):
+        return iter(self._buffers)
+
+
+class FakeDiarizationPipeline:
+    """Like whisperx's DiarizationPipeline: modules held a few plain objects down"""
+    def __init__(self):
+        segmentation, embedding = FakeModule(6), FakeModule(25, 1)
+        self.model = type("Pipeline", (), {})()
+        self.model._models = {"segmentation": segmentation}
+        self.model._embedding = type("Embedding", (), {})()
+        self.model._embedding.model_ = embedding
+        self.model.device = "cpu"
+
+
+def fixed_size(sizes_mb):
+    """Size estimator that reads sizes from a dict keyed by model kind"""
+    return lambda model, key: sizes_mb[key.kind] * MB
+
+
+class TestModelPool(unittest.TestCase):
+
+    def test_hit_and_miss_counters(self):
+        """Test the loader runs once per key and repeats count as hits"""
+        pool = ModelPool()
+        calls = []
+        key = PoolKey("whisper", "base", "cpu", "float32")
+
+        def loader():
+            calls.append(1)
+            return object()
+
+        first = pool.get(key, loader)
+        second = pool.get(key, loader)
+        self.assertIs(first, second)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(pool.stats()["hits"], 1)
+        self.assertEqual(pool.stats()["misses"], 1)
+
+    def test_lru_eviction_within_budget(self):
+        """Test the least recently used model is evicted when over budget"""
+        pool = ModelPool(memory_budget_mb=250, size_estimator=fixed_size({"a": 100, "b": 100, "c": 100}))
+        key_a, key_b, key_c = PoolKey("a"), PoolKey("b"), PoolKey("c")
+        pool.get(key_a, object)
+        pool.get(key_b, object)
+        pool.get(key_a, object)  # a is now most recently used
+        pool.get(key_c, object)
+
+        self.assertIn(key_a, pool)
+        self.assertNotIn(key_b, pool)
+        self.assertIn(key_c, pool)
+        self.assertEqual(pool.stats()["evictions"], 1)
+        self.assertEqual(pool.stats()["used_mb"], 200)
+
+    def test_oversized_model_still_loads(self):
+        """Test a model bigger than the budget is kept while it is in use"""
+        pool = ModelPool(memory_budget_mb=50, size_estimator=fixed_size({"a": 100, "b": 100}))
+        pool.get(PoolKey("a"), object)
+        self.assertEqual(len(pool), 1)
+        pool.get(PoolKey("b"), object)
+        self.assertEqual(len(pool), 1)
+        self.assertIn(PoolKey("b"), pool)
+
+    def test_set_budget_evicts(self):
+        """Test shrinking the budget evicts immediately"""
+        pool = ModelPool(size_estimator=fixed_size({"a": 100, "b": 100}))
+        pool.get(PoolKey("a"), object)
+        pool.get(PoolKey("b"), object)
+        pool.set_budget(150)
+        self.assertEqual(len(pool), 1)
+        self.assertIn(PoolKey("b"), pool)
+
+    def test_estimate_falls_back_to_whisper_table(self):
+        """Test models without parameters use the checkpoint size table"""
+        half = estimate_model_bytes(object(), PoolKey("whisper", "medium", "cuda", "float16"))
+        full = estimate_model_bytes(object(), PoolKey("whisper", "medium", "cpu", "float32"))
+        self.assertEqual(full, 2 * half)
+        # Unknown Whisper names count as the large checkpoint rather than nothing
+        self.assertEqual(estimate_model_bytes(object(), PoolKey("whisper", "distil-large-v3", "cuda", "float16")),
+                         3100 * MB)
+
+    def test_estimate_measures_wrapped_modules(self):
+        """Test modules inside pipelines and tuples are measured, and unmeasurable models are never free"""
+        self.assertEqual(estimate_model_bytes(FakeDiarizationPipeline(), PoolKey("diarize")), 32 * MB)
+        self.assertEqual(estimate_model_bytes((FakeModule(300), {"language": "en"}), PoolKey("align")), 300 * MB)
+        self.assertGreater(estimate_model_bytes(object(), PoolKey("diarize")), 0)
+        self.assertGreater(estimate_model_bytes(object(), PoolKey("align")), 0)
+        self.assertGreater(estimate_model_bytes(object()), 0)
+        # A small torch helper (the VAD) doesn't stand in for CTranslate2 Whisper weights
+        self.assertEqual(estimate_model_bytes(FakeModule(2), PoolKey("whisper", "medium", "cuda", "float16")),
+                         1500 * MB)
+
+    def test_non_whisper_models_are_evicted(self):
+        """Test alignment and diarization models count against the budget with the default estimator"""
+        pool = ModelPool(memory_budget_mb=400)
+        pool.get(PoolKey("align", device="cpu", language="en"), lambda: (FakeModule(300), {}))
+        pool.get(PoolKey("diarize", device="cpu"), FakeDiarizationPipeline)
+        pool.get(PoolKey("align", device="cpu", language="de"), lambda: (FakeModule(300), {}))
+        self.assertEqual([key["language"] for key in pool.stats()["keys"]], [None, "de"])
+        self.assertEqual(pool.stats()["evictions"], 1)
+        self.assertEqual(pool.stats()["used_mb"], 332)
+
+
+if __name__ == '__main__':
+    unittest.main()
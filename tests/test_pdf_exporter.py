@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import re
+import shutil
+import tempfile
+import zlib
+from unittest.mock import patch
+from diarized_transcriber.pdf_exporter import PdfWriter, generate_pdf_transcript
+
+
+def build_font(path, chars):
+    """Write a minimal TrueType font with a square glyph for each of chars."""
+    from fontTools.fontBuilder import FontBuilder
+    from fontTools.pens.ttGlyphPen import TTGlyphPen
+    from fontTools.ttLib import newTable
+
+    names = {ord(char): f"uni{ord(char):04X}" for char in chars}
+    order = [".notdef", "space"] + list(names.values())
+    builder = FontBuilder(1000, isTTF=True)
+    builder.setupGlyphOrder(order)
+    builder.setupCharacterMap({32: "space", **names})
+    glyphs = {}
+    for name in order:
+        pen = TTGlyphPen(None)
+        if name != "space":
+            pen.moveTo((0, 0))
+            pen.lineTo((0, 500))
+            pen.lineTo((400, 500))
+            pen.closePath()
+        glyphs[name] = pen.glyph()
+    builder.setupGlyf(glyphs)
+    builder.setupHorizontalMetrics({name: (500, 0) for name in order})
+    builder.setupHorizontalHeader(ascent=800, descent=-200)
+    builder.setupNameTable({"familyName": "Test", "styleName": "Regular"})
+    builder.setupOS2(sTypoAscender=800, usWinAscent=800, usWinDescent=200)
+    builder.setupPost()
+    # FontForge's timestamp table, found in DejaVu and other fonts built with it
+    timestamp = newTable("FFTM")
+    timestamp.version, timestamp.FFTimeStamp, timestamp.sourceCreated, timestamp.sourceModified = 1, 0, 0, 0
+    builder.font["FFTM"] = timestamp
+    builder.save(path)
+
+
+def read_pdf(path):
+    """Return the raw bytes and {object id: (dictionary, decompressed stream)} of a written PDF."""
+    with open(path, "rb") as f:
+        data = f.read()
+    objects = {}
+    for match in re.finditer(rb"(\d+) 0 obj\n(.*?)\nendobj", data, re.S):
+        body = match.group(2)
+        stream = None
+        if b"stream\n" in body:
+            head, stream = body.split(b"stream\n", 1)
+            stream = stream[:stream.rindex(b"\nendstream")]
+            if b"/FlateDecode" in head:
+                stream = zlib.decompress(stream)
+            body = head
+        objects[int(match.group(1))] = (body, stream)
+    return data, objects
+
+
+class TestPdfExporter(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a temporary output directory"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "talk.pdf")
+
+    def tearDown(self):
+        """Clean up the output directory"""
+        shutil.rmtree(self.temp_dir)
+
+    def content(self, objects):
+        return b"\n".join(stream for body, stream in objects.values()
+                          if stream is not None and b"/Length1" not in body and b"CMap" not in stream)
+
+    def test_xref_points_at_every_object(self):
+        """Test the cross-reference table gives each object's byte offset"""
+        generate_pdf_transcript([{"start": 0, "end": 1, "text": "Hello", "speaker": "SPEAKER_00"}], self.path)
+        data, objects = read_pdf(self.path)
+        self.assertTrue(data.startswith(b"%PDF-"))
+        self.assertTrue(data.rstrip().endswith(b"%%EOF"))
+
+        xref = int(data[data.rindex(b"startxref") + 9:].split()[0])
+        table = data[xref:].split(b"trailer")[0].split(b"\n")
+        count = int(table[1].split()[1])
+        self.assertEqual(count, len(objects) + 1)
+        for object_id in range(1, count):
+            offset = int(table[2 + object_id].split()[0])
+            self.assertTrue(data[offset:].startswith(f"{object_id} 0 obj".encode()))
+
+    def test_turn_is_one_paragraph(self):
+        """Test a speaker's segments are merged into one paragraph under a bold label"""
+        segments = [
+            {"start": 0, "end": 1, "text": "Hello", "speaker": "SPEAKER_00"},
+            {"start": 1.2, "end": 2, "text": "there", "speaker": "SPEAKER_00"},
+            {"start": 2.5, "end": 3, "text": "Hi back", "speaker": "SPEAKER_01"},
+            # A long pause within the turn starts a new paragraph without a label
+            {"start": 10, "end": 11, "text": "Later", "speaker": "SPEAKER_01"},
+        ]
+        generate_pdf_transcript(segments, self.path)
+        _, objects = read_pdf(self.path)
+        content = self.content(objects)
+
+        self.assertIn(b"(Hello there) Tj", content)
+        self.assertIn(b"(Hi back) Tj", content)
+        self.assertIn(b"(Later) Tj", content)
+        self.assertEqual(content.count(b"(SPEAKER_00:)"), 1)
+        self.assertEqual(content.count(b"(SPEAKER_01:)"), 1)
+        fonts = b" ".join(body for body, _ in objects.values() if b"/Type /Font" in body)
+        self.assertIn(b"/Helvetica-Bold", fonts)
+        self.assertNotIn(b"/FontFile2", fonts)
+
+    def test_pages_written_as_they_fill(self):
+        """Test a long transcript spans several pages that reach the file before it is closed"""
+        words = " ".join(f"word{i}" for i in range(40))
+        with PdfWriter(self.path, has_speakers=False, autoflush=False) as writer:
+            for i in range(300):
+                writer.write({"start": i * 3.0, "end": i * 3.0 + 1, "text": words})
+            self.assertGreater(writer.document.page_count, 10)
+        data, objects = read_pdf(self.path)
+        pages = [body for body, _ in objects.values() if b"/Type /Page " in body or body.endswith(b"/Type /Page")]
+        count = int(re.search(rb"/Count (\d+)", data).group(1))
+        self.assertGreater(count, 10)
+        self.assertEqual(len(pages), count)
+        self.assertIn(b"word39", self.content(objects))
+
+    def test_empty_transcript(self):
+        """Test an empty transcript still produces a one-page PDF"""
+        generate_pdf_transcript([], self.path)
+        data, _ = read_pdf(self.path)
+        self.assertIn(b"/Count 1", data)
+
+    def test_unicode_text_embeds_subset_font(self):
+        """Test text outside cp1252 uses an embedded TrueType font holding only the glyphs used"""
+        font_path = os.path.join(self.temp_dir, "test.ttf")
+        build_font(font_path, "ABDEGIKMNOPRSTaehiklmnoprstu:_0123456789ПриветДругЖя")
+        segments = [
+            {"start": 0, "end": 1, "text": "Привет", "speaker": "SPEAKER_00"},
+            {"start": 2, "end": 3, "text": "Hello", "speaker": "SPEAKER_01"},
+        ]
+        from fontTools import subset
+        with patch.object(subset.log, "warning") as warning:
+            generate_pdf_transcript(segments, self.path, font_path=font_path)
+        warning.assert_not_called()
+        _, objects = read_pdf(self.path)
+
+        fonts = b" ".join(body for body, _ in objects.values() if b"/Type /Font" in body)
+        self.assertIn(b"/Subtype /Type0", fonts)
+        self.assertIn(b"/Helvetica", fonts)
+        cmap = b"".join(stream for _, stream in objects.values() if stream and b"begincmap" in stream)
+        self.assertIn(b"<041F>", cmap.upper())
+
+        from io import BytesIO
+        from fontTools.ttLib import TTFont
+        embedded = next(stream for body, stream in objects.values() if b"/Length1" in body)
+        subset = TTFont(BytesIO(embedded))
+        outlines = [name for name in subset.getGlyphOrder() if subset["glyf"][name].numberOfContours]
+        # Glyph ids are kept, but only the glyphs used have outlines: П р и в е т and the label's letters
+        self.assertNotIn("uni0416", outlines)
+        self.assertIn("uni041F", outlines)
+
+    def test_unicode_text_without_font(self):
+        """Test text outside cp1252 falls back to '?' when no Unicode font is available"""
+        segments = [{"start": 0, "end": 1, "text": "Привет", "speaker": None}]
+        with patch("diarized_transcriber.pdf_exporter.find_unicode_font", return_value=None):
+            generate_pdf_transcript(segments, self.path)
+        _, objects = read_pdf(self.path)
+        self.assertIn(b"(??????) Tj", self.content(objects))
+
+
+if __name__ == '__main__':
+    unittest.main()
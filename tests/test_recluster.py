@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import shutil
+import tempfile
+from argparse import Namespace
+from types import SimpleNamespace
+from unittest.mock import patch
+import numpy as np
+from pyannote.core import Annotation, Segment
+from pyannote.core import SlidingWindow, SlidingWindowFeature
+from pyannote.pipeline import Pipeline
+from diarized_transcriber.recluster import (DiarizationArtifacts, DiarizationArtifactStore, artifacts_key,
+                                            diarize_keeping_artifacts, recluster)
+from diarized_transcriber.result_cache import DEFAULT_ARTIFACTS_SIZE_MB
+from diarized_transcriber.speaker_assignment import strip_speakers
+
+
+class FakeSpeakerDiarization(Pipeline):
+    """pyannote's SpeakerDiarization in miniature: segmentation, embeddings, then clustering.
+
+    Each chunk has one active local speaker whose embedding points along one
+    of three axes; clustering keeps the first num_speakers axes and merges
+    the rest into the last one kept.
+    """
+
+    def __init__(self, chunks=6):
+        super().__init__()
+        self.chunks = chunks
+        self.computed = []
+
+    def get_segmentations(self, file, hook=None):
+        self.computed.append("segmentation")
+        data = np.zeros((self.chunks, 10, 2), dtype=np.float32)
+        data[:, :, 0] = 1
+        return SlidingWindowFeature(data, SlidingWindow(start=0.0, duration=5.0, step=5.0))
+
+    def get_embeddings(self, file, binary_segmentations, exclude_overlap=False, hook=None):
+        self.computed.append("embeddings")
+        embeddings = np.zeros((self.chunks, 2, 3), dtype=np.float32)
+        embeddings[np.arange(self.chunks), 0, np.arange(self.chunks) % 3] = 1
+        return embeddings
+
+    def apply(self, file, num_speakers=None, min_speakers=None, max_speakers=None, return_embeddings=False, hook=None):
+        hook = hook or (lambda *args, **kwargs: None)
+        segmentations = self.get_segmentations(file, hook=hook)
+        hook("segmentation", segmentations)
+        embeddings = self.get_embeddings(file, segmentations, hook=hook)
+        hook("embeddings", embeddings)
+        keep = num_speakers or 3
+        annotation = Annotation()
+        window = segmentations.sliding_window
+        for chunk in range(len(embeddings)):
+            cluster = min(int(np.argmax(embeddings[chunk, 0])), keep - 1)
+            annotation[Segment(chunk * window.step, chunk * window.step + window.duration)] = f"SPEAKER_{cluster:02d}"
+        centroids = np.eye(keep, 3, dtype=np.float32)
+        return (annotation, centroids) if return_embeddings else annotation
+
+    def __call__(self, file, hook=None, **kwargs):
+        return self.apply(file, hook=hook, **kwargs)
+
+
+class TestRecluster(unittest.TestCase):
+
+    def setUp(self):
+        """Set up a temporary store directory"""
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Clean up the store directory"""
+        shutil.rmtree(self.cache_dir)
+
+    def test_store_roundtrip(self):
+        """Test stored artifacts come back intact and unknown or corrupt entries read as misses"""
+        store = DiarizationArtifactStore(self.cache_dir)
+        artifacts = DiarizationArtifacts(np.random.rand(4, 10, 3).astype(np.float32), (0.0, 10.0, 1.0),
+                                         np.random.rand(4, 3, 8).astype(np.float32), 13.0)
+        key = artifacts_key("digest")
+        store.put(key, artifacts)
+        loaded = store.get(key)
+        np.testing.assert_array_equal(loaded.segmentation, artifacts.segmentation)
+        np.testing.assert_array_equal(loaded.embeddings, artifacts.embeddings)
+        self.assertEqual(loaded.window, (0.0, 10.0, 1.0))
+        self.assertEqual(loaded.duration, 13.0)
+        self.assertIn(key, store)
+        self.assertEqual(len(store.entries()), 1)
+        self.assertEqual(store.max_size_bytes, DEFAULT_ARTIFACTS_SIZE_MB * 1024 * 1024)
+        store.put(key, artifacts, audio_path="/audio/talk.wav", settings={"stage": "diarization"})
+        self.assertEqual(store.describe(key)["audio_path"], "/audio/talk.wav")
+        self.assertEqual(store.describe(key)["settings"], {"stage": "diarization"})
+
+        self.assertIsNone(store.get(artifacts_key("other")))
+        with open(os.path.join(self.cache_dir, f"{key}.npz"), "wb") as f:
+            f.write(b"truncated")
+        self.assertIsNone(store.get(key))
+
+    def test_recluster_skips_segmentation_and_embeddings(self):
+        """Test re-clustering with a new speaker count reuses the captured artifacts"""
+        model = FakeSpeakerDiarization()
+        diarize_pipeline = SimpleNamespace(model=model)
+        audio = np.zeros(16000 * 30, dtype=np.float32)
+
+        frame, embeddings, artifacts = diarize_keeping_artifacts(diarize_pipeline, audio)
+        self.assertEqual(sorted(frame["speaker"].unique()), ["SPEAKER_00", "SPEAKER_01", "SPEAKER_02"])
+        self.assertEqual(sorted(embeddings), ["SPEAKER_00", "SPEAKER_01", "SPEAKER_02"])
+        self.assertEqual(artifacts.segmentation.shape, (6, 10, 2))
+        self.assertEqual(artifacts.window, (0.0, 5.0, 5.0))
+        self.assertEqual(artifacts.duration, 30.0)
+        self.assertEqual(model.computed, ["segmentation", "embeddings"])
+
+        frame, embeddings = recluster(diarize_pipeline, artifacts, num_speakers=2)
+        self.assertEqual(sorted(frame["speaker"].unique()), ["SPEAKER_00", "SPEAKER_01"])
+        self.assertEqual(list(frame["start"]), [0.0, 5.0, 10.0, 15.0, 20.0, 25.0])
+        self.assertEqual(list(frame["end"]), [5.0, 10.0, 15.0, 20.0, 25.0, 30.0])
+        self.assertEqual(embeddings["SPEAKER_01"], [0.0, 1.0, 0.0])
+        # Nothing was recomputed, and the shared pipeline itself wasn't patched
+        self.assertEqual(model.computed, ["segmentation", "embeddings"])
+        self.assertEqual(model.get_segmentations(None).data.shape, (6, 10, 2))
+
+    def test_strip_speakers(self):
+        """Test stripping leaves the aligned transcript and doesn't touch the diarized result"""
+        result = {
+            "language": "en",
+            "segments": [{"start": 0.0, "end": 1.0, "text": "Hi", "speaker": "SPEAKER_00",
+                          "words": [{"word": "Hi", "start": 0.0, "end": 1.0, "speaker": "SPEAKER_00"}]}],
+            "word_segments": [{"word": "Hi", "start": 0.0, "end": 1.0, "speaker": "SPEAKER_00"}],
+            "speaker_embeddings": {"SPEAKER_00": [1.0]},
+            "speaker_matches": {"SPEAKER_00": {"name": "Ada", "similarity": 0.9}},
+        }
+        stripped = strip_speakers(result)
+        self.assertEqual(stripped, {
+            "language": "en",
+            "segments": [{"start": 0.0, "end": 1.0, "text": "Hi", "words": [{"word": "Hi", "start": 0.0, "end": 1.0}]}],
+            "word_segments": [{"word": "Hi", "start": 0.0, "end": 1.0}],
+        })
+        self.assertEqual(result["segments"][0]["words"][0]["speaker"], "SPEAKER_00")
+        self.assertIn("speaker_embeddings", result)
+
+    def test_rerun_with_other_speaker_count_reuses_cache(self):
+        """Test a diarized run caches its aligned transcript and artifacts for a re-run with another --num-speakers"""
+        from diarized_transcriber.cli import transcribe_file
+        from diarized_transcriber.result_cache import ResultCache
+
+        audio_path = os.path.join(self.cache_dir, "talk.wav")
+        with open(audio_path, "wb") as f:
+            f.write(b"RIFF....audio")
+        args = Namespace(model="base", skip_diarization=False, num_speakers=None, no_checkpoint=True, quiet=True,
+                         debug=True, output_dir=self.cache_dir, concurrent=False, asr_threads=None,
+                         diarize_threads=None, chunk_minutes=None, chunk_overlap=None, compute_type=None,
+                         batch_size=None, no_profile=True, cache_size_mb=100, embeddings_cache_size_mb=100, no_identify=True,
+                         multilingual=False, languages=None)
+        cache = ResultCache(os.path.join(self.cache_dir, "results"))
+        artifacts = DiarizationArtifacts(np.zeros((2, 10, 3), dtype=np.float32), (0.0, 5.0, 5.0),
+                                         np.zeros((2, 3, 4), dtype=np.float32), 10.0)
+        diarized = {"language": "en", "segments": [{"start": 0.0, "end": 1.0, "text": "Hi", "speaker": "SPEAKER_00",
+                                                    "words": [{"word": "Hi", "start": 0.0, "end": 1.0,
+                                                               "speaker": "SPEAKER_00"}]}]}
+        calls = []
+
+        def pipeline(**kwargs):
+            calls.append(kwargs)
+            if kwargs["on_artifacts"]:
+                kwargs["on_artifacts"](artifacts)
+            return dict(diarized)
+
+        with patch.dict(os.environ, {"HUGGINGFACE_TOKEN": "test_token"}), \
+             patch("diarized_transcriber.diarization.run_transcribe_with_diarization", side_effect=pipeline):
+            transcribe_file(args, audio_path, cache=cache)
+            args.num_speakers = 3
+            transcribe_file(args, audio_path, cache=cache)
+            _, from_cache, metrics = transcribe_file(args, audio_path, cache=cache)
+
+        # The third run is a cache hit, which still reports what it spent
+        self.assertEqual(len(calls), 2)
+        self.assertTrue(from_cache)
+        self.assertEqual([s["stage"] for s in metrics["stages"]], ["cache_lookup"])
+
+        self.assertIsNone(calls[0]["aligned"])
+        self.assertIsNone(calls[0]["artifacts"])
+        self.assertEqual(calls[1]["aligned"]["segments"][0], {"start": 0.0, "end": 1.0, "text": "Hi",
+                                                              "words": [{"word": "Hi", "start": 0.0, "end": 1.0}]})
+        self.assertEqual(calls[1]["artifacts"].duration, 10.0)
+        self.assertIsNone(calls[1]["on_artifacts"])
+        store = DiarizationArtifactStore(os.path.join(cache.cache_dir, "diarization"))
+        self.assertEqual(store.describe(store.entries()[0]["key"])["audio_path"], audio_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from diarized_transcriber.result_cache import ResultCache, audio_digest, cache_key, result_settings
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache = ResultCache(os.path.join(self.tmpdir, "cache"))
+        self.result = {"segments": [{"start": 0, "end": 1, "text": "Hello", "speaker": "SPEAKER_00"}], "language": "en"}
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write_audio(self, name, data):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_key_depends_on_audio_bytes_not_name(self):
+        """Test identical audio under different names shares a key"""
+        a = self.write_audio("a.wav", b"RIFF....same")
+        b = self.write_audio("b.wav", b"RIFF....same")
+        c = self.write_audio("c.wav", b"RIFF....different")
+        settings = result_settings("medium")
+        self.assertEqual(cache_key(audio_digest(a), settings), cache_key(audio_digest(b), settings))
+        self.assertNotEqual(cache_key(audio_digest(a), settings), cache_key(audio_digest(c), settings))
+
+    def test_key_depends_on_result_settings(self):
+        """Test model, diarization and speaker count change the key"""
+        digest = "abc"
+        base = cache_key(digest, result_settings("medium", num_speakers=2))
+        self.assertNotEqual(base, cache_key(digest, result_settings("large-v3", num_speakers=2)))
+        self.assertNotEqual(base, cache_key(digest, result_settings("medium", num_speakers=3)))
+        self.assertNotEqual(base, cache_key(digest, result_settings("medium", language="de", num_speakers=2)))
+        # The speaker count is irrelevant once diarization is skipped
+        self.assertEqual(cache_key(digest, result_settings("medium", skip_diarization=True, num_speakers=2)),
+                         cache_key(digest, result_settings("medium", skip_diarization=True)))
+
+    def test_put_and_get(self):
+        """Test a stored result round-trips and unknown keys miss"""
+        self.assertIsNone(self.cache.get("missing"))
+        self.cache.put("k1", self.result, audio_path="/audio/a.wav", settings=result_settings("medium"))
+        self.assertEqual(self.cache.get("k1"), self.result)
+        self.assertEqual(self.cache.describe("k1")["audio_path"], "/audio/a.wav")
+
+    def test_numpy_values_and_failed_writes(self):
+        """Test numpy scores are stored as numbers and an unserializable result leaves no temp file"""
+        result = {"segments": [{"start": np.float64(0.5), "end": np.float32(1.0), "text": "Hi",
+                                "words": [{"word": "Hi", "score": np.float64(0.9)}]}], "language": "en"}
+        self.cache.put("k1", result)
+        self.assertEqual(self.cache.get("k1")["segments"][0]["words"][0]["score"], 0.9)
+        with self.assertRaises(TypeError):
+            self.cache.put("k2", {"segments": [object()]})
+        self.assertEqual(os.listdir(self.cache.cache_dir), ["k1.json"])
+
+    def test_lru_eviction_by_size(self):
+        """Test the least recently used entries go once over the size limit"""
+        self.cache.put("old", self.result)
+        entry_size = self.cache.total_size()
+        self.cache.max_size_bytes = int(entry_size * 2.5)
+        self.cache.put("mid", self.result)
+        past = time.time() - 100
+        os.utime(self.cache._path("old"), (past, past))
+        os.utime(self.cache._path("mid"), (past + 10, past + 10))
+        self.cache.get("old")  # old becomes most recently used
+        self.cache.put("new", self.result)
+
+        keys = {e["key"] for e in self.cache.entries()}
+        self.assertEqual(keys, {"old", "new"})
+
+    def test_purge(self):
+        """Test purging everything or only stale entries"""
+        self.cache.put("stale", self.result)
+        self.cache.put("fresh", self.result)
+        past = time.time() - 40 * 86400
+        os.utime(self.cache._path("stale"), (past, past))
+
+        self.assertEqual(self.cache.purge(older_than_days=30), 1)
+        self.assertEqual([e["key"] for e in self.cache.entries()], ["fresh"])
+        self.assertEqual(self.cache.purge(), 1)
+        self.assertEqual(self.cache.entries(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+
+import unittest
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+from diarized_transcriber import search_index
+from diarized_transcriber.search_index import SearchIndex, normalize_term, parse_query
+from diarized_transcriber.transcript import Transcript
+from diarized_transcriber.transcript_file import save_transcript
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_result(lines):
+    """A result with timed words from (speaker, start, text) lines."""
+    segments = []
+    for speaker, start, text in lines:
+        words = [{"word": word, "start": start + i, "end": start + i + 0.5, "score": 0.9, "speaker": speaker}
+                 for i, word in enumerate(text.split())]
+        segments.append({"start": start, "end": start + len(words), "text": " " + text, "speaker": speaker,
+                         "words": words})
+    return {"segments": segments, "language": "en"}
+
+
+class TestSearchIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.sources = os.path.join(self.temp_dir, "transcripts")
+        os.makedirs(self.sources)
+        self.index = SearchIndex(os.path.join(self.temp_dir, "index"))
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.temp_dir)
+
+    def write_json(self, name, lines):
+        path = os.path.join(self.sources, name)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(make_result(lines), f)
+        return path
+
+    def test_normalize(self):
+        """Test terms ignore case and edge punctuation, and a query's quotes make phrases"""
+        self.assertEqual(normalize_term("Hello,"), b"hello")
+        self.assertEqual(normalize_term("U.S."), b"u.s")
+        self.assertEqual(normalize_term("—"), b"")
+        self.assertEqual(parse_query('budget "Machine learning!" x'), [[b"budget"], [b"machine", b"learning"], [b"x"]])
+
+    def test_phrase_and_speaker(self):
+        """Test phrases match consecutive words and --speaker limits hits to what that speaker said"""
+        self.write_json("ep1.json", [("Ada", 0.0, "We train the machine learning model"),
+                                     ("Grace", 10.0, "Machine tools, learning curves.")])
+        save_transcript(Transcript.from_result(make_result([("SPEAKER_01", 5.0, "machine learning at scale")])),
+                        os.path.join(self.sources, "ep2.dtr"))
+        stats = self.index.update([self.sources])
+        self.assertEqual(stats["added"], 2)
+
+        hits, total = self.index.search('"Machine Learning"')
+        self.assertEqual(total, 2)
+        self.assertEqual([(os.path.basename(h.path), h.speaker, h.start) for h in hits],
+                         [("ep1.json", "Ada", 3.0), ("ep2.dtr", "SPEAKER_01", 5.0)])
+        self.assertIn("machine learning model", hits[0].text)
+
+        # Unquoted words only have to share a segment; the hit is the first word's
+        hits, _ = self.index.search("learning machine", speaker="grace")
+        self.assertEqual([(h.speaker, h.start) for h in hits], [("Grace", 12.0)])
+        self.assertEqual(self.index.search('"machine learning"', speaker="Grace"), ([], 0))
+        self.assertEqual(self.index.search("nowhere"), ([], 0))
+
+        hits, total = self.index.search("machine", limit=1)
+        self.assertEqual((len(hits), total), (1, 3))
+
+    def test_incremental_update(self):
+        """Test only new and changed files are read, and removed or replaced files stop matching"""
+        first = self.write_json("ep1.json", [("Ada", 0.0, "the first episode")])
+        second = self.write_json("ep2.json", [("Ada", 0.0, "the second episode")])
+        with open(os.path.join(self.sources, "batch-summary.json"), "w") as f:
+            json.dump({"files": []}, f)
+        self.assertEqual(self.index.update([self.sources])["added"], 2)
+
+        # Reopened, with no paths: the remembered directory is rescanned
+        self.index.close()
+        self.index = SearchIndex(self.index.directory)
+        with patch.object(search_index, "load_source", wraps=search_index.load_source) as load:
+            stats = self.index.update()
+        load.assert_not_called()
+        self.assertEqual(stats["unchanged"], 2)
+
+        os.remove(first)
+        self.write_json("ep2.json", [("Ada", 0.0, "the revised episode")])
+        os.utime(second, ns=(0, 1))
+        self.write_json("ep3.json", [("Ada", 0.0, "the third episode")])
+        stats = self.index.update()
+        self.assertEqual((stats["added"], stats["updated"], stats["removed"]), (1, 1, 1))
+        self.assertEqual(self.index.search("first"), ([], 0))
+        self.assertEqual(self.index.search("second"), ([], 0))
+        self.assertEqual(self.index.search("episode")[1], 2)
+        self.assertEqual(len(self.index), 2)
+
+    def test_small_parts_are_merged(self):
+        """Test many small updates are merged into few parts without losing or reviving documents"""
+        with patch.object(search_index, "MAX_SMALL_PARTS", 2):
+            for i in range(6):
+                self.write_json(f"ep{i}.json", [("Ada", float(i), f"episode number{i} here")])
+                self.index.update([self.sources])
+            os.remove(os.path.join(self.sources, "ep0.json"))
+            self.index.update()
+        self.assertLessEqual(len(self.index.manifest["parts"]), 2)
+        parts = sorted(n for n in os.listdir(self.index.directory) if n.endswith(".dsi"))
+        self.assertEqual(parts, sorted(self.index.manifest["parts"]))
+        self.assertEqual(self.index.search("episode")[1], 5)
+        hits, _ = self.index.search("number3")
+        self.assertEqual([(os.path.basename(h.path), h.start) for h in hits], [("ep3.json", 4.0)])
+        self.assertEqual(self.index.search("number0"), ([], 0))
+
+    def test_manifest_of_another_version_is_rebuilt(self):
+        """Test an index whose manifest is of another version or corrupt is rebuilt from the remembered sources"""
+        self.write_json("ep1.json", [("Ada", 0.0, "the first episode")])
+        self.index.update([self.sources])
+        manifest_path = os.path.join(self.index.directory, search_index.MANIFEST)
+        for saved in ({**self.index.manifest, "version": 0}, "{not json"):
+            with open(manifest_path, "w", encoding="utf-8") as f:
+                f.write(saved if isinstance(saved, str) else json.dumps(saved))
+            self.index.close()
+            self.index = SearchIndex(self.index.directory)
+            self.assertEqual((len(self.index), self.index.search("episode")), (0, ([], 0)))
+            stats = self.index.update([self.sources])
+            self.assertEqual(stats["added"], 1)
+            self.assertEqual(self.index.search("episode")[1], 1)
+            parts = [n for n in os.listdir(self.index.directory) if n.endswith(".dsi")]
+            self.assertEqual(parts, self.index.manifest["parts"])
+
+    def test_concurrent_updates_keep_each_others_files(self):
+        """Test updates from several index objects on one directory all end up in the manifest"""
+        directories = []
+        for n in range(4):
+            directory = os.path.join(self.sources, f"show{n}")
+            os.makedirs(directory)
+            with open(os.path.join(directory, "ep.json"), "w", encoding="utf-8") as f:
+                json.dump(make_result([("Ada", 0.0, f"show{n} episode")]), f)
+            directories.append(directory)
+        indexes = [SearchIndex(self.index.directory) for _ in directories]
+        threads = [threading.Thread(target=index.update, args=([directory],))
+                   for index, directory in zip(indexes, directories)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for index in indexes:
+            index.close()
+
+        self.index = SearchIndex(self.index.directory)
+        self.assertEqual(len(self.index), 4)
+        self.assertEqual(self.index.search("episode")[1], 4)
+        self.assertEqual(sorted(self.index.manifest["sources"]), directories)
+
+    def test_large_index_is_fast(self):
+        """Test a phrase query over hundreds of thousands of indexed words answers in milliseconds"""
+        vocabulary = [f"w{i}" for i in range(500)]
+        for n in range(10):
+            lines = [(f"SPEAKER_{s % 4:02d}", s * 10.0, " ".join(vocabulary[(s * 7 + k * 13 + n) % 500] for k in range(10)))
+                     for s in range(3000)]
+            self.write_json(f"ep{n}.json", lines)
+        self.index.update([self.sources])
+        self.assertEqual(self.index.word_count(), 300000)
+
+        self.index.close()
+        self.index = SearchIndex(self.index.directory)
+        start = time.perf_counter()
+        hits, total = self.index.search('"w7 w20"', speaker="SPEAKER_01")
+        seconds = time.perf_counter() - start
+        self.assertGreater(total, 0)
+        self.assertTrue(all(h.speaker == "SPEAKER_01" and "w7 w20" in h.text for h in hits))
+        self.assertLess(seconds, 0.1)
+
+
+class TestSearchCommands(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.index_dir = os.path.join(self.temp_dir, "index")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def run_cli(self, command, *args):
+        code = ("import sys\n"
+                "from diarized_transcriber.cli import main\n"
+                f"sys.argv = ['transcribe', {command!r}] + sys.argv[1:]\n"
+                "main()\n")
+        env = dict(os.environ, PYTHONPATH=PROJECT_ROOT)
+        return subprocess.run([sys.executable, "-c", code, *args, "--index", self.index_dir], capture_output=True,
+                              text=True, env=env, timeout=120)
+
+    def test_index_then_search(self):
+        """Test indexing a directory and searching it from the command line"""
+        with open(os.path.join(self.temp_dir, "ep1-transcript.json"), "w", encoding="utf-8") as f:
+            json.dump(make_result([("Ada", 62.0, "Quarterly budget forecast"), ("Grace", 70.0, "budget talk")]), f)
+
+        completed = self.run_cli("search", "budget")
+        self.assertEqual(completed.returncode, 2)
+        self.assertIn("transcribe index", completed.stderr)
+
+        completed = self.run_cli("index", self.temp_dir)
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        self.assertIn("Indexed 1 new", completed.stdout)
+
+        completed = self.run_cli("search", "budget", "--speaker", "Ada")
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        self.assertIn("ep1-transcript.json [1:03] Ada: Quarterly budget forecast", completed.stdout)
+        self.assertIn("1 hit(s)", completed.stdout)
+
+        completed = self.run_cli("search", "budget", "--json")
+        hits = [json.loads(line) for line in completed.stdout.splitlines()]
+        self.assertEqual([(h["speaker"], h["start"]) for h in hits], [("Ada", 63.0), ("Grace", 70.0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
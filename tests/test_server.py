@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+from diarized_transcriber.model_pool import ModelPool, PoolKey
+from diarized_transcriber.server import (
+    JobQueue, QueueFullError, JobStateError, create_server, DONE, FAILED, CANCELLED, QUEUED
+)
+
+
+def stub_transcribe(audio_path, options, pool):
+    """Stand-in for the pipeline that loads a fake model through the pool"""
+    pool.get(PoolKey("whisper", options["model"], "cpu", "float32"), object)
+    return {"segments": [{"start": 0, "end": 1, "text": f"hello from {os.path.basename(audio_path)}"}]}
+
+
+def stub_export(result, output_dir, base_filename, formats, include_timestamps=True):
+    path = os.path.join(output_dir, f"{base_filename}.json")
+    with open(path, "w") as f:
+        json.dump(result, f)
+    return [path]
+
+
+def wait_for(job, timeout=5):
+    deadline = time.time() + timeout
+    while job.state not in (DONE, FAILED, CANCELLED) and time.time() < deadline:
+        time.sleep(0.01)
+
+
+class TestJobQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.audio_path = os.path.join(self.tmpdir, "episode.wav")
+        open(self.audio_path, "w").close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_jobs_share_warm_models(self):
+        """Test several jobs run through one pool and export their outputs"""
+        pool = ModelPool()
+        jobs = JobQueue(pool=pool, transcribe=stub_transcribe, export=stub_export)
+        jobs.start()
+        try:
+            submitted = [jobs.submit(self.audio_path, output_dir=self.tmpdir, model="base") for _ in range(3)]
+            for job in submitted:
+                wait_for(job)
+                self.assertEqual(job.state, DONE)
+                self.assertTrue(os.path.exists(job.outputs[0]))
+        finally:
+            jobs.stop(timeout=1)
+        self.assertEqual(pool.stats()["misses"], 1)
+        self.assertEqual(pool.stats()["hits"], 2)
+        self.assertIn("hello from episode.wav", jobs.result(submitted[0].id)["segments"][0]["text"])
+
+    def test_bounded_queue_and_cancel(self):
+        """Test a full queue rejects jobs and queued jobs can be cancelled"""
+        jobs = JobQueue(max_queued=2, pool=ModelPool(), transcribe=stub_transcribe, export=stub_export)
+        first = jobs.submit(self.audio_path, output_dir=self.tmpdir)
+        second = jobs.submit(self.audio_path, output_dir=self.tmpdir)
+        with self.assertRaises(QueueFullError):
+            jobs.submit(self.audio_path, output_dir=self.tmpdir)
+
+        jobs.cancel(first.id)
+        self.assertEqual(first.state, CANCELLED)
+        with self.assertRaises(JobStateError):
+            jobs.cancel(first.id)
+        with self.assertRaises(JobStateError):
+            jobs.result(second.id)
+
+        jobs.start()
+        try:
+            wait_for(second)
+        finally:
+            jobs.stop(timeout=1)
+        self.assertEqual(first.state, CANCELLED)
+        self.assertEqual(second.state, DONE)
+
+    def test_cancel_frees_capacity_and_stop_does_not_block(self):
+        """Test cancelled jobs stop counting against the queue and stop returns with the queue full"""
+        started, release = threading.Event(), threading.Event()
+
+        def slow_transcribe(audio_path, options, pool):
+            started.set()
+            release.wait(5)
+            return stub_transcribe(audio_path, options, pool)
+
+        jobs = JobQueue(max_queued=1, pool=ModelPool(), transcribe=slow_transcribe, export=stub_export)
+        jobs.start()
+        running = jobs.submit(self.audio_path, output_dir=self.tmpdir)
+        self.assertTrue(started.wait(5))
+        waiting = jobs.submit(self.audio_path, output_dir=self.tmpdir)
+        with self.assertRaises(QueueFullError):
+            jobs.submit(self.audio_path, output_dir=self.tmpdir)
+        jobs.cancel(waiting.id)
+        self.assertEqual(jobs.stats()["queued"], 0)
+        queued = jobs.submit(self.audio_path, output_dir=self.tmpdir)
+
+        start = time.perf_counter()
+        jobs.stop(timeout=0.1)
+        self.assertLess(time.perf_counter() - start, 1)
+        release.set()
+        wait_for(running)
+        self.assertEqual(running.state, DONE)
+        self.assertEqual(queued.state, QUEUED)
+
+    def test_failed_job_reports_error(self):
+        """Test a missing input file fails the job without stopping the worker"""
+        jobs = JobQueue(pool=ModelPool(), transcribe=stub_transcribe, export=stub_export)
+        jobs.start()
+        try:
+            bad = jobs.submit(os.path.join(self.tmpdir, "missing.wav"), output_dir=self.tmpdir)
+            good = jobs.submit(self.audio_path, output_dir=self.tmpdir)
+            wait_for(bad)
+            wait_for(good)
+        finally:
+            jobs.stop(timeout=1)
+        self.assertEqual(bad.state, FAILED)
+        self.assertIn("FileNotFoundError", bad.error)
+        self.assertEqual(good.state, DONE)
+
+    def test_unknown_option_rejected(self):
+        """Test options outside the CLI's set are refused"""
+        jobs = JobQueue(pool=ModelPool(), transcribe=stub_transcribe, export=stub_export)
+        with self.assertRaises(ValueError):
+            jobs.submit(self.audio_path, speed="fast")
+
+
+class TestServerHTTP(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.audio_path = os.path.join(self.tmpdir, "episode.wav")
+        open(self.audio_path, "w").close()
+        self.jobs = JobQueue(pool=ModelPool(), transcribe=stub_transcribe, export=stub_export)
+        self.jobs.start()
+        self.server = create_server(self.jobs, port=0)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.jobs.stop(timeout=1)
+        shutil.rmtree(self.tmpdir)
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method)
+        try:
+            with urllib.request.urlopen(req) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def test_submit_status_and_result(self):
+        """Test the submit, status and fetch-result round trip"""
+        status, job = self.request("POST", "/jobs", {"audio_path": self.audio_path, "output_dir": self.tmpdir,
+                                                     "formats": ["json"]})
+        self.assertEqual(status, 202)
+        self.assertEqual(job["state"], QUEUED)
+
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            _, info = self.request("GET", f"/jobs/{job['id']}")
+            if info["state"] == DONE:
+                break
+            time.sleep(0.01)
+        self.assertEqual(info["state"], DONE)
+
+        status, result = self.request("GET", f"/jobs/{job['id']}/result")
+        self.assertEqual(status, 200)
+        self.assertEqual(len(result["segments"]), 1)
+
+    def test_result_with_numpy_values(self):
+        """Test a result holding numpy scores and timings is served as JSON, without the run's metrics"""
+        def numpy_transcribe(audio_path, options, pool):
+            return {"segments": [{"start": np.float64(0.0), "end": np.float32(1.0), "text": "hi",
+                                  "words": [{"word": "hi", "score": np.float64(0.5)}]}],
+                    "speaker_embeddings": {"SPEAKER_00": np.ones(2, dtype=np.float32)},
+                    "metrics": {"stages": []}}
+
+        self.jobs.transcribe = numpy_transcribe
+        self.jobs.export = lambda result, output_dir, base_filename, formats, include_timestamps=True: []
+        _, job = self.request("POST", "/jobs", {"audio_path": self.audio_path, "output_dir": self.tmpdir})
+        wait_for(self.jobs.get(job["id"]))
+        status, result = self.request("GET", f"/jobs/{job['id']}/result")
+        self.assertEqual(status, 200)
+        self.assertEqual(result["segments"][0]["words"][0]["score"], 0.5)
+        self.assertEqual(result["speaker_embeddings"]["SPEAKER_00"], [1.0, 1.0])
+        self.assertNotIn("metrics", result)
+
+    def test_errors(self):
+        """Test unknown jobs, bad payloads and cancelling finished jobs"""
+        self.assertEqual(self.request("GET", "/jobs/nope")[0], 404)
+        self.assertEqual(self.request("POST", "/jobs", {"output_dir": self.tmpdir})[0], 400)
+        self.assertEqual(self.request("GET", "/health")[0], 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
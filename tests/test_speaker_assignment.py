@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+import unittest
+import copy
+import random
+import numpy as np
+import pandas as pd
+from diarized_transcriber.speaker_assignment import assign_word_speakers, dominant_speakers
+from diarized_transcriber.transcript import Transcript
+
+
+def reference_assign(diarize_df, result):
+    """Row-by-row assignment as done by whisperx 3.4's assign_word_speakers"""
+    def best(start, end):
+        intersection = np.minimum(diarize_df['end'], end) - np.maximum(diarize_df['start'], start)
+        hits = diarize_df.assign(intersection=intersection)
+        hits = hits[hits['intersection'] > 0]
+        if len(hits):
+            return hits.groupby("speaker")["intersection"].sum().sort_values(ascending=False).index[0]
+        return None
+
+    for seg in result["segments"]:
+        speaker = best(seg['start'], seg['end'])
+        if speaker is not None:
+            seg["speaker"] = speaker
+        for word in seg.get("words", []):
+            if 'start' in word:
+                speaker = best(word['start'], word['end'])
+                if speaker is not None:
+                    word["speaker"] = speaker
+    return result
+
+
+def synthetic(num_words, num_speakers, seed):
+    """Turns with overlapping speech and gaps, and words (some untimed) across them"""
+    rng = random.Random(seed)
+    turns, t = [], 0.0
+    while t < num_words * 0.45:
+        duration = rng.uniform(0.5, 12)
+        turns.append({"start": t, "end": t + duration, "speaker": f"SPEAKER_{rng.randrange(num_speakers):02d}"})
+        if rng.random() < 0.25:
+            turns.append({"start": t + duration - rng.uniform(0.2, 2), "end": t + duration + rng.uniform(0.2, 2),
+                          "speaker": f"SPEAKER_{rng.randrange(num_speakers):02d}"})
+        t += duration + rng.uniform(-0.5, 1.5)
+    segments, t = [], 0.0
+    for _ in range(0, num_words, 8):
+        words = []
+        for _ in range(8):
+            duration = rng.uniform(0.1, 0.6)
+            words.append({"word": "w", "start": round(t, 3), "end": round(t + duration, 3), "score": 0.9}
+                         if rng.random() > 0.03 else {"word": "42"})
+            t += duration + rng.uniform(0, 0.3)
+        timed = [w for w in words if "start" in w] or [{"start": t, "end": t}]
+        segments.append({"start": timed[0]["start"], "end": timed[-1]["end"], "text": "w", "words": words})
+    return pd.DataFrame(turns), {"segments": segments, "language": "en"}
+
+
+class TestSpeakerAssignment(unittest.TestCase):
+
+    def test_matches_row_by_row_assignment(self):
+        """Test labels match the row-by-row computation, including overlapping speech"""
+        for seed in range(3):
+            diarize_df, result = synthetic(600, 3, seed)
+            expected = reference_assign(diarize_df, copy.deepcopy(result))
+            self.assertEqual(assign_word_speakers(diarize_df, copy.deepcopy(result)), expected)
+
+    def test_long_turn(self):
+        """Test a turn spanning the whole recording neither changes the labels nor multiplies the candidates"""
+        diarize_df, result = synthetic(600, 3, 7)
+        long_turn = pd.DataFrame([{"start": 0.0, "end": 1e6, "speaker": "SPEAKER_09"}])
+        diarize_df = pd.concat([long_turn, diarize_df], ignore_index=True)
+        expected = reference_assign(diarize_df, copy.deepcopy(result))
+        self.assertEqual(assign_word_speakers(diarize_df, copy.deepcopy(result)), expected)
+
+        # 200k words against 3000 turns, one of them covering everything: a
+        # words x turns expansion would need tens of GB
+        rng = np.random.default_rng(0)
+        turn_start = np.concatenate(([0.0], np.sort(rng.uniform(0, 100000, 3000))))
+        turn_end = turn_start + np.concatenate(([100000.0], rng.uniform(1, 30, 3000)))
+        turn_speaker = np.concatenate(([4], rng.integers(0, 4, 3000)))
+        word_start = np.sort(rng.uniform(0, 100000, 200000))
+        best = dominant_speakers(turn_start, turn_end, turn_speaker, 5, word_start, word_start + 0.3)
+        self.assertTrue((best >= 0).all())
+
+    def test_ties_go_to_first_label(self):
+        """Test a word inside two overlapping turns gets the alphabetically first speaker"""
+        turns = [{"start": 0, "end": 10, "speaker": "SPEAKER_01"}, {"start": 2, "end": 8, "speaker": "SPEAKER_00"}]
+        best = dominant_speakers(np.array([0.0, 2.0]), np.array([10.0, 8.0]), np.array([1, 0]), 2,
+                                 np.array([3.0, 9.0]), np.array([4.0, 9.5]))
+        self.assertEqual(best.tolist(), [0, 1])
+
+        result = {"segments": [{"start": 3, "end": 4, "text": "hi", "words": [{"word": "hi", "start": 3, "end": 4}]}]}
+        assign_word_speakers(turns, result)
+        self.assertEqual(result["segments"][0]["speaker"], "SPEAKER_00")
+
+    def test_unmatched_left_unlabelled(self):
+        """Test segments in gaps, touching boundaries or without timings get no speaker"""
+        turns = pd.DataFrame([{"start": 0.0, "end": 2.0, "speaker": "A"}, {"start": 5.0, "end": 6.0, "speaker": "B"}])
+        result = {"segments": [
+            {"start": 2.0, "end": 5.0, "text": "gap", "words": [{"word": "gap", "start": 2.0, "end": 5.0}, {"word": "7"}]},
+            {"start": 5.5, "end": 5.8, "text": "b", "words": [{"word": "b", "start": 5.5, "end": 5.8}]},
+        ]}
+        assign_word_speakers(turns, result)
+        self.assertNotIn("speaker", result["segments"][0])
+        self.assertEqual(result["segments"][0]["words"], [{"word": "gap", "start": 2.0, "end": 5.0}, {"word": "7"}])
+        self.assertEqual(result["segments"][1]["speaker"], "B")
+        self.assertEqual(result["segments"][1]["words"][0]["speaker"], "B")
+
+    def test_transcript_matches_dicts(self):
+        """Test assigning on a Transcript gives the same labels as on the dicts"""
+        diarize_df, result = synthetic(400, 4, 7)
+        expected = assign_word_speakers(diarize_df, copy.deepcopy(result))
+        transcript = assign_word_speakers(diarize_df, Transcript.from_result(result))
+        self.assertEqual(transcript.to_result()["segments"], expected["segments"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+
+import unittest
+import json
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+import numpy as np
+
+from diarized_transcriber.speaker_index import SpeakerIndex, identify_speakers, load_speaker_index
+from diarized_transcriber.transcript import Transcript
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DIMENSION = 256
+
+
+def voices(count, seed=0):
+    """Random unit vectors; in 256 dimensions they are all nearly orthogonal, like different voices."""
+    vectors = np.random.default_rng(seed).normal(size=(count, DIMENSION)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def near(vector, seed=1, noise=0.02):
+    """The same voice in another recording."""
+    return vector + np.random.default_rng(seed).normal(scale=noise, size=vector.shape).astype(np.float32)
+
+
+def make_result(embeddings):
+    return {
+        "segments": [
+            {"start": 0.0, "end": 1.0, "text": "Hi", "speaker": "SPEAKER_00",
+             "words": [{"word": "Hi", "start": 0.0, "end": 1.0, "score": 0.9, "speaker": "SPEAKER_00"}]},
+            {"start": 1.0, "end": 2.0, "text": "Hello", "speaker": "SPEAKER_01",
+             "words": [{"word": "Hello", "start": 1.0, "end": 2.0, "score": 0.9, "speaker": "SPEAKER_01"}]},
+        ],
+        "language": "en",
+        "speaker_embeddings": embeddings,
+    }
+
+
+class TestSpeakerIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.voices = voices(3)
+        self.index = SpeakerIndex()
+        for name, vector in zip(["Ada", "Grace", "Alan"], self.voices):
+            self.index.add(name, vector)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_match(self):
+        """Test each label gets the enrolled voice it is closest to and strangers stay anonymous"""
+        stranger = voices(1, seed=9)[0]
+        matches = self.index.match({"SPEAKER_00": near(self.voices[1]), "SPEAKER_01": near(self.voices[0]),
+                                    "SPEAKER_02": stranger})
+        self.assertEqual({label: m["name"] for label, m in matches.items()}, {"SPEAKER_00": "Grace", "SPEAKER_01": "Ada"})
+        self.assertGreater(matches["SPEAKER_00"]["similarity"], 0.9)
+
+    def test_each_name_used_once(self):
+        """Test two labels resembling one enrolled voice don't both get its name"""
+        matches = self.index.match({"SPEAKER_00": near(self.voices[0], noise=0.01),
+                                    "SPEAKER_01": near(self.voices[0], seed=2, noise=0.03)}, threshold=0.5)
+        self.assertEqual(list(matches), ["SPEAKER_00"])
+
+    def test_several_embeddings_per_name(self):
+        """Test a name matches on its closest enrolled embedding"""
+        other = voices(1, seed=5)[0]
+        self.index.add("Ada", other)
+        self.assertEqual(self.index.counts(), {"Ada": 2, "Grace": 1, "Alan": 1})
+        self.assertEqual(self.index.match({"SPEAKER_00": near(other)})["SPEAKER_00"]["name"], "Ada")
+
+    def test_save_load_remove(self):
+        """Test the index survives a save and a mapped load, then still accepts additions and removals"""
+        path = os.path.join(self.temp_dir, "nested", "speakers.idx")
+        self.index.save(path)
+        loaded = SpeakerIndex.load(path)
+        self.assertEqual(loaded.names, ["Ada", "Grace", "Alan"])
+        np.testing.assert_allclose(loaded.vectors, self.index.vectors)
+        self.assertFalse(loaded.vectors.flags.writeable)
+
+        self.assertEqual(loaded.remove("Grace"), 1)
+        loaded.add("Edsger", voices(1, seed=7)[0])
+        self.assertEqual(loaded.match({"S": near(self.voices[2])})["S"]["name"], "Alan")
+        self.assertEqual(loaded.match({"S": near(self.voices[1])}), {})
+        loaded.save(path)
+        self.assertEqual(SpeakerIndex.load(path).counts(), {"Ada": 1, "Alan": 1, "Edsger": 1})
+
+        self.assertIsNone(load_speaker_index(os.path.join(self.temp_dir, "missing.idx")))
+        with open(path, "wb") as f:
+            f.write(b"not an index at all")
+        with self.assertRaises(ValueError):
+            SpeakerIndex.load(path)
+        with self.assertRaises(ValueError):
+            self.index.add("Short", np.ones(8))
+
+    def test_load_index_without_recorded_layout(self):
+        """Test an index saved before the block layout was recorded in its header still loads"""
+        header = json.dumps({"names": ["Ada", "Grace", "Alan"], "rows": 3, "dimension": DIMENSION}).encode("utf-8")
+        header += b" " * (-(16 + len(header)) % 64)
+        path = os.path.join(self.temp_dir, "old.idx")
+        with open(path, "wb") as f:
+            f.write(struct.pack("<8sII", b"DTRSPKRS", 1, len(header)) + header)
+            f.write(np.arange(3, dtype="<i4").tobytes() + b"\0" * 52)
+            f.write(self.index.vectors.astype("<f4").tobytes())
+        loaded = SpeakerIndex.load(path)
+        self.assertEqual(loaded.counts(), {"Ada": 1, "Grace": 1, "Alan": 1})
+        np.testing.assert_allclose(loaded.vectors, self.index.vectors)
+
+    def test_large_index_is_fast(self):
+        """Test matching against tens of thousands of enrolled voices stays in the millisecond range"""
+        index = SpeakerIndex()
+        enrolled = voices(50000, seed=3)
+        for start in range(0, len(enrolled), 1000):
+            index.add(f"speaker-{start // 1000}", enrolled[start:start + 1000])
+        for name in range(1000):
+            index.add(f"host-{name}", voices(1, seed=10000 + name)[0])
+        path = os.path.join(self.temp_dir, "large.idx")
+        index.save(path)
+
+        start = time.perf_counter()
+        loaded = SpeakerIndex.load(path)
+        load_seconds = time.perf_counter() - start
+        queries = {f"SPEAKER_{i:02d}": near(voices(1, seed=10000 + i)[0]) for i in range(4)}
+        loaded.match(queries)  # the first query groups rows by name
+        start = time.perf_counter()
+        matches = loaded.match(queries)
+        match_seconds = time.perf_counter() - start
+
+        self.assertEqual({m["name"] for m in matches.values()}, {"host-0", "host-1", "host-2", "host-3"})
+        self.assertLess(load_seconds, 0.1)
+        self.assertLess(match_seconds, 0.1)
+
+
+class TestIdentifySpeakers(unittest.TestCase):
+
+    def setUp(self):
+        self.voices = voices(2)
+        self.index = SpeakerIndex()
+        self.index.add("Ada", self.voices[0])
+
+    def test_result_dict(self):
+        """Test matched labels are renamed in segments, words and embeddings, and the match is recorded"""
+        result = make_result({"SPEAKER_00": self.voices[1].tolist(), "SPEAKER_01": near(self.voices[0]).tolist()})
+        matches = identify_speakers(result, self.index)
+        self.assertEqual(matches["SPEAKER_01"]["name"], "Ada")
+        self.assertEqual([s["speaker"] for s in result["segments"]], ["SPEAKER_00", "Ada"])
+        self.assertEqual(result["segments"][1]["words"][0]["speaker"], "Ada")
+        self.assertEqual(sorted(result["speaker_embeddings"]), ["Ada", "SPEAKER_00"])
+        self.assertEqual(result["speaker_matches"], matches)
+
+    def test_transcript(self):
+        """Test a Transcript is renamed through its speaker table"""
+        transcript = Transcript.from_result(make_result({"SPEAKER_01": near(self.voices[0]).tolist()}))
+        identify_speakers(transcript, self.index)
+        self.assertEqual([s["speaker"] for s in transcript], ["SPEAKER_00", "Ada"])
+        self.assertEqual(transcript.to_result()["speaker_matches"]["SPEAKER_01"]["name"], "Ada")
+
+    def test_without_embeddings(self):
+        """Test results without voice embeddings are left alone"""
+        result = make_result(None)
+        self.assertEqual(identify_speakers(result, self.index), {})
+        self.assertEqual(result["segments"][1]["speaker"], "SPEAKER_01")
+
+
+class TestSpeakersCommand(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.index_path = os.path.join(self.temp_dir, "speakers.idx")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def run_speakers(self, *args):
+        code = ("import sys\n"
+                "from diarized_transcriber.cli import main\n"
+                "sys.argv = ['transcribe', 'speakers'] + sys.argv[1:]\n"
+                "main()\n")
+        env = dict(os.environ, PYTHONPATH=PROJECT_ROOT)
+        return subprocess.run([sys.executable, "-c", code, *args, "--index", self.index_path], capture_output=True,
+                              text=True, env=env, timeout=120)
+
+    def test_enroll_from_transcript(self):
+        """Test enrolling a speaker from a saved transcript, then listing and removing them"""
+        voice = voices(1)[0]
+        transcript_path = os.path.join(self.temp_dir, "ep1-transcript.json")
+        with open(transcript_path, "w", encoding="utf-8") as f:
+            json.dump(make_result({"SPEAKER_00": voice.tolist()}), f)
+
+        completed = self.run_speakers("enroll", "Ada Lovelace", "--from", transcript_path, "--speaker", "SPEAKER_00")
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        self.assertEqual(SpeakerIndex.load(self.index_path).match({"S": voice})["S"]["name"], "Ada Lovelace")
+
+        completed = self.run_speakers("list")
+        self.assertIn("Ada Lovelace (1 embedding)", completed.stdout)
+
+        completed = self.run_speakers("enroll", "Grace", "--from", transcript_path, "--speaker", "SPEAKER_07")
+        self.assertEqual(completed.returncode, 2)
+        self.assertIn("SPEAKER_00", completed.stderr)
+
+        completed = self.run_speakers("remove", "Ada Lovelace")
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        self.assertEqual(len(SpeakerIndex.load(self.index_path)), 0)
+
+    def test_enroll_from_audio_reports_errors(self):
+        """Test enrolling from audio without a Hugging Face token exits with the reason on stderr"""
+        audio_path = os.path.join(self.temp_dir, "ada.wav")
+        with open(audio_path, "wb") as f:
+            f.write(b"RIFF")
+        # An empty token is not replaced by one from a .env file
+        with patch.dict(os.environ, {"HUGGINGFACE_TOKEN": ""}):
+            completed = self.run_speakers("enroll", "Ada", "--audio", audio_path)
+        self.assertEqual(completed.returncode, 2)
+        self.assertIn("HUGGINGFACE_TOKEN is required", completed.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
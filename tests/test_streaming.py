@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+import unittest
+import tempfile
+import shutil
+import os
+import json
+from unittest.mock import patch
+from diarized_transcriber.txt_exporter import TxtWriter, generate_txt
+from diarized_transcriber.markdown_exporter import generate_markdown_transcript
+from diarized_transcriber.srt_exporter import SrtWriter, generate_speaker_aware_srt
+from diarized_transcriber.html_exporter import HtmlWriter, generate_html_transcript, generate_html_viewer
+from diarized_transcriber.export import TranscriptStream, export_transcript
+
+
+SEGMENTS = [
+    {"start": 0, "end": 1.5, "text": " Hello there ", "speaker": "SPEAKER_00"},
+    {"start": 2, "end": 3.5, "text": "How are you?", "speaker": "SPEAKER_00"},
+    {"start": 4, "end": 5.5, "text": "Fine, thanks.", "speaker": "SPEAKER_01"},
+    {"start": 61, "end": 62.5, "text": "Good to hear.", "speaker": "SPEAKER_00"},
+]
+
+
+def read(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def read_script(path):
+    """The JSON argument of a viewer data file's transcriptIndex(...) or transcriptChunk(n, ...) call."""
+    text = read(path)
+    start = text.index(",") if text.startswith("transcriptChunk(") else text.index("(")
+    return json.loads(text[start + 1:text.rindex(")")])
+
+
+class TestStreamingWriters(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def path(self, name):
+        return os.path.join(self.temp_dir, name)
+
+    def test_iterator_matches_list_output(self):
+        """Test exporters give the same file from a one-shot iterator as from a list"""
+        for segments in (SEGMENTS, [{k: v for k, v in s.items() if k != "speaker"} for s in SEGMENTS]):
+            for name, export in (
+                ("txt", lambda segs, path: generate_txt(segs, path, include_timestamps=True)),
+                ("md", lambda segs, path: generate_markdown_transcript(segs, path, include_timestamps=True)),
+                ("srt", generate_speaker_aware_srt),
+                ("html", generate_html_transcript),
+            ):
+                export(segments, self.path(f"list.{name}"))
+                export(iter(segments), self.path(f"iter.{name}"))
+                self.assertEqual(read(self.path(f"list.{name}")), read(self.path(f"iter.{name}")), name)
+
+    def test_partial_output_visible_before_close(self):
+        """Test finished cues and turns are on disk while the writer is still open"""
+        with SrtWriter(self.path("out.srt")) as srt, TxtWriter(self.path("out.txt")) as txt:
+            for seg in SEGMENTS[:3]:
+                srt.write(seg)
+                txt.write(seg)
+            self.assertIn("3\n00:00:04,000 --> 00:00:05,500\nSPEAKER_01: Fine, thanks.", read(self.path("out.srt")))
+            # The first speaker's turn is complete; the second is still buffered
+            self.assertEqual(read(self.path("out.txt")), "SPEAKER_00: Hello there How are you?\n")
+        self.assertIn("SPEAKER_01: Fine, thanks.", read(self.path("out.txt")))
+
+    def test_html_closed_on_close(self):
+        """Test the document is only closed once the writer is"""
+        writer = HtmlWriter(self.path("out.html"))
+        writer.write(SEGMENTS[0])
+        self.assertNotIn("</html>", read(self.path("out.html")))
+        writer.close()
+        self.assertTrue(read(self.path("out.html")).endswith("</body></html>"))
+
+    def test_html_escapes_text(self):
+        """Test markup in transcript text doesn't break the HTML"""
+        generate_html_transcript([{"start": 0, "end": 1, "text": "x < y & <b>z</b>", "speaker": "A<B"}],
+                                 self.path("out.html"))
+        self.assertIn("<h3>A&lt;B</h3>\n<p>x &lt; y &amp; &lt;b&gt;z&lt;/b&gt;</p>", read(self.path("out.html")))
+
+    def test_transcript_stream_finish_writes_undelivered_segments(self):
+        """Test finish() writes the segments the pipeline didn't deliver and skips PDF"""
+        stream = TranscriptStream(self.temp_dir, "talk-transcript", ["txt", "srt", "pdf"], has_speakers=True)
+        stream.write(SEGMENTS[0])
+        stream.finish(SEGMENTS)
+
+        self.assertEqual(stream.remaining_formats, ["pdf"])
+        generate_speaker_aware_srt(SEGMENTS, self.path("expected.srt"))
+        self.assertEqual(read(self.path("talk-transcript.srt")), read(self.path("expected.srt")))
+        self.assertEqual(read(self.path("talk-transcript.txt")).count("Hello there"), 1)
+
+
+
+class TestHtmlViewer(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def path(self, *names):
+        return os.path.join(self.temp_dir, *names)
+
+    @patch('diarized_transcriber.html_exporter.CHUNK_SEGMENTS', 2)
+    def test_chunks_and_index(self):
+        """Test segments are split into data files with an index of time ranges and turn starts"""
+        segments = SEGMENTS + [{"start": 63, "end": 64, "text": "</script><b>", "speaker": "SPEAKER_00"}]
+        generate_html_viewer(segments, self.path("talk.viewer.html"))
+
+        self.assertEqual(sorted(os.listdir(self.path("talk.viewer_files"))),
+                         ["chunk-00000.js", "chunk-00001.js", "chunk-00002.js", "index.js"])
+        index = read_script(self.path("talk.viewer_files", "index.js"))
+        self.assertEqual(index, {"title": "talk", "speakers": ["SPEAKER_00", "SPEAKER_01"], "complete": True,
+                                 "chunks": [[0, 3.5, 2, [0]], [4, 62.5, 2, [0, 1]], [63, 64, 1, []]]})
+
+        first = read_script(self.path("talk.viewer_files", "chunk-00000.js"))
+        self.assertEqual(first, {"continued": False, "rows": [[0, 1.5, "Hello there", 0], [2, 3.5, "How are you?", -1]]})
+        # A chunk starting mid-turn still names the speaker, flagged as a continuation
+        last = read(self.path("talk.viewer_files", "chunk-00002.js"))
+        self.assertTrue(last.startswith("transcriptChunk(2,"))
+        self.assertNotIn("<", last)
+        self.assertEqual(read_script(self.path("talk.viewer_files", "chunk-00002.js")),
+                         {"continued": True, "rows": [[63, 64, "</script><b>", 0]]})
+
+        page = read(self.path("talk.viewer.html"))
+        self.assertIn('var DATA_DIR = "talk.viewer_files";', page)
+        self.assertNotIn("Hello there", page)
+
+    def test_page_weight_independent_of_length(self):
+        """Test the page and its first data file stay the same size for a much longer transcript"""
+        sizes = []
+        for count in (600, 60000):
+            segments = [{"start": i * 2.0, "end": i * 2.0 + 1, "text": f"Line {i % 10}.", "speaker": f"SPEAKER_0{i // 7 % 3}"}
+                        for i in range(count)]
+            generate_html_viewer(segments, self.path(f"n{count:05d}.viewer.html"))
+            sizes.append([os.path.getsize(self.path(f"n{count:05d}.viewer.html")),
+                          os.path.getsize(self.path(f"n{count:05d}.viewer_files", "chunk-00000.js"))])
+        self.assertEqual(sizes[0], sizes[1])
+        self.assertLess(os.path.getsize(self.path("n60000.viewer_files", "index.js")), 5000)
+
+    @patch('diarized_transcriber.html_exporter.CHUNK_SEGMENTS', 2)
+    def test_streamed_index_grows_and_stale_chunks_removed(self):
+        """Test a streamed viewer lists each chunk as it is written, and a re-export drops old chunks"""
+        stream = TranscriptStream(self.temp_dir, "talk", ["viewer"], has_speakers=True)
+        self.assertEqual(stream.paths, [self.path("talk.viewer.html")])
+        for seg in SEGMENTS[:3]:
+            stream.write(seg)
+        index = read_script(self.path("talk.viewer_files", "index.js"))
+        self.assertEqual((len(index["chunks"]), index["complete"]), (1, False))
+        stream.finish(SEGMENTS)
+        index = read_script(self.path("talk.viewer_files", "index.js"))
+        self.assertEqual((len(index["chunks"]), index["complete"]), (2, True))
+
+        written = export_transcript({"segments": SEGMENTS[:1]}, self.temp_dir, "talk", ["viewer"])
+        self.assertEqual(written, [self.path("talk.viewer.html")])
+        self.assertEqual(sorted(os.listdir(self.path("talk.viewer_files"))), ["chunk-00000.js", "index.js"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+import unittest
+import tempfile
+import shutil
+import json
+import os
+import numpy as np
+from diarized_transcriber.transcript import Transcript, NO_SPEAKER
+from diarized_transcriber.export import export_transcript
+from diarized_transcriber.txt_exporter import generate_txt
+
+
+def make_result():
+    segments = [
+        {"start": 0.0, "end": 1.2, "text": " Hello there.", "speaker": "SPEAKER_00", "words": [
+            {"word": "Hello", "start": 0.0, "end": 0.5, "score": 0.91, "speaker": "SPEAKER_00"},
+            {"word": "there.", "start": 0.6, "end": 1.2, "score": 0.88, "speaker": "SPEAKER_00"},
+        ]},
+        {"start": 1.5, "end": 3.0, "text": " It's 2024.", "speaker": "SPEAKER_01", "words": [
+            {"word": "It's", "start": 1.5, "end": 1.8, "score": 0.7, "speaker": "SPEAKER_01"},
+            # Aligners leave numerals without timings
+            {"word": "2024."},
+        ]},
+        {"start": 3.2, "end": 4.0, "text": " Ok.", "words": [
+            {"word": "Ok.", "start": 3.2, "end": 4.0, "score": 0.99},
+        ]},
+    ]
+    return {"segments": segments, "word_segments": [w for s in segments for w in s["words"]], "language": "en"}
+
+
+class TestTranscript(unittest.TestCase):
+
+    def test_round_trip(self):
+        """Test converting to the columnar form and back gives the same result"""
+        result = make_result()
+        self.assertEqual(Transcript.from_result(result).to_result(), result)
+
+    def test_columns(self):
+        """Test labels are interned and missing values use the sentinels"""
+        transcript = Transcript.from_result(make_result())
+        self.assertEqual(len(transcript), 3)
+        self.assertEqual(transcript.word_count, 5)
+        self.assertEqual(transcript.speakers, ["SPEAKER_00", "SPEAKER_01"])
+        self.assertEqual(transcript.seg_speaker.tolist(), [0, 1, NO_SPEAKER])
+        self.assertTrue(np.isnan(transcript.word_start[3]))
+        self.assertEqual(transcript.segment_text(1), " It's 2024.")
+        self.assertEqual(transcript.language, "en")
+        self.assertTrue(transcript.has_speakers)
+
+    def test_iterates_as_segments(self):
+        """Test iteration yields the segment fields exporters read, without words"""
+        segments = list(Transcript.from_result(make_result()))
+        self.assertEqual(segments[0], {"start": 0.0, "end": 1.2, "text": " Hello there.", "speaker": "SPEAKER_00"})
+        self.assertNotIn("speaker", segments[2])
+
+    def test_empty(self):
+        """Test an empty result converts both ways"""
+        transcript = Transcript.from_result({"segments": [], "language": "en"})
+        self.assertEqual(len(transcript), 0)
+        self.assertFalse(transcript.has_speakers)
+        self.assertEqual(transcript.to_result(), {"segments": [], "word_segments": [], "language": "en"})
+
+
+class TestTranscriptExport(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read(self, name):
+        with open(os.path.join(self.temp_dir, name), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def test_exporters_accept_transcript(self):
+        """Test every format writes the same output from a Transcript as from the dicts"""
+        result = make_result()
+        transcript = Transcript.from_result(result)
+        export_transcript(result, self.temp_dir, "dicts", ["srt", "txt", "md", "html", "json"])
+        export_transcript(transcript, self.temp_dir, "columns", ["srt", "txt", "md", "html", "json", "pdf"])
+        for ext in ("srt", "txt", "md", "html"):
+            self.assertEqual(self.read(f"columns.{ext}"), self.read(f"dicts.{ext}"), ext)
+        self.assertEqual(json.loads(self.read("columns.json")), json.loads(self.read("dicts.json")))
+        self.assertTrue(os.path.getsize(os.path.join(self.temp_dir, "columns.pdf")) > 0)
+
+        generate_txt(transcript, os.path.join(self.temp_dir, "direct.txt"), include_timestamps=True)
+        self.assertEqual(self.read("direct.txt"), self.read("dicts.txt"))
+
+
+if __name__ == '__main__':
+    unittest.main()
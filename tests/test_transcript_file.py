@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+
+import unittest
+import tempfile
+import shutil
+import json
+import os
+import subprocess
+import sys
+from diarized_transcriber.transcript import Transcript
+from diarized_transcriber.block_file import ALIGNMENT
+from diarized_transcriber.transcript_file import load_transcript, save_transcript
+from diarized_transcriber.export import export_transcript
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_result():
+    segments = [
+        {"start": 0.0, "end": 1.2, "text": " Hello there.", "speaker": "SPEAKER_00", "words": [
+            {"word": "Hello", "start": 0.0, "end": 0.5, "score": 0.91, "speaker": "SPEAKER_00"},
+            {"word": "there.", "start": 0.6, "end": 1.2, "score": 0.88, "speaker": "SPEAKER_00"},
+        ]},
+        {"start": 1.5, "end": 3.0, "text": " It's 2024.", "speaker": "SPEAKER_01", "words": [
+            {"word": "It's", "start": 1.5, "end": 1.8, "score": 0.7, "speaker": "SPEAKER_01"},
+            {"word": "2024."},
+        ]},
+        {"start": 3.2, "end": 4.0, "text": " Ok.", "words": [{"word": "Ok.", "start": 3.2, "end": 4.0, "score": 0.99}]},
+    ]
+    return {"segments": segments, "word_segments": [w for s in segments for w in s["words"]], "language": "en"}
+
+
+def read(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+class TestTranscriptFile(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "talk.dtr")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_round_trip(self):
+        """Test saving and loading, mapped or read, reproduces the result"""
+        result = make_result()
+        result["segments"][0]["text"] = " Héllo thère 🎙️"
+        save_transcript(Transcript.from_result(result), self.path)
+        for use_mmap in (True, False):
+            transcript = load_transcript(self.path, use_mmap=use_mmap)
+            self.assertEqual(transcript.to_result(), result)
+            self.assertEqual(transcript.speakers, ["SPEAKER_00", "SPEAKER_01"])
+
+    def test_mapped_arrays(self):
+        """Test mapped arrays are read-only and aligned, and the speaker columns can still be replaced"""
+        save_transcript(make_result(), self.path)
+        transcript = load_transcript(self.path)
+        self.assertFalse(transcript.word_start.flags.writeable)
+        self.assertEqual(transcript.word_start.ctypes.data % 8, 0)
+
+        from diarized_transcriber.speaker_assignment import assign_word_speakers
+        assign_word_speakers([{"start": 0.0, "end": 5.0, "speaker": "HOST"}], transcript)
+        self.assertEqual([seg["speaker"] for seg in transcript], ["HOST"] * 3)
+
+    def test_empty(self):
+        """Test a transcript without segments round-trips"""
+        save_transcript({"segments": [], "language": "en"}, self.path)
+        transcript = load_transcript(self.path)
+        self.assertEqual(len(transcript), 0)
+        self.assertEqual(transcript.language, "en")
+        self.assertEqual(os.path.getsize(self.path) % ALIGNMENT, 0)
+
+    def test_rejects_other_files(self):
+        """Test non-transcript files and other format versions raise ValueError"""
+        with open(self.path, "wb") as f:
+            f.write(b'{"segments": []}')
+        with self.assertRaises(ValueError):
+            load_transcript(self.path)
+
+        save_transcript(make_result(), self.path)
+        with open(self.path, "r+b") as f:
+            f.seek(8)
+            f.write((99).to_bytes(4, "little"))
+        with self.assertRaisesRegex(ValueError, "version 99"):
+            load_transcript(self.path)
+
+    def test_exported_as_format(self):
+        """Test dtr is an export format and renders the same text formats as the original result"""
+        export_transcript(make_result(), self.temp_dir, "original", ["dtr", "md", "srt"])
+        transcript = load_transcript(os.path.join(self.temp_dir, "original.dtr"))
+        export_transcript(transcript, self.temp_dir, "reloaded", ["md", "srt"])
+        for ext in ("md", "srt"):
+            self.assertEqual(read(os.path.join(self.temp_dir, f"reloaded.{ext}")),
+                             read(os.path.join(self.temp_dir, f"original.{ext}")))
+
+
+class TestExportCommand(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def run_export(self, *args):
+        code = ("import sys\n"
+                "from diarized_transcriber.cli import main\n"
+                "sys.argv = ['transcribe', 'export'] + sys.argv[1:]\n"
+                "main()\n"
+                "print([m for m in ('torch', 'whisperx') if m in sys.modules])\n")
+        env = dict(os.environ, PYTHONPATH=PROJECT_ROOT)
+        return subprocess.run([sys.executable, "-c", code, *args], capture_output=True, text=True, env=env,
+                              timeout=120)
+
+    def test_renders_without_models(self):
+        """Test `transcribe export` writes the formats from a .dtr or .json file without importing torch/whisperx"""
+        save_transcript(make_result(), os.path.join(self.temp_dir, "ep1-transcript.dtr"))
+        with open(os.path.join(self.temp_dir, "ep2.json"), "w", encoding="utf-8") as f:
+            json.dump(make_result(), f)
+
+        out_dir = os.path.join(self.temp_dir, "out")
+        completed = self.run_export(os.path.join(self.temp_dir, "ep1-transcript.dtr"), "--output-dir", out_dir,
+                                    "--formats", "txt", "srt")
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        self.assertTrue(completed.stdout.strip().endswith("[]"))
+        self.assertEqual(sorted(os.listdir(out_dir)), ["ep1-transcript.srt", "ep1-transcript.txt"])
+
+        completed = self.run_export(os.path.join(self.temp_dir, "ep2.json"), "--output-dir", out_dir, "--name", "two",
+                                    "--quiet")
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        self.assertIn("SPEAKER_01", read(os.path.join(out_dir, "two.md")))
+
+    def test_bad_input(self):
+        """Test an unreadable transcript is reported as a usage error"""
+        completed = self.run_export(os.path.join(self.temp_dir, "missing.dtr"))
+        self.assertEqual(completed.returncode, 2)
+        self.assertIn("missing.dtr", completed.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()